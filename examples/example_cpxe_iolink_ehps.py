@@ -7,34 +7,26 @@ import time
 from cpx_io.cpx_system.cpx_e.cpx_e import CpxE
 from cpx_io.cpx_system.cpx_e.eep import CpxEEp
 from cpx_io.cpx_system.cpx_e.e4iol import CpxE4Iol
-
-
-# process data as dict
-def read_process_data_in(data):
-    """Read the process data and return as dict"""
-    # ehps provides 3 x UIntegerT16 "process data in" according to datasheet.
-    # you can unpack the data easily with stuct
-    ehps_data = struct.unpack(">HHHH", data)
-    # the last 16 bit value of this list is always 0 since ehps only uses 3*16 bit
-    assert ehps_data[3] == 0
-
-    process_data_dict = {}
-
-    process_data_dict["Error"] = bool((ehps_data[0] >> 15) & 1)
-    process_data_dict["DirectionCloseFlag"] = bool((ehps_data[0] >> 14) & 1)
-    process_data_dict["DirectionOpenFlag"] = bool((ehps_data[0] >> 13) & 1)
-    process_data_dict["LatchDataOk"] = bool((ehps_data[0] >> 12) & 1)
-    process_data_dict["UndefinedPositionFlag"] = bool((ehps_data[0] >> 11) & 1)
-    process_data_dict["ClosedPositionFlag"] = bool((ehps_data[0] >> 10) & 1)
-    process_data_dict["GrippedPositionFlag"] = bool((ehps_data[0] >> 9) & 1)
-    process_data_dict["OpenedPositionFlag"] = bool((ehps_data[0] >> 8) & 1)
-
-    process_data_dict["Ready"] = bool((ehps_data[0] >> 6) & 1)
-
-    process_data_dict["ErrorNumber"] = ehps_data[1]
-    process_data_dict["ActualPosition"] = ehps_data[2]
-
-    return process_data_dict
+from cpx_io.utils.codecs import StructCodec
+
+
+# ehps provides 3 x UIntegerT16 "process data in" according to datasheet. The codec
+# decodes them (and the flags of the first word) into a record. The 4th word is unused.
+EHPS_CODEC = StructCodec(
+    ">HHHH",
+    ["StatusWord", "ErrorNumber", "ActualPosition", "Unused"],
+    bits={
+        "Error": (0, 15),
+        "DirectionCloseFlag": (0, 14),
+        "DirectionOpenFlag": (0, 13),
+        "LatchDataOk": (0, 12),
+        "UndefinedPositionFlag": (0, 11),
+        "ClosedPositionFlag": (0, 10),
+        "GrippedPositionFlag": (0, 9),
+        "OpenedPositionFlag": (0, 8),
+        "Ready": (0, 6),
+    },
+)
 
 
 # list of some connected modules. IO-Link module is specified with 8 bytes per port:
@@ -69,11 +61,10 @@ with CpxE(
     # (optional) read line-state, should now be "OPERATE" for the channel
     param = e4iol.read_line_state()
 
-    # read process data
-    raw_data = e4iol.read_channel(EHPS_CHANNEL)
-
-    # interpret it according to datasheet
-    process_data_in = read_process_data_in(raw_data)
+    # register the codec for the port, read_ports() then decodes the process data
+    # according to datasheet
+    e4iol.register_codec(EHPS_CHANNEL, EHPS_CODEC)
+    process_data_in = e4iol.read_ports()[EHPS_CHANNEL]
 
     # demo of process data out needed to initialize EHPS
     control_word_msb = 0x00
@@ -103,9 +94,7 @@ with CpxE(
     e4iol.write_channel(EHPS_CHANNEL, process_data_out)
 
     # wait for the process data in to change to "opened"
-    while not process_data_in["OpenedPositionFlag"]:
-        process_data_in = read_process_data_in(e4iol.read_channel(EHPS_CHANNEL))
-        time.sleep(0.05)
+    e4iol.wait_for(EHPS_CHANNEL, lambda data: data.OpenedPositionFlag, timeout=5.0)
 
     # Close command 0x 0200
     process_data_out[0] = 0x0200
@@ -113,6 +102,4 @@ with CpxE(
     e4iol.write_channel(EHPS_CHANNEL, process_data_out)
 
     # wait for the process data in to change to "closed"
-    while not process_data_in["ClosedPositionFlag"]:
-        process_data_in = read_process_data_in(e4iol.read_channel(EHPS_CHANNEL))
-        time.sleep(0.05)
+    e4iol.wait_for(EHPS_CHANNEL, lambda data: data.ClosedPositionFlag, timeout=5.0)
@@ -0,0 +1,58 @@
+"""Parameter backup of IO-Link devices on CPX-AP IO-Link ports"""
+
+from dataclasses import dataclass, field
+
+
+@dataclass
+class PortBackup:
+    """Raw ISDU data of the device parameters of one IO-Link device keyed by (index,
+    subindex). The data is restored as read, so no data types are needed."""
+
+    vendor_id: int
+    device_id: int
+    parameters: dict[tuple[int, int], bytes] = field(default_factory=dict)
+
+    def matches(self, vendor_id: int, device_id: int) -> bool:
+        """Returns True if the backup belongs to a device with the given IDs
+
+        :param vendor_id: actual vendor ID of the port
+        :type vendor_id: int
+        :param device_id: actual device ID of the port
+        :type device_id: int
+        :return: True if the IDs are the IDs of the backup
+        :rtype: bool
+        """
+        return (self.vendor_id, self.device_id) == (vendor_id, device_id)
+
+    def to_dict(self) -> dict:
+        """Returns the backup as json serializable dict with the data as hex strings
+
+        :return: backup
+        :rtype: dict
+        """
+        return {
+            "vendor_id": self.vendor_id,
+            "device_id": self.device_id,
+            "parameters": [
+                [index, subindex, data.hex()]
+                for (index, subindex), data in self.parameters.items()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PortBackup":
+        """Creates a backup from a dict returned by to_dict()
+
+        :param data: backup
+        :type data: dict
+        :return: backup
+        :rtype: PortBackup
+        """
+        return cls(
+            data["vendor_id"],
+            data["device_id"],
+            {
+                (index, subindex): bytes.fromhex(value)
+                for index, subindex, value in data["parameters"]
+            },
+        )
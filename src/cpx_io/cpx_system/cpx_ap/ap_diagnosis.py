@@ -0,0 +1,215 @@
+"""Diagnosis monitoring of CPX-AP systems"""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from cpx_io.cpx_system.cpx_ap.dataclasses.module_diagnosis import ModuleDiagnosis
+from cpx_io.utils.logging import Logging
+
+# bits of the global diagnosis state (register 11000 and 11001), the following bits
+# are reserved
+GLOBAL_DIAGNOSIS_KEYS = (
+    "Device available",
+    "Current",
+    "Voltage",
+    "Temperature",
+    "reserved",
+    "Movement",
+    "Configuration / Parameters",
+    "Monitoring",
+    "Communication",
+    "Safety",
+    "Internal Hardware",
+    "Software",
+    "Maintenance",
+    "Misc",
+    "reserved(14)",
+    "reserved(15)",
+    "External Device",
+    "Security",
+    "Encoder",
+)
+
+# registers of the global diagnosis block (state, count, latest index and code)
+GLOBAL_DIAGNOSIS_REGISTERS = 6
+# registers of the diagnosis block of every module, the code is in the last two
+MODULE_DIAGNOSIS_REGISTERS = 6
+
+
+def decode_global_diagnosis_state(data: bytes) -> dict:
+    """Decodes the global diagnosis state registers
+
+    :param data: content of register 11000 and 11001
+    :type data: bytes
+    :return: state of every diagnosis key
+    :rtype: dict
+    """
+    value = int.from_bytes(data[:4], byteorder="little")
+    return {
+        key: bool(value >> bit & 1) for bit, key in enumerate(GLOBAL_DIAGNOSIS_KEYS)
+    }
+
+
+@dataclass
+class DiagnosisState:
+    """Global diagnosis block of a CPX-AP system read with one request"""
+
+    state: dict
+    active_count: int
+    latest_module: int | None
+    latest_code: int
+
+    @classmethod
+    def from_registers(cls, data: bytes) -> "DiagnosisState":
+        """Decodes the registers 11000 to 11005
+
+        :param data: register content
+        :type data: bytes
+        :return: diagnosis state
+        :rtype: DiagnosisState
+        """
+        # AP starts with module index 1
+        latest_module = int.from_bytes(data[6:8], byteorder="little") - 1
+        return cls(
+            state=decode_global_diagnosis_state(data[:4]),
+            active_count=int.from_bytes(data[4:6], byteorder="little"),
+            latest_module=latest_module if latest_module >= 0 else None,
+            latest_code=int.from_bytes(data[8:12], byteorder="little"),
+        )
+
+
+@dataclass
+class DiagnosisEvent:
+    """Change of the diagnosis state. name is a key of the global diagnosis state,
+    "active_count" or "latest" (the latest diagnosis code of module). diagnosis is
+    the ModuleDiagnosis of the latest diagnosis code if the module knows it."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    timestamp: float
+    name: str
+    old: object
+    new: object
+    module: int = None
+    diagnosis: ModuleDiagnosis = None
+
+
+@dataclass
+class ActiveDiagnosis:
+    """Active diagnosis of one module, diagnosis is None if the code is not in the
+    diagnosis dict of the module"""
+
+    module: object  # ApModule
+    code: int
+    diagnosis: ModuleDiagnosis = None
+
+
+class DiagnosisMonitor:
+    """Polls the global diagnosis block of a CpxAp with one request, decodes it once
+    and returns events only for the values that changed. The events are kept in a
+    bounded history in the order they occurred for post-mortems.
+    """
+
+    def __init__(self, cpx, history_size: int = 1000):
+        """Constructor of the DiagnosisMonitor class.
+
+        :param cpx: system to monitor
+        :type cpx: CpxAp
+        :param history_size: (optional) number of events kept in the history,
+            defaults to 1000
+        :type history_size: int
+        """
+        self.cpx = cpx
+        self.history = deque(maxlen=history_size)
+        self.state = None
+
+    def poll(self) -> list[DiagnosisEvent]:
+        """Reads the diagnosis state and returns the changes since the last poll. The
+        first poll reports the active diagnoses only, a healthy system gives no events.
+
+        :return: events
+        :rtype: list[DiagnosisEvent]
+        """
+        state = self.cpx.read_diagnosis_state()
+        timestamp = time.time()
+        previous, self.state = self.state, state
+
+        events = []
+        for key, new in state.state.items():
+            old = previous.state[key] if previous else None
+            if old != new and (previous or new):
+                events.append(DiagnosisEvent(timestamp, key, old, new))
+        old_count = previous.active_count if previous else None
+        if old_count != state.active_count and (previous or state.active_count):
+            events.append(
+                DiagnosisEvent(
+                    timestamp,
+                    "active_count",
+                    old_count,
+                    state.active_count,
+                )
+            )
+        latest = (state.latest_module, state.latest_code)
+        old_latest = (
+            (previous.latest_module, previous.latest_code) if previous else None
+        )
+        if latest != old_latest and (previous or state.latest_code):
+            events.append(
+                DiagnosisEvent(
+                    timestamp,
+                    "latest",
+                    old_latest,
+                    latest,
+                    state.latest_module,
+                    self._diagnosis(state.latest_module, state.latest_code),
+                )
+            )
+
+        for event in events:
+            Logging.logger.info(f"{self.cpx}: {event}")
+        self.history.extend(events)
+        return events
+
+    def stream(self, period: float = 0.1, count: int = None):
+        """Generator that polls every period and yields the events
+
+        :param period: (optional) time between two polls in s, defaults to 0.1
+        :type period: float
+        :param count: (optional) number of polls, endless if not given
+        :type count: int
+        :return: events
+        :rtype: Generator[DiagnosisEvent]
+        """
+        polled = 0
+        while count is None or polled < count:
+            start = time.monotonic()
+            yield from self.poll()
+            polled += 1
+            time.sleep(max(0.0, period - (time.monotonic() - start)))
+
+    def events(self, since: float = None, until: float = None) -> list[DiagnosisEvent]:
+        """Returns the events of the history in a time range, oldest first. The
+        timestamps are wall clock times that can jump, so the whole history is checked.
+
+        :param since: (optional) first timestamp (time.time()), defaults to the oldest
+        :type since: float
+        :param until: (optional) last timestamp, defaults to the newest
+        :type until: float
+        :return: events
+        :rtype: list[DiagnosisEvent]
+        """
+        return [
+            event
+            for event in list(self.history)
+            if (since is None or event.timestamp >= since)
+            and (until is None or event.timestamp <= until)
+        ]
+
+    def _diagnosis(self, position: int | None, code: int) -> ModuleDiagnosis | None:
+        if position is None or not 0 <= position < len(self.cpx.modules):
+            return None
+        module_dicts = getattr(self.cpx.modules[position], "module_dicts", None)
+        if module_dicts is None or not module_dicts.diagnosis:
+            return None
+        return module_dicts.diagnosis.get(code)
@@ -0,0 +1,457 @@
+"""IODD (IO-Link device description) based decoding of ISDU and process data"""
+
+import json
+import os
+import re
+import struct
+import tempfile
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from dataclasses import dataclass
+
+from cpx_io.utils.logging import Logging
+
+XSI_TYPE = "{http://www.w3.org/2001/XMLSchema-instance}type"
+
+# increase when the format of the compiled IODDs changes, older files are recompiled
+IODD_COMPILER_VERSION = 2
+
+# variables of the IO-Link standard definitions that are referenced by StdVariableRef
+STANDARD_VARIABLES = {
+    "V_VendorName": 0x10,
+    "V_VendorText": 0x11,
+    "V_ProductName": 0x12,
+    "V_ProductID": 0x13,
+    "V_ProductText": 0x14,
+    "V_SerialNumber": 0x15,
+    "V_HardwareRevision": 0x16,
+    "V_FirmwareRevision": 0x17,
+    "V_ApplicationSpecificTag": 0x18,
+    "V_FunctionTag": 0x19,
+    "V_LocationTag": 0x1A,
+}
+
+# standard variables that can be written, the others are read only
+STANDARD_WRITABLE_VARIABLES = {
+    "V_ApplicationSpecificTag",
+    "V_FunctionTag",
+    "V_LocationTag",
+}
+
+# bit length of the datatypes without bitLength attribute
+DEFAULT_BIT_LENGTHS = {"BooleanT": 1, "Float32T": 32}
+
+
+def _field_name(name: str) -> str:
+    """Returns the IODD name as python identifier, e.g. "Switching signal 1" as
+    "switching_signal_1" """
+    name = re.sub(r"\W+", "_", name).strip("_").lower()
+    return name if name and not name[0].isdigit() else f"_{name}"
+
+
+def _bit_length(datatype: dict) -> int | None:
+    """Returns the bit length of a datatype, None for strings of variable length"""
+    if "bitLength" in datatype:
+        return datatype["bitLength"]
+    if "fixedLength" in datatype:
+        return datatype["fixedLength"] * 8
+    return DEFAULT_BIT_LENGTHS.get(datatype["type"])
+
+
+def _converter(datatype: dict, bits: int):
+    """Returns a function that converts the raw value (int of bits bits) of a simple
+    datatype"""
+    kind = datatype["type"]
+    if kind == "BooleanT":
+        return bool
+    if kind == "IntegerT":
+        sign = 1 << (bits - 1)
+        return lambda value: (value ^ sign) - sign
+    if kind == "Float32T":
+        return lambda value: struct.unpack(">f", value.to_bytes(4, "big"))[0]
+    if kind == "StringT":
+        encoding = "utf-8" if datatype.get("encoding") == "UTF-8" else "ascii"
+        return lambda value: (
+            value.to_bytes(bits // 8, "big").decode(encoding).split("\x00", 1)[0]
+        )
+    if kind == "OctetStringT":
+        return lambda value: value.to_bytes(bits // 8, "big")
+    # UIntegerT and types without conversion (e.g. TimeT) are returned as int
+    return lambda value: value
+
+
+class IoddCodec:
+    """Decoder of one IODD datatype, compiled once from the datatype description.
+    IO-Link data is transmitted msb first, bitOffset 0 is the lowest bit of the last
+    byte. Records are decoded into a named tuple with the item names as python
+    identifiers (lower case, non-alphanumeric characters replaced by "_").
+    """
+
+    def __init__(self, datatype: dict):
+        """Constructor of the IoddCodec class.
+
+        :param datatype: compiled datatype (see parse_iodd)
+        :type datatype: dict
+        """
+        self.datatype = datatype
+        self.bit_length = _bit_length(datatype)
+        self.record_type = None
+        if datatype["type"] == "RecordT":
+            items = datatype["items"]
+            self.record_type = namedtuple(
+                "Record", [_field_name(i["name"]) for i in items], rename=True
+            )
+            self._fields = []
+            for item in items:
+                bits = _bit_length(item["datatype"])
+                self._fields.append(
+                    (
+                        item["bitOffset"],
+                        (1 << bits) - 1,
+                        _converter(item["datatype"], bits),
+                    )
+                )
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.datatype['type']}, {self.bit_length} bit)"
+
+    @property
+    def size(self) -> int | None:
+        """Size of the data in bytes, None for strings of variable length"""
+        return None if self.bit_length is None else (self.bit_length + 7) // 8
+
+    def decode(self, data: bytes):
+        """Decodes data of the datatype
+
+        :param data: ISDU or process data, msb first
+        :type data: bytes
+        :return: value or record with the item names as fields
+        :rtype: any
+        """
+        kind = self.datatype["type"]
+        if self.bit_length is None or kind in ("StringT", "OctetStringT"):
+            data = bytes(data[: self.size])
+            if kind == "StringT":
+                return _converter(self.datatype, len(data) * 8)(
+                    int.from_bytes(data, "big")
+                )
+            return data
+
+        size = self.size
+        value = int.from_bytes(bytes(data[:size]).ljust(size, b"\x00"), "big")
+        if self.record_type is None:
+            return _converter(self.datatype, self.bit_length)(
+                value & ((1 << self.bit_length) - 1)
+            )
+        return self.record_type(
+            *(convert(value >> shift & mask) for shift, mask, convert in self._fields)
+        )
+
+    def item(self, subindex: int) -> "IoddCodec":
+        """Returns the codec of one record item, e.g. to decode an ISDU that was read
+        with a subindex
+
+        :param subindex: subindex of the record item
+        :type subindex: int
+        :return: codec of the item
+        :rtype: IoddCodec
+        """
+        for item in self.datatype.get("items", []):
+            if item["subindex"] == subindex:
+                return IoddCodec(item["datatype"])
+        raise ValueError(f"{self} has no subindex {subindex}")
+
+
+@dataclass
+class IoddVariable:
+    """ISDU variable of an IODD"""
+
+    name: str
+    index: int
+    codec: IoddCodec
+    access_rights: str = "rw"
+
+    @property
+    def writable(self) -> bool:
+        """True if the variable can be read and written, e.g. for a backup"""
+        return self.access_rights == "rw"
+
+
+class IoddDevice:
+    """Compiled IODD of one device with the ISDU variables and process data codecs"""
+
+    def __init__(self, description: dict):
+        """Constructor of the IoddDevice class.
+
+        :param description: compiled IODD (see parse_iodd)
+        :type description: dict
+        """
+        self.vendor_id = description["vendor_id"]
+        self.device_id = description["device_id"]
+        self.name = description["name"]
+        self.variables = {}
+        for name, variable in description["variables"].items():
+            self.variables[name] = IoddVariable(
+                name,
+                variable["index"],
+                IoddCodec(variable["datatype"]),
+                variable.get("access", "rw"),
+            )
+        self.process_data_in = self._codec(description.get("process_data_in"))
+        self.process_data_out = self._codec(description.get("process_data_out"))
+
+    def __repr__(self):
+        return f"{self.name} (vendor id: {self.vendor_id}, device id: {self.device_id})"
+
+    @staticmethod
+    def _codec(datatype: dict | None) -> IoddCodec | None:
+        return None if datatype is None else IoddCodec(datatype)
+
+    def parameter_indices(self) -> list[int]:
+        """Returns the indices of the variables that can be read and written, i.e.
+        the device parameters of a backup
+
+        :return: sorted indices
+        :rtype: list[int]
+        """
+        return sorted(
+            {
+                variable.index
+                for variable in self.variables.values()
+                if variable.writable
+            }
+        )
+
+    def variable(self, name: str) -> IoddVariable:
+        """Returns an ISDU variable by name (e.g. "Vendor Name") or IODD id (e.g.
+        "V_VendorName")
+
+        :param name: name or id of the variable
+        :type name: str
+        :return: variable
+        :rtype: IoddVariable
+        """
+        if name not in self.variables:
+            raise ValueError(f"{self} has no variable '{name}'")
+        return self.variables[name]
+
+
+def parse_iodd(xml: str | bytes) -> dict:
+    """Compiles an IODD xml into a json serializable description with the ISDU
+    variables (by name and id) and the process data layouts.
+
+    :param xml: content of the IODD file
+    :type xml: str | bytes
+    :return: compiled IODD
+    :rtype: dict
+    """
+    # pylint: disable=too-many-locals
+    root = ET.fromstring(xml)
+    if not root.tag.startswith("{"):
+        raise ValueError("IODD without namespace is not supported")
+    # the namespace depends on the IODD version
+    ns = {"i": root.tag[1:].split("}")[0]}
+
+    texts = {
+        text.get("id"): text.get("value")
+        for text in root.iterfind(
+            ".//i:ExternalTextCollection/i:PrimaryLanguage/i:Text", ns
+        )
+    }
+    datatypes = {
+        datatype.get("id"): datatype
+        for datatype in root.iterfind(".//i:DatatypeCollection/i:Datatype", ns)
+    }
+
+    def name_of(element, tag: str = "Name") -> str:
+        name = element.find(f"i:{tag}", ns)
+        return texts.get(name.get("textId"), "") if name is not None else ""
+
+    def datatype_of(element) -> dict | None:
+        datatype = element.find("i:Datatype", ns)
+        if datatype is None:
+            datatype = element.find("i:SimpleDatatype", ns)
+        if datatype is None:
+            ref = element.find("i:DatatypeRef", ns)
+            if ref is None:
+                return None
+            datatype = datatypes[ref.get("datatypeId")]
+
+        compiled = {"type": datatype.get(XSI_TYPE).split(":")[-1]}
+        for attribute in ("bitLength", "fixedLength"):
+            if datatype.get(attribute) is not None:
+                compiled[attribute] = int(datatype.get(attribute))
+        if datatype.get("encoding") is not None:
+            compiled["encoding"] = datatype.get("encoding")
+        if compiled["type"] == "RecordT":
+            compiled["items"] = [
+                {
+                    "name": name_of(item),
+                    "subindex": int(item.get("subindex")),
+                    "bitOffset": int(item.get("bitOffset")),
+                    "datatype": datatype_of(item),
+                }
+                for item in datatype.iterfind("i:RecordItem", ns)
+            ]
+        return compiled
+
+    identity = root.find(".//i:DeviceIdentity", ns)
+    if identity is None:
+        raise ValueError("IODD has no DeviceIdentity")
+
+    device_name = name_of(identity, "DeviceName")
+
+    variables = {}
+    for ref in root.iterfind(".//i:VariableCollection/i:StdVariableRef", ns):
+        variable_id = ref.get("id")
+        if variable_id in STANDARD_VARIABLES:
+            # "V_SerialNumber" is named "Serial Number"
+            name = re.sub(r"(?<=[a-z])(?=[A-Z])", " ", variable_id[2:])
+            variable = {
+                "index": STANDARD_VARIABLES[variable_id],
+                "datatype": {"type": "StringT"},
+                "access": (
+                    "rw" if variable_id in STANDARD_WRITABLE_VARIABLES else "ro"
+                ),
+            }
+            variables[name] = variables[variable_id] = variable
+    for element in root.iterfind(".//i:VariableCollection/i:Variable", ns):
+        datatype = datatype_of(element)
+        if datatype is None:
+            continue
+        variable = {
+            "index": int(element.get("index")),
+            "datatype": datatype,
+            "access": element.get("accessRights", "rw"),
+        }
+        variables[element.get("id")] = variable
+        if name_of(element):
+            variables[name_of(element)] = variable
+
+    process_data = {}
+    for direction in ("In", "Out"):
+        element = root.find(
+            f".//i:ProcessDataCollection/i:ProcessData/i:ProcessData{direction}", ns
+        )
+        process_data[direction] = None if element is None else datatype_of(element)
+
+    return {
+        "vendor_id": int(identity.get("vendorId")),
+        "device_id": int(identity.get("deviceId")),
+        "name": f"{identity.get('vendorName', '')} {device_name}".strip(),
+        "variables": variables,
+        "process_data_in": process_data["In"],
+        "process_data_out": process_data["Out"],
+    }
+
+
+class IoddLibrary:
+    """IODD files of a local folder, found by vendor and device ID. The files are
+    compiled on first use and the compiled IODDs are saved as json in cache_path, so
+    they are only parsed again when the IODD file changed.
+    """
+
+    def __init__(self, path: str, cache_path: str = None):
+        """Constructor of the IoddLibrary class.
+
+        :param path: folder with the IODD xml files
+        :type path: str
+        :param cache_path: (optional) folder for the compiled IODDs, not saved if None
+        :type cache_path: str
+        """
+        self.path = path
+        self.cache_path = cache_path
+        self._devices = None
+
+    def __len__(self):
+        self._load()
+        return len(self._devices)
+
+    def get(self, vendor_id: int, device_id: int) -> IoddDevice | None:
+        """Returns the IODD of a device
+
+        :param vendor_id: IO-Link vendor ID
+        :type vendor_id: int
+        :param device_id: IO-Link device ID
+        :type device_id: int
+        :return: IODD or None if there is no IODD for the device
+        :rtype: IoddDevice | None
+        """
+        self._load()
+        return self._devices.get((vendor_id, device_id))
+
+    def reload(self) -> None:
+        """Scans the folder again, e.g. after new IODD files were added"""
+        self._devices = None
+        self._load()
+
+    def _load(self) -> None:
+        if self._devices is not None:
+            return
+        self._devices = {}
+        for file_name in sorted(os.listdir(self.path)):
+            if not file_name.lower().endswith(".xml"):
+                continue
+            try:
+                device = IoddDevice(self._compiled(file_name))
+            except (ET.ParseError, ValueError, KeyError, TypeError) as error:
+                Logging.logger.warning(f"Skipped IODD {file_name} ({error})")
+                continue
+            self._devices[(device.vendor_id, device.device_id)] = device
+        Logging.logger.debug(f"Loaded {len(self._devices)} IODDs from {self.path}")
+
+    def _compiled(self, file_name: str) -> dict:
+        """Returns the compiled IODD from the cache or compiles the file"""
+        file_path = os.path.join(self.path, file_name)
+        stat = os.stat(file_path)
+        source = [file_name, stat.st_mtime_ns, stat.st_size, IODD_COMPILER_VERSION]
+
+        cache_file = None
+        if self.cache_path:
+            cache_file = os.path.join(
+                self.cache_path, os.path.splitext(file_name)[0] + ".json"
+            )
+            cached = self._read_cache(cache_file)
+            if cached is not None and cached.get("source") == source:
+                return cached["iodd"]
+
+        with open(file_path, "rb") as f:
+            description = parse_iodd(f.read())
+        Logging.logger.debug(f"Compiled IODD {file_name}")
+
+        if cache_file:
+            self._write_cache(cache_file, {"source": source, "iodd": description})
+        return description
+
+    @staticmethod
+    def _read_cache(cache_file: str) -> dict | None:
+        """Returns the content of a cache file or None if it is missing or corrupt"""
+        if not os.path.isfile(cache_file):
+            return None
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as error:
+            Logging.logger.warning(f"Ignored IODD cache {cache_file} ({error})")
+            return None
+        if not isinstance(cached, dict) or "iodd" not in cached:
+            Logging.logger.warning(f"Ignored IODD cache {cache_file} (invalid content)")
+            return None
+        return cached
+
+    @staticmethod
+    def _write_cache(cache_file: str, content: dict) -> None:
+        """Writes a cache file via a temporary file, so it is never left half written.
+        Errors are logged, the IODD is then compiled again on the next load."""
+        temp_file = None
+        try:
+            fd, temp_file = tempfile.mkstemp(
+                suffix=".tmp", dir=os.path.dirname(cache_file)
+            )
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(content, f)
+            os.replace(temp_file, cache_file)
+        except OSError as error:
+            Logging.logger.warning(f"Could not write IODD cache {cache_file} ({error})")
+            if temp_file and os.path.exists(temp_file):
+                os.remove(temp_file)
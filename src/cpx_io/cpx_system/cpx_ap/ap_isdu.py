@@ -0,0 +1,528 @@
+"""ISDU (IO-Link device parameter) transactions of CPX-AP systems"""
+
+import struct
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any
+
+from cpx_io.cpx_system.cpx_base import CONNECTION_LOST_ERRORS, CpxRequestError
+from cpx_io.cpx_system.cpx_ap import ap_modbus_registers
+from cpx_io.cpx_system.cpx_ap.ap_supported_datatypes import SUPPORTED_ISDU_DATATYPES
+from cpx_io.cpx_system.cpx_transport import MAX_READ_REGISTERS, MAX_WRITE_REGISTERS
+from cpx_io.utils.logging import Logging
+from cpx_io.utils.statistics import LatencyStatistics
+
+# shortest sleep between two status polls after the fast poll window, doubled after
+# every poll up to max_poll_interval
+ISDU_MIN_POLL_INTERVAL = 0.0005
+
+# registers from ISDU_STATUS to the first data register
+ISDU_HEADER_REGISTERS = (
+    ap_modbus_registers.ISDU_DATA.register_address
+    - ap_modbus_registers.ISDU_STATUS.register_address
+)
+
+
+# IO-Link identification data (vendor name ... location tag) that is cached
+IDENTIFICATION_INDICES = frozenset(range(0x10, 0x1B))
+
+
+class IsduCommand(IntEnum):
+    """Commands of the ISDU mailbox, the swapped variants change the byte order of
+    the data (used for numbers)"""
+
+    READ_SWAPPED = 50
+    WRITE_SWAPPED = 51
+    READ = 100
+    WRITE = 101
+
+
+@dataclass
+class IsduJob:
+    """One ISDU request of a batch. The job is a write if data is not None, else a
+    read that returns the value as data_type."""
+
+    module: Any  # ApModule or module position
+    channel: int
+    index: int
+    subindex: int = 0
+    data_type: str = "raw"
+    data: Any = None
+
+
+@dataclass
+class IsduResult:
+    """Result of an IsduJob, value is None for writes and failed jobs"""
+
+    job: IsduJob
+    value: Any = None
+    error: Exception = None
+
+    @property
+    def ok(self) -> bool:
+        """True if the job was executed without error"""
+        return self.error is None
+
+
+class IsduCache:
+    """Cache of ISDU identification data keyed by (module position, channel, index,
+    subindex). The entries of a port are dropped when the port state reported by
+    update_port() changes, e.g. a new actual vendor/device ID or the DevCOM bit of
+    the PQI, so a device swap is detected by the regular status reads.
+    """
+
+    def __init__(self, indices: frozenset = IDENTIFICATION_INDICES):
+        """Constructor of the IsduCache class.
+
+        :param indices: (optional) cached ISDU indices, defaults to the identification
+            data
+        :type indices: frozenset
+        """
+        self.enabled = True
+        self.indices = indices
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = {}
+        self._ports = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def cacheable(self, index: int) -> bool:
+        """Returns True if reads of the index are cached"""
+        return self.enabled and index in self.indices
+
+    def get(self, key: tuple, command: IsduCommand) -> bytes | None:
+        """Returns the cached data of key read with command or None"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != command:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: tuple, command: IsduCommand, data: bytes) -> None:
+        """Stores the data of key read with command"""
+        self._entries[key] = (command, data)
+
+    def discard(self, key: tuple) -> None:
+        """Drops the entry of key, e.g. after the ISDU was written"""
+        self._entries.pop(key, None)
+
+    def update_port(self, position: int, channel: int, **state) -> None:
+        """Reports the state of a port, e.g. vendor_id=..., device_id=...,
+        port_status=... or dev_com=.... The entries of the port are dropped if one of
+        the given values changed since the last report.
+
+        :param position: position of the module, starting with 0 for the bus module
+        :type position: int
+        :param channel: Channel number, starting with 0
+        :type channel: int
+        """
+        port = self._ports.setdefault((position, channel), {})
+        changed = [
+            name for name, value in state.items() if port.get(name, value) != value
+        ]
+        port.update(state)
+        if changed:
+            Logging.logger.debug(
+                f"ISDU cache of module {position} channel {channel} invalidated "
+                f"({', '.join(changed)} changed)"
+            )
+            self.invalidate(position, channel)
+
+    def invalidate(self, position: int = None, channel: int = None) -> None:
+        """Drops the entries of a port, a module (channel None) or all entries
+
+        :param position: (optional) position of the module, all modules if None
+        :type position: int
+        :param channel: (optional) Channel number, all channels if None
+        :type channel: int
+        """
+        keys = [
+            key
+            for key in list(self._entries)
+            if position in (None, key[0]) and channel in (None, key[1])
+        ]
+        for key in keys:
+            self._entries.pop(key, None)
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drops all entries and the known port states"""
+        self._entries.clear()
+        self._ports.clear()
+
+    def statistics(self) -> dict:
+        """Returns hits, misses, invalidations and the number of entries
+
+        :return: cache statistics
+        :rtype: dict
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+        }
+
+
+def read_command(data_type: str) -> IsduCommand:
+    """Returns the read command for a data type, numbers are read with byte swap
+
+    :param data_type: data type, see SUPPORTED_ISDU_DATATYPES
+    :type data_type: str
+    :return: read command
+    :rtype: IsduCommand
+    """
+    # checking the availability in the SUPPORTED_ISDU_DATATYPES is not required but
+    # keeps the two files synchronized during development
+    if data_type in ["raw", "str"] and data_type in SUPPORTED_ISDU_DATATYPES:
+        return IsduCommand.READ
+    if data_type in ["int", "bool", "float"] and data_type in SUPPORTED_ISDU_DATATYPES:
+        return IsduCommand.READ_SWAPPED
+    raise TypeError(f"Datatype '{data_type}' is not supported by read_isdu()")
+
+
+def decode(data: bytes, data_type: str) -> Any:
+    """Returns the ISDU data read with read_command(data_type) as data_type
+
+    :param data: ISDU data
+    :type data: bytes
+    :param data_type: data type, see SUPPORTED_ISDU_DATATYPES
+    :type data_type: str
+    :return: Value depending on the datatype
+    :rtype: any
+    """
+    if data_type == "raw":
+        return data
+    if data_type == "str":
+        return data.decode("ascii").split("\x00", 1)[0]
+    if data_type == "int":
+        return int.from_bytes(data, byteorder="little")
+    if data_type == "bool":
+        return bool.from_bytes(data, byteorder="little")
+    if data_type == "float":
+        return struct.unpack("f", data)[0]
+    raise TypeError(f"Datatype '{data_type}' is not supported by read_isdu()")
+
+
+def encode(data: bytes | str | int | bool) -> tuple[bytes, IsduCommand]:
+    """Returns the ISDU data and the write command for a value
+
+    :param data: value to write
+    :type data: bytes|str|int|bool
+    :return: ISDU data and write command
+    :rtype: tuple[bytes, IsduCommand]
+    """
+    if isinstance(data, bytes):
+        return data, IsduCommand.WRITE  # write without byteswap
+    if isinstance(data, str):
+        return data.encode(encoding="ascii"), IsduCommand.WRITE
+    if isinstance(data, bool):
+        return data.to_bytes(1, byteorder="little"), IsduCommand.WRITE_SWAPPED
+    if isinstance(data, int):
+        # calculate bytelength of integer
+        length = (data.bit_length() + 7) // 8
+        data = data.to_bytes(length, byteorder="little", signed=data < 0)
+        return data, IsduCommand.WRITE_SWAPPED  # write with byteswap
+    raise TypeError(f"Datatype '{type(data)}' is not supported by write_isdu()")
+
+
+class IsduEngine:
+    """Executes ISDU requests through the ISDU mailbox registers of a CPX-AP system.
+
+    The request (module, channel, index, subindex, length and data) is written with
+    one request and the command afterwards, because the command starts the
+    transaction. The status is polled back to back during a short fast poll window and
+    then with growing sleeps until the deadline. Every poll also reads the length and
+    the first data registers, so short values need no further request when the
+    transaction is done.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        base,
+        timeout: float = 1.0,
+        fast_poll_time: float = 0.002,
+        max_poll_interval: float = 0.01,
+        prefetch_registers: int = 8,
+    ):
+        """Constructor of the IsduEngine class.
+
+        :param base: system that provides the register access
+        :type base: CpxBase
+        :param timeout: (optional) deadline of one transaction in s, defaults to 1.0
+        :type timeout: float
+        :param fast_poll_time: (optional) time in s in which the status is polled
+            without sleep, defaults to 0.002
+        :type fast_poll_time: float
+        :param max_poll_interval: (optional) longest sleep between two polls in s
+        :type max_poll_interval: float
+        :param prefetch_registers: (optional) number of data registers that are read
+            with every status poll, defaults to 8
+        :type prefetch_registers: int
+        """
+        self.base = base
+        self.timeout = timeout
+        self.fast_poll_time = fast_poll_time
+        self.max_poll_interval = max_poll_interval
+        self.prefetch_registers = min(
+            prefetch_registers,
+            ap_modbus_registers.ISDU_DATA.length,
+            MAX_READ_REGISTERS - ISDU_HEADER_REGISTERS,
+        )
+        self.cache = IsduCache()
+        # content of the registers from ISDU_MODULE_NO on while a batch is running,
+        # None if unknown
+        self._batch = False
+        self._registers = None
+        self._statistics = {
+            kind: {"polls": 0, "timeouts": 0, "latency": LatencyStatistics()}
+            for kind in ("read", "write")
+        }
+
+    def read(
+        self,
+        position: int,
+        channel: int,
+        index: int,
+        subindex: int = 0,
+        command: IsduCommand = IsduCommand.READ,
+    ) -> bytes:
+        """Reads one ISDU.
+
+        :param position: position of the module, starting with 0 for the bus module
+        :type position: int
+        :param channel: Channel number, starting with 0
+        :type channel: int
+        :param index: io-link parameter index
+        :type index: int
+        :param subindex: (optional) io-link parameter subindex, defaults to 0
+        :type subindex: int
+        :param command: (optional) read command, defaults to IsduCommand.READ
+        :type command: IsduCommand
+        :return: data of the ISDU
+        :rtype: bytes
+        """
+        with self.base.mailbox("isdu"):
+            return self._read(position, channel, index, subindex, command)
+
+    def write(
+        self,
+        position: int,
+        channel: int,
+        index: int,
+        subindex: int,
+        data: bytes,
+        command: IsduCommand = IsduCommand.WRITE,
+    ) -> None:
+        """Writes one ISDU.
+
+        :param position: position of the module, starting with 0 for the bus module
+        :type position: int
+        :param channel: Channel number, starting with 0
+        :type channel: int
+        :param index: io-link parameter index
+        :type index: int
+        :param subindex: io-link parameter subindex
+        :type subindex: int
+        :param data: data to write
+        :type data: bytes
+        :param command: (optional) write command, defaults to IsduCommand.WRITE
+        :type command: IsduCommand
+        """
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        with self.base.mailbox("isdu"):
+            self._write(position, channel, index, subindex, data, command)
+
+    def batch(self, requests: list[tuple]) -> list:
+        """Executes ISDU requests back to back while holding the ISDU mailbox. Setup
+        registers that still hold the value of the previous request are not written
+        again. A failed request (including a transport error) does not abort the batch,
+        its exception is returned instead of the data.
+
+        :param requests: requests as (position, channel, index, subindex, data,
+            command), data is None for reads
+        :type requests: list[tuple]
+        :return: data (reads), None (writes) or the exception of every request
+        :rtype: list
+        """
+        results = []
+        with self.base.mailbox("isdu"):
+            self._batch = True
+            try:
+                for position, channel, index, subindex, data, command in requests:
+                    try:
+                        if data is None:
+                            ret = self._read(
+                                position, channel, index, subindex, command
+                            )
+                        else:
+                            self._write(
+                                position, channel, index, subindex, data, command
+                            )
+                            ret = None
+                    except (
+                        CpxRequestError,
+                        ValueError,
+                        *CONNECTION_LOST_ERRORS,
+                    ) as error:
+                        # the state of the registers is unknown after a failure
+                        self._registers = None
+                        ret = error
+                    results.append(ret)
+            finally:
+                self._batch = False
+                self._registers = None
+        return results
+
+    def statistics(self) -> dict:
+        """Returns polls, timeouts and latency statistics of the ISDU transactions and
+        the cache statistics
+
+        :return: dict with "read", "write" and "cache" statistics
+        :rtype: dict
+        """
+        return {
+            kind: {
+                "polls": values["polls"],
+                "timeouts": values["timeouts"],
+                "latency": values["latency"].as_dict(),
+            }
+            for kind, values in self._statistics.items()
+        } | {"cache": self.cache.statistics()}
+
+    def _read(
+        self, position: int, channel: int, index: int, subindex: int, command
+    ) -> bytes:
+        key = (position, channel, index, subindex)
+        cacheable = self.cache.cacheable(index)
+        if cacheable:
+            data = self.cache.get(key, command)
+            if data is not None:
+                return data
+
+        start = time.perf_counter()
+        self._request(position, channel, index, subindex, b"", command)
+        header = self._wait(
+            "read", f"module {position} channel {channel} ({index},{subindex})"
+        )
+        length_bytes = header[ISDU_HEADER_REGISTERS * 2 - 2 : ISDU_HEADER_REGISTERS * 2]
+        length = int.from_bytes(length_bytes, byteorder="little")
+        data = header[ISDU_HEADER_REGISTERS * 2 :]
+        if length > len(data):
+            data += self.base.read_reg_data(
+                ap_modbus_registers.ISDU_DATA.register_address + len(data) // 2,
+                (length - len(data) + 1) // 2,
+            )
+        if self._registers is not None:
+            # the device returns the length and data in the request registers
+            self._registers = self._registers[:8] + length_bytes
+        self._statistics["read"]["latency"].record(time.perf_counter() - start)
+        if cacheable:
+            self.cache.put(key, command, data[:length])
+        return data[:length]
+
+    def _write(
+        self,
+        position: int,
+        channel: int,
+        index: int,
+        subindex: int,
+        data: bytes,
+        command: IsduCommand,
+    ) -> None:
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        if len(data) > ap_modbus_registers.ISDU_DATA.length * 2:
+            raise ValueError(
+                f"ISDU data with {len(data)} bytes exceeds "
+                f"{ap_modbus_registers.ISDU_DATA.length * 2} bytes"
+            )
+        self.cache.discard((position, channel, index, subindex))
+        start = time.perf_counter()
+        self._request(position, channel, index, subindex, data, command)
+        self._wait("write", f"module {position} channel {channel} ({index},{subindex})")
+        self._statistics["write"]["latency"].record(time.perf_counter() - start)
+
+    def _request(
+        self,
+        position: int,
+        channel: int,
+        index: int,
+        subindex: int,
+        data: bytes,
+        command: IsduCommand,
+    ) -> None:
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        # module and channel start with 1, the length is zero for reads
+        request = (
+            struct.pack("<HHHHH", position + 1, channel + 1, index, subindex, len(data))
+            + data
+        )
+        first = ap_modbus_registers.ISDU_MODULE_NO.register_address
+        if not self._batch:
+            changed = (0, len(request))
+        else:
+            request += b"\x00" * (len(request) % 2)
+            registers = self._registers or b""
+            changed = self._changed_span(request, registers)
+            self._registers = request + registers[len(request) :]
+
+        if changed is not None:
+            chunk = MAX_WRITE_REGISTERS * 2
+            for offset in range(changed[0], changed[1], chunk):
+                self.base.write_reg_data(
+                    request[offset : min(offset + chunk, changed[1])],
+                    first + offset // 2,
+                )
+        # the command starts the transaction, so it is written last
+        self.base.write_reg_data(
+            int(command).to_bytes(2, byteorder="little"),
+            ap_modbus_registers.ISDU_COMMAND.register_address,
+        )
+
+    @staticmethod
+    def _changed_span(request: bytes, registers: bytes) -> tuple | None:
+        """Returns first and end byte of the registers of request that differ from
+        registers or None if all are equal"""
+        changed = [
+            offset
+            for offset in range(0, len(request), 2)
+            if request[offset : offset + 2] != registers[offset : offset + 2]
+        ]
+        if not changed:
+            return None
+        return changed[0], changed[-1] + 2
+
+    def _wait(self, kind: str, request: str) -> bytes:
+        """Polls the status until the transaction is done and returns the registers
+        from ISDU_STATUS on"""
+        start = time.monotonic()
+        fast_poll_end = start + self.fast_poll_time
+        deadline = start + self.timeout
+        interval = ISDU_MIN_POLL_INTERVAL
+        statistics = self._statistics[kind]
+        while True:
+            header = self.base.read_reg_data(
+                ap_modbus_registers.ISDU_STATUS.register_address,
+                ISDU_HEADER_REGISTERS + self.prefetch_registers,
+            )
+            statistics["polls"] += 1
+            if int.from_bytes(header[:2], byteorder="little") == 0:
+                return header
+            now = time.monotonic()
+            if now >= deadline:
+                statistics["timeouts"] += 1
+                Logging.logger.error(f"ISDU {kind} of {request} timed out")
+                raise CpxRequestError(
+                    f"ISDU data {kind} of {request} failed, no response within "
+                    f"{self.timeout} s"
+                )
+            if now >= fast_poll_end:
+                time.sleep(min(interval, deadline - now))
+                interval = min(interval * 2, self.max_poll_interval)
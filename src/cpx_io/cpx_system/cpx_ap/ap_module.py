@@ -4,13 +4,16 @@ import struct
 import inspect
 from typing import Any
 from collections import namedtuple
-from cpx_io.cpx_system.cpx_base import CpxBase, CpxRequestError
+from cpx_io.cpx_system.cpx_base import (
+    CONNECTION_LOST_ERRORS,
+    CpxBase,
+    CpxRequestError,
+)
 from cpx_io.cpx_system.cpx_module import CpxModule
 from cpx_io.cpx_system.cpx_ap.ap_product_categories import ProductCategory
 from cpx_io.cpx_system.cpx_ap.ap_supported_datatypes import (
     SUPPORTED_DATATYPES,
     SUPPORTED_IOL_DATATYPES,
-    SUPPORTED_ISDU_DATATYPES,
 )
 from cpx_io.cpx_system.cpx_ap.ap_supported_functions import (
     DIAGNOSIS_FUNCTIONS,
@@ -22,7 +25,11 @@ from cpx_io.cpx_system.cpx_ap.ap_supported_functions import (
 from cpx_io.cpx_system.cpx_ap.dataclasses.module_diagnosis import ModuleDiagnosis
 from cpx_io.cpx_system.cpx_ap.dataclasses.system_parameters import SystemParameters
 from cpx_io.cpx_system.cpx_ap.dataclasses.channels import Channels
-from cpx_io.cpx_system.cpx_ap import ap_modbus_registers
+from cpx_io.cpx_system.cpx_ap import ap_isdu
+from cpx_io.cpx_system.cpx_ap.ap_backup import PortBackup
+from cpx_io.cpx_system.cpx_ap.ap_isdu import IsduJob
+from cpx_io.cpx_system.cpx_ap.ap_iodd import IoddDevice
+from cpx_io.cpx_system.cpx_ap.ap_pqi import IoLinkPort, PortQualifier, decode_pqi
 from cpx_io.utils.boollist import bytes_to_boollist, boollist_to_bytes
 from cpx_io.utils.helpers import (
     div_ceil,
@@ -34,6 +41,9 @@ from cpx_io.utils.helpers import (
 from cpx_io.utils.logging import Logging
 from cpx_io.cpx_system.cpx_ap.dataclasses.apdd_information import ApddInformation
 
+# first input register of the port qualifier information of IO-Link modules
+PQI_REGISTER_OFFSET = 16
+
 
 class ApModule(CpxModule):
     """Generic AP module class. This includes all functions that are shared
@@ -43,6 +53,7 @@ class ApModule(CpxModule):
 
     # pylint: disable=too-many-public-methods
     # pylint: disable=too-many-lines
+    # pylint: disable=too-many-instance-attributes
     # intended. Module offers many functions for user comfort
 
     def __init__(
@@ -70,7 +81,20 @@ class ApModule(CpxModule):
             },
         )
 
+        # IO-Link special parameters, see read_fieldbus_parameters()
         self.fieldbus_parameters = None
+        # channels whose DevCOM bit changed since the fieldbus parameters were read
+        self._outdated_ports = set()
+        # ((vendor ID, device ID), process data decoder of the IODD) per channel
+        self._decoders = {}
+        # DevCOM bit of the IO-Link ports from the last read_channels()
+        self._dev_com = None
+        # PortBackup per channel that is restored when a matching device appears
+        self.port_backups = {}
+        # channels with a backup on which a device appeared, see restore_pending_ports()
+        self._pending_restore = set()
+        # IoddLibrary of the system, set in configure()
+        self.iodds = None
 
     def __repr__(self):
         return f"{self.name} (idx: {self.position}, type: {self.apdd_information.module_type})"
@@ -155,10 +179,11 @@ class ApModule(CpxModule):
         self.base.next_output_register += div_ceil(self.information.output_size, 2)
         self.base.next_input_register += div_ceil(self.information.input_size, 2)
         self.base.next_diagnosis_register += 6  # always 6 registers per module
+        self.iodds = self.base.iodds
 
-        # IO-Link special parameter
-        if self.apdd_information.product_category == ProductCategory.IO_LINK.value:
-            self.fieldbus_parameters = self.read_fieldbus_parameters()
+        # IO-Link special parameters are read on first use
+        self.fieldbus_parameters = None
+        self._decoders.clear()
 
     @staticmethod
     def _generate_decode_string(channels: list) -> str:
@@ -238,6 +263,9 @@ class ApModule(CpxModule):
             )
 
             if self.apdd_information.product_category == ProductCategory.IO_LINK.value:
+                pqi = data[PQI_REGISTER_OFFSET * 2 : PQI_REGISTER_OFFSET * 2 + 4]
+                if len(pqi) == 4:
+                    self._update_port_qualifiers(decode_pqi(pqi))
                 # IO-Link splits into byte_channel_size chunks. Assumes all channels are the same
                 byte_channel_size = self.channels.inouts[0].array_size
                 # for IO-Link only the channels.inouts are relevant
@@ -314,14 +342,110 @@ class ApModule(CpxModule):
 
         channel_range_check(channel, channel_count)
 
-        # if datalength is given and full_size is not requested, shorten output
-        if self.fieldbus_parameters and not full_size:
-            return self.read_channels()[channel][
-                : self.fieldbus_parameters[channel]["Input data length"]
-            ]
+        # if datalength is given and full_size is not requested, shorten output. The
+        # parameters of ports whose DevCOM bit changed are read again first
+        params = self.fieldbus_parameters
+        if self.apdd_information.product_category == ProductCategory.IO_LINK.value:
+            params = self.read_fieldbus_parameters(refresh_outdated=True)
+        if params and not full_size:
+            data = self.read_channels()[channel][: params[channel]["Input data length"]]
+            decoder = self._decoder(channel, params[channel])
+            if decoder:
+                return decoder.decode(data)
+            return data
 
         return self.read_channels()[channel]
 
+    def _decoder(self, channel: int, params: dict):
+        """Returns the process data decoder of the IODD of the device on the channel.
+        It is looked up once per device and again when the IDs of the port change."""
+        ids = (params.get("Actual vendor ID"), params.get("Actual device ID"))
+        cached = self._decoders.get(channel)
+        if cached is None or cached[0] != ids:
+            device = self.iodds.get(*ids) if self.iodds is not None else None
+            cached = (ids, device.process_data_in if device else None)
+            self._decoders[channel] = cached
+        return cached[1]
+
+    def reset_port_states(self) -> None:
+        """Forgets the fieldbus parameters and the DevCOM bits of the IO-Link ports,
+        e.g. after a reconnect. They are read again on the next access and every port
+        with a device then counts as appeared for the auto restore (see backup_port()).
+        """
+        self.fieldbus_parameters = None
+        self._outdated_ports.clear()
+        self._dev_com = None
+
+    def _update_port_qualifiers(self, qualifiers: list[PortQualifier]) -> None:
+        """Marks the fieldbus parameters and the cached identification data of a port
+        as outdated if its DevCOM bit changed, e.g. after a device was connected or
+        swapped. Nothing is read here, the data is read again on the next access."""
+        dev_com = [bool(pqi & PortQualifier.DEV_COM) for pqi in qualifiers]
+        previous, self._dev_com = self._dev_com, dev_com
+        if dev_com == previous:
+            return
+        # without a previous state (first read or after a reconnect) every port counts
+        # as changed, a device may have been swapped in the meantime
+        changed = {
+            channel_item
+            for channel_item, dev_com_item in enumerate(dev_com)
+            if previous is None or dev_com_item != previous[channel_item]
+        }
+        for channel_item in sorted(changed):
+            self.base.isdu.cache.update_port(
+                self.position, channel_item, dev_com=dev_com[channel_item]
+            )
+        if previous is not None:
+            Logging.logger.debug(f"{self.name}: DevCOM changed to {dev_com}")
+            self._outdated_ports.update(changed)
+        appeared = {
+            channel_item
+            for channel_item in changed
+            if dev_com[channel_item] and channel_item in self.port_backups
+        }
+        if appeared:
+            # the restore needs several blocking reads, so it must not run here in the
+            # process data path but as job of the scheduler
+            self._pending_restore.update(appeared)
+            self.base.submit(self.restore_pending_ports)
+
+    @CpxBase.require_base
+    def restore_pending_ports(self) -> list[int]:
+        """Restores the backups created with auto_restore on the ports on which a device
+        appeared. The ports are collected when read_channels(), read_ports() or
+        read_pqi() notice a device and this function is then queued as job of the
+        scheduler (see CpxBase.submit()). Devices that do not match the backup are left
+        as they are, errors are logged.
+
+        :return: channels whose backup was restored
+        :rtype: list[int]
+        """
+        self._check_function_supported(inspect.currentframe().f_code.co_name)
+
+        restored = []
+        for channel in sorted(self._pending_restore):
+            self._pending_restore.discard(channel)
+            backup = self.port_backups.get(channel)
+            if backup is None:
+                continue
+            try:
+                params = self.read_fieldbus_parameters(refresh_outdated=True)[channel]
+                if not backup.matches(
+                    params["Actual vendor ID"], params["Actual device ID"]
+                ):
+                    Logging.logger.info(
+                        f"{self.name}: Device on channel {channel} does not match the "
+                        "backup"
+                    )
+                    continue
+                self.restore_port(channel, backup)
+                restored.append(channel)
+            except (CpxRequestError, ValueError, *CONNECTION_LOST_ERRORS) as error:
+                Logging.logger.error(
+                    f"{self.name}: Restoring channel {channel} failed ({error})"
+                )
+        return restored
+
     @CpxBase.require_base
     def write_channels(self, data: list[Any]) -> None:
         """Write all channels with a list of values. Length of the list must fit the output
@@ -547,6 +671,9 @@ class ApModule(CpxModule):
                     i,
                 )
 
+        # e.g. the port mode changes the port status of IO-Link modules
+        self.fieldbus_parameters = None
+
         Logging.logger.info(
             f"{self.name}: Setting {parameter.name}, instances {instances} to {value}"
         )
@@ -748,40 +875,33 @@ class ApModule(CpxModule):
         """
         self._check_function_supported(inspect.currentframe().f_code.co_name)
 
-        data45 = self.base.read_reg_data(self.system_entry_registers.inputs + 16)[0]
-        data67 = self.base.read_reg_data(self.system_entry_registers.inputs + 17)[0]
-        data = [
-            data45 & 0xFF,
-            (data45 & 0xFF00) >> 8,
-            data67 & 0xFF,
-            (data67 & 0xFF00) >> 8,
-        ]
-
-        channels_pqi = []
-        for data_item in data:
-            port_qualifier = (
-                "input data is valid"
-                if (data_item & 0b10000000) >> 7
-                else "input data is invalid"
-            )
-            device_error = (
-                "there is at least one error or warning on the device or port"
-                if (data_item & 0b01000000) >> 6
-                else "there are no errors or warnings on the device or port"
-            )
-            dev_com = (
-                "device is in status PREOPERATE or OPERATE"
-                if (data_item & 0b00100000) >> 5
-                else "device is not connected or not yet in operation"
-            )
-
-            channels_pqi.append(
-                {
-                    "Port Qualifier": port_qualifier,
-                    "Device Error": device_error,
-                    "DevCOM": dev_com,
-                }
+        qualifiers = decode_pqi(
+            self.base.read_reg_data(
+                self.system_entry_registers.inputs + PQI_REGISTER_OFFSET, 2
             )
+        )
+        self._update_port_qualifiers(qualifiers)
+
+        channels_pqi = [
+            {
+                "Port Qualifier": (
+                    "input data is valid"
+                    if pqi & PortQualifier.PQ
+                    else "input data is invalid"
+                ),
+                "Device Error": (
+                    "there is at least one error or warning on the device or port"
+                    if pqi & PortQualifier.DEV_ERR
+                    else "there are no errors or warnings on the device or port"
+                ),
+                "DevCOM": (
+                    "device is in status PREOPERATE or OPERATE"
+                    if pqi & PortQualifier.DEV_COM
+                    else "device is not connected or not yet in operation"
+                ),
+            }
+            for pqi in qualifiers
+        ]
 
         Logging.logger.info(f"{self.name}: Reading PQI of channel(s) {channel}")
 
@@ -790,14 +910,176 @@ class ApModule(CpxModule):
         return channels_pqi[channel]
 
     @CpxBase.require_base
-    def read_fieldbus_parameters(self) -> list[dict]:
-        """Read all fieldbus parameters (status/information) for all channels.
+    def read_ports(self, mask_invalid: bool = False) -> list[IoLinkPort]:
+        """Reads the process data and the PQI of all IO-Link ports with one request.
+        The PQI is decoded into PortQualifier flags, see IoLinkPort.valid. Raises
+        ValueError if the input data of the module does not contain the PQI.
+
+        :param mask_invalid: (optional) return None as data of ports whose input data
+            is not valid, defaults to False
+        :type mask_invalid: bool
+        :return: IoLinkPort for every port
+        :rtype: list[IoLinkPort]
+        """
+        self._check_function_supported(inspect.currentframe().f_code.co_name)
+
+        data = self.base.read_reg_data(
+            self.system_entry_registers.inputs, div_ceil(self.information.input_size, 2)
+        )
+        pqi = data[PQI_REGISTER_OFFSET * 2 : PQI_REGISTER_OFFSET * 2 + 4]
+        if len(pqi) != 4:
+            raise ValueError(
+                f"{self.name}: Input size of {self.information.input_size} bytes does "
+                f"not contain the PQI bytes (input bytes {PQI_REGISTER_OFFSET * 2} to "
+                f"{PQI_REGISTER_OFFSET * 2 + 3})"
+            )
+        qualifiers = decode_pqi(pqi)
+        self._update_port_qualifiers(qualifiers)
+
+        # all channels have the same size
+        size = self.channels.inouts[0].array_size
+        ports = []
+        for channel_item, pqi in enumerate(qualifiers):
+            channel_data = data[channel_item * size : (channel_item + 1) * size]
+            if mask_invalid and not pqi & PortQualifier.PQ:
+                channel_data = None
+            ports.append(IoLinkPort(channel_item, channel_data, pqi))
+        Logging.logger.info(f"{self.name}: Reading IO-Link ports: {ports}")
+        return ports
+
+    @CpxBase.require_base
+    def backup_port(
+        self,
+        channel: int,
+        indices: list[int | tuple[int, int]] = None,
+        auto_restore: bool = False,
+    ) -> PortBackup:
+        """Reads the device parameters of an IO-Link port with one ISDU batch. Indices
+        that cannot be read are left out of the backup.
+
+        :param channel: Channel number, starting with 0
+        :type channel: int
+        :param indices: (optional) index or (index, subindex) of every parameter,
+            defaults to the read/write variables of the IODD of the device
+        :type indices: list[int | tuple[int, int]]
+        :param auto_restore: (optional) restore the backup with restore_port() when a
+            device with the same vendor and device ID appears on the port
+        :type auto_restore: bool
+        :return: backup of the device parameters
+        :rtype: PortBackup
+        """
+        self._check_function_supported(inspect.currentframe().f_code.co_name)
+
+        if indices is None:
+            iodd = self.iodd(channel)
+            if iodd is None:
+                raise ValueError(
+                    f"{self.name}: No indices given and no IODD for channel {channel}"
+                )
+            indices = iodd.parameter_indices()
+        keys = [key if isinstance(key, tuple) else (key, 0) for key in indices]
+
+        params = self.read_fieldbus_parameters(refresh_outdated=True)[channel]
+        backup = PortBackup(params["Actual vendor ID"], params["Actual device ID"])
+        results = self.base.isdu_batch(
+            [IsduJob(self, channel, index, subindex) for index, subindex in keys]
+        )
+        for key, result in zip(keys, results):
+            if result.ok:
+                backup.parameters[key] = result.value
+            else:
+                Logging.logger.warning(
+                    f"{self.name}: Backup of channel {channel} {key} failed "
+                    f"({result.error!r})"
+                )
+
+        if auto_restore:
+            self.port_backups[channel] = backup
+        Logging.logger.info(
+            f"{self.name}: Backup of {len(backup.parameters)} parameters of channel "
+            f"{channel}"
+        )
+        return backup
+
+    @CpxBase.require_base
+    def restore_port(
+        self, channel: int, backup: PortBackup = None
+    ) -> list[tuple[int, int]]:
+        """Writes the parameters of a backup that differ from the values of the device.
+        The current values are read with one ISDU batch and the differences written
+        with another one. Raises CpxRequestError if a parameter cannot be written.
+
+        :param channel: Channel number, starting with 0
+        :type channel: int
+        :param backup: (optional) backup to restore, defaults to the backup of the port
+            created with auto_restore
+        :type backup: PortBackup
+        :return: (index, subindex) of the written parameters
+        :rtype: list[tuple[int, int]]
+        """
+        self._check_function_supported(inspect.currentframe().f_code.co_name)
+
+        if backup is None:
+            if channel not in self.port_backups:
+                raise ValueError(f"{self.name}: No backup for channel {channel}")
+            backup = self.port_backups[channel]
+        params = self.read_fieldbus_parameters(refresh_outdated=True)[channel]
+        if not backup.matches(params["Actual vendor ID"], params["Actual device ID"]):
+            raise ValueError(
+                f"{self.name}: Device on channel {channel} does not match the backup "
+                f"(vendor ID {backup.vendor_id}, device ID {backup.device_id})"
+            )
 
+        keys = list(backup.parameters)
+        current = self.base.isdu_batch(
+            [IsduJob(self, channel, index, subindex) for index, subindex in keys]
+        )
+        changed = [
+            key
+            for key, result in zip(keys, current)
+            if not result.ok or result.value != backup.parameters[key]
+        ]
+        results = self.base.isdu_batch(
+            [
+                IsduJob(self, channel, *key, data=backup.parameters[key])
+                for key in changed
+            ]
+        )
+        failed = [key for key, result in zip(changed, results) if not result.ok]
+        if failed:
+            raise CpxRequestError(
+                f"{self.name}: Restoring {failed} of channel {channel} failed"
+            )
+
+        Logging.logger.info(
+            f"{self.name}: Restored {len(changed)} of {len(keys)} parameters of "
+            f"channel {channel}"
+        )
+        return changed
+
+    @CpxBase.require_base
+    def read_fieldbus_parameters(self, refresh_outdated: bool = False) -> list[dict]:
+        """Read all fieldbus parameters (status/information) for all channels. The
+        result is kept in fieldbus_parameters.
+
+        :param refresh_outdated: (optional) only read the parameters that are outdated:
+            all of them on first use or after a module parameter was written, otherwise
+            the ports whose DevCOM bit changed since the last read (with one batch).
+            Without outdated ports fieldbus_parameters is returned without a request.
+            Defaults to False
+        :type refresh_outdated: bool
         :return: a dict of parameters for every channel.
         :rtype: list[dict]
         """
         self._check_function_supported(inspect.currentframe().f_code.co_name)
 
+        if refresh_outdated and self.fieldbus_parameters is not None:
+            channels = sorted(self._outdated_ports)
+            if not channels:
+                return self.fieldbus_parameters
+        else:
+            channels = list(range(4))
+
         params = {
             "port_status_info": self.module_dicts.parameters.get(20074),
             "revision_id": self.module_dicts.parameters.get(20075),
@@ -808,7 +1090,7 @@ class ApModule(CpxModule):
             "iolink_input_data_length": self.module_dicts.parameters.get(20108),
             "iolink_output_data_length": self.module_dicts.parameters.get(20109),
         }
-        channel_params = []
+        channel_params = list(self.fieldbus_parameters or [None] * 4)
 
         port_status_dict = {
             0: "NO_DEVICE",
@@ -823,68 +1105,76 @@ class ApModule(CpxModule):
         }
         transmission_rate_dict = {0: "not detected", 1: "COM1", 2: "COM2", 3: "COM3"}
 
-        for channel_item in range(4):
-            port_status_information = port_status_dict.get(
-                self.base.read_parameter(
-                    self.position, params.get("port_status_info"), channel_item
-                ),
-            )
-            revision_id = self.base.read_parameter(
-                self.position, params.get("revision_id"), channel_item
-            )
-            transmission_rate = transmission_rate_dict.get(
-                self.base.read_parameter(
-                    self.position, params.get("transmission_rate"), channel_item
-                ),
-            )
-            actual_cycle_time = self.base.read_parameter(
-                self.position, params.get("actual_cycle_time"), channel_item
-            )
-            actual_vendor_id = self.base.read_parameter(
-                self.position, params.get("actual_vendor_id"), channel_item
-            )
-            actual_device_id = self.base.read_parameter(
-                self.position, params.get("actual_device_id"), channel_item
-            )
-            input_data_length = self.base.read_parameter(
-                self.position, params.get("iolink_input_data_length"), channel_item
-            )
-            output_data_length = self.base.read_parameter(
+        keys = list(params)
+        values = self.base.read_parameters(
+            self.position,
+            [(params[key], channel) for channel in channels for key in keys],
+        )
+        for i, channel_item in enumerate(channels):
+            value = dict(zip(keys, values[i * len(keys) :]))
+            port_status_information = port_status_dict.get(value["port_status_info"])
+            self.base.isdu.cache.update_port(
                 self.position,
-                params.get("iolink_output_data_length"),
                 channel_item,
+                port_status=port_status_information,
+                vendor_id=value["actual_vendor_id"],
+                device_id=value["actual_device_id"],
             )
-            channel_params.append(
-                {
-                    "Port status information": port_status_information,
-                    "Revision ID": revision_id,
-                    "Transmission rate": transmission_rate,
-                    "Actual cycle time [in 100 us]": actual_cycle_time,
-                    "Actual vendor ID": actual_vendor_id,
-                    "Actual device ID": actual_device_id,
-                    "Input data length": input_data_length,
-                    "Output data length": output_data_length,
-                }
-            )
+            channel_params[channel_item] = {
+                "Port status information": port_status_information,
+                "Revision ID": value["revision_id"],
+                "Transmission rate": transmission_rate_dict.get(
+                    value["transmission_rate"]
+                ),
+                "Actual cycle time [in 100 us]": value["actual_cycle_time"],
+                "Actual vendor ID": value["actual_vendor_id"],
+                "Actual device ID": value["actual_device_id"],
+                "Input data length": value["iolink_input_data_length"],
+                "Output data length": value["iolink_output_data_length"],
+            }
 
         Logging.logger.info(
-            f"{self.name}: Reading fieldbus parameters for all channels: {channel_params}"
+            f"{self.name}: Reading fieldbus parameters for channels {channels}: "
+            f"{channel_params}"
         )
         # update the instance
         self.fieldbus_parameters = channel_params
+        self._outdated_ports.difference_update(channels)
         return channel_params
 
+    def iodd(self, channel: int) -> IoddDevice | None:
+        """Returns the IODD of the device on an IO-Link channel from the IODD library of
+        the system, found by the actual vendor and device ID of the port.
+
+        :param channel: Channel number, starting with 0
+        :type channel: int
+        :return: IODD or None if there is no library or no IODD for the device
+        :rtype: IoddDevice | None
+        """
+        if (
+            self.iodds is None
+            or self.base is None
+            or self.apdd_information.product_category != ProductCategory.IO_LINK.value
+        ):
+            return None
+        params = self.read_fieldbus_parameters(refresh_outdated=True)[channel]
+        return self.iodds.get(
+            params.get("Actual vendor ID"), params.get("Actual device ID")
+        )
+
     @CpxBase.require_base
     def read_isdu(
-        self, channel: int, index: int, subindex: int = 0, data_type: str = "raw"
+        self, channel: int, index: int | str, subindex: int = 0, data_type: str = "raw"
     ) -> any:
         """Read isdu (device parameter) from defined channel.
-        Raises CpxRequestError when read failed.
+        Raises CpxRequestError when read failed. Identification data (index 0x10 to
+        0x1A) is cached until the port state changes, see base.isdu.cache.
 
         :param channel: Channel number, starting with 0
         :type channel: int
-        :param index: io-link parameter index
-        :type index: int
+        :param index: io-link parameter index or the name of the variable in the
+            IODD of the device (e.g. "Vendor Name"), see CpxAp iodd_path
+        :type index: int | str
         :param subindex: (optional) io-link parameter subindex, defaults to 0
         :type subindex: int
         :param data_type: (optional) datatype for correct interptetation.
@@ -896,82 +1186,30 @@ class ApModule(CpxModule):
         """
         self._check_function_supported(inspect.currentframe().f_code.co_name)
 
-        module_index = (self.position + 1).to_bytes(2, "little")
-        channel = (channel + 1).to_bytes(2, "little")
-        index = index.to_bytes(2, "little")
-        subindex = subindex.to_bytes(2, "little")
-        length = (0).to_bytes(2, "little")  # always zero when reading
-
-        # command: 50 Read(with byte swap), 51 write(with byte swap), 100 read, 101 write
-        # checking the availability in the SUPPORTED_ISDU_DATATYPES is not required but
-        # keeps the two files synchronized during development
-        if data_type in ["raw", "str"] and data_type in SUPPORTED_ISDU_DATATYPES:
-            command = (100).to_bytes(2, "little")
-        elif (
-            data_type in ["int", "bool", "float"]
-            and data_type in SUPPORTED_ISDU_DATATYPES
-        ):
-            command = (50).to_bytes(2, "little")
-        else:
-            raise TypeError(f"Datatype '{data_type}' is not supported by read_isdu()")
+        if isinstance(index, str):
+            return self._read_isdu_iodd(channel, index, subindex)
 
-        # select module, starts with 1
-        self.base.write_reg_data(
-            module_index, ap_modbus_registers.ISDU_MODULE_NO.register_address
-        )
-        # select channel, starts with 1
-        self.base.write_reg_data(
-            channel, ap_modbus_registers.ISDU_CHANNEL.register_address
-        )
-        # select index
-        self.base.write_reg_data(index, ap_modbus_registers.ISDU_INDEX.register_address)
-        # select subindex
-        self.base.write_reg_data(
-            subindex, ap_modbus_registers.ISDU_SUBINDEX.register_address
-        )
-        # select length of data in bytes
-        self.base.write_reg_data(
-            length, ap_modbus_registers.ISDU_LENGTH.register_address
-        )
-        # command
-        self.base.write_reg_data(
-            command, ap_modbus_registers.ISDU_COMMAND.register_address
-        )
+        command = ap_isdu.read_command(data_type)
+        ret = self.base.isdu.read(self.position, channel, index, subindex, command)
+        Logging.logger.info(f"{self.name}: Reading ISDU for channel {channel}: {ret}")
+        return ap_isdu.decode(ret, data_type)
 
-        stat, cnt = 1, 0
-        while stat > 0 and cnt < 1000:
-            stat = int.from_bytes(
-                self.base.read_reg_data(*ap_modbus_registers.ISDU_STATUS),
-                byteorder="little",
+    def _read_isdu_iodd(self, channel: int, name: str, subindex: int) -> Any:
+        """Reads an ISDU variable by name and decodes it with the IODD of the device"""
+        device = self.iodd(channel)
+        if device is None:
+            raise ValueError(
+                f"{self.name}: No IODD for the device on channel {channel}"
             )
-            cnt += 1
-        if cnt >= 1000:
-            raise CpxRequestError("ISDU data read failed")
-
-        # read back the actual length from the length register
-        actual_length = int.from_bytes(
-            self.base.read_reg_data(ap_modbus_registers.ISDU_LENGTH.register_address),
-            byteorder="little",
+        variable = device.variable(name)
+        codec = variable.codec.item(subindex) if subindex else variable.codec
+        ret = self.base.isdu.read(
+            self.position, channel, variable.index, subindex, ap_isdu.IsduCommand.READ
         )
-
-        ret = self.base.read_reg_data(
-            ap_modbus_registers.ISDU_DATA.register_address, actual_length
+        Logging.logger.info(
+            f"{self.name}: Reading ISDU {name} for channel {channel}: {ret}"
         )
-        Logging.logger.info(f"{self.name}: Reading ISDU for channel {channel}: {ret}")
-
-        if data_type == "raw":
-            return ret[:actual_length]
-        if data_type == "str":
-            return ret.decode("ascii").split("\x00", 1)[0]
-        if data_type == "int":
-            return int.from_bytes(ret, byteorder="little")
-        if data_type == "bool":
-            return bool.from_bytes(ret, byteorder="little")
-        if data_type == "float":
-            return struct.unpack("f", ret[:actual_length])[0]
-
-        # this is unnecessary but required for consistent return statements
-        raise TypeError(f"Datatype '{data_type}' is not supported by read_isdu()")
+        return codec.decode(ret)
 
     @CpxBase.require_base
     def write_isdu(
@@ -995,69 +1233,8 @@ class ApModule(CpxModule):
         """
         self._check_function_supported(inspect.currentframe().f_code.co_name)
 
-        module_index = (self.position + 1).to_bytes(2, "little")
-        channel = (channel + 1).to_bytes(2, "little")
-        index = (index).to_bytes(2, "little")
-        subindex = (subindex).to_bytes(2, "little")
-
-        if isinstance(data, bytes):
-            length = (len(data)).to_bytes(2, "little")
-            command = (101).to_bytes(2, "little")  # write without byteswap
-
-        elif isinstance(data, str):
-            length = (len(data)).to_bytes(2, "little")
-            command = (101).to_bytes(2, "little")  # write without byteswap
-            data = data.encode(encoding="ascii")
-
-        elif isinstance(data, bool):
-            length = (1).to_bytes(2, "little")
-            command = (51).to_bytes(2, "little")  # write with byteswap
-            data = data.to_bytes(1, byteorder="little")
-
-        elif isinstance(data, int):
-            # calculate bytelength of integer
-            length_int = (data.bit_length() + 7) // 8
-            length = length_int.to_bytes(2, "little")
-            command = (51).to_bytes(2, "little")  # write with byteswap
-            data = data.to_bytes(length_int, byteorder="little", signed=data < 0)
-
-        else:
-            raise TypeError(f"Datatype '{type(data)}' is not supported by write_isdu()")
-
-        # select module, starts with 1
-        self.base.write_reg_data(
-            module_index, ap_modbus_registers.ISDU_MODULE_NO.register_address
-        )
-        # select channel, starts with 1
-        self.base.write_reg_data(
-            channel, ap_modbus_registers.ISDU_CHANNEL.register_address
-        )
-        # select index
-        self.base.write_reg_data(index, ap_modbus_registers.ISDU_INDEX.register_address)
-        # select subindex
-        self.base.write_reg_data(
-            subindex, ap_modbus_registers.ISDU_SUBINDEX.register_address
-        )
-        # select length of data in bytes
-        self.base.write_reg_data(
-            length, ap_modbus_registers.ISDU_LENGTH.register_address
-        )
-        # write data to data register
-        self.base.write_reg_data(data, ap_modbus_registers.ISDU_DATA.register_address)
-        # command
-        self.base.write_reg_data(
-            command, ap_modbus_registers.ISDU_COMMAND.register_address
-        )
-
-        stat, cnt = 1, 0
-        while stat > 0 and cnt < 1000:
-            stat = int.from_bytes(
-                self.base.read_reg_data(*ap_modbus_registers.ISDU_STATUS),
-                byteorder="little",
-            )
-            cnt += 1
-        if cnt >= 1000:
-            raise CpxRequestError("ISDU data write failed")
+        data, command = ap_isdu.encode(data)
+        self.base.isdu.write(self.position, channel, index, subindex, data, command)
 
         Logging.logger.info(
             f"{self.name}: Write ISDU {data} to channel {channel} ({index},{subindex})"
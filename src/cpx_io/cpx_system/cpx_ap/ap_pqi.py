@@ -0,0 +1,57 @@
+"""Port Qualifier Information (PQI) of CPX-AP IO-Link modules"""
+
+from dataclasses import dataclass
+from enum import IntFlag
+
+
+class PortQualifier(IntFlag):
+    """Bits of the PQI byte of an IO-Link port"""
+
+    DEV_COM = 0b00100000  # device is in PREOPERATE or OPERATE
+    DEV_ERR = 0b01000000  # error or warning on the device or port
+    PQ = 0b10000000  # input data is valid
+
+
+# PortQualifier of every possible PQI byte, decoding is a lookup without allocations
+_PORT_QUALIFIERS = tuple(
+    PortQualifier(
+        value & (PortQualifier.PQ | PortQualifier.DEV_ERR | PortQualifier.DEV_COM)
+    )
+    for value in range(256)
+)
+
+
+def decode_pqi(data: bytes) -> list[PortQualifier]:
+    """Decodes the PQI bytes of the ports
+
+    :param data: one PQI byte per port, e.g. the input registers 16 and 17
+    :type data: bytes
+    :return: PortQualifier per port
+    :rtype: list[PortQualifier]
+    """
+    return [_PORT_QUALIFIERS[value] for value in data]
+
+
+@dataclass
+class IoLinkPort:
+    """Process data and PQI of one IO-Link port. data is None if the port was read
+    with mask_invalid and the input data is not valid."""
+
+    channel: int
+    data: bytes | None
+    pqi: PortQualifier
+
+    @property
+    def valid(self) -> bool:
+        """True if the input data of the port is valid"""
+        return bool(self.pqi & PortQualifier.PQ)
+
+    @property
+    def device_error(self) -> bool:
+        """True if there is at least one error or warning on the device or port"""
+        return bool(self.pqi & PortQualifier.DEV_ERR)
+
+    @property
+    def dev_com(self) -> bool:
+        """True if the device is in PREOPERATE or OPERATE"""
+        return bool(self.pqi & PortQualifier.DEV_COM)
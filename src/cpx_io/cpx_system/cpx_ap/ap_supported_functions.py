@@ -156,9 +156,13 @@ SUPPORTED_PRODUCT_FUNCTIONS_DICT = {
     ],
     "read_system_parameters": [ProductCategory.INTERFACE],
     "read_pqi": [ProductCategory.IO_LINK],
+    "read_ports": [ProductCategory.IO_LINK],
     "read_fieldbus_parameters": [ProductCategory.IO_LINK],
     "read_isdu": [ProductCategory.IO_LINK],
     "write_isdu": [ProductCategory.IO_LINK],
+    "backup_port": [ProductCategory.IO_LINK],
+    "restore_port": [ProductCategory.IO_LINK],
+    "restore_pending_ports": [ProductCategory.IO_LINK],
     "configure": [
         ProductCategory.INTERFACE,
         ProductCategory.ANALOG,
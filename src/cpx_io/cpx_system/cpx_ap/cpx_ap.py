@@ -7,9 +7,23 @@ from dataclasses import dataclass
 import os
 import platformdirs
 import requests
-from cpx_io.cpx_system.cpx_base import CpxBase, CpxRequestError
+from cpx_io.cpx_system.cpx_base import CpxBase, CpxInitError, CpxRequestError
+from cpx_io.cpx_system.cpx_dataclasses import ReadRequest, WriteRequest
+from cpx_io.cpx_system.cpx_scheduler import Priority
+from cpx_io.cpx_system.cpx_transport import MAX_READ_REGISTERS
 from cpx_io.cpx_system.cpx_ap.builder.ap_module_builder import build_ap_module
 from cpx_io.cpx_system.cpx_ap.ap_module import ApModule
+from cpx_io.cpx_system.cpx_ap import ap_isdu
+from cpx_io.cpx_system.cpx_ap.ap_diagnosis import (
+    GLOBAL_DIAGNOSIS_REGISTERS,
+    MODULE_DIAGNOSIS_REGISTERS,
+    ActiveDiagnosis,
+    DiagnosisMonitor,
+    DiagnosisState,
+    decode_global_diagnosis_state,
+)
+from cpx_io.cpx_system.cpx_ap.ap_iodd import IoddLibrary
+from cpx_io.cpx_system.cpx_ap.ap_isdu import IsduEngine, IsduJob, IsduResult
 from cpx_io.cpx_system.cpx_ap.ap_product_categories import ProductCategory
 from cpx_io.cpx_system.cpx_ap.ap_supported_functions import (
     SUPPORTED_PRODUCT_FUNCTIONS_DICT,
@@ -23,13 +37,27 @@ from cpx_io.cpx_system.cpx_ap.ap_parameter import (
     parameter_unpack,
 )
 from cpx_io.utils.helpers import div_ceil
-from cpx_io.utils.boollist import bytes_to_boollist
 from cpx_io.utils.logging import Logging
 
+# registers from the parameter status (10003) to the first data register (10010)
+PARAMETER_DATA_OFFSET = 7
+# data registers that are read with every status poll of a parameter read
+PARAMETER_PREFETCH_REGISTERS = 4
+# AP diagnosis status of every module (one byte per module, see Diagnostics)
+DIAGNOSTIC_STATUS_PARAMETER_ID = 20196
+# bits of every possible diagnostic status byte, LSB first
+DIAGNOSTICS_BITS = tuple(
+    tuple(bool(value >> bit & 1) for bit in range(8)) for value in range(256)
+)
+
 
 class CpxAp(CpxBase):
     """CPX-AP base class"""
 
+    # pylint: disable=too-many-instance-attributes
+    # pylint: disable=too-many-public-methods
+    # intended. The system offers the batched ISDU, IODD and diagnosis functions
+
     @dataclass
     class ApInformation:
         """Information of AP Module"""
@@ -62,12 +90,15 @@ class CpxAp(CpxBase):
         module_present: bool
         _7: None  # spacer for not-used bit
 
+    _pipeline_probe_register = ap_modbus_registers.MODULE_COUNT.register_address
+
     def __init__(
         self,
         timeout: float = 0.1,
         apdd_path: str = None,
         docu_path: str = None,
         generate_docu: bool = True,
+        iodd_path: str = None,
         **kwargs,
     ):
         """Constructor of the CpxAp class.
@@ -87,8 +118,19 @@ class CpxAp(CpxBase):
         :param generate_docu: (optional) parameter to disable the generation of the documentation
             this is useful for big systems when the generation takes too long
         :type generate_docu: bool
+        :param iodd_path: (optional) Path with IODD files of the connected IO-Link
+            devices. If given, read_isdu() accepts variable names and read_channel()
+            returns the decoded process data of IO-Link devices
+        :type iodd_path: str
         """
+        self._timeout_ms = None
         super().__init__(**kwargs)
+        self.isdu = IsduEngine(self)
+        self.iodds = None
+        # modules with diagnosis codes, see read_all_diagnoses()
+        self._diagnosis_modules = None
+        # parameter of read_diagnostic_status() sized for the modules
+        self._diagnostic_status_parameter = None
         if not self.connected():
             return
 
@@ -110,6 +152,9 @@ class CpxAp(CpxBase):
         else:
             self._docu_path = self.create_docu_path()
 
+        if iodd_path:
+            self.iodds = IoddLibrary(iodd_path, self.create_iodd_path())
+
         apdds = os.listdir(self._apdd_path)
 
         for i in range(self.read_module_count()):
@@ -141,10 +186,13 @@ class CpxAp(CpxBase):
             self._add_module(module, info)
 
         if generate_docu:
-            generate_system_information_file(self)
+            with self.priority(Priority.DOCS):
+                generate_system_information_file(self)
 
     def connected(self) -> bool:
         """Returns information about connection status"""
+        if self._transport:
+            return self._transport.connected
         return self.client.connected
 
     def delete_apdds(self) -> None:
@@ -172,6 +220,19 @@ class CpxAp(CpxBase):
         os.makedirs(apdd_path, exist_ok=True)
         return apdd_path
 
+    @staticmethod
+    def create_iodd_path() -> str:
+        """Creates the directory of the compiled iodds depending on the operating system
+        and returns the path"""
+        app_directory = platformdirs.user_data_dir(
+            appname="festo-cpx-io", appauthor="Festo"
+        )
+
+        # Create the directory if it doesn't exist
+        iodd_path = os.path.join(app_directory, "iodds")
+        os.makedirs(iodd_path, exist_ok=True)
+        return iodd_path
+
     @staticmethod
     def create_docu_path() -> str:
         """Creates the docu directory depending on the operating system and returns the path"""
@@ -213,6 +274,7 @@ class CpxAp(CpxBase):
                 f"the timeout is limited to a minimum of {timeout_ms} ms"
             )
         Logging.logger.info(f"Setting modbus timeout to {timeout_ms} ms")
+        self._timeout_ms = timeout_ms
         value_to_write = timeout_ms.to_bytes(length=4, byteorder="little")
         self.write_reg_data(
             value_to_write, ap_modbus_registers.TIMEOUT.register_address
@@ -227,6 +289,45 @@ class CpxAp(CpxBase):
         if indata != timeout_ms:
             Logging.logger.error("Setting of modbus timeout was not successful")
 
+    def _revalidate(self) -> None:
+        """Re-applies the modbus timeout after a reconnect and compares the module codes
+        of the system with the built modules in one batch. The modules are reused if the
+        topology is unchanged.
+        """
+        reads = [ReadRequest(*ap_modbus_registers.MODULE_COUNT)] + [
+            ReadRequest(*self._module_offset(ap_modbus_registers.MODULE_CODE, i))
+            for i in range(len(self._modules))
+        ]
+        if self._timeout_ms is not None:
+            reads.append(
+                WriteRequest(
+                    self._timeout_ms.to_bytes(length=4, byteorder="little"),
+                    ap_modbus_registers.TIMEOUT.register_address,
+                )
+            )
+        results = self.execute_batch(reads)
+
+        module_count = int.from_bytes(results[0], byteorder="little")
+        module_codes = [
+            int.from_bytes(data, byteorder="little")
+            for data in results[1 : len(self._modules) + 1]
+        ]
+        if module_count != len(self._modules) or module_codes != [
+            module.information.module_code for module in self._modules
+        ]:
+            raise CpxInitError(
+                "System topology changed while disconnected. Create a new CpxAp instance"
+            )
+        # devices may have been swapped while disconnected
+        self.isdu.cache.clear()
+        for module in self._modules:
+            if (
+                module.apdd_information.product_category
+                == ProductCategory.IO_LINK.value
+            ):
+                module.reset_port_states()
+        Logging.logger.info("System topology unchanged, reusing modules")
+
     def _add_module(self, module: ApModule, info: ApInformation) -> None:
         """Adds one module to the base. This is required to use the module.
         The module must be identified by the module code in info.
@@ -245,6 +346,8 @@ class CpxAp(CpxBase):
 
         module.configure(self, len(self._modules))
         self._modules.append(module)
+        self._diagnosis_modules = None
+        self._diagnostic_status_parameter = None
         self.update_module_names()
         Logging.logger.debug(f"Added module {module.name} ({type(module).__name__})")
         return module
@@ -260,6 +363,7 @@ class CpxAp(CpxBase):
         Logging.logger.debug(f"Total module count: {value}")
         return value
 
+    @CpxBase.with_priority(Priority.DOCS)
     def print_system_information(self) -> None:
         """Prints all parameters from all modules"""
         print("\nInformation")
@@ -289,6 +393,7 @@ class CpxAp(CpxBase):
             for p in m.module_dicts.parameters.values():
                 print(f"   > {p}")
 
+    @CpxBase.with_priority(Priority.DOCS)
     def print_system_state(self) -> None:
         """Prints all parameters and channels from every module"""
         for m in self.modules:
@@ -306,6 +411,7 @@ class CpxAp(CpxBase):
             else:
                 print("\t(No readable channels available)")
 
+    @CpxBase.with_priority(Priority.DOCS)
     def read_apdd_information(self, position: int) -> ApInformation:
         """Reads and returns detailed information for a specific IO module
 
@@ -412,27 +518,33 @@ class CpxAp(CpxBase):
         Logging.logger.debug(f"Reading ApInformation: {info}")
         return info
 
+    @CpxBase.with_priority(Priority.DIAGNOSIS)
     def read_diagnostic_status(self) -> list[Diagnostics]:
         """Read the diagnostic status and return a Diagnostics object for each module
 
         :ret value: Diagnostics status for every module
         :rtype: list[Diagnostics]
         """
-        # overwrite the type size with the actual module count + 1 (see datasheet)
-        ap_diagnosis_parameter = Parameter(
-            parameter_id=20196,
-            parameter_instances={"FirstIndex": 0, "NumberOfInstances": 1},
-            is_writable=False,
-            array_size=self.read_module_count() + 1,
-            data_type="UINT8",
-            default_value=0,
-            description="AP diagnosis status for each Module",
-            name="AP diagnosis status",
-        )
+        if self._diagnostic_status_parameter is None:
+            # overwrite the type size with the actual module count + 1 (see datasheet)
+            self._diagnostic_status_parameter = Parameter(
+                parameter_id=DIAGNOSTIC_STATUS_PARAMETER_ID,
+                parameter_instances={"FirstIndex": 0, "NumberOfInstances": 1},
+                is_writable=False,
+                array_size=len(self._modules) + 1,
+                data_type="UINT8",
+                default_value=0,
+                description="AP diagnosis status for each Module",
+                name="AP diagnosis status",
+            )
+        parameter = self._diagnostic_status_parameter
 
-        reg = self.read_parameter(0, ap_diagnosis_parameter)
-        return [self.Diagnostics.from_int(r) for r in reg]
+        reg = self._read_parameter_raw(0, parameter.parameter_id, 0)
+        return [
+            self.Diagnostics(*DIAGNOSTICS_BITS[r]) for r in reg[: parameter.array_size]
+        ]
 
+    @CpxBase.with_priority(Priority.DIAGNOSIS)
     def read_global_diagnosis_state(self) -> dict:
         """Read the global diagnosis state from the cpx system. Returns dict
         of module diagnosis state containing a logical OR over all modules errors.
@@ -441,34 +553,79 @@ class CpxAp(CpxBase):
         :ret value: Diagnosis state
         :rtype: dict"""
         reg = self.read_reg_data(self.global_diagnosis_register, length=2)
-        diagnosis_keys = [
-            "Device available",
-            "Current",
-            "Voltage",
-            "Temperature",
-            "reserved",
-            "Movement",
-            "Configuration / Parameters",
-            "Monitoring",
-            "Communication",
-            "Safety",
-            "Internal Hardware",
-            "Software",
-            "Maintenance",
-            "Misc",
-            "reserved(14)",
-            "reserved(15)",
-            "External Device",
-            "Security",
-            "Encoder",
-        ]
         # the rest of the bits are "reserved" and therefore trunctuated
-        diagnosis_dict = {
-            diagnosis_keys[i]: bytes_to_boollist(reg)[i]
-            for i in range(len(diagnosis_keys))
-        }
-        return diagnosis_dict
+        return decode_global_diagnosis_state(reg)
+
+    @CpxBase.with_priority(Priority.DIAGNOSIS)
+    def read_diagnosis_state(self) -> DiagnosisState:
+        """Read the global diagnosis state, the active diagnosis count and the latest
+        diagnosis (see read_global_diagnosis_state() ... read_latest_diagnosis_code())
+        with one request
+
+        :ret value: Diagnosis state
+        :rtype: DiagnosisState"""
+        reg = self.read_reg_data(
+            self.global_diagnosis_register, length=GLOBAL_DIAGNOSIS_REGISTERS
+        )
+        return DiagnosisState.from_registers(reg)
+
+    @CpxBase.with_priority(Priority.DIAGNOSIS)
+    def read_all_diagnoses(self) -> list[ActiveDiagnosis]:
+        """Read the diagnosis codes of all modules (see ApModule.read_diagnosis_code())
+        with as few requests as possible and return the modules with active diagnosis
+
+        :ret value: Active diagnosis of every module with a diagnosis code
+        :rtype: list[ActiveDiagnosis]"""
+        if self._diagnosis_modules is None:
+            self._diagnosis_modules = [
+                (module, module.module_dicts.diagnosis)
+                for module in self._modules
+                if module.is_function_supported("read_diagnosis_code")
+            ]
+        if not self._diagnosis_modules:
+            return []
+
+        # the diagnosis blocks of the modules are consecutive
+        first = self._diagnosis_modules[0][0].system_entry_registers.diagnosis
+        length = (
+            self._diagnosis_modules[-1][0].system_entry_registers.diagnosis
+            + MODULE_DIAGNOSIS_REGISTERS
+            - first
+        )
+        # split between modules
+        chunk = MAX_READ_REGISTERS - MAX_READ_REGISTERS % MODULE_DIAGNOSIS_REGISTERS
+        data = b"".join(
+            self.execute_batch(
+                [
+                    ReadRequest(first + offset, min(chunk, length - offset))
+                    for offset in range(0, length, chunk)
+                ]
+            )
+        )
+
+        diagnoses = []
+        for module, diagnosis_dict in self._diagnosis_modules:
+            offset = (module.system_entry_registers.diagnosis - first) * 2
+            code = int.from_bytes(data[offset + 8 : offset + 12], byteorder="little")
+            if code:
+                diagnoses.append(
+                    ActiveDiagnosis(module, code, diagnosis_dict.get(code))
+                )
+        Logging.logger.debug(f"Active diagnoses: {diagnoses}")
+        return diagnoses
+
+    def diagnosis_monitor(self, history_size: int = 1000) -> DiagnosisMonitor:
+        """Returns a DiagnosisMonitor that polls the diagnosis state of the system and
+        reports the changes
 
+        :param history_size: (optional) number of events kept in the history
+        :type history_size: int
+        :return: monitor
+        :rtype: DiagnosisMonitor
+        """
+        return DiagnosisMonitor(self, history_size)
+
+    @CpxBase.with_priority(Priority.DIAGNOSIS)
     def read_active_diagnosis_count(self) -> int:
         """Read count of currently active diagnosis from the cpx system
 
@@ -477,6 +634,7 @@ class CpxAp(CpxBase):
         reg = self.read_reg_data(self.global_diagnosis_register + 2)
         return int.from_bytes(reg, byteorder="little")
 
+    @CpxBase.with_priority(Priority.DIAGNOSIS)
     def read_latest_diagnosis_index(self) -> int:
         """Read the index of the module with the latest diagnosis.
         If no diagnosis is available, returns None
@@ -490,6 +648,7 @@ class CpxAp(CpxBase):
             return None
         return module_index
 
+    @CpxBase.with_priority(Priority.DIAGNOSIS)
     def read_latest_diagnosis_code(self) -> int:
         """Read the latest diagnosis code from the cpx system
 
@@ -542,6 +701,78 @@ class CpxAp(CpxBase):
         data = parameter_unpack(parameter, raw)
         return data
 
+    def read_parameters(
+        self, position: int, parameters: list[tuple[Parameter, int]]
+    ) -> list[Any]:
+        """Reads several parameters of one module back to back while holding the
+        parameter mailbox
+
+        :param position: Module position index starting with 0
+        :type position: int
+        :param parameters: AP Parameter and instance of every parameter to read
+        :type parameters: list[tuple[Parameter, int]]
+        :return: Parameter values in the order of parameters
+        :rtype: list[Any]
+        """
+        with self.mailbox("parameter"):
+            return [
+                self.read_parameter(position, parameter, instance)
+                for parameter, instance in parameters
+            ]
+
+    def isdu_batch(self, jobs: list[IsduJob | tuple]) -> list[IsduResult]:
+        """Executes many ISDU reads and writes back to back through the ISDU mailbox,
+        e.g. to commission the IO-Link devices of several modules. Setup registers
+        that are unchanged from the previous job are not written again. A failed job
+        does not abort the batch, its error is returned in the result.
+
+        :param jobs: IsduJob or tuple (module, channel, index, subindex, data_type
+            [, data]) per job. module is an ApModule or the module position, jobs with
+            data are writes.
+        :type jobs: list[IsduJob | tuple]
+        :return: result of every job in the order of jobs
+        :rtype: list[IsduResult]
+        """
+        jobs = [job if isinstance(job, IsduJob) else IsduJob(*job) for job in jobs]
+        results = [IsduResult(job) for job in jobs]
+
+        isdu_requests, pending = [], []
+        for result in results:
+            job = result.job
+            try:
+                module = (
+                    job.module
+                    if isinstance(job.module, ApModule)
+                    else self.modules[job.module]
+                )
+                func_name = "read_isdu" if job.data is None else "write_isdu"
+                if not module.is_function_supported(func_name):
+                    raise NotImplementedError(f"{module} has no function <{func_name}>")
+                if job.data is None:
+                    data, command = None, ap_isdu.read_command(job.data_type)
+                else:
+                    data, command = ap_isdu.encode(job.data)
+            except (IndexError, NotImplementedError, TypeError) as error:
+                result.error = error
+                continue
+            isdu_requests.append(
+                (module.position, job.channel, job.index, job.subindex, data, command)
+            )
+            pending.append(result)
+
+        for result, ret in zip(pending, self.isdu.batch(isdu_requests)):
+            if isinstance(ret, Exception):
+                result.error = ret
+            elif result.job.data is None:
+                try:
+                    result.value = ap_isdu.decode(ret, result.job.data_type)
+                except (struct.error, UnicodeDecodeError) as error:
+                    result.error = error
+
+        failed = sum(not result.ok for result in results)
+        Logging.logger.info(f"Executed {len(results)} ISDU jobs, {failed} failed")
+        return results
+
     def _write_parameter_raw(
         self, position: int, param_id: int, instance: int, data: bytes
     ) -> None:
@@ -567,23 +798,24 @@ class CpxAp(CpxBase):
         length_bytes = len(data).to_bytes(2, byteorder="little")
         command = (2).to_bytes(2, byteorder="little")  # 1=read, 2=write
 
-        # prepare the command
-        self.write_reg_data(module_index + param_id + instance, param_reg)
-        # write length in bytes
-        self.write_reg_data(length_bytes, param_reg + 4)
-        # write data to register
-        self.write_reg_data(data, param_reg + 10)
-        # execute the command
-        self.write_reg_data(command, param_reg + 3)
-
-        exe_code = 0
-        while exe_code != 16:
-            exe_code = int.from_bytes(
-                self.read_reg_data(param_reg + 3), byteorder="little"
-            )
-            # 1=read, 2=write, 3=busy, 4=error(request failed), 16=completed(request successful)
-            if exe_code == 4:
-                raise CpxRequestError
+        with self.mailbox("parameter"):
+            # prepare the command
+            self.write_reg_data(module_index + param_id + instance, param_reg)
+            # write length in bytes
+            self.write_reg_data(length_bytes, param_reg + 4)
+            # write data to register
+            self.write_reg_data(data, param_reg + 10)
+            # execute the command
+            self.write_reg_data(command, param_reg + 3)
+
+            exe_code = 0
+            while exe_code != 16:
+                exe_code = int.from_bytes(
+                    self.read_reg_data(param_reg + 3), byteorder="little"
+                )
+                # 1=read, 2=write, 3=busy, 4=error(request failed), 16=completed(request successful)
+                if exe_code == 4:
+                    raise CpxRequestError
 
         Logging.logger.debug(f"Wrote data {data} to module position: {position - 1}")
 
@@ -608,25 +840,32 @@ class CpxAp(CpxBase):
         instance = instance.to_bytes(2, byteorder="little")
         command = (1).to_bytes(2, byteorder="little")  # 1=read, 2=write
 
-        # prepare and execute the read command
-        self.write_reg_data(module_index + param_id + instance + command, param_reg)
-
-        # 1=read, 2=write, 3=busy, 4=error(request failed), 16=completed(request successful)
-        exe_code = 0
-        while exe_code != 16:
-            exe_code = int.from_bytes(
-                self.read_reg_data(param_reg + 3), byteorder="little"
-            )
-            if exe_code == 4:
-                raise CpxRequestError
+        with self.mailbox("parameter"):
+            # prepare and execute the read command
+            self.write_reg_data(module_index + param_id + instance + command, param_reg)
 
-        # get datalength in bytes from register 10004
-        length_bytes = int.from_bytes(
-            self.read_reg_data(param_reg + 4), byteorder="little"
-        )
-        # read 16 bit registers
-        length_registers = div_ceil(length_bytes, 2)
-        data = self.read_reg_data(param_reg + 10, length_registers)
+            # 1=read, 2=write, 3=busy, 4=error(request failed), 16=completed(request successful)
+            # the status poll also reads the datalength (register 10004) and the first
+            # data registers (from register 10010)
+            exe_code = 0
+            while exe_code != 16:
+                header = self.read_reg_data(
+                    param_reg + 3, PARAMETER_DATA_OFFSET + PARAMETER_PREFETCH_REGISTERS
+                )
+                exe_code = int.from_bytes(header[:2], byteorder="little")
+                if exe_code == 4:
+                    raise CpxRequestError
+
+            length_bytes = int.from_bytes(header[2:4], byteorder="little")
+            # read 16 bit registers
+            length_registers = div_ceil(length_bytes, 2)
+            data = header[PARAMETER_DATA_OFFSET * 2 :]
+            if length_registers > PARAMETER_PREFETCH_REGISTERS:
+                data += self.read_reg_data(
+                    param_reg + 10 + PARAMETER_PREFETCH_REGISTERS,
+                    length_registers - PARAMETER_PREFETCH_REGISTERS,
+                )
+            data = data[: length_registers * 2]
 
         Logging.logger.debug(
             f"Read parameter {param_id}: {data} from module position: {position - 1}"
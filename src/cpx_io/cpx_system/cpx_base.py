@@ -1,12 +1,18 @@
-"""CPX Base
-"""
+"""CPX Base"""
 
 import struct
+import threading
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass, fields
 from functools import wraps
 
 from pymodbus.client import ModbusTcpClient
+from pymodbus.exceptions import ConnectionException, ModbusIOException
 from pymodbus.pdu.mei_message import ReadDeviceInformationRequest
+from cpx_io.cpx_system.cpx_dataclasses import ReadRequest, WriteRequest
+from cpx_io.cpx_system.cpx_scheduler import Priority, RequestScheduler
+from cpx_io.cpx_system.cpx_transport import MAX_PIPELINE_WINDOW, ModbusTcpTransport
 from cpx_io.utils.logging import Logging
 from cpx_io.utils.boollist import boollist_to_bytes, bytes_to_boollist
 
@@ -31,28 +37,272 @@ class CpxRequestError(Exception):
         super().__init__(message)
 
 
+# Errors that indicate a lost connection. ConnectionAbortedError is raised for error
+# responses of the device, the connection is still fine in that case.
+CONNECTION_LOST_ERRORS = (OSError, ConnectionException, ModbusIOException)
+
+
+def _check_response(response) -> None:
+    """Raises the error of a pymodbus read response. pymodbus returns a
+    ModbusIOException instead of raising it if the connection is lost, it is raised
+    to reconnect. Error responses of the device raise ConnectionAbortedError.
+    """
+    if isinstance(response, ModbusIOException):
+        raise response
+    if response.isError():
+        raise ConnectionAbortedError(response.message)
+
+
+MAX_RECONNECT_DELAY = 2.0
+
+
 class CpxBase:
     """A class to connect to the Festo CPX system and read data from IO modules"""
 
-    def __init__(self, ip_address: str = None):
+    # pylint: disable=too-many-instance-attributes
+    # intended. Connection, transport, scheduler and reconnect state belong together
+
+    # register that can always be read, used to probe the supported pipeline depth
+    _pipeline_probe_register = None
+
+    def __init__(
+        self,
+        ip_address: str = None,
+        lean_transport: bool = False,
+        pipeline_window: int = MAX_PIPELINE_WINDOW,
+        reconnect_attempts: int = 3,
+        reconnect_backoff: float = 0.1,
+        acyclic_connection: bool = False,
+    ):
         """Constructor of CpxBase class.
 
         :param ip_address: Required IP address as string e.g. ('192.168.1.1')
         :type ip_address: str
+        :param lean_transport: (optional) Use the built-in ModbusTcpTransport for all
+            register access instead of pymodbus. pymodbus is then only used for the
+            device information. Defaults to False
+        :type lean_transport: bool
+        :param pipeline_window: (optional) Maximum number of requests in flight in
+            execute_batch(). Only used with lean_transport. The window is limited to the
+            depth the device supports, which is probed at connect. Defaults to 8
+        :type pipeline_window: int
+        :param reconnect_attempts: (optional) Number of connection attempts if the
+            connection is lost during a request. 0 disables the reconnect. Defaults to 3
+        :type reconnect_attempts: int
+        :param reconnect_backoff: (optional) Delay in s before the first attempt, it is
+            doubled for every further attempt. Defaults to 0.1
+        :type reconnect_backoff: float
+        :param acyclic_connection: (optional) Open a second connection that is used for
+            mailbox transactions (parameters, ISDU, function numbers), so they do not
+            delay the cyclic register access of other threads. Defaults to False
+        :type acyclic_connection: bool
         """
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
         self._modules = []
         self._module_names = []
         self.base = None
         self.ip_address = ip_address
+        self._transport = None
+        self.pipeline_window = 1
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_backoff = reconnect_backoff
+
+        # one scheduler per connection, the register access functions are atomic
+        self.scheduler = RequestScheduler()
+        self._acyclic_scheduler = RequestScheduler()
+        self._reconnect_lock = threading.RLock()
+        self._mailbox_locks = {}
+        self._local = threading.local()
+        self._connection_generation = 0
+        self._acyclic_client = None
+        self._acyclic_transport = None
 
         if ip_address is None:
             Logging.logger.info("Not connected since no IP address was provided")
             return
 
+        # pymodbus connects on demand, so it does not hold a connection in lean mode
         self.client = ModbusTcpClient(host=ip_address)
-        if self.client.connect():
+        if lean_transport:
+            self._transport = ModbusTcpTransport(host=ip_address)
+            if self._transport.connect():
+                Logging.logger.info(f"Connected to {ip_address}:502 (lean transport)")
+                self.pipeline_window = self._probe_pipeline_window(pipeline_window)
+        elif self.client.connect():
             Logging.logger.info(f"Connected to {ip_address}:502")
 
+        # the acyclic connection is opened on the first mailbox transaction
+        if acyclic_connection:
+            self._acyclic_client = ModbusTcpClient(host=ip_address)
+            if lean_transport:
+                self._acyclic_transport = ModbusTcpTransport(host=ip_address)
+
+    def _probe_pipeline_window(self, pipeline_window: int) -> int:
+        """Limits the configured pipeline window to the depth the device supports"""
+        if pipeline_window <= 1 or self._pipeline_probe_register is None:
+            return max(pipeline_window, 1)
+        depth = self._transport.probe_pipeline_depth(
+            self._pipeline_probe_register, pipeline_window
+        )
+        Logging.logger.info(
+            f"Using pipeline window {depth} (requested {pipeline_window})"
+        )
+        return depth
+
+    def reconnect(self) -> bool:
+        """Closes the connection and connects again with exponential backoff. After a
+        successful reconnect the system is revalidated, see _revalidate().
+
+        :return: True if the connection was reestablished
+        :rtype: bool
+        """
+        if not hasattr(self, "client"):
+            return False
+
+        with self._reconnect_lock:
+            self._local.reconnecting = True
+            try:
+                self._close_acyclic_connection()
+                delay = self.reconnect_backoff
+                for attempt in range(1, self.reconnect_attempts + 1):
+                    time.sleep(delay)
+                    delay = min(2 * delay, MAX_RECONNECT_DELAY)
+                    with self.scheduler.request(Priority.OUTPUT):
+                        if self._transport:
+                            self._transport.close()
+                            connected = self._transport.connect()
+                        else:
+                            self.client.close()
+                            connected = self.client.connect()
+                    if connected:
+                        Logging.logger.info(
+                            f"Reconnected to {self.ip_address}:502 (attempt {attempt})"
+                        )
+                        self._connection_generation += 1
+                        self._revalidate()
+                        return True
+                    Logging.logger.warning(f"Reconnect attempt {attempt} failed")
+                Logging.logger.error(f"Reconnect to {self.ip_address}:502 failed")
+                return False
+            finally:
+                self._local.reconnecting = False
+
+    def _recover(self, generation: int) -> bool:
+        """Reconnects unless another thread already did since generation was taken"""
+        with self._reconnect_lock:
+            if self._connection_generation != generation:
+                return True
+            return self.reconnect()
+
+    def _close_acyclic_connection(self) -> None:
+        with self._acyclic_scheduler.request(Priority.OUTPUT):
+            if self._acyclic_transport:
+                self._acyclic_transport.close()
+            if self._acyclic_client:
+                self._acyclic_client.close()
+
+    @contextmanager
+    def mailbox(self, name: str):
+        """Context manager for multi-register transactions on one mailbox (e.g. the
+        parameter or the ISDU registers). Only one thread at a time can use a mailbox.
+        If the base was created with acyclic_connection, all register access of the
+        calling thread inside the context uses the acyclic connection.
+
+        :param name: Name of the mailbox, e.g. "parameter"
+        :type name: str
+        """
+        lock = self._mailbox_locks.setdefault(name, threading.RLock())
+        with lock:
+            depth = getattr(self._local, "mailbox_depth", 0)
+            self._local.mailbox_depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.mailbox_depth = depth
+
+    @contextmanager
+    def priority(self, priority: Priority):
+        """Context manager that sets the priority of all requests of the calling thread
+        inside the context. Without it, writes use Priority.OUTPUT, reads use
+        Priority.CYCLIC_INPUT and mailbox transactions use Priority.PARAMETER.
+
+        :param priority: Priority class of the requests
+        :type priority: Priority
+        """
+        previous = getattr(self._local, "priority", None)
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    @staticmethod
+    def with_priority(priority: Priority):
+        """Decorator that runs a function of the system inside priority(priority)"""
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(self, *args, **kwargs):
+                with self.priority(priority):
+                    return func(self, *args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def submit(
+        self, function, *args, priority: Priority = Priority.PARAMETER, **kwargs
+    ):
+        """Queues function(*args, **kwargs) as job of the scheduler. Jobs are executed
+        one after another by a worker thread, highest priority first. All requests of
+        the job use the priority of the job.
+
+        :param function: function to execute, e.g. module.read_isdu
+        :type function: callable
+        :param priority: (optional) Priority class of the job, defaults to PARAMETER
+        :type priority: Priority
+        :return: future that holds the result of the job
+        :rtype: concurrent.futures.Future
+        """
+
+        def job():
+            with self.priority(priority):
+                return function(*args, **kwargs)
+
+        return self.scheduler.submit(job, priority)
+
+    @contextmanager
+    def configuration(self):
+        """Context manager for a set of configuration changes. Systems that can defer
+        parameter writes (e.g. CpxE) collect the changes of the calling thread and write
+        them when the context is left. The default writes every change immediately.
+        """
+        yield self
+
+    def _channel(self, default_priority: Priority) -> tuple:
+        """Returns client, transport and the request context of the connection for the
+        calling thread"""
+        priority = getattr(self._local, "priority", None)
+        mailbox = getattr(self._local, "mailbox_depth", 0)
+        if priority is None:
+            priority = Priority.PARAMETER if mailbox else default_priority
+        if self._acyclic_client and mailbox:
+            return (
+                self._acyclic_client,
+                self._acyclic_transport,
+                self._acyclic_scheduler.request(priority),
+            )
+        return (
+            getattr(self, "client", None),
+            self._transport,
+            self.scheduler.request(priority),
+        )
+
+    def _revalidate(self) -> None:
+        """Called after a reconnect. Systems override this to restore settings of the
+        connection and to check that the hardware was not changed in the meantime.
+        """
+
     def __enter__(self):
         return self
 
@@ -70,6 +320,10 @@ class CpxBase:
 
     def shutdown(self):
         """Shutdown function"""
+        self.scheduler.shutdown()
+        if self._transport:
+            self._transport.close()
+        self._close_acyclic_connection()
         if hasattr(self, "client"):
             self.client.close()
             Logging.logger.info("Connection closed")
@@ -87,13 +341,15 @@ class CpxBase:
 
         # Read device information
         rreq = ReadDeviceInformationRequest(0x1, 0)
-        rres = self.client.execute(False, rreq)
+        with self.scheduler.request(Priority.DOCS):
+            rres = self.client.execute(False, rreq)
         dev_info["vendor_name"] = rres.information[0].decode("ascii")
         dev_info["product_code"] = rres.information[1].decode("ascii")
         dev_info["revision"] = rres.information[2].decode("ascii")
 
         rreq = ReadDeviceInformationRequest(0x2, 0)
-        rres = self.client.execute(False, rreq)
+        with self.scheduler.request(Priority.DOCS):
+            rres = self.client.execute(False, rreq)
         dev_info["vendor_url"] = rres.information[3].decode("ascii")
         dev_info["product_name"] = rres.information[4].decode("ascii")
         dev_info["model_name"] = rres.information[5].decode("ascii")
@@ -138,6 +394,40 @@ class CpxBase:
 
         byte_size: int = 2
 
+    @staticmethod
+    def _recover_connection(retry: bool):
+        """Decorator for register access functions. If the connection is lost, the base
+        reconnects. Requests that are safe to repeat (retry=True) are executed again,
+        all others raise the original error after the reconnect.
+        """
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(self, *args, **kwargs):
+                return CpxBase._call_recovering(self, func, retry, *args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def _call_recovering(self, func, retry: bool, *args, **kwargs):
+        """Calls func and handles a lost connection, see _recover_connection()"""
+        generation = self._connection_generation
+        try:
+            return func(self, *args, **kwargs)
+        except ConnectionAbortedError:
+            raise
+        except CONNECTION_LOST_ERRORS as error:
+            if getattr(self._local, "reconnecting", False) or not (
+                self.reconnect_attempts
+            ):
+                raise
+            Logging.logger.warning(f"Connection lost ({error!r})")
+            if not self._recover(generation) or not retry:
+                raise
+        return func(self, *args, **kwargs)
+
+    @_recover_connection(retry=True)
     def read_reg_data(self, register: int, length: int = 1) -> bytes:
         """Reads and returns register(s) from Modbus server without interpreting the data
 
@@ -148,15 +438,38 @@ class CpxBase:
         :return: Register(s) content
         :rtype: bytes
         """
+        client, transport, lock = self._channel(Priority.CYCLIC_INPUT)
+        with lock:
+            if transport:
+                return bytes(transport.read_holding_registers(register, length))
+            response = client.read_holding_registers(register, length)
 
-        response = self.client.read_holding_registers(register, length)
-
-        if response.isError():
-            raise ConnectionAbortedError(response.message)
+        _check_response(response)
 
         data = struct.pack("<" + "H" * len(response.registers), *response.registers)
         return data
 
+    @_recover_connection(retry=True)
+    def read_reg_view(self, register: int, length: int = 1) -> memoryview:
+        """Reads register(s) like read_reg_data() but without copying the data when the
+        lean transport is used. The returned memoryview is only valid until the next
+        register access, so it must be consumed (e.g. by struct.unpack) immediately and
+        should not be used when other threads access the same connection.
+
+        :param register: adress of the first register to read
+        :type register: int
+        :param length: number of registers to read (default: 1)
+        :type length: int
+        :return: Register(s) content
+        :rtype: memoryview
+        """
+        _, transport, lock = self._channel(Priority.CYCLIC_INPUT)
+        if transport:
+            with lock:
+                return transport.read_holding_registers(register, length)
+        return memoryview(self.read_reg_data(register, length))
+
+    @_recover_connection(retry=False)
     def write_reg_data(self, data: bytes, register: int) -> None:
         """Write bytes object data to register(s).
 
@@ -168,10 +481,117 @@ class CpxBase:
         # if odd number of bytes, add one zero byte
         if len(data) % 2 != 0:
             data += b"\x00"
+        client, transport, lock = self._channel(Priority.OUTPUT)
+        if transport:
+            with lock:
+                transport.write_registers(data, register)
+            return
         # Convert to list of words
         reg = list(struct.unpack("<" + "H" * (len(data) // 2), data))
         # Write data
-        self.client.write_registers(register, reg)
+        with lock:
+            response = client.write_registers(register, reg)
+        # error responses of writes are ignored, only a lost connection is raised
+        if isinstance(response, ModbusIOException):
+            raise response
+
+    @_recover_connection(retry=False)
+    def write_read_reg_data(
+        self, data: bytes, register: int, read_register: int, length: int = 1
+    ) -> bytes:
+        """Writes bytes object data to register(s) and reads register(s) back in one
+        Modbus transaction (function code 23). The write is executed first.
+
+        :param data: data to write to the register(s)
+        :type data: bytes
+        :param register: adress of the first register to write
+        :type register: int
+        :param read_register: adress of the first register to read
+        :type read_register: int
+        :param length: number of registers to read (default: 1)
+        :type length: int
+        :return: Register(s) content
+        :rtype: bytes
+        """
+        if len(data) % 2 != 0:
+            data += b"\x00"
+        client, transport, lock = self._channel(Priority.OUTPUT)
+        if transport:
+            with lock:
+                return bytes(
+                    transport.read_write_registers(
+                        data, register, read_register, length
+                    )
+                )
+
+        reg = list(struct.unpack("<" + "H" * (len(data) // 2), data))
+        with lock:
+            response = client.readwrite_registers(
+                read_address=read_register,
+                read_count=length,
+                write_address=register,
+                values=reg,
+            )
+        _check_response(response)
+
+        return struct.pack("<" + "H" * len(response.registers), *response.registers)
+
+    def execute_batch(self, requests: list) -> list:
+        """Executes a batch of independent register requests. With the lean transport
+        up to pipeline_window requests are sent before the responses are collected, which
+        saves one round trip time per request. Otherwise the requests are executed one
+        after another. The requests must not depend on each other since their execution
+        order on the device is not guaranteed. If the connection is lost, a batch of
+        reads is repeated after the reconnect, batches containing writes are not.
+
+        :param requests: ReadRequest and WriteRequest instances
+        :type requests: list
+        :return: bytes for every ReadRequest and None for every WriteRequest, in the order
+            of the requests
+        :rtype: list
+        """
+        requests = [
+            (
+                WriteRequest(request.data + b"\x00", request.register)
+                if isinstance(request, WriteRequest) and len(request.data) % 2
+                else request
+            )
+            for request in requests
+        ]
+        _, transport, _ = self._channel(Priority.CYCLIC_INPUT)
+        if transport and self.pipeline_window > 1:
+            if all(isinstance(request, ReadRequest) for request in requests):
+                return self._execute_pipelined_reads(requests)
+            return self._execute_pipelined(requests)
+
+        results = []
+        for request in requests:
+            if isinstance(request, ReadRequest):
+                results.append(self.read_reg_data(request.register, request.length))
+            elif isinstance(request, WriteRequest):
+                self.write_reg_data(request.data, request.register)
+                results.append(None)
+            else:
+                raise TypeError(f"Unsupported request {request}")
+        return results
+
+    @_recover_connection(retry=True)
+    def _execute_pipelined_reads(self, requests: list) -> list:
+        return self._execute_pipelined_raw(requests)
+
+    @_recover_connection(retry=False)
+    def _execute_pipelined(self, requests: list) -> list:
+        return self._execute_pipelined_raw(requests)
+
+    def _execute_pipelined_raw(self, requests: list) -> list:
+        default = (
+            Priority.CYCLIC_INPUT
+            if all(isinstance(request, ReadRequest) for request in requests)
+            else Priority.OUTPUT
+        )
+        _, transport, lock = self._channel(default)
+        with lock:
+            return transport.execute_pipelined(requests, self.pipeline_window)
 
     @staticmethod
     def require_base(func):
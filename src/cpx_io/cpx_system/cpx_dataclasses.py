@@ -1,4 +1,4 @@
-"""CPX SystemEntryRegisters dataclass"""
+"""CPX dataclasses"""
 
 from dataclasses import dataclass
 
@@ -10,3 +10,101 @@ class SystemEntryRegisters:
     inputs: int = None
     outputs: int = None
     diagnosis: int = None
+
+
+@dataclass
+class ReadRequest:
+    """Register read request for CpxBase.execute_batch()"""
+
+    register: int
+    length: int = 1
+
+
+@dataclass
+class WriteRequest:
+    """Register write request for CpxBase.execute_batch()"""
+
+    data: bytes
+    register: int
+
+
+@dataclass
+class ProcessImage:
+    """Snapshot of consecutive modbus registers, e.g. all inputs of a CPX-E system"""
+
+    register: int
+    data: bytes
+
+    def read(self, register: int, length: int = 1) -> bytes:
+        """Returns register(s) from the snapshot like CpxBase.read_reg_data()
+
+        :param register: adress of the first register
+        :type register: int
+        :param length: number of registers (default: 1)
+        :type length: int
+        :return: Register(s) content
+        :rtype: bytes
+        """
+        offset = (register - self.register) * 2
+        if offset < 0 or offset + length * 2 > len(self.data):
+            raise ValueError(
+                f"Registers {register} to {register + length - 1} are not part of "
+                "the process image"
+            )
+        return self.data[offset : offset + length * 2]
+
+
+@dataclass
+class ModuleSnapshot:
+    """Channel values and status of one module read with one request"""
+
+    channels: list
+    status: list[bool]
+
+
+@dataclass
+class SystemHealth:
+    """Module configuration, fault detection and status of a CPX-E system read with
+    one request"""
+
+    module_bitmap: int
+    faults: list[bool]
+    write_protected: bool
+    force_active: bool
+
+    @property
+    def module_count(self) -> int:
+        """Number of modules in the module bitmap"""
+        return self.module_bitmap.bit_count()
+
+    def changes(self, previous: "SystemHealth" = None) -> list["HealthChange"]:
+        """Returns the transitions from a previous health to this one. Without previous
+        health every value is reported with the old value None.
+
+        :param previous: (optional) previous health
+        :type previous: SystemHealth
+        :return: changed values
+        :rtype: list[HealthChange]
+        """
+        changes = []
+        for name in ("module_bitmap", "write_protected", "force_active"):
+            old = getattr(previous, name) if previous else None
+            new = getattr(self, name)
+            if old != new:
+                changes.append(HealthChange(name, old, new))
+        for position, new in enumerate(self.faults):
+            old = previous.faults[position] if previous else None
+            if old != new:
+                changes.append(HealthChange("fault", old, new, position))
+        return changes
+
+
+@dataclass
+class HealthChange:
+    """Transition of one value of the SystemHealth, position is the module position
+    for faults"""
+
+    name: str
+    old: object
+    new: object
+    position: int = None
@@ -1,26 +1,120 @@
 """CPX-E module implementations"""
 
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
 from cpx_io.utils.logging import Logging
-from cpx_io.utils.helpers import module_list_from_typecode
 from cpx_io.cpx_system.cpx_base import CpxBase, CpxInitError
+from cpx_io.cpx_system.cpx_dataclasses import (
+    HealthChange,
+    ProcessImage,
+    SystemHealth,
+    ReadRequest,
+    WriteRequest,
+)
 from cpx_io.cpx_system.cpx_e import cpx_e_registers
+from cpx_io.cpx_system.cpx_scheduler import Priority
+from cpx_io.cpx_system.cpx_transport import MAX_READ_REGISTERS, MAX_WRITE_REGISTERS
 from cpx_io.cpx_system.cpx_e.cpx_e_module_definitions import CPX_E_MODULE_ID_DICT
 from cpx_io.cpx_system.cpx_e.eep import CpxEEp
 from cpx_io.utils.boollist import bytes_to_boollist
+from cpx_io.utils.statistics import LatencyStatistics
+
+# shortest sleep between two polls of the function number handshake after the fast
+# poll window, doubled after every poll up to handshake_max_poll_interval
+HANDSHAKE_MIN_POLL_INTERVAL = 0.0005
+
+
+class CpxFunctionNumberTimeoutError(ConnectionError):
+    """Error is raised if the system does not acknowledge a function number request
+    in time"""
+
+    def __init__(self, function_number: int, module=None, timeout: float = None):
+        self.function_number = function_number
+        self.module = module
+        location = f"module {module}" if module is not None else "the system"
+        super().__init__(
+            f"Function number {function_number} of {location} was not acknowledged "
+            f"within {timeout} s"
+        )
+
+
+# one module of a typecode with optional count, longer ids are matched first
+TYPECODE_TOKEN = re.compile(
+    r"(\d*)("
+    + "|".join(sorted(map(re.escape, CPX_E_MODULE_ID_DICT), key=len, reverse=True))
+    + ")"
+)
+
+# bits of the status register
+WRITE_PROTECT_BIT = 11
+FORCE_ACTIVE_BIT = 15
+
+# every module has a block of 64 parameters in the system table, starting with
+# function number 4828 for the module at position 0
+MODULE_PARAMETERS = 4828
+MODULE_PARAMETER_LENGTH = 64
+# every module has a block of 16 module data entries in the system table, the first
+# one is the module code, starting with function number 16 for the module at position 0
+MODULE_DATA = 16
+MODULE_DATA_LENGTH = 16
 
 
 class CpxE(CpxBase):
     """CPX-E base class"""
 
-    def __init__(self, modules=None, **kwargs):
+    # pylint: disable=too-many-instance-attributes
+    # pylint: disable=too-many-public-methods
+    # intended. The system offers the process image, topology and health functions
+
+    _pipeline_probe_register = cpx_e_registers.MODULE_CONFIGURATION.register_address
+
+    def __init__(
+        self,
+        modules=None,
+        function_number_cache: bool = True,
+        topology_cache: str = None,
+        **kwargs,
+    ):
         """Constructor of the CpxE class.
 
-        :param modules: List of module instances e.g. [CpxEEp(), CpxE8Do(), CpxE16Di()]
-        :type modules: list
+        :param modules: List of module instances e.g. [CpxEEp(), CpxE8Do(), CpxE16Di()],
+            a typecode e.g. "60E-EP-MLNINO" or "auto" to create the modules from the
+            topology_cache (see discover_modules())
+        :type modules: list | str
+        :param function_number_cache: (optional) keep read and written module parameters
+            so that they are only read once from the device, defaults to True
+        :type function_number_cache: bool
+        :param topology_cache: (optional) json file that maps system fingerprints to
+            module ids, see save_topology()
+        :type topology_cache: str
         """
         super().__init__(**kwargs)
+        self.topology_cache = topology_cache
+        self._last_health = None
+        self.function_number_cache = function_number_cache
+        # status values in the parameter block of a module (e.g. the IO-Link line
+        # state) are read again when their cache entry is older than this (in s)
+        self.status_cache_time = 0.1
+        self._function_number_cache = {}
+        # function number handshake: polls without pause during the fast poll window,
+        # then with increasing pauses until the timeout (all in s)
+        self.handshake_timeout = 1.0
+        self.handshake_fast_poll_time = 0.002
+        self.handshake_max_poll_interval = 0.02
+        self._handshakes = {
+            kind: {"polls": 0, "timeouts": 0, "latency": LatencyStatistics()}
+            for kind in ("read", "write")
+        }
         self._control_bit_value = 1 << 15
         self._write_bit_value = 1 << 13
+        # local copy of the module outputs, see write_output_image()
+        self._output_lock = threading.RLock()
+        self._output_image = None
+        self._dirty_outputs = set()
 
         self.next_output_register = None
         self.next_input_register = None
@@ -43,15 +137,21 @@ class CpxE(CpxBase):
         Enables overwriting of modules list.
         """
         self._modules = []
+        self._function_number_cache.clear()
+        self._reset_output_image()
 
         if modules_value is None:
             module_list = [CpxEEp()]
         elif isinstance(modules_value, list):
             module_list = modules_value
+        elif modules_value == "auto":
+            module_list = self.discover_modules()
         elif isinstance(modules_value, str):
             Logging.logger.info("Use typecode %s for module setup", modules_value)
-            cpxe_typecode = self.unwrap_cpxe_typecode(modules_value)
-            module_list = module_list_from_typecode(cpxe_typecode, CPX_E_MODULE_ID_DICT)
+            module_list = [
+                CPX_E_MODULE_ID_DICT[module_id]()
+                for module_id in self.tokenize_typecode(modules_value)
+            ]
         else:
             raise CpxInitError
 
@@ -59,122 +159,346 @@ class CpxE(CpxBase):
             self.add_module(mod)
 
     @staticmethod
-    def unwrap_cpxe_typecode(typecode: str) -> str:
-        """Takes care of the cpx-e typecode merging more than two of the same module
-        type into a number. For example MMM will be merged to 3M while MM stays."""
+    def tokenize_typecode(typecode: str) -> list[str]:
+        """Splits a cpx-e typecode into module ids in a single pass. A number in front of
+        a module id repeats the module, e.g. 60E-EP-NI3M gives EP, NI, M, M, M.
+
+        :param typecode: cpx-e typecode, e.g. 60E-EP-MLNINO
+        :type typecode: str
+        :return: module ids, see CPX_E_MODULE_ID_DICT
+        :rtype: list[str]
+        """
         typecode_header = typecode[:7]
         typecode_config = typecode[7:]
 
-        if typecode_header == "60E-EP-":
-            result = ""
-            i = 0
-            while i < len(typecode_config):
-                if typecode_config[i].isdigit():
-                    num = ""
-                    # look if there are following numbers
-                    while i < len(typecode_config) and typecode_config[i].isdigit():
-                        num += typecode_config[i]
-                        i += 1
-                    # if a number is found, look for the key in the dict
-                    for key in CPX_E_MODULE_ID_DICT:
-                        if typecode_config.startswith(key, i):
-                            result += key * int(num)
-                            # set i to the next index after the found key
-                            i += len(key) - 1
-                            break
-                else:
-                    result += typecode_config[i]
-                i += 1
-            return typecode_header + result
+        if typecode_header != "60E-EP-":
+            raise TypeError(
+                "Your CPX-E configuration must include the Ethernet/IP "
+                "Busmodule to be compatible with this software"
+            )
+
+        module_ids = ["EP"]
+        position = 0
+        while position < len(typecode_config):
+            match = TYPECODE_TOKEN.match(typecode_config, position)
+            if match is None:
+                raise ValueError(
+                    f"Unknown module {typecode_config[position:]} in typecode {typecode}"
+                )
+            count, module_id = match.groups()
+            module_ids.extend([module_id] * int(count or 1))
+            position = match.end()
+        return module_ids
+
+    @staticmethod
+    def unwrap_cpxe_typecode(typecode: str) -> str:
+        """Takes care of the cpx-e typecode merging more than two of the same module
+        type into a number. For example 3M will be expanded to MMM while MM stays."""
+        return typecode[:7] + "".join(CpxE.tokenize_typecode(typecode)[1:])
+
+    def read_fingerprint(self) -> str:
+        """Reads a fingerprint of the system from the module configuration, the
+        device identification and the module code of every module. Systems with the
+        same fingerprint have the same module types on the same positions.
 
-        raise TypeError(
-            "Your CPX-E configuration must include the Ethernet/IP "
-            "Busmodule to be compatible with this software"
+        :return: fingerprint
+        :rtype: str
+        """
+        configuration = int.from_bytes(
+            self.read_reg_data(*cpx_e_registers.MODULE_CONFIGURATION),
+            byteorder="little",
         )
+        identification = self.read_device_identification()
+        module_codes = [
+            self.read_function_number(MODULE_DATA + MODULE_DATA_LENGTH * position)
+            for position in range(configuration.bit_count())
+        ]
+        return (
+            f"{identification:04x}-{configuration:012x}-"
+            f"{'.'.join(f'{code:02x}' for code in module_codes)}"
+        )
+
+    def discover_modules(self) -> list:
+        """Creates the module list of the system from the topology cache. The cache maps
+        the fingerprint of a system (see read_fingerprint()) to its module ids and is
+        filled with save_topology(), e.g. once per station type during commissioning.
+
+        :return: new module instances
+        :rtype: list
+        """
+        if not self.topology_cache:
+            raise CpxInitError("Module discovery requires a topology_cache file")
+        fingerprint = self.read_fingerprint()
+        module_ids = self._load_topologies().get(fingerprint)
+        if module_ids is None:
+            raise CpxInitError(
+                f"Unknown system {fingerprint}. Create it once with a typecode or a "
+                "module list and save_topology()"
+            )
+        Logging.logger.info(f"Discovered modules {module_ids} for system {fingerprint}")
+        return [CPX_E_MODULE_ID_DICT[module_id]() for module_id in module_ids]
+
+    def save_topology(self) -> str:
+        """Saves the module ids of the system in the topology cache, so that systems
+        with the same fingerprint can be created with modules="auto".
+
+        :return: fingerprint of the system
+        :rtype: str
+        """
+        if not self.topology_cache:
+            raise CpxInitError("No topology_cache file set")
+        fingerprint = self.read_fingerprint()
+        module_count = int(fingerprint.split("-")[1], 16).bit_count()
+        if module_count != len(self._modules):
+            raise CpxInitError(
+                f"Module list with {len(self._modules)} modules does not match the "
+                f"system with {module_count} modules"
+            )
+        module_ids = {value: key for key, value in CPX_E_MODULE_ID_DICT.items()}
+        topologies = self._load_topologies()
+        topologies[fingerprint] = [module_ids[type(m)] for m in self._modules]
+        with open(self.topology_cache, "w", encoding="utf-8") as file:
+            json.dump(topologies, file, indent=4)
+        Logging.logger.info(f"Saved topology of system {fingerprint}")
+        return fingerprint
+
+    def _load_topologies(self) -> dict:
+        if not os.path.exists(self.topology_cache):
+            return {}
+        with open(self.topology_cache, "r", encoding="utf-8") as file:
+            return json.load(file)
 
     def write_function_number(self, function_number: int, value: int) -> None:
-        """Write parameters via function number
+        """Write parameters via function number. Inside configuration() the value is
+        only collected and written when the context is left.
 
         :param function_number: Function number (see datasheet)
         :type function_number: int
         :param value: Value to write to function number
         :type value: int
         """
-        value_bytes = value.to_bytes(2, byteorder="little")
-        self.write_reg_data(
-            value_bytes, cpx_e_registers.DATA_SYSTEM_TABLE_WRITE.register_address
-        )
-        # need to write 0 first because there might be an
-        # old unknown configuration in the register
-        self.write_reg_data(
-            b"\x00\x00", cpx_e_registers.PROCESS_DATA_OUTPUTS.register_address
-        )
+        pending = getattr(self._local, "pending_function_numbers", None)
+        if pending is not None:
+            pending[function_number] = value
+            Logging.logger.debug(
+                f"Deferred writing value {value} to function number {function_number}"
+            )
+            return
 
-        write_data = (
-            self._control_bit_value | self._write_bit_value | function_number
-        ).to_bytes(2, byteorder="little")
+        try:
+            self._write_function_number_uncached(function_number, value)
+        except Exception:
+            # the device might have taken the value or not
+            self._function_number_cache.pop(function_number, None)
+            raise
+        self._cache_function_number(function_number, value)
 
-        self.write_reg_data(
-            write_data,
-            cpx_e_registers.PROCESS_DATA_OUTPUTS.register_address,
+    def read_function_number(self, function_number: int) -> int:
+        """Read parameters via function number. Module parameters are served from the
+        function number cache if possible.
+
+        :param function_number: Function number (see datasheet)
+        :type function_number: int
+        :return: Value read from function number
+        :rtype: int
+        """
+        pending = getattr(self._local, "pending_function_numbers", None)
+        if pending is not None and function_number in pending:
+            return pending[function_number]
+
+        entry = self._function_number_cache.get(function_number)
+        if entry is not None:
+            value, timestamp = entry
+            if (
+                not self._is_status_function_number(function_number)
+                or time.monotonic() - timestamp <= self.status_cache_time
+            ):
+                Logging.logger.debug(
+                    f"Read value {value} from function number {function_number} (cached)"
+                )
+                return value
+
+        value = self._read_function_number_uncached(function_number)
+        self._cache_function_number(function_number, value)
+        return value
+
+    @contextmanager
+    def configuration(self):
+        """Context manager that collects all function number writes of the calling
+        thread and writes every changed function number once when the context is left.
+        Reads inside the context return the collected values, so several bit-level
+        changes of the same function number are merged. If the context is left with
+        an exception, the collected values are discarded.
+        """
+        if getattr(self._local, "pending_function_numbers", None) is not None:
+            # nested configuration, the outermost context writes the values
+            yield self
+            return
+
+        pending = {}
+        self._local.pending_function_numbers = pending
+        try:
+            yield self
+        finally:
+            self._local.pending_function_numbers = None
+
+        with self.mailbox("function_number"):
+            for function_number, value in sorted(pending.items()):
+                entry = self._function_number_cache.get(function_number)
+                if entry and entry[0] == value:
+                    # read inside the context and not changed
+                    continue
+                self.write_function_number(function_number, value)
+
+    def invalidate_function_number_cache(self, position: int = None) -> None:
+        """Clears the function number cache, e.g. after the parameters were changed
+        by another master.
+
+        :param position: (optional) only clear the parameters of the module at this
+            position
+        :type position: int
+        """
+        if position is None:
+            self._function_number_cache.clear()
+            return
+        first = MODULE_PARAMETERS + MODULE_PARAMETER_LENGTH * position
+        for function_number in range(first, first + MODULE_PARAMETER_LENGTH):
+            self._function_number_cache.pop(function_number, None)
+
+    def _cache_function_number(self, function_number: int, value: int) -> None:
+        if self.function_number_cache and self._module_parameter(function_number):
+            self._function_number_cache[function_number] = (value, time.monotonic())
+
+    def _module_parameter(self, function_number: int) -> tuple | None:
+        """Returns (position, offset) if the function number is a module parameter"""
+        position, offset = divmod(
+            function_number - MODULE_PARAMETERS, MODULE_PARAMETER_LENGTH
         )
+        if function_number < MODULE_PARAMETERS or position >= len(self._modules):
+            return None
+        return position, offset
+
+    def _is_status_function_number(self, function_number: int) -> bool:
+        position, offset = self._module_parameter(function_number)
+        return offset in getattr(self._modules[position], "status_parameters", ())
+
+    def handshake_statistics(self) -> dict:
+        """Returns the statistics of the function number handshakes
 
-        data = 0
-        its = 0
-        while (data & self._control_bit_value) == 0 and its < 1000:
+        :return: dict with "read" and "write" as key, each with the number of polls
+            and timeouts and the handshake latency
+        :rtype: dict
+        """
+        return {
+            kind: {
+                "polls": handshake["polls"],
+                "timeouts": handshake["timeouts"],
+                "latency": handshake["latency"].as_dict(),
+            }
+            for kind, handshake in self._handshakes.items()
+        }
+
+    def _wait_for_handshake(self, function_number: int, kind: str) -> None:
+        """Polls the process data inputs until the system sets the control bit.
+        Polls back to back during handshake_fast_poll_time, then sleeps between the
+        polls with exponential backoff until handshake_timeout is reached.
+        """
+        handshake = self._handshakes[kind]
+        start = time.monotonic()
+        deadline = start + self.handshake_timeout
+        fast_poll_end = start + self.handshake_fast_poll_time
+        interval = HANDSHAKE_MIN_POLL_INTERVAL
+        while True:
             data = int.from_bytes(
                 self.read_reg_data(*cpx_e_registers.PROCESS_DATA_INPUTS),
                 byteorder="little",
             )
-            its += 1
+            handshake["polls"] += 1
+            now = time.monotonic()
+            if data & self._control_bit_value:
+                handshake["latency"].record(now - start)
+                return
+            if now >= deadline:
+                handshake["timeouts"] += 1
+                module_parameter = self._module_parameter(function_number)
+                module = (
+                    self._modules[module_parameter[0]] if module_parameter else None
+                )
+                raise CpxFunctionNumberTimeoutError(
+                    function_number, module, self.handshake_timeout
+                )
+            if now >= fast_poll_end:
+                time.sleep(min(interval, deadline - now))
+                interval = min(interval * 2, self.handshake_max_poll_interval)
+
+    def _revalidate(self) -> None:
+        # the device might have been restarted with its stored parameters
+        self.invalidate_function_number_cache()
+
+    def _write_function_number_uncached(self, function_number: int, value: int) -> None:
+        """Writes one function number to the device
+
+        :param function_number: Function number (see datasheet)
+        :type function_number: int
+        :param value: Value to write to function number
+        :type value: int
+        """
+        with self.mailbox("function_number"):
+            value_bytes = value.to_bytes(2, byteorder="little")
+            self.write_reg_data(
+                value_bytes, cpx_e_registers.DATA_SYSTEM_TABLE_WRITE.register_address
+            )
+            # need to write 0 first because there might be an
+            # old unknown configuration in the register
+            self.write_reg_data(
+                b"\x00\x00", cpx_e_registers.PROCESS_DATA_OUTPUTS.register_address
+            )
+
+            write_data = (
+                self._control_bit_value | self._write_bit_value | function_number
+            ).to_bytes(2, byteorder="little")
+
+            self.write_reg_data(
+                write_data,
+                cpx_e_registers.PROCESS_DATA_OUTPUTS.register_address,
+            )
 
-        if its >= 1000:
-            raise ConnectionError()
+            self._wait_for_handshake(function_number, "write")
 
         Logging.logger.debug(
             f"Wrote value {value} to function number {function_number}"
         )
 
-    def read_function_number(self, function_number: int) -> int:
-        """Read parameters via function number
+    def _read_function_number_uncached(self, function_number: int) -> int:
+        """Reads one function number from the device
 
         :param function_number: Function number (see datasheet)
         :type function_number: int
         :return: Value read from function number
         :rtype: int
         """
-        # need to write 0 first because there might be an
-        # old unknown configuration in the register
-        self.write_reg_data(
-            b"\x00\x00", cpx_e_registers.PROCESS_DATA_OUTPUTS.register_address
-        )
-
-        write_data = (self._control_bit_value | function_number).to_bytes(
-            2, byteorder="little"
-        )
+        with self.mailbox("function_number"):
+            # need to write 0 first because there might be an
+            # old unknown configuration in the register
+            self.write_reg_data(
+                b"\x00\x00", cpx_e_registers.PROCESS_DATA_OUTPUTS.register_address
+            )
 
-        self.write_reg_data(
-            write_data,
-            cpx_e_registers.PROCESS_DATA_OUTPUTS.register_address,
-        )
+            write_data = (self._control_bit_value | function_number).to_bytes(
+                2, byteorder="little"
+            )
 
-        data = 0
-        its = 0
-        while (data & self._control_bit_value) == 0 and its < 1000:
-            data = int.from_bytes(
-                self.read_reg_data(*cpx_e_registers.PROCESS_DATA_INPUTS),
-                byteorder="little",
+            self.write_reg_data(
+                write_data,
+                cpx_e_registers.PROCESS_DATA_OUTPUTS.register_address,
             )
-            its += 1
 
-        if its >= 1000:
-            raise ConnectionError()
+            self._wait_for_handshake(function_number, "read")
 
-        data &= ~self._control_bit_value
-        value = int.from_bytes(
-            self.read_reg_data(*cpx_e_registers.DATA_SYSTEM_TABLE_READ),
-            byteorder="little",
-        )
+            value = int.from_bytes(
+                self.read_reg_data(*cpx_e_registers.DATA_SYSTEM_TABLE_READ),
+                byteorder="little",
+            )
 
         Logging.logger.debug(
             f"Read value {value} from function number {function_number}"
@@ -194,6 +518,184 @@ class CpxE(CpxBase):
         Logging.logger.debug(f"Read {data} from MODULE_CONFIGURATION register")
         return data.bit_count()
 
+    def read_process_image(self) -> ProcessImage:
+        """reads the input data of all modules. The inputs of the modules are consecutive
+        registers starting with PROCESS_DATA_INPUTS, so they are read with one request
+        (or a batch of requests for large systems). Use the image with read_snapshot() of
+        the modules to get their channels and status without further requests.
+
+        :returns: Input registers of the system
+        :rtype: ProcessImage
+        """
+        first = cpx_e_registers.PROCESS_DATA_INPUTS.register_address
+        length = self.next_input_register - first
+        requests = [
+            ReadRequest(register, min(MAX_READ_REGISTERS, first + length - register))
+            for register in range(first, first + length, MAX_READ_REGISTERS)
+        ]
+        data = b"".join(self.execute_batch(requests))
+        Logging.logger.debug(f"Read process image with {length} input registers")
+        return ProcessImage(first, data)
+
+    @contextmanager
+    def output_batch(self, all_modules: bool = False):
+        """Context manager that collects the output changes of write_output_image() and
+        flushes them when the context is left, e.g. to update several output modules
+        in one machine step. The changes are kept per thread and applied to the output
+        image at once, so other threads neither see nor flush a part of the batch. If
+        the context is left with an exception, the changes are discarded.
+
+        :param all_modules: (optional) write the outputs of all modules with one request
+            instead of only the changed registers, defaults to False
+        :type all_modules: bool
+        """
+        if getattr(self._local, "pending_outputs", None) is not None:
+            # nested batch, the outermost one flushes
+            yield self
+            return
+        # changed bytes of the batch keyed by their offset in the output image
+        self._local.pending_outputs = pending = {}
+        try:
+            yield self
+        finally:
+            self._local.pending_outputs = None
+        with self._output_lock:
+            if self._output_image is None:
+                self.sync_output_image()
+            first = self._output_image_start()
+            for offset, value in pending.items():
+                self._output_image[offset] = value
+                self._dirty_outputs.add(first + offset // 2)
+            self.flush_outputs(all_modules)
+
+    def read_output_image(self, register: int, length: int = 1) -> bytes:
+        """Returns output register(s) of the modules from the output image. The image
+        is read from the device on first use.
+
+        :param register: adress of the first output register
+        :type register: int
+        :param length: number of registers (default: 1)
+        :type length: int
+        :return: Register(s) content
+        :rtype: bytes
+        """
+        with self._output_lock:
+            offset = self._output_offset(register, length)
+            data = self._output_image[offset : offset + length * 2]
+        # changes of an output_batch() of this thread that are not applied yet
+        pending = getattr(self._local, "pending_outputs", None)
+        if pending:
+            for i, value in enumerate(data):
+                data[i] = pending.get(offset + i, value)
+        return bytes(data)
+
+    def write_output_image(self, data: bytes, register: int) -> None:
+        """Changes output register(s) of the modules in the output image and writes
+        the changed registers to the device. Inside output_batch() the registers are
+        written when the context is left. If data has an odd length, the high byte of
+        the last register is kept.
+
+        :param data: data to write
+        :type data: bytes
+        :param register: adress of the first output register
+        :type register: int
+        """
+        pending = getattr(self._local, "pending_outputs", None)
+        with self._output_lock:
+            length = (len(data) + 1) // 2
+            offset = self._output_offset(register, length)
+            if pending is None:
+                self._output_image[offset : offset + len(data)] = data
+                self._dirty_outputs.update(range(register, register + length))
+        if pending is None:
+            self.flush_outputs()
+        else:
+            pending.update(zip(range(offset, offset + len(data)), data))
+
+    def flush_outputs(self, all_modules: bool = False) -> None:
+        """Writes the changed registers of the output image to the device. Consecutive
+        changed registers are written with one request.
+
+        :param all_modules: (optional) write the outputs of all modules with one request
+            instead of only the changed registers, defaults to False
+        :type all_modules: bool
+        """
+        with self._output_lock:
+            if self._output_image is None or not (self._dirty_outputs or all_modules):
+                return
+            first = self._output_image_start()
+            if all_modules:
+                dirty = range(first, first + len(self._output_image) // 2)
+            else:
+                dirty = sorted(self._dirty_outputs)
+            # one write request for every run of consecutive registers
+            runs = []
+            for register in dirty:
+                if (
+                    runs
+                    and register == runs[-1][0] + runs[-1][1]
+                    and runs[-1][1] < MAX_WRITE_REGISTERS
+                ):
+                    runs[-1][1] += 1
+                else:
+                    runs.append([register, 1])
+            self.execute_batch(
+                [
+                    WriteRequest(
+                        bytes(
+                            self._output_image[
+                                (start - first) * 2 : (start - first + length) * 2
+                            ]
+                        ),
+                        start,
+                    )
+                    for start, length in runs
+                ]
+            )
+            self._dirty_outputs.clear()
+        Logging.logger.debug(f"Flushed output registers {list(dirty)}")
+
+    def sync_output_image(self) -> None:
+        """Reads the outputs of all modules from the device into the output image, e.g.
+        if the outputs were changed with write_reg_data(). Registers with changes that
+        were not flushed yet keep their value.
+        """
+        first = self._output_image_start()
+        length = self.next_output_register - first
+        requests = [
+            ReadRequest(register, min(MAX_READ_REGISTERS, first + length - register))
+            for register in range(first, first + length, MAX_READ_REGISTERS)
+        ]
+        data = bytearray(b"".join(self.execute_batch(requests)))
+        with self._output_lock:
+            for register in self._dirty_outputs:
+                offset = (register - first) * 2
+                data[offset : offset + 2] = self._output_image[offset : offset + 2]
+            self._output_image = data
+        Logging.logger.debug(f"Read output image with {length} registers")
+
+    def _output_image_start(self) -> int:
+        # the first two output registers belong to the bus module and are used for
+        # the function number handshake
+        return cpx_e_registers.PROCESS_DATA_OUTPUTS.register_address + 2
+
+    def _output_offset(self, register: int, length: int) -> int:
+        """Returns the byte offset of register in the output image"""
+        if self._output_image is None:
+            self.sync_output_image()
+        offset = (register - self._output_image_start()) * 2
+        if offset < 0 or offset + length * 2 > len(self._output_image):
+            raise ValueError(
+                f"Registers {register} to {register + length - 1} are not module outputs"
+            )
+        return offset
+
+    def _reset_output_image(self) -> None:
+        with self._output_lock:
+            self._output_image = None
+            self._dirty_outputs.clear()
+
+    @CpxBase.with_priority(Priority.DIAGNOSIS)
     def read_fault_detection(self) -> list[bool]:
         """reads the fault detection register from the system
 
@@ -204,19 +706,61 @@ class CpxE(CpxBase):
         Logging.logger.debug(f"Read {data} from FAULT_DETECTION register")
         return bytes_to_boollist(data[:6], 3)
 
+    @CpxBase.with_priority(Priority.DIAGNOSIS)
     def read_status(self) -> tuple:
         """reads the status register.
 
         :returns: tuple (Write-protected, Force active)
         :rtype: tuple
         """
-        write_protect_bit = 11
-        force_active_bit = 15
         data = self.read_reg_data(*cpx_e_registers.STATUS_REGISTER)
         Logging.logger.debug(f"Read {data} from STATUS_REGISTER register")
         data = bytes_to_boollist(data)
-        return (data[write_protect_bit], data[force_active_bit])
+        return (data[WRITE_PROTECT_BIT], data[FORCE_ACTIVE_BIT])
 
+    @CpxBase.with_priority(Priority.DIAGNOSIS)
+    def read_health(self) -> SystemHealth:
+        """reads the module configuration, fault detection and status registers with
+        one request.
+
+        :returns: module bitmap, faults per module, write-protect and force-active flag
+        :rtype: SystemHealth
+        """
+        start = cpx_e_registers.MODULE_CONFIGURATION.register_address
+        end = sum(cpx_e_registers.STATUS_REGISTER)
+        data = self.read_reg_data(start, end - start)
+        Logging.logger.debug(f"Read {data} from registers {start} to {end - 1}")
+
+        def offset(register):
+            return (register.register_address - start) * 2
+
+        configuration = offset(cpx_e_registers.MODULE_CONFIGURATION)
+        fault_detection = offset(cpx_e_registers.FAULT_DETECTION)
+        status = bytes_to_boollist(data[offset(cpx_e_registers.STATUS_REGISTER) :][:2])
+        return SystemHealth(
+            module_bitmap=int.from_bytes(
+                data[configuration : configuration + 6], byteorder="little"
+            ),
+            faults=bytes_to_boollist(data[fault_detection : fault_detection + 6], 3),
+            write_protected=status[WRITE_PROTECT_BIT],
+            force_active=status[FORCE_ACTIVE_BIT],
+        )
+
+    def read_health_changes(self) -> list[HealthChange]:
+        """reads the health of the system (see read_health()) and returns only the
+        values that changed since the last call. The first call reports all values.
+
+        :returns: changed values
+        :rtype: list[HealthChange]
+        """
+        health = self.read_health()
+        changes = health.changes(self._last_health)
+        self._last_health = health
+        for change in changes:
+            Logging.logger.info(f"{self}: {change}")
+        return changes
+
+    @CpxBase.with_priority(Priority.DOCS)
     def read_device_identification(self) -> int:
         """reads device identification
 
@@ -233,6 +777,7 @@ class CpxE(CpxBase):
         """
         module.configure(self, len(self._modules))
         self._modules.append(module)
+        self._reset_output_image()
         if [type(mod) for mod in self._modules].count(CpxEEp) > 1:
             Logging.logger.warning(
                 "Module CpxEEp is assigned multiple times. This is most likey incorrect."
@@ -0,0 +1,168 @@
+"""Conversion of CPX-E analogue channel values to engineering units"""
+
+from dataclasses import dataclass, field
+from cpx_io.cpx_system.cpx_e.cpx_e_enums import ChannelRange
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# largest value of the data format "Sign + 15 bit"
+SIGN_15_BIT_MAX = 32767
+
+
+# signal range as (lower end, upper end, unit)
+SIGNAL_RANGES = {
+    ChannelRange.U_10V: (0.0, 10.0, "V"),
+    ChannelRange.B_10V: (-10.0, 10.0, "V"),
+    ChannelRange.B_5V: (-5.0, 5.0, "V"),
+    ChannelRange.U_1_5V: (1.0, 5.0, "V"),
+    ChannelRange.U_20MA: (0.0, 20.0, "mA"),
+    ChannelRange.U_4_20MA: (4.0, 20.0, "mA"),
+    ChannelRange.B_20MA: (-20.0, 20.0, "mA"),
+    ChannelRange.U_10V_NO_UNDERDRIVE: (0.0, 10.0, "V"),
+    ChannelRange.U_20MA_NO_UNDERDRIVE: (0.0, 20.0, "mA"),
+    ChannelRange.U_4_20MA_NO_UNDERDRIVE: (4.0, 20.0, "mA"),
+}
+
+
+def ranges_from_parameters(reg_01: int, reg_23: int) -> list[ChannelRange]:
+    """Returns the signal range of the four channels from the two range parameters,
+    one channel per nibble"""
+    return [
+        ChannelRange((reg >> shift) & 0x0F)
+        for reg in (reg_01, reg_23)
+        for shift in (0, 4)
+    ]
+
+
+@dataclass
+class ChannelScaling:
+    """Linear mapping of the raw values raw_min ... raw_max of one channel to the
+    signal range value_min ... value_max in unit"""
+
+    raw_min: int
+    raw_max: int
+    value_min: float
+    value_max: float
+    unit: str
+    factor: float = field(init=False, repr=False)
+    offset: float = field(init=False, repr=False)
+
+    @classmethod
+    def from_range(
+        cls, channel_range: ChannelRange | int, limits: tuple = None
+    ) -> "ChannelScaling":
+        """Creates the scaling of a signal range. Without limits the data format
+        "Sign + 15 bit" is used, with limits (lower, upper) the data format "linear
+        scaled" where the limits are the scaling end values.
+
+        :param channel_range: signal range of the channel
+        :type channel_range: ChannelRange | int
+        :param limits: (optional) lower and upper limit for linear scaled data format
+        :type limits: tuple
+        :return: scaling or None if the channel is not used
+        :rtype: ChannelScaling | None
+        """
+        channel_range = ChannelRange(channel_range)
+        if channel_range not in SIGNAL_RANGES:
+            return None
+        value_min, value_max, unit = SIGNAL_RANGES[channel_range]
+        if limits is None:
+            raw_min = -SIGN_15_BIT_MAX if value_min < 0 else 0
+            limits = (raw_min, SIGN_15_BIT_MAX)
+        if limits[0] >= limits[1]:
+            raise ValueError(f"Lower limit {limits[0]} must be below {limits[1]}")
+        return cls(limits[0], limits[1], value_min, value_max, unit)
+
+    def __post_init__(self):
+        self.factor = (self.value_max - self.value_min) / (self.raw_max - self.raw_min)
+        self.offset = self.value_min - self.raw_min * self.factor
+
+    def to_units(self, raw: int) -> float:
+        """Converts one raw value to engineering units"""
+        return raw * self.factor + self.offset
+
+    def to_raw(self, value: float) -> int:
+        """Quantizes one value in engineering units, limited to the raw range"""
+        raw = round((value - self.offset) / self.factor)
+        return min(max(raw, self.raw_min), self.raw_max)
+
+
+class ScalingVector:
+    """Scaling of all channels of a module with precomputed factors. Lists are
+    converted channel by channel, numpy arrays (if numpy is installed) with the
+    channels in the last axis are converted at once, e.g. many samples of shape
+    (n, channels). Channels without scaling are None (float("nan") in arrays).
+    """
+
+    def __init__(self, scalings: list[ChannelScaling]):
+        """Constructor of the ScalingVector class.
+
+        :param scalings: scaling of every channel, None for unused channels
+        :type scalings: list[ChannelScaling]
+        """
+        self.scalings = list(scalings)
+        self.units = [s.unit if s else None for s in self.scalings]
+        if np is not None:
+            nan = float("nan")
+            self._np_factors = np.array([s.factor if s else nan for s in self.scalings])
+            self._np_offsets = np.array([s.offset if s else nan for s in self.scalings])
+            self._np_bounds = (
+                np.array([s.raw_min if s else 0 for s in self.scalings]),
+                np.array([s.raw_max if s else 0 for s in self.scalings]),
+            )
+
+    def __len__(self):
+        return len(self.scalings)
+
+    def to_units(self, raw_values):
+        """Converts raw channel values to engineering units
+
+        :param raw_values: raw value of every channel or numpy array of them
+        :type raw_values: list[int] | numpy.ndarray
+        :return: values in engineering units
+        :rtype: list[float] | numpy.ndarray
+        """
+        if np is not None and isinstance(raw_values, np.ndarray):
+            return raw_values * self._np_factors + self._np_offsets
+        self._check_length(raw_values)
+        return [
+            s.to_units(raw) if s else None for raw, s in zip(raw_values, self.scalings)
+        ]
+
+    def to_raw(self, values):
+        """Quantizes values in engineering units to raw channel values. Values outside
+        of the signal range are limited to the range.
+
+        :param values: value of every channel or numpy array of them
+        :type values: list[float] | numpy.ndarray
+        :return: raw values
+        :rtype: list[int] | numpy.ndarray
+        """
+        if np is not None and isinstance(values, np.ndarray):
+            raw = np.rint((values - self._np_offsets) / self._np_factors)
+            raw = np.clip(np.nan_to_num(raw), *self._np_bounds)
+            return raw.astype(np.int16)
+        self._check_length(values)
+        return [s.to_raw(value) if s else 0 for value, s in zip(values, self.scalings)]
+
+    def channel(self, channel: int) -> ChannelScaling:
+        """Returns the scaling of one channel
+
+        :param channel: Channel number, starting with 0
+        :type channel: int
+        :return: scaling of the channel
+        :rtype: ChannelScaling
+        """
+        scaling = self.scalings[channel]
+        if scaling is None:
+            raise ValueError(f"Channel {channel} has no signal range")
+        return scaling
+
+    def _check_length(self, values) -> None:
+        if len(values) != len(self.scalings):
+            raise ValueError(
+                f"Data len error: expected: {len(self.scalings)}, got: {len(values)}"
+            )
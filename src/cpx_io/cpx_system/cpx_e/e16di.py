@@ -5,6 +5,7 @@
 
 from cpx_io.cpx_system.cpx_base import CpxBase
 from cpx_io.cpx_system.cpx_module import CpxModule
+from cpx_io.cpx_system.cpx_dataclasses import ModuleSnapshot, ProcessImage
 from cpx_io.utils.boollist import bytes_to_boollist
 from cpx_io.utils.helpers import value_range_check
 from cpx_io.utils.logging import Logging
@@ -55,6 +56,23 @@ class CpxE16Di(CpxModule):
         Logging.logger.info(f"{self.name}: Reading status: {ret}")
         return ret
 
+    @CpxBase.require_base
+    def read_snapshot(self, image: ProcessImage = None) -> ModuleSnapshot:
+        """read channels and status with one request. If a process image of the system is
+        given (see CpxE.read_process_image()), the values are taken from the image.
+
+        :param image: (optional) process image of the system
+        :type image: ProcessImage
+        :return: channel values and status
+        :rtype: ModuleSnapshot
+        """
+        data = self._read_inputs(2, image)
+        snapshot = ModuleSnapshot(
+            bytes_to_boollist(data[:2]), bytes_to_boollist(data[2:4])
+        )
+        Logging.logger.info(f"{self.name}: Reading snapshot: {snapshot}")
+        return snapshot
+
     @CpxBase.require_base
     def configure_diagnostics(self, value: bool) -> None:
         """
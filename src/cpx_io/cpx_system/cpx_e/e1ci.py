@@ -7,9 +7,11 @@ from dataclasses import dataclass
 
 from cpx_io.cpx_system.cpx_base import CpxBase
 from cpx_io.cpx_system.cpx_module import CpxModule
+from cpx_io.cpx_system.cpx_dataclasses import ProcessImage
 from cpx_io.utils.boollist import bytes_to_boollist, boollist_to_bytes
 from cpx_io.utils.helpers import value_range_check
 from cpx_io.utils.logging import Logging
+from cpx_io.cpx_system.cpx_e.e1ci_sampling import CounterSampler
 from cpx_io.cpx_system.cpx_e.cpx_e_enums import (
     DigInDebounceTime,
     IntegrationTime,
@@ -64,6 +66,16 @@ class CpxE1Ci(CpxModule):
         confirm_latching: bool
         block_latching: bool
 
+    @dataclass
+    class Snapshot:
+        """Input data of the module read with one request"""
+
+        value: int
+        latching_value: int
+        status_word: "CpxE1Ci.StatusWord"
+        process_data: "CpxE1Ci.ProcessData"
+        status: list[bool]
+
     def configure(self, *args):
         super().configure(*args)
 
@@ -165,6 +177,61 @@ class CpxE1Ci(CpxModule):
         Logging.logger.info(f"{self.name}: Read status {ret}")
         return ret
 
+    @CpxBase.require_base
+    def read_snapshot(self, image: ProcessImage = None) -> Snapshot:
+        """read all input data with one request. If a process image of the system is
+        given (see CpxE.read_process_image()), the values are taken from the image.
+
+        :param image: (optional) process image of the system
+        :type image: ProcessImage
+        :return: counter value, latching value, status word, process data and status
+        :rtype: Snapshot
+        """
+        data = self._read_inputs(8, image)
+        snapshot = self.Snapshot(
+            value=int.from_bytes(data[:4], byteorder="little"),
+            latching_value=int.from_bytes(data[4:8], byteorder="little"),
+            status_word=self.StatusWord.from_bytes(data[8:10]),
+            process_data=self.ProcessData.from_bytes(data[12:13]),
+            status=bytes_to_boollist(data[14:16]),
+        )
+        Logging.logger.info(f"{self.name}: Reading snapshot: {snapshot}")
+        return snapshot
+
+    @CpxBase.require_base
+    def read_counter_limits(self) -> tuple[int, int]:
+        """Read the lower and upper count limit (see configure_lower_counter_limit() and
+        configure_upper_counter_limit())
+
+        :return: lower and upper count limit
+        :rtype: tuple[int, int]
+        """
+        function_number = 4828 + 64 * self.position
+        limits = tuple(
+            int.from_bytes(
+                bytes(
+                    self.base.read_function_number(function_number + offset + i)
+                    for i in range(4)
+                ),
+                byteorder="little",
+            )
+            for offset in (20, 16)
+        )
+        Logging.logger.info(f"{self.name}: Read counter limits {limits}")
+        return limits
+
+    @CpxBase.require_base
+    def sampler(self, **kwargs) -> CounterSampler:
+        """Creates a sampler that reads the input data with one request per tick and
+        estimates velocity and acceleration of the counter. The count limits are read
+        from the module if they are not given. For the keyword arguments see
+        CounterSampler.
+
+        :return: sampler of this module
+        :rtype: CounterSampler
+        """
+        return CounterSampler(self, **kwargs)
+
     @CpxBase.require_base
     def configure_signal_type(self, value: SignalType | int) -> None:
         """The parameter “Signal type/encoder type” defines the encoder supply and connection
@@ -0,0 +1,217 @@
+"""Sampling of the CPX-E-1CI counter module with velocity estimation"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from cpx_io.utils.logging import Logging
+
+
+@dataclass
+class CounterSample:
+    """One sample of the counter module. position is the counter value continued over
+    the count limits, velocity (counts/s) and acceleration (counts/s²) are estimated
+    over the sliding windows and None until enough samples were read."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    timestamp: float
+    value: int
+    latching_value: int
+    status_word: object
+    process_data: object
+    status: list[bool]
+    position: int
+    velocity: float = None
+    acceleration: float = None
+
+
+class CounterSampler:
+    """Reads the whole input block of a CpxE1Ci with one request per tick, timestamps
+    every sample and estimates velocity and acceleration. A counter overrun from one
+    count limit to the other is detected by the shortest distance between two values,
+    so the counter must not move more than half of the counting range per tick. The
+    module must count, speed measurement mode (process data "speed_measurement") is
+    rejected.
+
+    The samples are kept in a bounded ring buffer. They can be read with stream() in
+    the calling thread or with start() in a background thread.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        module,
+        period: float = 0.005,
+        window: int = 5,
+        buffer_size: int = 1000,
+        limits: tuple = None,
+    ):
+        """Constructor of the CounterSampler class.
+
+        :param module: counter module to read
+        :type module: CpxE1Ci
+        :param period: (optional) time between two samples in s, defaults to 0.005
+        :type period: float
+        :param window: (optional) number of samples for the velocity and acceleration
+            estimation, defaults to 5
+        :type window: int
+        :param buffer_size: (optional) number of samples kept in the buffer
+        :type buffer_size: int
+        :param limits: (optional) lower and upper count limit, read from the module if
+            not given
+        :type limits: tuple
+        :raises ValueError: if the window is too small, the limits are invalid or the
+            module is in speed measurement mode
+        """
+        if window < 2:
+            raise ValueError("Window must contain at least two samples")
+        self.module = module
+        self.period = period
+        self.window = window
+        self.buffer = deque(maxlen=buffer_size)
+        self.lower_limit, self.upper_limit = (
+            limits if limits is not None else module.read_counter_limits()
+        )
+        if self.lower_limit >= self.upper_limit:
+            raise ValueError(
+                f"Lower count limit {self.lower_limit} must be below {self.upper_limit}"
+            )
+        # in speed measurement mode the value is a speed and cannot be unwrapped
+        if module.read_process_data().speed_measurement:
+            raise ValueError(
+                f"{module.name} is in speed measurement mode, disable the process data "
+                "speed_measurement to sample the counter"
+            )
+        self.overruns = 0
+        self._positions = deque(maxlen=window)
+        self._velocities = deque(maxlen=window)
+        self._last = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.error = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def sample(self) -> CounterSample:
+        """Reads one sample and adds it to the buffer
+
+        :return: sample
+        :rtype: CounterSample
+        """
+        start = time.monotonic()
+        snapshot = self.module.read_snapshot()
+        # the input data were sampled somewhere during the request
+        timestamp = (start + time.monotonic()) / 2
+
+        position = self._unwrap(snapshot.value)
+        self._positions.append((timestamp, position))
+        velocity = self._slope(self._positions)
+        acceleration = None
+        if velocity is not None:
+            self._velocities.append((timestamp, velocity))
+            acceleration = self._slope(self._velocities)
+
+        sample = CounterSample(
+            timestamp=timestamp,
+            value=snapshot.value,
+            latching_value=snapshot.latching_value,
+            status_word=snapshot.status_word,
+            process_data=snapshot.process_data,
+            status=snapshot.status,
+            position=position,
+            velocity=velocity,
+            acceleration=acceleration,
+        )
+        self.buffer.append(sample)
+        return sample
+
+    def stream(self, count: int = None):
+        """Generator that reads a sample every period. The ticks are scheduled from the
+        start time, so a slow request does not shift the following ticks.
+
+        :param count: (optional) number of samples, endless if not given
+        :type count: int
+        :return: samples
+        :rtype: Generator[CounterSample]
+        """
+        next_tick = time.monotonic()
+        taken = 0
+        while count is None or taken < count:
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -self.period:
+                # missed ticks are skipped instead of being read back to back
+                next_tick = time.monotonic()
+            yield self.sample()
+            taken += 1
+            next_tick += self.period
+
+    def start(self) -> None:
+        """Starts sampling into the buffer in a background thread"""
+        if self._thread is not None:
+            raise RuntimeError("Sampler is already running")
+        self._stop.clear()
+        self.error = None
+        self._thread = threading.Thread(
+            target=self._run, name=f"cpx-io-sampler-{self.module.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the background thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def samples(self) -> list[CounterSample]:
+        """Returns the samples in the buffer, oldest first
+
+        :return: samples
+        :rtype: list[CounterSample]
+        """
+        return list(self.buffer)
+
+    def _run(self) -> None:
+        try:
+            for _ in self.stream():
+                if self._stop.is_set():
+                    return
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            Logging.logger.error(f"{self.module.name}: Sampling stopped ({error!r})")
+            self.error = error
+
+    def _unwrap(self, value: int) -> int:
+        if self._last is None:
+            self._last = (value, value)
+            return value
+        last_value, position = self._last
+        span = self.upper_limit - self.lower_limit + 1
+        delta = value - last_value
+        if delta > span // 2:
+            delta -= span
+            self.overruns += 1
+        elif delta < -(span // 2):
+            delta += span
+            self.overruns += 1
+        position += delta
+        self._last = (value, position)
+        return position
+
+    @staticmethod
+    def _slope(points: deque) -> float | None:
+        if len(points) < 2:
+            return None
+        (start_time, start_value), (end_time, end_value) = points[0], points[-1]
+        if end_time <= start_time:
+            return None
+        return (end_value - start_value) / (end_time - start_time)
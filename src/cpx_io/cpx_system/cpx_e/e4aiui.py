@@ -6,20 +6,34 @@
 import struct
 from cpx_io.cpx_system.cpx_base import CpxBase
 from cpx_io.cpx_system.cpx_module import CpxModule
+from cpx_io.cpx_system.cpx_dataclasses import ModuleSnapshot, ProcessImage
 from cpx_io.utils.boollist import bytes_to_boollist
 from cpx_io.utils.helpers import value_range_check, channel_range_check
 from cpx_io.utils.logging import Logging
 from cpx_io.cpx_system.cpx_e.cpx_e_enums import ChannelRange
+from cpx_io.cpx_system.cpx_e.cpx_e_scaling import (
+    ChannelScaling,
+    ScalingVector,
+    ranges_from_parameters,
+)
 
 
 class CpxE4AiUI(CpxModule):
     """Class for CPX-E-4AI-UI module"""
 
+    # pylint: disable=too-many-public-methods
+    # intended. The scaling functions belong to the channels of the module
+
+    def __init__(self, name=None):
+        super().__init__(name)
+        self._scaling = None
+
     def __getitem__(self, key):
         return self.read_channel(key)
 
     def configure(self, *args):
         super().configure(*args)
+        self._scaling = None
 
         self.base.next_input_register = self.system_entry_registers.inputs + 5
 
@@ -46,6 +60,23 @@ class CpxE4AiUI(CpxModule):
         Logging.logger.info(f"{self.name}: Reading status: {ret}")
         return ret
 
+    @CpxBase.require_base
+    def read_snapshot(self, image: ProcessImage = None) -> ModuleSnapshot:
+        """read channels and status with one request. If a process image of the system is
+        given (see CpxE.read_process_image()), the values are taken from the image.
+
+        :param image: (optional) process image of the system
+        :type image: ProcessImage
+        :return: channel values and status
+        :rtype: ModuleSnapshot
+        """
+        data = self._read_inputs(5, image)
+        snapshot = ModuleSnapshot(
+            list(struct.unpack("<hhhh", data[:8])), bytes_to_boollist(data[8:10])
+        )
+        Logging.logger.info(f"{self.name}: Reading snapshot: {snapshot}")
+        return snapshot
+
     @CpxBase.require_base
     def read_channel(self, channel: int) -> int:
         """read back the value of one channel
@@ -55,6 +86,70 @@ class CpxE4AiUI(CpxModule):
         """
         return self.read_channels()[channel]
 
+    @CpxBase.require_base
+    def read_scaling(self) -> ScalingVector:
+        """read signal range, data format and, for the data format "linear scaled", the
+        limits of all channels to convert the channel values to engineering units (V, mA).
+        The parameters are only read on the first call, changing them with the configure
+        functions of this module reads them again.
+
+        :return: scaling of all channels
+        :rtype: ScalingVector
+        """
+        if self._scaling is None:
+            function_number = 4828 + 64 * self.position
+            channel_ranges = ranges_from_parameters(
+                self.base.read_function_number(function_number + 13),
+                self.base.read_function_number(function_number + 14),
+            )
+            linear = self.base.read_function_number(function_number + 6) & 0x01
+            scalings = []
+            for channel, channel_range in enumerate(channel_ranges):
+                channel_limits = None
+                if linear:
+                    channel_limits = (
+                        self._read_limit(function_number + 17 + channel * 2),
+                        self._read_limit(function_number + 25 + channel * 2),
+                    )
+                scalings.append(
+                    ChannelScaling.from_range(channel_range, channel_limits)
+                )
+            self._scaling = ScalingVector(scalings)
+            Logging.logger.info(
+                f"{self.name}: Reading scaling: {self._scaling.scalings}"
+            )
+        return self._scaling
+
+    @CpxBase.require_base
+    def read_channels_scaled(self) -> list[float]:
+        """read all channels in engineering units (see read_scaling()). Channels without
+        signal range are None.
+
+        :return: Values of all channels
+        :rtype: list[float]
+        """
+        return self.read_scaling().to_units(self.read_channels())
+
+    @CpxBase.require_base
+    def read_channel_scaled(self, channel: int) -> float:
+        """read back the value of one channel in engineering units
+
+        :param channel: Channel number, starting with 0
+        :type channel: int
+        :return: Value of the channel
+        :rtype: float
+        """
+        return self.read_scaling().channel(channel).to_units(self.read_channel(channel))
+
+    def _read_limit(self, function_number: int) -> int:
+        data = bytes(
+            [
+                self.base.read_function_number(function_number),
+                self.base.read_function_number(function_number + 1),
+            ]
+        )
+        return int.from_bytes(data, byteorder="little", signed=True)
+
     @CpxBase.require_base
     def configure_diagnostics(
         self, short_circuit: bool = None, param_error: bool = None
@@ -139,6 +234,7 @@ class CpxE4AiUI(CpxModule):
 
         self.base.write_function_number(function_number, value_to_write)
 
+        self._scaling = None
         Logging.logger.info(f"{self.name}: Setting data format to {value}")
 
     @CpxBase.require_base
@@ -430,6 +526,7 @@ class CpxE4AiUI(CpxModule):
 
         self.base.write_function_number(function_number, value_to_write)
 
+        self._scaling = None
         Logging.logger.info(f"{self.name}: Setting channel {channel} range to {value}")
 
     @CpxBase.require_base
@@ -548,6 +645,7 @@ class CpxE4AiUI(CpxModule):
         else:
             raise ValueError("Value must be given for upper, lower or both")
 
+        self._scaling = None
         Logging.logger.info(
             f"{self.name}: Setting channel {channel} limits to upper {upper}, lower {lower}"
         )
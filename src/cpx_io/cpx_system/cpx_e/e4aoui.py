@@ -6,15 +6,25 @@
 import struct
 from cpx_io.cpx_system.cpx_base import CpxBase
 from cpx_io.cpx_system.cpx_module import CpxModule
+from cpx_io.cpx_system.cpx_dataclasses import ModuleSnapshot, ProcessImage
 from cpx_io.utils.boollist import bytes_to_boollist
 from cpx_io.utils.helpers import value_range_check, channel_range_check
 from cpx_io.utils.logging import Logging
 from cpx_io.cpx_system.cpx_e.cpx_e_enums import ChannelRange
+from cpx_io.cpx_system.cpx_e.cpx_e_scaling import (
+    ChannelScaling,
+    ScalingVector,
+    ranges_from_parameters,
+)
 
 
 class CpxE4AoUI(CpxModule):
     """Class for CPX-E-4AO-UI module"""
 
+    def __init__(self, name=None):
+        super().__init__(name)
+        self._scaling = None
+
     def __getitem__(self, key):
         return self.read_channel(key)
 
@@ -23,6 +33,7 @@ class CpxE4AoUI(CpxModule):
 
     def configure(self, *args):
         super().configure(*args)
+        self._scaling = None
 
         self.base.next_output_register = self.system_entry_registers.outputs + 4
         self.base.next_input_register = self.system_entry_registers.inputs + 5
@@ -50,6 +61,23 @@ class CpxE4AoUI(CpxModule):
         Logging.logger.info(f"{self.name}: Reading status: {ret}")
         return ret
 
+    @CpxBase.require_base
+    def read_snapshot(self, image: ProcessImage = None) -> ModuleSnapshot:
+        """read channels and status with one request. If a process image of the system is
+        given (see CpxE.read_process_image()), the values are taken from the image.
+
+        :param image: (optional) process image of the system
+        :type image: ProcessImage
+        :return: channel values and status
+        :rtype: ModuleSnapshot
+        """
+        data = self._read_inputs(5, image)
+        snapshot = ModuleSnapshot(
+            list(struct.unpack("<hhhh", data[:8])), bytes_to_boollist(data[8:10])
+        )
+        Logging.logger.info(f"{self.name}: Reading snapshot: {snapshot}")
+        return snapshot
+
     @CpxBase.require_base
     def read_channel(self, channel: int) -> bool:
         """read back the value of one channel
@@ -72,7 +100,7 @@ class CpxE4AoUI(CpxModule):
             raise ValueError(f"Data len error: expected: 4, got: {len(values)}")
 
         reg_data = struct.pack("<hhhh", *values)
-        self.base.write_reg_data(reg_data, self.system_entry_registers.outputs)
+        self.base.write_output_image(reg_data, self.system_entry_registers.outputs)
         Logging.logger.info(f"{self.name}: Writing {values} to channels")
 
     @CpxBase.require_base
@@ -87,11 +115,71 @@ class CpxE4AoUI(CpxModule):
         channel_range_check(channel, 4)
 
         reg_data = value.to_bytes(2, byteorder="little", signed=True)
-        self.base.write_reg_data(
+        self.base.write_output_image(
             reg_data, self.system_entry_registers.outputs + channel
         )
         Logging.logger.info(f"{self.name}: Writing {value} to channel {channel}")
 
+    @CpxBase.require_base
+    def read_scaling(self) -> ScalingVector:
+        """read signal range and data format of all channels to convert the channel values
+        to engineering units (V, mA). The parameters are only read on the first call,
+        changing them with the configure functions of this module reads them again.
+
+        :return: scaling of all channels
+        :rtype: ScalingVector
+        """
+        if self._scaling is None:
+            function_number = 4828 + 64 * self.position
+            channel_ranges = ranges_from_parameters(
+                self.base.read_function_number(function_number + 11),
+                self.base.read_function_number(function_number + 12),
+            )
+            if self.base.read_function_number(function_number + 6) & 0x01:
+                raise ValueError(
+                    "Scaling is only available for the data format 'Sign + 15 bit'"
+                )
+            self._scaling = ScalingVector(
+                [ChannelScaling.from_range(r) for r in channel_ranges]
+            )
+            Logging.logger.info(
+                f"{self.name}: Reading scaling: {self._scaling.scalings}"
+            )
+        return self._scaling
+
+    @CpxBase.require_base
+    def read_channels_scaled(self) -> list[float]:
+        """read back all channels in engineering units (see read_scaling())
+
+        :return: Values of all channels
+        :rtype: list[float]
+        """
+        return self.read_scaling().to_units(self.read_channels())
+
+    @CpxBase.require_base
+    def write_channels_scaled(self, values) -> None:
+        """write values in engineering units (see read_scaling()) to the module channels
+        in ascending order. The values are quantized at once and limited to the signal
+        range of the channel.
+
+        :param values: values to write to the channels, list or numpy array
+        :type values: list[float] | numpy.ndarray
+        """
+        raw_values = self.read_scaling().to_raw(values)
+        self.write_channels([int(value) for value in raw_values])
+
+    @CpxBase.require_base
+    def write_channel_scaled(self, channel: int, value: float) -> None:
+        """write value in engineering units to one module channel
+
+        :param channel: Channel number, starting with 0
+        :type channel: int
+        :param value: Value to write to the channel
+        :type value: float
+        """
+        channel_range_check(channel, 4)
+        self.write_channel(channel, self.read_scaling().channel(channel).to_raw(value))
+
     @CpxBase.require_base
     def configure_diagnostics(
         self,
@@ -209,6 +297,7 @@ class CpxE4AoUI(CpxModule):
 
         self.base.write_function_number(function_number, value_to_write)
 
+        self._scaling = None
         Logging.logger.info(f"{self.name}: data format to {value}")
 
     @CpxBase.require_base
@@ -364,4 +453,5 @@ class CpxE4AoUI(CpxModule):
 
         self.base.write_function_number(function_number, value_to_write)
 
+        self._scaling = None
         Logging.logger.info(f"{self.name}: Setting channel {channel} range to {value}")
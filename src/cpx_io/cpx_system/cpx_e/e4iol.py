@@ -3,17 +3,65 @@
 # pylint: disable=duplicate-code
 # intended: modules have similar functions
 
+import time
+from dataclasses import dataclass
 from cpx_io.cpx_system.cpx_base import CpxBase
 from cpx_io.cpx_system.cpx_module import CpxModule
+from cpx_io.cpx_system.cpx_dataclasses import ModuleSnapshot, ProcessImage
 from cpx_io.utils.boollist import bytes_to_boollist
+from cpx_io.utils.codecs import StructCodec
 from cpx_io.utils.helpers import value_range_check
 from cpx_io.utils.logging import Logging
 from cpx_io.cpx_system.cpx_e.cpx_e_enums import OperatingMode, AddressSpace
 
+# poll interval of wait_for() while the port data does not change, it starts with the
+# minimum and is doubled on every poll up to the maximum
+WAIT_FOR_MIN_POLL_INTERVAL = 0.001
+WAIT_FOR_MAX_POLL_INTERVAL = 0.05
+
+# module parameters of the ports: 4 configuration parameters per port starting with
+# offset 8 (cycle time low, cycle time high, pl supply, operating mode) and 3 status
+# parameters per port starting with offset 24 (line state, device error low, high)
+PORT_CONFIGURATION_OFFSET = 8
+PORT_STATUS_OFFSET = 24
+
+LINE_STATES = [
+    "INACTIVE",
+    "DI",
+    "_",
+    "CHECKFAULT",
+    "PREOPERATE",
+    "OPERATE",
+    "SCANNING",
+    "DEVICELOST",
+]
+
 
 class CpxE4Iol(CpxModule):
     """Class for CPX-E-4IOL io-link master module"""
 
+    # pylint: disable=too-many-public-methods
+    # intended. The port codecs and the one pass port functions belong to the module
+
+    # line state and device error of the ports (parameter offsets 24 to 35) change
+    # during operation and are only cached for a short time by the base
+    status_parameters = tuple(range(24, 36))
+
+    @dataclass
+    class PortConfiguration:
+        """Configuration of one IO-Link port"""
+
+        cycle_time: tuple[int, int]
+        pl_supply: bool
+        operating_mode: int
+
+    @dataclass
+    class PortState:
+        """Line state and device error of one IO-Link port"""
+
+        line_state: str
+        device_error: tuple[str, str]
+
     def __init__(self, address_space: int | AddressSpace = 2, **kwargs):
         """The address space (inputs/outputs) provided by the module is set using DIL
         switches (see Datasheet CPX-E-4IOL-...)
@@ -36,6 +84,7 @@ class CpxE4Iol(CpxModule):
 
         self.module_input_size = address_space // 2
         self.module_output_size = address_space // 2
+        self._codecs = [None] * 4
 
     def __getitem__(self, key):
         return self.read_channel(key)
@@ -68,6 +117,26 @@ class CpxE4Iol(CpxModule):
         Logging.logger.info(f"{self.name}: Reading status: {ret}")
         return ret
 
+    @CpxBase.require_base
+    def read_snapshot(self, image: ProcessImage = None) -> ModuleSnapshot:
+        """read channels and status with one request. If a process image of the system is
+        given (see CpxE.read_process_image()), the values are taken from the image.
+
+        :param image: (optional) process image of the system
+        :type image: ProcessImage
+        :return: channel values and status
+        :rtype: ModuleSnapshot
+        """
+        # status register follows the inputs of the first channels, see read_status()
+        data = self._read_inputs(max(self.module_input_size * 4, 5), image)
+        channel_size = self.module_input_size * 2
+        snapshot = ModuleSnapshot(
+            [data[channel_size * i : channel_size * (i + 1)] for i in range(4)],
+            bytes_to_boollist(data[8:10]),
+        )
+        Logging.logger.info(f"{self.name}: Reading snapshot: {snapshot}")
+        return snapshot
+
     @CpxBase.require_base
     def read_channels(self) -> list[bytes]:
         """read all channels as a list of bytes values
@@ -103,6 +172,90 @@ class CpxE4Iol(CpxModule):
         """
         return self.read_channels()[channel]
 
+    def register_codec(self, channel: int, codec: StructCodec | None) -> None:
+        """Registers the codec that read_ports() uses to decode the input data of one
+        port, e.g. StructCodec(">HHH", ["status", "error", "position"]) for three 16 bit
+        values. None removes the codec.
+
+        :param channel: Channel number, starting with 0
+        :type channel: int
+        :param codec: codec with a decode(buffer, offset) function
+        :type codec: StructCodec | None
+        """
+        if not 0 <= channel < 4:
+            raise ValueError(f"Channel {channel} must be between 0 and 3")
+        channel_size = self.module_input_size * 2
+        if codec is not None and codec.size > channel_size:
+            raise ValueError(
+                f"Codec with {codec.size} bytes does not fit in {channel_size} bytes "
+                "of input data per port"
+            )
+        self._codecs[channel] = codec
+        Logging.logger.info(
+            f"{self.name}: Registered codec {codec} on channel {channel}"
+        )
+
+    @CpxBase.require_base
+    def read_ports(self, image: ProcessImage = None) -> list:
+        """read the input data of all ports with one request and decode each port with
+        its codec (see register_codec()). Ports without codec are returned as bytes like
+        in read_channels(). If a process image of the system is given (see
+        CpxE.read_process_image()), the values are taken from the image.
+
+        :param image: (optional) process image of the system
+        :type image: ProcessImage
+        :return: decoded input data of every port
+        :rtype: list
+        """
+        length = self.module_input_size * 4
+        if image is None:
+            data = self.base.read_reg_data(self.system_entry_registers.inputs, length)
+        else:
+            data = image.read(self.system_entry_registers.inputs, length)
+        channel_size = self.module_input_size * 2
+        ports = [
+            (
+                codec.decode(data, channel_size * i)
+                if codec
+                else bytes(data[channel_size * i : channel_size * (i + 1)])
+            )
+            for i, codec in enumerate(self._codecs)
+        ]
+        Logging.logger.info(f"{self.name}: Reading ports: {ports}")
+        return ports
+
+    @CpxBase.require_base
+    def wait_for(self, channel: int, predicate, timeout: float = 1.0):
+        """Polls the input data of one port until predicate returns True. The poll
+        interval starts short and grows while the data does not change.
+
+        :param channel: Channel number, starting with 0
+        :type channel: int
+        :param predicate: function that takes the decoded port data (see read_ports())
+        :type predicate: callable
+        :param timeout: (optional) maximum waiting time in s, defaults to 1.0
+        :type timeout: float
+        :return: decoded port data that fulfilled the predicate
+        """
+        deadline = time.monotonic() + timeout
+        interval = WAIT_FOR_MIN_POLL_INTERVAL
+        last = None
+        while True:
+            value = self.read_ports()[channel]
+            if predicate(value):
+                return value
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"{self.name}: Channel {channel} did not reach the condition "
+                    f"within {timeout} s, last value {value}"
+                )
+            if value != last:
+                interval = WAIT_FOR_MIN_POLL_INTERVAL
+                last = value
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, WAIT_FOR_MAX_POLL_INTERVAL)
+
     @CpxBase.require_base
     def write_channel(self, channel: int, data: list[int]) -> None:
         """set one channel to list of uint16 values
@@ -366,32 +519,11 @@ class CpxE4Iol(CpxModule):
         if isinstance(channel, list) and any(c not in range(4) for c in channel):
             raise ValueError("All channel numbers must be between 0 and 3")
 
-        function_number = [
-            4828 + 64 * self.position + 24,
-            4828 + 64 * self.position + 27,
-            4828 + 64 * self.position + 30,
-            4828 + 64 * self.position + 33,
-        ]
-        states = [
-            "INACTIVE",
-            "DI",
-            "_",
-            "CHECKFAULT",
-            "PREOPERATE",
-            "OPERATE",
-            "SCANNING",
-            "DEVICELOST",
-        ]
-
-        line_state = []
-        for item in range(4):
-            reg = self.base.read_function_number(function_number[item]) & 0x07
-            try:
-                line_state.append(states[reg])
-            except IndexError as exc:
-                raise ValueError(
-                    f"Read unknown linestate {reg} for channel {item}"
-                ) from exc
+        function_number = 4828 + 64 * self.position + PORT_STATUS_OFFSET
+        line_state = {}
+        for item in [channel] if isinstance(channel, int) else channel:
+            reg = self.base.read_function_number(function_number + 3 * item) & 0x07
+            line_state[item] = self._line_state(reg, item)
 
         if isinstance(channel, int) and channel in range(4):
             return line_state[channel]
@@ -423,17 +555,11 @@ class CpxE4Iol(CpxModule):
         if isinstance(channel, list) and any(c not in range(4) for c in channel):
             raise ValueError("All channel numbers must be between 0 and 3")
 
-        function_number = [
-            4828 + 64 * self.position + 25,
-            4828 + 64 * self.position + 28,
-            4828 + 64 * self.position + 31,
-            4828 + 64 * self.position + 34,
-        ]
-
-        device_error = [0, 0, 0, 0]
-        for item in range(4):
-            low = self.base.read_function_number(function_number[item]) & 0x0F
-            high = self.base.read_function_number(function_number[item] + 1) & 0x0F
+        function_number = 4828 + 64 * self.position + PORT_STATUS_OFFSET + 1
+        device_error = {}
+        for item in [channel] if isinstance(channel, int) else channel:
+            low = self.base.read_function_number(function_number + 3 * item) & 0x0F
+            high = self.base.read_function_number(function_number + 3 * item + 1) & 0x0F
             device_error[item] = (hex(low), hex(high))
 
         if isinstance(channel, int) and channel in range(4):
@@ -444,3 +570,152 @@ class CpxE4Iol(CpxModule):
             f"{self.name}: Reading channel(s) {channel} device error: {ret}"
         )
         return ret
+
+    @CpxBase.require_base
+    def read_port_states(self, channel: int | list = None) -> list[PortState]:
+        """Line state and device error of the ports, read in one pass over the status
+        parameters of the requested ports. See read_line_state() and read_device_error().
+
+        :param channel: Channel number, starting with 0 or list of channels e.g. [0, 2], optional
+        :type channel: int | list[int]
+        :return: state of every requested port
+        :rtype: list[PortState]
+        """
+        channels = self._channel_list(channel)
+        function_number = 4828 + 64 * self.position + PORT_STATUS_OFFSET
+        states = []
+        for item in channels:
+            data = [
+                self.base.read_function_number(function_number + 3 * item + i)
+                for i in range(3)
+            ]
+            states.append(
+                self.PortState(
+                    line_state=self._line_state(data[0] & 0x07, item),
+                    device_error=(hex(data[1] & 0x0F), hex(data[2] & 0x0F)),
+                )
+            )
+        Logging.logger.info(
+            f"{self.name}: Reading channel(s) {channels} port state: {states}"
+        )
+        return states
+
+    @CpxBase.require_base
+    def read_port_configuration(
+        self, channel: int | list = None
+    ) -> list[PortConfiguration]:
+        """Cycle time, pl supply and operating mode of the ports, read in one pass over
+        the configuration parameters of the requested ports.
+
+        :param channel: Channel number, starting with 0 or list of channels e.g. [0, 2], optional
+        :type channel: int | list[int]
+        :return: configuration of every requested port
+        :rtype: list[PortConfiguration]
+        """
+        channels = self._channel_list(channel)
+        function_number = 4828 + 64 * self.position + PORT_CONFIGURATION_OFFSET
+        configuration = []
+        for item in channels:
+            data = [
+                self.base.read_function_number(function_number + 4 * item + i)
+                for i in range(4)
+            ]
+            configuration.append(
+                self.PortConfiguration(
+                    cycle_time=(data[0], data[1]),
+                    pl_supply=bool(data[2] & 0x01),
+                    operating_mode=data[3] & 0x03,
+                )
+            )
+        Logging.logger.info(
+            f"{self.name}: Reading channel(s) {channels} port configuration: {configuration}"
+        )
+        return configuration
+
+    @CpxBase.require_base
+    def configure_ports(
+        self,
+        operating_mode: OperatingMode | int | list = None,
+        pl_supply: bool | list = None,
+        cycle_time: tuple[int] | list = None,
+        channel: int | list = None,
+    ) -> None:
+        """Configures operating mode, pl supply and cycle time of several ports at once
+        (see configure_operating_mode(), configure_pl_supply(), configure_cycle_time()).
+        Every parameter is read at most once and only changed parameters are written,
+        in the order cycle time, pl supply, operating mode per port. A value is applied
+        to all requested ports, a list gives one value per requested port. Values that
+        are None are not changed.
+
+        :param operating_mode: (optional) operating mode
+        :type operating_mode: OperatingMode | int | list
+        :param pl_supply: (optional) pl supply
+        :type pl_supply: bool | list[bool]
+        :param cycle_time: (optional) cycle time as tuple (low, high)
+        :type cycle_time: tuple[int] | list[tuple[int]]
+        :param channel: Channel number, starting with 0 or list of channels e.g. [0, 2], optional
+        :type channel: int | list[int]
+        """
+        channels = self._channel_list(channel)
+        operating_mode = self._per_port(operating_mode, channels)
+        pl_supply = self._per_port(pl_supply, channels)
+        cycle_time = self._per_port(cycle_time, channels)
+        for mode in operating_mode:
+            if mode is not None:
+                value_range_check(
+                    mode.value if isinstance(mode, OperatingMode) else mode, 4
+                )
+
+        function_number = 4828 + 64 * self.position + PORT_CONFIGURATION_OFFSET
+        with self.base.configuration():
+            for i, item in enumerate(channels):
+                port = function_number + 4 * item
+                if cycle_time[i] is not None:
+                    self.base.write_function_number(port, cycle_time[i][0])
+                    self.base.write_function_number(port + 1, cycle_time[i][1])
+                if pl_supply[i] is not None:
+                    reg = self.base.read_function_number(port + 2)
+                    self.base.write_function_number(
+                        port + 2, (reg & 0xFE) | int(bool(pl_supply[i]))
+                    )
+                if operating_mode[i] is not None:
+                    mode = operating_mode[i]
+                    if isinstance(mode, OperatingMode):
+                        mode = mode.value
+                    reg = self.base.read_function_number(port + 3)
+                    self.base.write_function_number(port + 3, (reg & 0xFC) | mode)
+
+        Logging.logger.info(
+            f"{self.name}: setting channel(s) {channels} operating mode to "
+            f"{operating_mode}, pl supply to {pl_supply}, cycle time to {cycle_time}"
+        )
+
+    @staticmethod
+    def _channel_list(channel: int | list | None) -> list[int]:
+        if channel is None:
+            return [0, 1, 2, 3]
+        if isinstance(channel, int):
+            channel = [channel]
+        if any(c not in range(4) for c in channel):
+            raise ValueError("All channel numbers must be between 0 and 3")
+        return list(channel)
+
+    @staticmethod
+    def _per_port(value, channels: list[int]) -> list:
+        if not isinstance(value, list):
+            return [value] * len(channels)
+        if len(value) != len(channels):
+            raise ValueError(
+                f"Expected one value for each of the {len(channels)} channels, "
+                f"got {len(value)}"
+            )
+        return value
+
+    @staticmethod
+    def _line_state(reg: int, channel: int) -> str:
+        try:
+            return LINE_STATES[reg]
+        except IndexError as exc:
+            raise ValueError(
+                f"Read unknown linestate {reg} for channel {channel}"
+            ) from exc
@@ -5,6 +5,7 @@
 
 from cpx_io.cpx_system.cpx_base import CpxBase
 from cpx_io.cpx_system.cpx_module import CpxModule
+from cpx_io.cpx_system.cpx_dataclasses import ModuleSnapshot, ProcessImage
 from cpx_io.utils.boollist import bytes_to_boollist, boollist_to_bytes
 from cpx_io.utils.logging import Logging
 
@@ -57,7 +58,7 @@ class CpxE8Do(CpxModule):
         if len(data) != 8:
             raise ValueError(f"Data len error: expected: 8, got: {len(data)}")
         integer_data = boollist_to_bytes(data)
-        self.base.write_reg_data(integer_data, self.system_entry_registers.outputs)
+        self.base.write_output_image(integer_data, self.system_entry_registers.outputs)
 
         Logging.logger.info(f"{self.name}: Setting channels to {data}")
 
@@ -70,10 +71,10 @@ class CpxE8Do(CpxModule):
         :value: Value that should be written to the channel
         :type value: bool
         """
-        data = self.read_channels()
+        data = self._read_outputs()
         data[channel] = value
         reg = boollist_to_bytes(data)
-        self.base.write_reg_data(reg, self.system_entry_registers.outputs)
+        self.base.write_output_image(reg, self.system_entry_registers.outputs)
 
         Logging.logger.info(f"{self.name}: Setting channel {channel} to {value}")
 
@@ -88,6 +89,23 @@ class CpxE8Do(CpxModule):
         Logging.logger.info(f"{self.name}: Reading status: {ret}")
         return ret
 
+    @CpxBase.require_base
+    def read_snapshot(self, image: ProcessImage = None) -> ModuleSnapshot:
+        """read channels and status with one request. If a process image of the system is
+        given (see CpxE.read_process_image()), the values are taken from the image.
+
+        :param image: (optional) process image of the system
+        :type image: ProcessImage
+        :return: channel values and status
+        :rtype: ModuleSnapshot
+        """
+        data = self._read_inputs(2, image)
+        snapshot = ModuleSnapshot(
+            bytes_to_boollist(data[:2], num_bytes=1), bytes_to_boollist(data[2:4])
+        )
+        Logging.logger.info(f"{self.name}: Reading snapshot: {snapshot}")
+        return snapshot
+
     @CpxBase.require_base
     def set_channel(self, channel: int) -> None:
         """set one channel to logic high level
@@ -110,10 +128,15 @@ class CpxE8Do(CpxModule):
 
         :param channel: Channel number, starting with 0
         :type channel: int"""
-        # get the relevant value from the register and write the inverse
-        value = self.read_channel(channel)
+        # get the relevant value from the output image and write the inverse
+        value = self._read_outputs()[channel]
         self.write_channel(channel, not value)
 
+    def _read_outputs(self) -> list[bool]:
+        """Returns the outputs from the output image of the base"""
+        data = self.base.read_output_image(self.system_entry_registers.outputs)
+        return bytes_to_boollist(data, num_bytes=1)
+
     @CpxBase.require_base
     def configure_diagnostics(
         self, short_circuit: bool = None, undervoltage: bool = None
@@ -1,8 +1,9 @@
 """CpxModule"""
 
+from contextlib import contextmanager
 from cpx_io.utils.logging import Logging
 from cpx_io.cpx_system.cpx_base import CpxBase
-from cpx_io.cpx_system.cpx_dataclasses import SystemEntryRegisters
+from cpx_io.cpx_system.cpx_dataclasses import ProcessImage, SystemEntryRegisters
 
 
 class CpxModule:
@@ -42,6 +43,23 @@ class CpxModule:
         if self.base:
             self.base.update_module_names()
 
+    @contextmanager
+    @CpxBase.require_base
+    def configuration(self):
+        """Context manager that collects the configuration changes of this module,
+        e.g. several configure_* calls, and writes them when the context is left
+        (see configuration() of the base).
+        """
+        with self.base.configuration():
+            yield self
+
+    def _read_inputs(self, length: int, image: ProcessImage = None) -> bytes:
+        """Returns the first length input registers of the module from the process
+        image or, if no image is given, with one request"""
+        if image is None:
+            return self.base.read_reg_data(self.system_entry_registers.inputs, length)
+        return image.read(self.system_entry_registers.inputs, length)
+
     def configure(self, base: CpxBase, position: int) -> None:
         """Setup a module with the according base and position in the system
 
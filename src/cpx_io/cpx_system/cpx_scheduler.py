@@ -0,0 +1,246 @@
+"""Priority scheduler for the requests on one Modbus connection"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from enum import IntEnum
+
+from cpx_io.utils.logging import Logging
+from cpx_io.utils.statistics import LatencyStatistics
+
+
+class Priority(IntEnum):
+    """Priority classes of device requests, lower values are served first"""
+
+    OUTPUT = 0
+    CYCLIC_INPUT = 1
+    DIAGNOSIS = 2
+    PARAMETER = 3
+    DOCS = 4
+
+
+class RequestScheduler:
+    """Grants access to one connection in priority order.
+
+    Requests wait until the connection is free and no request of a higher priority is
+    waiting. Within one priority class requests are served in order of arrival. A
+    request budget per cycle can be set for every priority class to limit how much of
+    the connection low priority traffic can use. The lock is reentrant, so a thread can
+    use it again inside a request (e.g. in a multi-register transaction).
+
+    Jobs submitted with submit() are executed one after another by a worker thread,
+    the job with the highest priority first.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, cycle_time: float = 0.01):
+        """Constructor of the RequestScheduler class.
+
+        :param cycle_time: (optional) length of one budget cycle in s, defaults to 0.01
+        :type cycle_time: float
+        """
+        self.cycle_time = cycle_time
+        self._condition = threading.Condition()
+        self._owner = None
+        self._depth = 0
+        self._waiting = {priority: deque() for priority in Priority}
+        self._budgets = {}
+        self._cycle_start = time.monotonic()
+        self._cycle_used = {priority: 0 for priority in Priority}
+        self.wait_statistics = {priority: LatencyStatistics() for priority in Priority}
+
+        self._jobs = []
+        self._job_counter = itertools.count()
+        self._job_condition = threading.Condition()
+        self._worker = None
+        self._stopped = False
+
+    def __repr__(self):
+        return f"{type(self).__name__}(queue_depth={self.queue_depth()})"
+
+    def set_budget(self, priority: Priority, requests_per_cycle: int = None) -> None:
+        """Limits the number of requests of one priority class per cycle.
+
+        :param priority: priority class
+        :type priority: Priority
+        :param requests_per_cycle: maximum number of requests per cycle, None removes
+            the limit
+        :type requests_per_cycle: int
+        """
+        with self._condition:
+            if requests_per_cycle is None:
+                self._budgets.pop(priority, None)
+            elif requests_per_cycle < 1:
+                raise ValueError("Budget must be at least one request per cycle")
+            else:
+                self._budgets[priority] = requests_per_cycle
+            self._condition.notify_all()
+
+    @contextmanager
+    def request(self, priority: Priority):
+        """Context manager that holds the connection for one request.
+
+        :param priority: priority class of the request
+        :type priority: Priority
+        """
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self, priority: Priority) -> None:
+        """Waits until the connection is granted to the calling thread.
+
+        :param priority: priority class of the request
+        :type priority: Priority
+        """
+        thread_id = threading.get_ident()
+        with self._condition:
+            if self._owner == thread_id:
+                self._depth += 1
+                return
+
+            ticket = object()
+            queue = self._waiting[priority]
+            queue.append(ticket)
+            start = time.perf_counter()
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._start_cycle(now)
+                    if self._owner is None and queue[0] is ticket:
+                        if not self._higher_priority_ready(priority):
+                            if self._budget_left(priority):
+                                break
+                            # budget exhausted, wait for the next cycle
+                            self._condition.wait(
+                                self._cycle_start + self.cycle_time - now
+                            )
+                            continue
+                    self._condition.wait()
+            finally:
+                queue.remove(ticket)
+
+            self._owner = thread_id
+            self._depth = 1
+            self._cycle_used[priority] += 1
+            self.wait_statistics[priority].record(time.perf_counter() - start)
+
+    def release(self) -> None:
+        """Releases the connection held by the calling thread"""
+        with self._condition:
+            if self._owner != threading.get_ident():
+                raise RuntimeError("Cannot release a request of another thread")
+            self._depth -= 1
+            if self._depth == 0:
+                self._owner = None
+                self._condition.notify_all()
+
+    def queue_depth(self, priority: Priority = None) -> int:
+        """Returns the number of waiting requests and queued jobs.
+
+        :param priority: (optional) only count this priority class
+        :type priority: Priority
+        :return: number of waiting requests and jobs
+        :rtype: int
+        """
+        with self._condition, self._job_condition:
+            if priority is None:
+                return sum(len(queue) for queue in self._waiting.values()) + len(
+                    self._jobs
+                )
+            return len(self._waiting[priority]) + sum(
+                1 for job in self._jobs if job[0] == priority
+            )
+
+    def statistics(self) -> dict:
+        """Returns queue depth and wait time statistics for every priority class
+
+        :return: dict with the priority name as key
+        :rtype: dict
+        """
+        return {
+            priority.name: {
+                "queue_depth": self.queue_depth(priority),
+                "wait_time": self.wait_statistics[priority].as_dict(),
+            }
+            for priority in Priority
+        }
+
+    def submit(self, function, priority: Priority = Priority.PARAMETER) -> Future:
+        """Queues a job that is executed by the worker thread of the scheduler.
+
+        :param function: callable without arguments
+        :type function: callable
+        :param priority: (optional) priority class of the job, defaults to PARAMETER
+        :type priority: Priority
+        :return: future that holds the result of the job
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        with self._job_condition:
+            if self._stopped:
+                raise RuntimeError("Scheduler was shut down")
+            heapq.heappush(
+                self._jobs, (priority, next(self._job_counter), function, future)
+            )
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run_jobs, name="cpx-io-scheduler", daemon=True
+                )
+                self._worker.start()
+            self._job_condition.notify()
+        return future
+
+    def shutdown(self) -> None:
+        """Stops the worker thread. Jobs that are still queued are cancelled."""
+        with self._job_condition:
+            self._stopped = True
+            for _, _, _, future in self._jobs:
+                future.cancel()
+            self._jobs.clear()
+            self._job_condition.notify_all()
+            worker = self._worker
+        if worker and worker is not threading.current_thread():
+            worker.join()
+
+    def _run_jobs(self) -> None:
+        while True:
+            with self._job_condition:
+                while not self._jobs and not self._stopped:
+                    self._job_condition.wait()
+                if self._stopped:
+                    return
+                _, _, function, future = heapq.heappop(self._jobs)
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = function()
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                Logging.logger.debug(f"Scheduled job failed ({error!r})")
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _start_cycle(self, now: float) -> None:
+        if now - self._cycle_start >= self.cycle_time:
+            self._cycle_start = now
+            for priority in self._cycle_used:
+                self._cycle_used[priority] = 0
+
+    def _budget_left(self, priority: Priority) -> bool:
+        budget = self._budgets.get(priority)
+        return budget is None or self._cycle_used[priority] < budget
+
+    def _higher_priority_ready(self, priority: Priority) -> bool:
+        return any(
+            self._waiting[higher] and self._budget_left(higher)
+            for higher in Priority
+            if higher < priority
+        )
@@ -0,0 +1,393 @@
+"""Lean Modbus TCP transport for cyclic register access"""
+
+import socket
+import struct
+
+from cpx_io.cpx_system.cpx_dataclasses import ReadRequest, WriteRequest
+
+from cpx_io.utils.logging import Logging
+
+# Modbus function codes handled by the transport
+READ_HOLDING_REGISTERS = 0x03
+WRITE_MULTIPLE_REGISTERS = 0x10
+READ_WRITE_MULTIPLE_REGISTERS = 0x17
+
+# Protocol limits (see Modbus application protocol specification)
+MAX_READ_REGISTERS = 125
+MAX_WRITE_REGISTERS = 123
+MAX_READ_WRITE_REGISTERS = 121
+
+# Upper bound of requests in flight on one connection
+MAX_PIPELINE_WINDOW = 8
+
+MBAP_HEADER = struct.Struct(">HHHB")
+MBAP_HEADER_SIZE = MBAP_HEADER.size
+
+EXCEPTION_CODES = {
+    1: "Illegal function",
+    2: "Illegal data address",
+    3: "Illegal data value",
+    4: "Slave device failure",
+    5: "Acknowledge",
+    6: "Slave device busy",
+    10: "Gateway path unavailable",
+    11: "Gateway target device failed to respond",
+}
+
+
+def swap_register_bytes(buffer: bytearray, start: int, stop: int) -> None:
+    """Swaps the two bytes of every 16 bit register in buffer[start:stop] in place.
+    Modbus transmits registers big endian while the library represents them little endian.
+    """
+    buffer[start:stop:2], buffer[start + 1 : stop : 2] = (
+        buffer[start + 1 : stop : 2],
+        buffer[start:stop:2],
+    )
+
+
+class ModbusTcpTransport:
+    """Minimal Modbus TCP client for the cyclic hot path.
+
+    Only holding register access (FC3, FC16, FC23) is supported. Request frames are
+    preallocated and only patched per request, responses are received into one reusable
+    buffer. Read functions return a memoryview of that buffer, which is only valid until
+    the next request is issued on this transport. Independent requests can be pipelined
+    with execute_pipelined(), responses are then matched by their transaction id.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self, host: str, port: int = 502, unit_id: int = 1, timeout: float = 3.0
+    ):
+        """Constructor of the ModbusTcpTransport class.
+
+        :param host: IP address or hostname of the Modbus server
+        :type host: str
+        :param port: (optional) TCP port, defaults to 502
+        :type port: int
+        :param unit_id: (optional) Modbus unit identifier, defaults to 1
+        :type unit_id: int
+        :param timeout: (optional) socket timeout in s, defaults to 3.0
+        :type timeout: float
+        """
+        self.host = host
+        self.port = port
+        self.unit_id = unit_id
+        self.timeout = timeout
+
+        self._socket = None
+        self._transaction_id = 0
+
+        self._read_frame = bytearray(MBAP_HEADER_SIZE + 5)
+        MBAP_HEADER.pack_into(self._read_frame, 0, 0, 0, 6, unit_id)
+        self._read_frame[MBAP_HEADER_SIZE] = READ_HOLDING_REGISTERS
+
+        self._write_frame = bytearray(MBAP_HEADER_SIZE + 6 + 2 * MAX_WRITE_REGISTERS)
+        MBAP_HEADER.pack_into(self._write_frame, 0, 0, 0, 0, unit_id)
+        self._write_frame[MBAP_HEADER_SIZE] = WRITE_MULTIPLE_REGISTERS
+
+        self._read_write_frame = bytearray(
+            MBAP_HEADER_SIZE + 10 + 2 * MAX_READ_WRITE_REGISTERS
+        )
+        MBAP_HEADER.pack_into(self._read_write_frame, 0, 0, 0, 0, unit_id)
+        self._read_write_frame[MBAP_HEADER_SIZE] = READ_WRITE_MULTIPLE_REGISTERS
+
+        # header + function code + byte count + maximum register payload
+        self._rx_buffer = bytearray(MBAP_HEADER_SIZE + 2 + 2 * MAX_READ_REGISTERS)
+        self._rx_view = memoryview(self._rx_buffer)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.host}:{self.port})"
+
+    @property
+    def connected(self) -> bool:
+        """Returns True if the socket is open"""
+        return self._socket is not None
+
+    def connect(self) -> bool:
+        """Opens the TCP connection if it is not already open.
+
+        :return: True if connected
+        :rtype: bool
+        """
+        if self._socket:
+            return True
+        try:
+            sock = socket.create_connection((self.host, self.port), self.timeout)
+        except OSError as exc:
+            Logging.logger.error(f"{self}: connection failed ({exc})")
+            return False
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket = sock
+        return True
+
+    def close(self) -> None:
+        """Closes the TCP connection"""
+        if self._socket:
+            self._socket.close()
+            self._socket = None
+
+    def read_holding_registers(self, register: int, length: int = 1) -> memoryview:
+        """Reads holding registers (FC3).
+
+        :param register: address of the first register to read
+        :type register: int
+        :param length: number of registers to read (default: 1)
+        :type length: int
+        :return: Register content, little endian per register. Valid until the next request
+        :rtype: memoryview
+        """
+        transaction_id, frame = self._prepare_read(register, length)
+        self._send(frame)
+        return self._receive_registers(transaction_id, READ_HOLDING_REGISTERS, length)
+
+    def write_registers(self, data: bytes, register: int) -> None:
+        """Writes holding registers (FC16).
+
+        :param data: data to write, little endian per register, even number of bytes
+        :type data: bytes
+        :param register: address of the first register to write
+        :type register: int
+        """
+        transaction_id, frame = self._prepare_write(data, register)
+        self._send(frame)
+        self._receive(transaction_id, WRITE_MULTIPLE_REGISTERS)
+
+    def read_write_registers(
+        self, data: bytes, write_register: int, read_register: int, read_length: int
+    ) -> memoryview:
+        """Writes and reads holding registers in one transaction (FC23).
+        The device performs the write before the read.
+
+        :param data: data to write, little endian per register, even number of bytes
+        :type data: bytes
+        :param write_register: address of the first register to write
+        :type write_register: int
+        :param read_register: address of the first register to read
+        :type read_register: int
+        :param read_length: number of registers to read
+        :type read_length: int
+        :return: Register content, little endian per register. Valid until the next request
+        :rtype: memoryview
+        """
+        byte_count = len(data)
+        if byte_count % 2 or not 0 < byte_count <= 2 * MAX_READ_WRITE_REGISTERS:
+            raise ValueError(f"Invalid data length {byte_count} for register write")
+        _check_read_length(read_length)
+
+        frame = self._read_write_frame
+        transaction_id = self._next_transaction_id()
+        struct.pack_into(">HHH", frame, 0, transaction_id, 0, 11 + byte_count)
+        struct.pack_into(
+            ">HHHHB",
+            frame,
+            MBAP_HEADER_SIZE + 1,
+            read_register,
+            read_length,
+            write_register,
+            byte_count // 2,
+            byte_count,
+        )
+        start = MBAP_HEADER_SIZE + 10
+        frame[start : start + byte_count] = data
+        swap_register_bytes(frame, start, start + byte_count)
+        self._send(memoryview(frame)[: start + byte_count])
+        return self._receive_registers(
+            transaction_id, READ_WRITE_MULTIPLE_REGISTERS, read_length
+        )
+
+    def execute_pipelined(self, requests: list, window: int) -> list:
+        """Executes independent requests with up to window requests in flight.
+        Responses are matched by transaction id, so the device may answer out of order.
+
+        :param requests: ReadRequest and WriteRequest instances
+        :type requests: list
+        :param window: maximum number of requests in flight
+        :type window: int
+        :return: bytes for every ReadRequest, None for every WriteRequest, in request order
+        :rtype: list
+        """
+        results = [None] * len(requests)
+        pending = {}
+        next_index = 0
+        while next_index < len(requests) or pending:
+            while next_index < len(requests) and len(pending) < window:
+                request = requests[next_index]
+                if isinstance(request, ReadRequest):
+                    transaction_id, frame = self._prepare_read(
+                        request.register, request.length
+                    )
+                elif isinstance(request, WriteRequest):
+                    transaction_id, frame = self._prepare_write(
+                        request.data, request.register
+                    )
+                else:
+                    raise TypeError(f"Unsupported request {request}")
+                # the frame is copied into the socket buffer, so it can be reused
+                self._send(frame)
+                pending[transaction_id] = next_index
+                next_index += 1
+
+            received_id = self._receive_frame()
+            index = pending.pop(received_id, None)
+            if index is None:
+                Logging.logger.debug(
+                    f"{self}: discarded response of transaction {received_id}"
+                )
+                continue
+            request = requests[index]
+            if isinstance(request, ReadRequest):
+                self._check_function_code(READ_HOLDING_REGISTERS)
+                results[index] = bytes(self._registers_view(request.length))
+            else:
+                self._check_function_code(WRITE_MULTIPLE_REGISTERS)
+        return results
+
+    def probe_pipeline_depth(
+        self, register: int, max_depth: int = MAX_PIPELINE_WINDOW
+    ) -> int:
+        """Determines how many requests the device answers when they are sent back to
+        back. Devices that do not queue requests drop them or close the connection.
+
+        :param register: address of a register that can be read on the device
+        :type register: int
+        :param max_depth: (optional) number of requests to probe with
+        :type max_depth: int
+        :return: supported pipeline depth, at least 1
+        :rtype: int
+        """
+        if max_depth <= 1 or not self.connect():
+            return 1
+
+        pending = set()
+        answered = 0
+        self._socket.settimeout(min(self.timeout, 0.5))
+        try:
+            for _ in range(max_depth):
+                transaction_id, frame = self._prepare_read(register, 1)
+                self._send(frame)
+                pending.add(transaction_id)
+            while pending:
+                received_id = self._receive_frame()
+                if received_id in pending:
+                    pending.remove(received_id)
+                    answered += 1
+        except OSError:
+            # drop the connection, unanswered requests must not show up later
+            self.close()
+            self.connect()
+        finally:
+            if self._socket:
+                self._socket.settimeout(self.timeout)
+
+        Logging.logger.debug(f"{self}: {answered} of {max_depth} pipelined requests")
+        return max(answered, 1)
+
+    def _prepare_read(self, register: int, length: int) -> tuple:
+        _check_read_length(length)
+        frame = self._read_frame
+        transaction_id = self._next_transaction_id()
+        struct.pack_into(">H", frame, 0, transaction_id)
+        struct.pack_into(">HH", frame, MBAP_HEADER_SIZE + 1, register, length)
+        return transaction_id, frame
+
+    def _prepare_write(self, data: bytes, register: int) -> tuple:
+        byte_count = len(data)
+        if byte_count % 2 or not 0 < byte_count <= 2 * MAX_WRITE_REGISTERS:
+            raise ValueError(f"Invalid data length {byte_count} for register write")
+
+        frame = self._write_frame
+        transaction_id = self._next_transaction_id()
+        struct.pack_into(">HHH", frame, 0, transaction_id, 0, 7 + byte_count)
+        struct.pack_into(
+            ">HHB", frame, MBAP_HEADER_SIZE + 1, register, byte_count // 2, byte_count
+        )
+        start = MBAP_HEADER_SIZE + 6
+        frame[start : start + byte_count] = data
+        swap_register_bytes(frame, start, start + byte_count)
+        return transaction_id, memoryview(frame)[: start + byte_count]
+
+    def _next_transaction_id(self) -> int:
+        self._transaction_id = (self._transaction_id + 1) & 0xFFFF
+        return self._transaction_id
+
+    def _send(self, frame) -> None:
+        if not self.connect():
+            raise ConnectionRefusedError(f"{self}: not connected")
+        try:
+            self._socket.sendall(frame)
+        except OSError:
+            self.close()
+            raise
+
+    def _receive_exactly(self, start: int, count: int) -> None:
+        view = self._rx_view
+        end = start + count
+        while start < end:
+            received = self._socket.recv_into(view[start:end])
+            if received == 0:
+                raise ConnectionResetError(f"{self}: connection closed by peer")
+            start += received
+
+    def _receive_frame(self) -> int:
+        """Receives the next frame into the rx buffer and returns its transaction id"""
+        try:
+            self._receive_exactly(0, MBAP_HEADER_SIZE)
+            received_id, _, length, _ = MBAP_HEADER.unpack_from(self._rx_buffer)
+            pdu_length = length - 1
+            if not 0 < pdu_length <= len(self._rx_buffer) - MBAP_HEADER_SIZE:
+                raise ConnectionError(f"{self}: invalid frame length {length}")
+            self._receive_exactly(MBAP_HEADER_SIZE, pdu_length)
+        except OSError:
+            self.close()
+            raise
+        return received_id
+
+    def _receive(self, transaction_id: int, function_code: int) -> None:
+        """Receives the response for transaction_id into the rx buffer.
+        Responses of older transactions are discarded."""
+        while True:
+            received_id = self._receive_frame()
+            if received_id == transaction_id:
+                break
+            Logging.logger.debug(
+                f"{self}: discarded response of transaction {received_id}"
+            )
+        self._check_function_code(function_code)
+
+    def _check_function_code(self, function_code: int) -> None:
+        received_function_code = self._rx_buffer[MBAP_HEADER_SIZE]
+        if received_function_code == function_code | 0x80:
+            exception_code = self._rx_buffer[MBAP_HEADER_SIZE + 1]
+            raise ConnectionAbortedError(
+                f"Exception response {exception_code} "
+                f"({EXCEPTION_CODES.get(exception_code, 'unknown')})"
+            )
+        if received_function_code != function_code:
+            raise ConnectionAbortedError(
+                f"Unexpected function code {received_function_code} in response"
+            )
+
+    def _registers_view(self, length: int) -> memoryview:
+        byte_count = self._rx_buffer[MBAP_HEADER_SIZE + 1]
+        if byte_count != 2 * length:
+            raise ConnectionAbortedError(
+                f"Expected {2 * length} bytes in response, got {byte_count}"
+            )
+        start = MBAP_HEADER_SIZE + 2
+        swap_register_bytes(self._rx_buffer, start, start + byte_count)
+        return self._rx_view[start : start + byte_count]
+
+    def _receive_registers(
+        self, transaction_id: int, function_code: int, length: int
+    ) -> memoryview:
+        self._receive(transaction_id, function_code)
+        return self._registers_view(length)
+
+
+def _check_read_length(length: int) -> None:
+    if not 0 < length <= MAX_READ_REGISTERS:
+        raise ValueError(
+            f"Length {length} must be in range(1, {MAX_READ_REGISTERS + 1})"
+        )
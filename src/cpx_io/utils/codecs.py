@@ -0,0 +1,81 @@
+"""Codecs that decode process data into typed records"""
+
+import struct
+from collections import namedtuple
+
+
+class StructCodec:
+    """Decodes process data with a struct layout into a named tuple. The layout is
+    compiled once, decoding reads directly from the buffer (bytes or memoryview)
+    without copying it.
+
+    Single bits or bit groups of the unpacked values can be added as extra fields,
+    e.g. bits={"ready": (0, 6)} adds the field "ready" with bit 6 of the first value
+    as bool and bits={"mode": (0, 8, 4)} the field "mode" with bits 8 to 11 as int.
+    """
+
+    def __init__(self, fmt: str, fields: list[str] = None, bits: dict = None):
+        """Constructor of the StructCodec class.
+
+        :param fmt: struct format, e.g. ">HHH" for three big endian 16 bit values
+        :type fmt: str
+        :param fields: (optional) names of the unpacked values, defaults to value0,
+            value1, ...
+        :type fields: list[str]
+        :param bits: (optional) extra fields as name: (value index, first bit[, width])
+        :type bits: dict
+        """
+        self._struct = struct.Struct(fmt)
+        count = len(self._struct.unpack(bytes(self._struct.size)))
+        fields = list(fields) if fields else [f"value{i}" for i in range(count)]
+        if len(fields) != count:
+            raise ValueError(
+                f"Format {fmt} has {count} values, got {len(fields)} names"
+            )
+
+        bits = bits or {}
+        self._bits = []
+        for name, (index, bit, *width) in bits.items():
+            width = width[0] if width else 1
+            if not 0 <= index < count:
+                raise ValueError(f"Bit field {name} refers to missing value {index}")
+            self._bits.append((index, bit, (1 << width) - 1, width == 1))
+
+        self._count = count
+        self.record_type = namedtuple("Record", fields + list(bits))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._struct.format!r}, {self.record_type._fields})"
+
+    @property
+    def size(self) -> int:
+        """Size of the process data in bytes"""
+        return self._struct.size
+
+    def decode(self, buffer, offset: int = 0) -> tuple:
+        """Decodes one record from buffer starting at offset
+
+        :param buffer: process data
+        :type buffer: bytes | memoryview
+        :param offset: (optional) first byte of the record in buffer
+        :type offset: int
+        :return: record with the fields of the codec
+        :rtype: namedtuple
+        """
+        values = self._struct.unpack_from(buffer, offset)
+        extra = [
+            bool(values[index] >> bit & mask) if flag else values[index] >> bit & mask
+            for index, bit, mask, flag in self._bits
+        ]
+        return self.record_type(*values, *extra)
+
+    def encode(self, record) -> bytes:
+        """Encodes the values of a record (or any sequence of the values without the
+        bit fields)
+
+        :param record: values to encode
+        :type record: tuple
+        :return: process data
+        :rtype: bytes
+        """
+        return self._struct.pack(*tuple(record)[: self._count])
@@ -0,0 +1,83 @@
+"""Latency statistics with a fixed bucket histogram"""
+
+from bisect import bisect_left
+
+# upper bounds of the histogram buckets in s, the last bucket is unbounded
+DEFAULT_BUCKET_BOUNDS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+
+class LatencyStatistics:
+    """Collects durations (in s) as count, mean, minimum, maximum and histogram.
+    Recording is cheap enough to be done for every request.
+    """
+
+    def __init__(self, bucket_bounds: tuple = DEFAULT_BUCKET_BOUNDS):
+        """Constructor of the LatencyStatistics class.
+
+        :param bucket_bounds: (optional) ascending upper bounds of the histogram buckets
+        :type bucket_bounds: tuple
+        """
+        self.bucket_bounds = tuple(bucket_bounds)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.buckets = [0] * (len(self.bucket_bounds) + 1)
+
+    def __repr__(self):
+        if not self.count:
+            return f"{type(self).__name__}(count=0)"
+        return (
+            f"{type(self).__name__}(count={self.count}, mean={self.mean * 1000:.3f} ms, "
+            f"max={self.maximum * 1000:.3f} ms)"
+        )
+
+    def reset(self) -> None:
+        """Clears all recorded values"""
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.buckets = [0] * (len(self.bucket_bounds) + 1)
+
+    def record(self, duration: float) -> None:
+        """Records one duration
+
+        :param duration: duration in s
+        :type duration: float
+        """
+        self.count += 1
+        self.total += duration
+        if self.minimum is None or duration < self.minimum:
+            self.minimum = duration
+        if self.maximum is None or duration > self.maximum:
+            self.maximum = duration
+        self.buckets[bisect_left(self.bucket_bounds, duration)] += 1
+
+    @property
+    def mean(self) -> float:
+        """Mean duration in s, 0.0 if nothing was recorded"""
+        return self.total / self.count if self.count else 0.0
+
+    def histogram(self) -> dict:
+        """Returns the histogram as dict of bucket upper bound (in s) and count.
+        The last bucket has the upper bound float("inf").
+
+        :return: histogram
+        :rtype: dict
+        """
+        return dict(zip(self.bucket_bounds + (float("inf"),), self.buckets))
+
+    def as_dict(self) -> dict:
+        """Returns all values as dict
+
+        :return: count, mean, minimum, maximum and histogram
+        :rtype: dict
+        """
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "histogram": self.histogram(),
+        }
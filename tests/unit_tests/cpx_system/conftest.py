@@ -0,0 +1,119 @@
+"""Shared fixtures for cpx_system tests"""
+
+import socketserver
+import struct
+import threading
+import pytest
+
+
+class FakeModbusDevice(socketserver.ThreadingTCPServer):
+    """Stand-in Modbus TCP device with a holding register map.
+    Supports function codes 3, 16 and 23. Requests on one connection are processed in
+    order, so pipelined requests are answered like on a real device.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _FakeModbusHandler)
+        self.registers = {}
+        self.requests = []
+        self.write_hooks = []
+        self.lock = threading.Lock()
+        self.connections = []
+
+    @property
+    def port(self):
+        """TCP port of the server"""
+        return self.server_address[1]
+
+    def set_registers(self, register, data: bytes):
+        """Sets registers from little endian bytes"""
+        for i, value in enumerate(struct.unpack(f"<{len(data) // 2}H", data)):
+            self.registers[register + i] = value
+
+    def get_registers(self, register, length) -> bytes:
+        """Returns registers as little endian bytes"""
+        values = [self.registers.get(register + i, 0) for i in range(length)]
+        return struct.pack(f"<{length}H", *values)
+
+    def drop_connections(self):
+        """Closes all client connections"""
+        for connection in list(self.connections):
+            connection.close()
+        self.connections.clear()
+
+    def process(self, function_code, pdu):
+        """Processes one request pdu and returns the response pdu"""
+        with self.lock:
+            self.requests.append(function_code)
+            if function_code == 3:
+                register, length = struct.unpack(">HH", pdu[:4])
+                values = [self.registers.get(register + i, 0) for i in range(length)]
+                return struct.pack(f">BB{length}H", 3, 2 * length, *values)
+            if function_code == 16:
+                register, length = struct.unpack(">HH", pdu[:4])
+                self._write(register, struct.unpack(f">{length}H", pdu[5:]))
+                return struct.pack(">BHH", 16, register, length)
+            if function_code == 23:
+                read_register, read_length, write_register, write_length = (
+                    struct.unpack(">HHHH", pdu[:8])
+                )
+                self._write(write_register, struct.unpack(f">{write_length}H", pdu[9:]))
+                values = [
+                    self.registers.get(read_register + i, 0) for i in range(read_length)
+                ]
+                return struct.pack(f">BB{read_length}H", 23, 2 * read_length, *values)
+            return struct.pack(">BB", function_code | 0x80, 1)
+
+    def _write(self, register, values):
+        for i, value in enumerate(values):
+            self.registers[register + i] = value
+        for hook in self.write_hooks:
+            hook(self, register, values)
+
+
+class _FakeModbusHandler(socketserver.BaseRequestHandler):
+    """Connection handler of FakeModbusDevice"""
+
+    def _receive(self, count):
+        data = b""
+        while len(data) < count:
+            chunk = self.request.recv(count - len(data))
+            if not chunk:
+                raise ConnectionResetError
+            data += chunk
+        return data
+
+    def handle(self):
+        self.server.connections.append(self.request)
+        try:
+            while True:
+                transaction_id, protocol, length, unit_id = struct.unpack(
+                    ">HHHB", self._receive(7)
+                )
+                pdu = self._receive(length - 1)
+                response = self.server.process(pdu[0], pdu[1:])
+                self.request.sendall(
+                    struct.pack(
+                        ">HHHB", transaction_id, protocol, len(response) + 1, unit_id
+                    )
+                    + response
+                )
+        except OSError:
+            pass
+
+
+@pytest.fixture(name="fake_device")
+def fixture_fake_device():
+    """Running FakeModbusDevice on localhost"""
+    server = FakeModbusDevice()
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.drop_connections()
+    server.server_close()
@@ -0,0 +1,31 @@
+"""Contains tests for PortBackup class"""
+
+import json
+
+from cpx_io.cpx_system.cpx_ap.ap_backup import PortBackup
+
+
+class TestPortBackup:
+    "Test PortBackup"
+
+    def test_to_dict_from_dict(self):
+        """Test a backup survives a json round trip"""
+        # Arrange
+        backup = PortBackup(333, 1234, {(60, 0): b"\x01\x02", (0x18, 0): b"TAG"})
+
+        # Act
+        ret = PortBackup.from_dict(json.loads(json.dumps(backup.to_dict())))
+
+        # Assert
+        assert ret == backup
+        assert backup.to_dict()["parameters"] == [[60, 0, "0102"], [24, 0, "544147"]]
+
+    def test_matches(self):
+        """Test matches compares vendor and device ID"""
+        # Arrange
+        backup = PortBackup(333, 1234)
+
+        # Act & Assert
+        assert backup.matches(333, 1234)
+        assert not backup.matches(333, 1235)
+        assert not backup.matches(334, 1234)
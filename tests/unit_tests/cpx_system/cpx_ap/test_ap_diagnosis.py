@@ -0,0 +1,176 @@
+"""Contains tests for the diagnosis monitoring"""
+
+from collections import namedtuple
+from unittest.mock import Mock
+
+from cpx_io.cpx_system.cpx_ap.ap_diagnosis import (
+    DiagnosisMonitor,
+    DiagnosisState,
+    decode_global_diagnosis_state,
+)
+from cpx_io.cpx_system.cpx_ap.dataclasses.module_diagnosis import ModuleDiagnosis
+
+ModuleDicts = namedtuple("ModuleDicts", ["parameters", "diagnosis"])
+
+
+def diagnosis_block(state: int = 0, count: int = 0, module: int = 0, code: int = 0):
+    """Returns the registers 11000 to 11005"""
+    return (
+        state.to_bytes(4, "little")
+        + count.to_bytes(2, "little")
+        + module.to_bytes(2, "little")
+        + code.to_bytes(4, "little")
+    )
+
+
+class TestDiagnosisState:
+    "Test DiagnosisState"
+
+    def test_decode_global_diagnosis_state(self):
+        """Test the state bits are decoded in the order of the keys"""
+        # Act
+        state = decode_global_diagnosis_state(b"\x04\x00\x02\x00")
+
+        # Assert
+        assert len(state) == 19
+        assert [key for key, value in state.items() if value] == [
+            "Voltage",
+            "Security",
+        ]
+
+    def test_from_registers(self):
+        """Test the whole block is decoded"""
+        # Act
+        state = DiagnosisState.from_registers(diagnosis_block(0x02, 3, 2, 0x0601_0010))
+
+        # Assert
+        assert state.state["Current"] is True
+        assert state.active_count == 3
+        assert state.latest_module == 1
+        assert state.latest_code == 0x0601_0010
+
+    def test_from_registers_no_diagnosis(self):
+        """Test the latest module is None without diagnosis"""
+        # Act
+        state = DiagnosisState.from_registers(diagnosis_block())
+
+        # Assert
+        assert state.latest_module is None
+        assert not any(state.state.values())
+
+
+class TestDiagnosisMonitor:
+    "Test DiagnosisMonitor"
+
+    def cpx(self, *blocks):
+        """Returns a CpxAp mock that returns the diagnosis blocks"""
+        diagnosis = ModuleDiagnosis("Description", "0x06010010", "Guideline", "Name")
+        module = Mock(module_dicts=ModuleDicts({}, {0x06010010: diagnosis}))
+        return Mock(
+            modules=[Mock(module_dicts=ModuleDicts({}, {})), module],
+            read_diagnosis_state=Mock(
+                side_effect=[DiagnosisState.from_registers(b) for b in blocks]
+            ),
+        )
+
+    def test_poll_reports_changes_only(self):
+        """Test poll returns the changes since the last poll and nothing for a
+        healthy system on the first poll"""
+        # Arrange
+        monitor = DiagnosisMonitor(
+            self.cpx(
+                diagnosis_block(),
+                diagnosis_block(),
+                diagnosis_block(0x04, 1, 2, 0x06010010),
+            )
+        )
+
+        # Act
+        first = monitor.poll()
+        second = monitor.poll()
+        third = monitor.poll()
+
+        # Assert
+        assert not first
+        assert not second
+        assert [(event.name, event.old, event.new) for event in third] == [
+            ("Voltage", False, True),
+            ("active_count", 0, 1),
+            ("latest", (None, 0), (1, 0x06010010)),
+        ]
+        assert third[2].module == 1
+        assert third[2].diagnosis.name == "Name"
+        assert list(monitor.history) == third
+
+    def test_poll_unknown_code(self):
+        """Test the event of an unknown diagnosis code has no diagnosis"""
+        # Arrange
+        monitor = DiagnosisMonitor(self.cpx(diagnosis_block(0x01, 1, 1, 0x1234)))
+
+        # Act
+        events = monitor.poll()
+
+        # Assert
+        assert events[-1].name == "latest"
+        assert events[-1].module == 0
+        assert events[-1].diagnosis is None
+
+    def test_history_bounded(self):
+        """Test the history keeps the latest events only"""
+        # Arrange
+        monitor = DiagnosisMonitor(
+            self.cpx(*[diagnosis_block(count=i) for i in range(5)]), history_size=3
+        )
+
+        # Act
+        for _ in range(5):
+            monitor.poll()
+
+        # Assert
+        assert [event.new for event in monitor.history] == [2, 3, 4]
+
+    def test_events_time_range(self):
+        """Test events returns the events of a time range"""
+        # Arrange
+        monitor = DiagnosisMonitor(
+            self.cpx(*[diagnosis_block(count=i) for i in range(1, 5)])
+        )
+        for _ in range(4):
+            monitor.poll()
+        for timestamp, event in enumerate(monitor.history):
+            event.timestamp = float(timestamp)
+
+        # Act & Assert
+        assert [event.new for event in monitor.events(since=1.0, until=2.0)] == [2, 3]
+        assert [event.new for event in monitor.events(since=2.5)] == [4]
+        assert len(monitor.events()) == 4
+
+    def test_events_clock_jump(self):
+        """Test events finds all events of a time range after the clock jumped back"""
+        # Arrange
+        monitor = DiagnosisMonitor(
+            self.cpx(*[diagnosis_block(count=i) for i in range(1, 5)])
+        )
+        for _ in range(4):
+            monitor.poll()
+        for timestamp, event in zip([10.0, 11.0, 1.0, 12.0], monitor.history):
+            event.timestamp = timestamp
+
+        # Act
+        events = monitor.events(since=10.5)
+
+        # Assert
+        assert [event.new for event in events] == [2, 4]
+
+    def test_stream(self):
+        """Test stream yields the events of every poll"""
+        # Arrange
+        monitor = DiagnosisMonitor(
+            self.cpx(diagnosis_block(), diagnosis_block(count=1))
+        )
+
+        # Act
+        events = list(monitor.stream(period=0, count=2))
+
+        # Assert
+        assert [event.new for event in events] == [1]
@@ -0,0 +1,356 @@
+"""Contains tests for the IODD classes"""
+
+import json
+import os
+import struct
+from unittest.mock import patch
+import pytest
+
+from cpx_io.cpx_system.cpx_ap.ap_iodd import (
+    IoddCodec,
+    IoddDevice,
+    IoddLibrary,
+    parse_iodd,
+)
+
+IODD_XML = """<?xml version="1.0" encoding="utf-8"?>
+<IODevice xmlns="http://www.io-link.com/IODD/2010/10"
+    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+  <ProfileBody>
+    <DeviceIdentity vendorId="333" vendorName="Festo" deviceId="1234">
+      <DeviceName textId="TI_DeviceName"/>
+    </DeviceIdentity>
+    <DeviceFunction>
+      <DatatypeCollection>
+        <Datatype id="DT_PD" xsi:type="RecordT" bitLength="16">
+          <RecordItem subindex="1" bitOffset="4">
+            <SimpleDatatype xsi:type="UIntegerT" bitLength="12"/>
+            <Name textId="TN_PDV"/>
+          </RecordItem>
+          <RecordItem subindex="2" bitOffset="0">
+            <SimpleDatatype xsi:type="BooleanT"/>
+            <Name textId="TN_SSC1"/>
+          </RecordItem>
+          <RecordItem subindex="3" bitOffset="1">
+            <SimpleDatatype xsi:type="BooleanT"/>
+            <Name textId="TN_SSC2"/>
+          </RecordItem>
+        </Datatype>
+      </DatatypeCollection>
+      <VariableCollection>
+        <StdVariableRef id="V_VendorName"/>
+        <StdVariableRef id="V_SerialNumber"/>
+        <Variable id="V_Setpoint" index="60" accessRights="rw">
+          <Datatype xsi:type="RecordT" bitLength="48">
+            <RecordItem subindex="1" bitOffset="16">
+              <SimpleDatatype xsi:type="IntegerT" bitLength="32"/>
+              <Name textId="TN_SP1"/>
+            </RecordItem>
+            <RecordItem subindex="2" bitOffset="0">
+              <SimpleDatatype xsi:type="UIntegerT" bitLength="16"/>
+              <Name textId="TN_Hyst"/>
+            </RecordItem>
+          </Datatype>
+          <Name textId="TN_Setpoint"/>
+        </Variable>
+        <Variable id="V_Temperature" index="70" accessRights="ro">
+          <Datatype xsi:type="Float32T"/>
+          <Name textId="TN_Temperature"/>
+        </Variable>
+      </VariableCollection>
+      <ProcessDataCollection>
+        <ProcessData id="PD">
+          <ProcessDataIn id="PDI" bitLength="16">
+            <DatatypeRef datatypeId="DT_PD"/>
+            <Name textId="TN_PDI"/>
+          </ProcessDataIn>
+        </ProcessData>
+      </ProcessDataCollection>
+    </DeviceFunction>
+  </ProfileBody>
+  <ExternalTextCollection>
+    <PrimaryLanguage xml:lang="en">
+      <Text id="TI_DeviceName" value="SDAS"/>
+      <Text id="TN_PDV" value="Process data value"/>
+      <Text id="TN_SSC1" value="Switching signal 1"/>
+      <Text id="TN_SSC2" value="Switching signal 2"/>
+      <Text id="TN_SP1" value="Setpoint 1"/>
+      <Text id="TN_Hyst" value="Hysteresis"/>
+      <Text id="TN_Setpoint" value="Setpoint"/>
+      <Text id="TN_Temperature" value="Temperature"/>
+      <Text id="TN_PDI" value="Process data in"/>
+    </PrimaryLanguage>
+  </ExternalTextCollection>
+</IODevice>
+"""
+
+
+class TestParseIodd:
+    "Test parse_iodd"
+
+    def test_identity(self):
+        """Test vendor, device and name"""
+        # Act
+        description = parse_iodd(IODD_XML)
+
+        # Assert
+        assert description["vendor_id"] == 333
+        assert description["device_id"] == 1234
+        assert description["name"] == "Festo SDAS"
+
+    def test_variables(self):
+        """Test variables are found by name and id"""
+        # Act
+        description = parse_iodd(IODD_XML)
+
+        # Assert
+        variables = description["variables"]
+        assert variables["Vendor Name"]["index"] == 0x10
+        assert variables["V_VendorName"]["index"] == 0x10
+        assert variables["Serial Number"]["index"] == 0x15
+        assert variables["Setpoint"]["index"] == 60
+        assert variables["V_Temperature"]["datatype"] == {"type": "Float32T"}
+
+    def test_parameter_indices(self):
+        """Test parameter_indices returns the read/write variables only"""
+        # Arrange
+        device = IoddDevice(parse_iodd(IODD_XML))
+
+        # Act
+        indices = device.parameter_indices()
+
+        # Assert
+        assert indices == [60]
+        assert device.variable("Setpoint").writable
+        assert not device.variable("Temperature").writable
+        assert not device.variable("Vendor Name").writable
+
+    def test_process_data(self):
+        """Test the process data layout is resolved from the datatype collection"""
+        # Act
+        description = parse_iodd(IODD_XML)
+
+        # Assert
+        assert description["process_data_in"]["bitLength"] == 16
+        assert [i["name"] for i in description["process_data_in"]["items"]] == [
+            "Process data value",
+            "Switching signal 1",
+            "Switching signal 2",
+        ]
+        assert description["process_data_out"] is None
+
+    def test_json_serializable(self):
+        """Test the compiled IODD can be saved as json"""
+        # Act
+        description = parse_iodd(IODD_XML)
+
+        # Assert
+        assert json.loads(json.dumps(description)) == description
+
+    def test_no_namespace(self):
+        """Test IODD without namespace raises ValueError"""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            parse_iodd("<IODevice/>")
+
+
+class TestIoddCodec:
+    "Test IoddCodec"
+
+    @pytest.fixture(scope="function")
+    def device_fixture(self):
+        """device fixture"""
+        yield IoddDevice(parse_iodd(IODD_XML))
+
+    def test_decode_process_data(self, device_fixture):
+        """Test decode of a record with bit fields"""
+        # Act
+        ret = device_fixture.process_data_in.decode(b"\x12\x35")
+
+        # Assert
+        assert ret.process_data_value == 0x123
+        assert ret.switching_signal_1 is True
+        assert ret.switching_signal_2 is False
+
+    def test_decode_record_signed(self, device_fixture):
+        """Test decode of a record with a signed item"""
+        # Act
+        ret = device_fixture.variable("Setpoint").codec.decode(
+            b"\xff\xff\xff\xfb\x00\x0a"
+        )
+
+        # Assert
+        assert tuple(ret) == (-5, 10)
+        assert ret.setpoint_1 == -5
+
+    def test_decode_item(self, device_fixture):
+        """Test decode of one record item read with subindex"""
+        # Act
+        ret = device_fixture.variable("Setpoint").codec.item(2).decode(b"\x00\x0a")
+
+        # Assert
+        assert ret == 10
+
+    def test_item_missing(self, device_fixture):
+        """Test item raises ValueError for unknown subindex"""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            device_fixture.variable("Setpoint").codec.item(3)
+
+    def test_decode_float(self, device_fixture):
+        """Test decode of a Float32T"""
+        # Act
+        ret = device_fixture.variable("Temperature").codec.decode(
+            struct.pack(">f", 21.5)
+        )
+
+        # Assert
+        assert ret == 21.5
+
+    def test_decode_string(self, device_fixture):
+        """Test decode of a variable length string"""
+        # Act
+        ret = device_fixture.variable("Vendor Name").codec.decode(b"Festo\x00\x00")
+
+        # Assert
+        assert ret == "Festo"
+
+    @pytest.mark.parametrize(
+        "datatype, data, expected_output",
+        [
+            ({"type": "UIntegerT", "bitLength": 16}, b"\x01\x02", 0x0102),
+            ({"type": "IntegerT", "bitLength": 8}, b"\xff", -1),
+            ({"type": "BooleanT"}, b"\x01", True),
+            ({"type": "OctetStringT", "fixedLength": 2}, b"\xca\xfe\x00", b"\xca\xfe"),
+            ({"type": "StringT", "fixedLength": 3}, b"abcd", "abc"),
+        ],
+    )
+    def test_decode_simple(self, datatype, data, expected_output):
+        """Test decode of simple datatypes"""
+        # Arrange
+        codec = IoddCodec(datatype)
+
+        # Act & Assert
+        assert codec.decode(data) == expected_output
+
+    def test_variable_missing(self, device_fixture):
+        """Test variable raises ValueError for unknown names"""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            device_fixture.variable("Unknown")
+
+
+class TestIoddLibrary:
+    "Test IoddLibrary"
+
+    def test_get(self, tmp_path):
+        """Test get finds the IODD by vendor and device ID"""
+        # Arrange
+        (tmp_path / "Festo-SDAS-20240101-IODD1.1.xml").write_text(IODD_XML)
+        (tmp_path / "readme.txt").write_text("no IODD")
+        library = IoddLibrary(str(tmp_path))
+
+        # Act & Assert
+        assert library.get(333, 1234).name == "Festo SDAS"
+        assert library.get(333, 1) is None
+        assert len(library) == 1
+
+    def test_invalid_file_skipped(self, tmp_path):
+        """Test invalid IODD files are skipped"""
+        # Arrange
+        (tmp_path / "broken.xml").write_text("<IODevice")
+        (tmp_path / "sdas.xml").write_text(IODD_XML)
+        library = IoddLibrary(str(tmp_path))
+
+        # Act & Assert
+        assert len(library) == 1
+
+    def test_compiled_cache(self, tmp_path):
+        """Test compiled IODDs are saved and loaded without parsing"""
+        # Arrange
+        iodd_path = tmp_path / "iodd"
+        cache_path = tmp_path / "cache"
+        iodd_path.mkdir()
+        cache_path.mkdir()
+        (iodd_path / "sdas.xml").write_text(IODD_XML)
+        IoddLibrary(str(iodd_path), str(cache_path)).reload()
+
+        # Act
+        with patch("cpx_io.cpx_system.cpx_ap.ap_iodd.parse_iodd") as mock_parse:
+            library = IoddLibrary(str(iodd_path), str(cache_path))
+            device = library.get(333, 1234)
+
+        # Assert
+        assert os.listdir(cache_path) == ["sdas.json"]
+        mock_parse.assert_not_called()
+        assert device.process_data_in.decode(b"\x12\x35").process_data_value == 0x123
+
+    def test_compiled_cache_outdated(self, tmp_path):
+        """Test a changed IODD file is compiled again"""
+        # Arrange
+        (tmp_path / "sdas.xml").write_text(IODD_XML)
+        cache_path = tmp_path / "cache"
+        cache_path.mkdir()
+        (cache_path / "sdas.json").write_text(
+            json.dumps({"source": ["sdas.xml", 0, 0, 1], "iodd": {}})
+        )
+
+        # Act
+        library = IoddLibrary(str(tmp_path), str(cache_path))
+
+        # Assert
+        assert library.get(333, 1234) is not None
+        cached = json.loads((cache_path / "sdas.json").read_text())
+        assert cached["iodd"]["vendor_id"] == 333
+
+    def test_invalid_description_skipped(self, tmp_path):
+        """Test an IODD that parses but cannot be decoded is skipped"""
+        # Arrange
+        (tmp_path / "broken.xml").write_text(
+            IODD_XML.replace(
+                '<SimpleDatatype xsi:type="UIntegerT" bitLength="12"/>',
+                '<SimpleDatatype xsi:type="UIntegerT"/>',
+            ).replace('deviceId="1234"', 'deviceId="1"')
+        )
+        (tmp_path / "sdas.xml").write_text(IODD_XML)
+        library = IoddLibrary(str(tmp_path))
+
+        # Act & Assert
+        assert len(library) == 1
+        assert library.get(333, 1234) is not None
+
+    @pytest.mark.parametrize(
+        "content", ['{"source": ["sdas.xml", 0, 0, 2], "io', '{"source": []}', "[]"]
+    )
+    def test_compiled_cache_corrupt(self, tmp_path, content):
+        """Test a corrupt cache file is compiled again"""
+        # Arrange
+        (tmp_path / "sdas.xml").write_text(IODD_XML)
+        cache_path = tmp_path / "cache"
+        cache_path.mkdir()
+        (cache_path / "sdas.json").write_text(content)
+
+        # Act
+        library = IoddLibrary(str(tmp_path), str(cache_path))
+
+        # Assert
+        assert library.get(333, 1234) is not None
+        cached = json.loads((cache_path / "sdas.json").read_text())
+        assert cached["iodd"]["vendor_id"] == 333
+        assert os.listdir(cache_path) == ["sdas.json"]
+
+    def test_compiled_cache_write_error(self, tmp_path):
+        """Test the IODD is used if the cache file cannot be written"""
+        # Arrange
+        (tmp_path / "sdas.xml").write_text(IODD_XML)
+        cache_path = tmp_path / "cache"
+        cache_path.mkdir()
+        library = IoddLibrary(str(tmp_path), str(cache_path))
+
+        # Act
+        with patch("cpx_io.cpx_system.cpx_ap.ap_iodd.os.replace", side_effect=OSError):
+            device = library.get(333, 1234)
+
+        # Assert
+        assert device is not None
+        assert not os.listdir(cache_path)
@@ -0,0 +1,359 @@
+"""Contains tests for IsduEngine class"""
+
+from unittest.mock import MagicMock, Mock, call
+import pytest
+
+from cpx_io.cpx_system.cpx_base import CpxRequestError
+from cpx_io.cpx_system.cpx_ap.ap_isdu import IsduCache, IsduEngine, IsduCommand
+
+
+def status_block(length: int, data: bytes, status: int = 0, prefetch: int = 8):
+    """Returns the registers from ISDU_STATUS on as read by the engine"""
+    block = (
+        status.to_bytes(2, "little")
+        + bytes(10)
+        + length.to_bytes(2, "little")
+        + data[: prefetch * 2]
+    )
+    return block + bytes(2 * (7 + prefetch) - len(block))
+
+
+class TestIsduEngine:
+    "Test IsduEngine"
+
+    @pytest.fixture(scope="function")
+    def base_fixture(self):
+        """base fixture"""
+        base = MagicMock()
+        base.write_reg_data = Mock()
+        base.read_reg_data = Mock()
+        yield base
+
+    def test_read_prefetched(self, base_fixture):
+        """Test read with data that fits into the status poll"""
+        # Arrange
+        engine = IsduEngine(base_fixture)
+        base_fixture.read_reg_data.return_value = status_block(3, b"\x01\x02\x03")
+
+        # Act
+        ret = engine.read(1, 2, 0x10, 3)
+
+        # Assert
+        assert ret == b"\x01\x02\x03"
+        assert base_fixture.write_reg_data.call_args_list == [
+            call(b"\x02\x00\x03\x00\x10\x00\x03\x00\x00\x00", 34002),
+            call(b"\x64\x00", 34001),
+        ]
+        base_fixture.read_reg_data.assert_called_once_with(34000, 15)
+
+    def test_read_long(self, base_fixture):
+        """Test read with data that exceeds the prefetched registers"""
+        # Arrange
+        engine = IsduEngine(base_fixture, prefetch_registers=2)
+        data = bytes(range(9))
+        base_fixture.read_reg_data.side_effect = [
+            status_block(9, data, prefetch=2),
+            data[4:] + b"\x00",
+        ]
+
+        # Act
+        ret = engine.read(0, 0, 0x15, command=IsduCommand.READ_SWAPPED)
+
+        # Assert
+        assert ret == data
+        assert base_fixture.read_reg_data.call_args_list == [
+            call(34000, 9),
+            call(34009, 3),
+        ]
+        base_fixture.write_reg_data.assert_called_with(b"\x32\x00", 34001)
+
+    def test_read_polls_until_done(self, base_fixture):
+        """Test read polls the status until it is zero"""
+        # Arrange
+        engine = IsduEngine(base_fixture)
+        base_fixture.read_reg_data.side_effect = [
+            status_block(0, b"", status=1),
+            status_block(0, b"", status=1),
+            status_block(2, b"\xca\xfe"),
+        ]
+
+        # Act
+        ret = engine.read(0, 0, 0x10)
+
+        # Assert
+        assert ret == b"\xca\xfe"
+        assert engine.statistics()["read"]["polls"] == 3
+        assert engine.statistics()["read"]["latency"]["count"] == 1
+
+    def test_read_timeout(self, base_fixture):
+        """Test read raises CpxRequestError at the deadline"""
+        # Arrange
+        engine = IsduEngine(base_fixture, timeout=0.01)
+        base_fixture.read_reg_data.return_value = status_block(0, b"", status=1)
+
+        # Act & Assert
+        with pytest.raises(CpxRequestError):
+            engine.read(0, 0, 0x10)
+        assert engine.statistics()["read"]["timeouts"] == 1
+        assert engine.statistics()["read"]["latency"]["count"] == 0
+
+    def test_read_uses_isdu_mailbox(self, base_fixture):
+        """Test read is executed in the isdu mailbox"""
+        # Arrange
+        engine = IsduEngine(base_fixture)
+        base_fixture.read_reg_data.return_value = status_block(0, b"")
+
+        # Act
+        engine.read(0, 0, 0x10)
+
+        # Assert
+        base_fixture.mailbox.assert_called_once_with("isdu")
+
+    def test_write(self, base_fixture):
+        """Test write sends the request with one write and the command last"""
+        # Arrange
+        engine = IsduEngine(base_fixture)
+        base_fixture.read_reg_data.return_value = status_block(0, b"")
+
+        # Act
+        engine.write(0, 1, 0x18, 0, b"\xca\xfe", IsduCommand.WRITE_SWAPPED)
+
+        # Assert
+        assert base_fixture.write_reg_data.call_args_list == [
+            call(b"\x01\x00\x02\x00\x18\x00\x00\x00\x02\x00\xca\xfe", 34002),
+            call(b"\x33\x00", 34001),
+        ]
+        assert engine.statistics()["write"]["polls"] == 1
+
+    def test_write_long_data_chunked(self, base_fixture):
+        """Test write splits requests that exceed one modbus write"""
+        # Arrange
+        engine = IsduEngine(base_fixture)
+        base_fixture.read_reg_data.return_value = status_block(0, b"")
+        data = bytes(range(238))
+
+        # Act
+        engine.write(0, 0, 0x18, 0, data)
+
+        # Assert
+        calls = base_fixture.write_reg_data.call_args_list
+        assert len(calls) == 3
+        assert calls[0].args[1] == 34002
+        assert len(calls[0].args[0]) == 246
+        assert calls[1].args[1] == 34002 + 123
+        assert calls[0].args[0][10:] + calls[1].args[0] == data
+        assert calls[2] == call(b"\x65\x00", 34001)
+
+    def test_write_data_too_long(self, base_fixture):
+        """Test write raises ValueError for data exceeding the data registers"""
+        # Arrange
+        engine = IsduEngine(base_fixture)
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            engine.write(0, 0, 0x18, 0, bytes(239))
+        base_fixture.write_reg_data.assert_not_called()
+
+    def test_prefetch_registers_limited(self, base_fixture):
+        """Test prefetch_registers is limited to the data registers"""
+        # Arrange & Act
+        engine = IsduEngine(base_fixture, prefetch_registers=500)
+
+        # Assert
+        assert engine.prefetch_registers == 118
+
+    def test_batch_skips_unchanged_setup(self, base_fixture):
+        """Test batch writes only the setup registers that changed"""
+        # Arrange
+        engine = IsduEngine(base_fixture)
+        base_fixture.read_reg_data.return_value = status_block(0, b"")
+
+        # Act
+        ret = engine.batch(
+            [
+                (0, 0, 0x18, 0, b"\x01\x02", IsduCommand.WRITE),
+                (0, 0, 0x19, 0, b"\x01\x02", IsduCommand.WRITE),
+                (0, 0, 0x19, 0, b"\x01\x02", IsduCommand.WRITE),
+            ]
+        )
+
+        # Assert
+        assert ret == [None, None, None]
+        assert base_fixture.write_reg_data.call_args_list == [
+            call(b"\x01\x00\x01\x00\x18\x00\x00\x00\x02\x00\x01\x02", 34002),
+            call(b"\x65\x00", 34001),
+            call(b"\x19\x00", 34004),  # index
+            call(b"\x65\x00", 34001),
+            call(b"\x65\x00", 34001),
+        ]
+        base_fixture.mailbox.assert_called_once_with("isdu")
+
+    def test_batch_rewrites_length_after_read(self, base_fixture):
+        """Test batch writes the length again after the device returned a length"""
+        # Arrange
+        engine = IsduEngine(base_fixture)
+        base_fixture.read_reg_data.side_effect = [
+            status_block(2, b"\xca\xfe"),
+            status_block(1, b"\x01"),
+        ]
+
+        # Act
+        ret = engine.batch(
+            [
+                (0, 0, 0x10, 0, None, IsduCommand.READ),
+                (0, 1, 0x10, 0, None, IsduCommand.READ),
+            ]
+        )
+
+        # Assert
+        assert ret == [b"\xca\xfe", b"\x01"]
+        assert base_fixture.write_reg_data.call_args_list[2] == call(
+            b"\x02\x00\x10\x00\x00\x00\x00\x00", 34003
+        )
+
+    def test_batch_continues_after_error(self, base_fixture):
+        """Test batch returns the error of a failed request and writes the whole
+        setup of the next request"""
+        # Arrange
+        engine = IsduEngine(base_fixture, timeout=0.01)
+        base_fixture.read_reg_data.side_effect = [
+            status_block(0, b"", status=1)
+        ] * 1000 + [status_block(1, b"\x05")]
+
+        # Act
+        ret = engine.batch(
+            [
+                (0, 0, 0x10, 0, None, IsduCommand.READ),
+                (0, 0, 0x10, 0, b"\x01" * 239, IsduCommand.WRITE),
+            ]
+        )
+
+        # Assert
+        assert isinstance(ret[0], CpxRequestError)
+        assert isinstance(ret[1], ValueError)
+        assert engine.statistics()["read"]["timeouts"] == 1
+
+    @pytest.mark.parametrize(
+        "error", [ConnectionAbortedError("abort"), OSError("lost")]
+    )
+    def test_batch_continues_after_transport_error(self, base_fixture, error):
+        """Test batch returns a transport error of a request and continues with the
+        whole setup of the next request"""
+        # Arrange
+        engine = IsduEngine(base_fixture)
+        base_fixture.read_reg_data.side_effect = [error, status_block(1, b"\x05")]
+
+        # Act
+        ret = engine.batch(
+            [
+                (0, 0, 0x10, 0, None, IsduCommand.READ),
+                (0, 0, 0x10, 0, None, IsduCommand.READ),
+            ]
+        )
+
+        # Assert
+        assert ret == [error, b"\x05"]
+        assert base_fixture.write_reg_data.call_count == 4
+
+
+class TestIsduCache:
+    "Test IsduCache"
+
+    def test_get_put(self):
+        """Test get returns stored data for the same command only"""
+        # Arrange
+        cache = IsduCache()
+        cache.put((1, 0, 0x10, 0), IsduCommand.READ, b"Festo")
+
+        # Act & Assert
+        assert cache.get((1, 0, 0x10, 0), IsduCommand.READ) == b"Festo"
+        assert cache.get((1, 0, 0x10, 0), IsduCommand.READ_SWAPPED) is None
+        assert cache.get((1, 1, 0x10, 0), IsduCommand.READ) is None
+        assert cache.statistics() == {
+            "hits": 1,
+            "misses": 2,
+            "invalidations": 0,
+            "entries": 1,
+        }
+
+    @pytest.mark.parametrize(
+        "index, expected_output",
+        [(0x0F, False), (0x10, True), (0x1A, True), (0x1B, False)],
+    )
+    def test_cacheable(self, index, expected_output):
+        """Test cacheable for the identification indices"""
+        # Arrange
+        cache = IsduCache()
+
+        # Act & Assert
+        assert cache.cacheable(index) is expected_output
+        cache.enabled = False
+        assert cache.cacheable(index) is False
+
+    @pytest.mark.parametrize(
+        "state",
+        [{"vendor_id": 2}, {"device_id": 0x5678}, {"port_status": "NO_DEVICE"}],
+    )
+    def test_update_port_changed(self, state):
+        """Test update_port drops the entries of the port only"""
+        # Arrange
+        cache = IsduCache()
+        cache.update_port(
+            1, 0, vendor_id=1, device_id=0x1234, port_status="OPERATE", dev_com=True
+        )
+        cache.put((1, 0, 0x10, 0), IsduCommand.READ, b"Festo")
+        cache.put((1, 1, 0x10, 0), IsduCommand.READ, b"Festo")
+
+        # Act
+        cache.update_port(1, 0, **state)
+
+        # Assert
+        assert cache.get((1, 0, 0x10, 0), IsduCommand.READ) is None
+        assert cache.get((1, 1, 0x10, 0), IsduCommand.READ) == b"Festo"
+        assert cache.invalidations == 1
+
+    def test_update_port_unchanged(self):
+        """Test update_port keeps the entries if the state is unchanged"""
+        # Arrange
+        cache = IsduCache()
+        cache.put((1, 0, 0x10, 0), IsduCommand.READ, b"Festo")
+
+        # Act
+        cache.update_port(1, 0, dev_com=True)
+        cache.update_port(1, 0, dev_com=True, vendor_id=1)
+
+        # Assert
+        assert cache.get((1, 0, 0x10, 0), IsduCommand.READ) == b"Festo"
+        assert cache.invalidations == 0
+
+    def test_invalidate_module(self):
+        """Test invalidate drops all entries of a module"""
+        # Arrange
+        cache = IsduCache()
+        cache.put((1, 0, 0x10, 0), IsduCommand.READ, b"a")
+        cache.put((1, 3, 0x12, 0), IsduCommand.READ, b"b")
+        cache.put((2, 0, 0x10, 0), IsduCommand.READ, b"c")
+
+        # Act
+        cache.invalidate(1)
+
+        # Assert
+        assert len(cache) == 1
+
+    def test_engine_read_cached(self):
+        """Test the engine reads cacheable indices once"""
+        # Arrange
+        base = MagicMock()
+        base.read_reg_data = Mock(return_value=status_block(2, b"\xca\xfe"))
+        engine = IsduEngine(base)
+
+        # Act
+        first = engine.read(0, 0, 0x15)
+        second = engine.read(0, 0, 0x15)
+        engine.read(0, 0, 0x40)
+        engine.read(0, 0, 0x40)
+
+        # Assert
+        assert first == second == b"\xca\xfe"
+        assert base.read_reg_data.call_count == 3
+        assert engine.statistics()["cache"]["hits"] == 1
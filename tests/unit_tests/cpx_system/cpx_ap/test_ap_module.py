@@ -1,12 +1,16 @@
 """Contains tests for ApModule class"""
 
-from unittest.mock import Mock, call, patch
+from unittest.mock import MagicMock, Mock, call, patch
 from collections import namedtuple
 import pytest
 
 from cpx_io.cpx_system.cpx_base import CpxRequestError
 from cpx_io.cpx_system.cpx_ap.cpx_ap import CpxAp
 from cpx_io.cpx_system.cpx_ap.ap_module import ApModule
+from cpx_io.cpx_system.cpx_ap.ap_backup import PortBackup
+from cpx_io.cpx_system.cpx_ap.ap_isdu import IsduEngine, IsduJob, IsduResult
+from cpx_io.cpx_system.cpx_ap.ap_iodd import IoddDevice
+from cpx_io.cpx_system.cpx_ap.ap_pqi import PortQualifier
 from cpx_io.cpx_system.cpx_ap.dataclasses.apdd_information import ApddInformation
 from cpx_io.cpx_system.cpx_ap.dataclasses.system_parameters import SystemParameters
 from cpx_io.cpx_system.cpx_ap.ap_product_categories import ProductCategory
@@ -198,7 +202,7 @@ class TestApModule:
 
         # Assert
         assert module.position == MODULE_POSITION
-        module.read_fieldbus_parameters.assert_called_once_with()
+        module.read_fieldbus_parameters.assert_not_called()
 
     def test_repr_correct_string(self, module_fixture):
         """Test repr"""
@@ -568,6 +572,86 @@ class TestApModule:
         # Assert
         assert channel_values == [b"\xAB\xCD"] * 4
 
+    def test_read_channels_io_link_dev_com_changed(self, module_fixture):
+        """Test read channels marks the fieldbus parameters of a port as outdated if
+        DevCOM changed without reading them"""
+        # Arrange
+        module = module_fixture
+        module.apdd_information.product_category = ProductCategory.IO_LINK.value
+        module.information = CpxAp.ApInformation(input_size=36, output_size=32)
+        module.channels.inouts = [
+            Channel(
+                array_size=2,
+                bits=16,
+                byte_swap_needed=None,
+                channel_id=0,
+                data_type="UINT8",
+                description="",
+                direction="in",
+                name="Port %d",
+                parameter_group_ids=[1, 2],
+                profile_list=[50],
+            )
+        ] * 4
+        module.channels.inputs = module.channels.inouts
+        module.channels.outputs = module.channels.inouts
+
+        def data(pqi):
+            return bytes(32) + pqi + bytes(32)
+
+        module.base = Mock(
+            read_reg_data=Mock(
+                side_effect=[
+                    data(b"\xa0\x80\x80\x80"),
+                    data(b"\xa0\x80\x80\x80"),
+                    data(b"\xa0\xa0\x80\x80"),
+                ]
+            )
+        )
+        module.read_fieldbus_parameters = Mock()
+
+        # Act
+        module.read_channels()
+        module.fieldbus_parameters = [{}] * 4
+        module.read_channels()
+        module.read_channels()
+
+        # Assert
+        assert module._outdated_ports == {1}
+        assert module.fieldbus_parameters == [{}] * 4
+        module.read_fieldbus_parameters.assert_not_called()
+
+    def test_read_channel_not_io_link(self, module_fixture):
+        """Test read_channel does not read fieldbus parameters for other modules"""
+        # Arrange
+        module = module_fixture
+        module.apdd_information.product_category = ProductCategory.DIGITAL.value
+        module.channels.inputs = [
+            Channel(
+                array_size=None,
+                bits=8,
+                byte_swap_needed=None,
+                channel_id=0,
+                data_type="",
+                description="",
+                direction="in",
+                name="",
+                parameter_group_ids=None,
+                profile_list=[],
+            )
+        ] * 4
+        module.base = Mock()
+        module.read_channels = Mock(return_value=[False] * 4)
+        module.read_fieldbus_parameters = Mock()
+
+        # Act
+        ret = module.read_channel(0)
+
+        # Assert
+        assert ret is False
+        assert module.fieldbus_parameters is None
+        module.read_fieldbus_parameters.assert_not_called()
+
     def test_read_channels_unknown_type(self, module_fixture):
         """Test read channels"""
         # Arrange
@@ -1595,6 +1679,28 @@ class TestApModule:
             ]
         )
 
+    def test_write_module_parameter_drops_fieldbus_parameters(self, module_fixture):
+        """Test write_module_parameter marks the fieldbus parameters as outdated"""
+        # Arrange
+        module = module_fixture
+        module.position = 9
+        module.base = Mock()
+        module.apdd_information.product_category = ProductCategory.IO_LINK.value
+        ModuleDicts = namedtuple("ModuleDicts", ["parameters"])
+        module.module_dicts = ModuleDicts(
+            parameters={
+                0: Parameter(0, {}, True, 0, "INT", 0, "test parameter", "test")
+            }
+        )
+        module._check_instances = Mock(return_value=[0])
+        module.fieldbus_parameters = [{}] * 4
+
+        # Act
+        module.write_module_parameter(0, 1)
+
+        # Assert
+        assert module.fieldbus_parameters is None
+
     def test_read_module_parameter_int(self, module_fixture):
         """Test read_module_parameter"""
         # Arrange
@@ -1800,7 +1906,7 @@ class TestApModule:
         module.apdd_information.product_category = ProductCategory.IO_LINK.value
         module.system_entry_registers.inputs = 0
         module.base = Mock()
-        module.base.read_reg_data = Mock(return_value=b"\xCA\xFE")
+        module.base.read_reg_data = Mock(return_value=b"\xCA\xFE\x20\x00")
 
         # Act
         result = module.read_pqi()
@@ -1812,15 +1918,15 @@ class TestApModule:
                 "Device Error": "there is at least one error or warning on the device or port",
                 "DevCOM": "device is not connected or not yet in operation",
             },
-            {
-                "Port Qualifier": "input data is invalid",
-                "Device Error": "there are no errors or warnings on the device or port",
-                "DevCOM": "device is not connected or not yet in operation",
-            },
             {
                 "Port Qualifier": "input data is valid",
                 "Device Error": "there is at least one error or warning on the device or port",
-                "DevCOM": "device is not connected or not yet in operation",
+                "DevCOM": "device is in status PREOPERATE or OPERATE",
+            },
+            {
+                "Port Qualifier": "input data is invalid",
+                "Device Error": "there are no errors or warnings on the device or port",
+                "DevCOM": "device is in status PREOPERATE or OPERATE",
             },
             {
                 "Port Qualifier": "input data is invalid",
@@ -1828,6 +1934,7 @@ class TestApModule:
                 "DevCOM": "device is not connected or not yet in operation",
             },
         ]
+        module.base.read_reg_data.assert_called_once_with(16, 2)
 
     def test_read_pqi_channel_indexes(self, module_fixture):
         """Test read_pqi"""
@@ -1836,7 +1943,7 @@ class TestApModule:
         module.apdd_information.product_category = ProductCategory.IO_LINK.value
         module.system_entry_registers.inputs = 0
         module.base = Mock()
-        module.base.read_reg_data = Mock(return_value=b"\xCA\xFE")
+        module.base.read_reg_data = Mock(return_value=b"\xCA\xFE\x20\x00")
 
         # Act
         results = [module.read_pqi(idx) for idx in range(4)]
@@ -1848,15 +1955,15 @@ class TestApModule:
                 "Device Error": "there is at least one error or warning on the device or port",
                 "DevCOM": "device is not connected or not yet in operation",
             },
-            {
-                "Port Qualifier": "input data is invalid",
-                "Device Error": "there are no errors or warnings on the device or port",
-                "DevCOM": "device is not connected or not yet in operation",
-            },
             {
                 "Port Qualifier": "input data is valid",
                 "Device Error": "there is at least one error or warning on the device or port",
-                "DevCOM": "device is not connected or not yet in operation",
+                "DevCOM": "device is in status PREOPERATE or OPERATE",
+            },
+            {
+                "Port Qualifier": "input data is invalid",
+                "Device Error": "there are no errors or warnings on the device or port",
+                "DevCOM": "device is in status PREOPERATE or OPERATE",
             },
             {
                 "Port Qualifier": "input data is invalid",
@@ -1865,6 +1972,73 @@ class TestApModule:
             },
         ]
 
+    @pytest.mark.parametrize(
+        "mask_invalid, expected_output",
+        [(False, [b"\x01" * 8, b"\x02" * 8]), (True, [b"\x01" * 8, None])],
+    )
+    def test_read_ports(self, module_fixture, mask_invalid, expected_output):
+        """Test read_ports reads process data and PQI with one request"""
+        # Arrange
+        module = module_fixture
+        module.position = 1
+        module.apdd_information.product_category = ProductCategory.IO_LINK.value
+        module.information = CpxAp.ApInformation(input_size=36, output_size=32)
+        module.system_entry_registers.inputs = 5000
+        module.channels.inouts = [Mock(array_size=8)] * 4
+        module.base = Mock()
+        module.base.read_reg_data = Mock(
+            return_value=b"\x01" * 8
+            + b"\x02" * 8
+            + b"\x03" * 8
+            + b"\x04" * 8
+            + b"\xa0\x60\x80\x00"
+        )
+
+        # Act
+        ports = module.read_ports(mask_invalid)
+
+        # Assert
+        module.base.read_reg_data.assert_called_once_with(5000, 18)
+        assert [port.data for port in ports[:2]] == expected_output
+        assert [port.pqi for port in ports] == [
+            PortQualifier.PQ | PortQualifier.DEV_COM,
+            PortQualifier.DEV_ERR | PortQualifier.DEV_COM,
+            PortQualifier.PQ,
+            PortQualifier(0),
+        ]
+        assert ports[3].channel == 3
+        assert module.base.isdu.cache.update_port.call_args_list == [
+            call(1, 0, dev_com=True),
+            call(1, 1, dev_com=True),
+            call(1, 2, dev_com=False),
+            call(1, 3, dev_com=False),
+        ]
+
+    def test_read_ports_input_size_without_pqi(self, module_fixture):
+        """Test read_ports raises ValueError if the input data ends before the PQI"""
+        # Arrange
+        module = module_fixture
+        module.apdd_information.product_category = ProductCategory.IO_LINK.value
+        module.information = CpxAp.ApInformation(input_size=32)
+        module.system_entry_registers.inputs = 5000
+        module.base = Mock(read_reg_data=Mock(return_value=bytes(32)))
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            module.read_ports()
+        module.base.isdu.cache.update_port.assert_not_called()
+
+    def test_read_ports_not_io_link(self, module_fixture):
+        """Test read_ports is not supported by other modules"""
+        # Arrange
+        module = module_fixture
+        module.apdd_information.product_category = ProductCategory.DIGITAL.value
+        module.base = Mock()
+
+        # Act & Assert
+        with pytest.raises(NotImplementedError):
+            module.read_ports()
+
     def test_read_fieldbus_parameters(self, module_fixture):
         """Test read_fieldbus_parameters"""
         # Arrange
@@ -1872,7 +2046,9 @@ class TestApModule:
         module.apdd_information.product_category = ProductCategory.IO_LINK.value
         module.system_entry_registers.inputs = 0
         module.base = Mock()
-        module.base.read_parameter = Mock(return_value=True)
+        module.base.read_parameters = Mock(
+            side_effect=lambda position, parameters: [True] * len(parameters)
+        )
         ModuleDicts = namedtuple("ModuleDicts", ["parameters"])
         module.module_dicts = ModuleDicts(
             parameters={
@@ -1941,9 +2117,10 @@ class TestApModule:
         module = module_fixture
         module.position = 0
         module.apdd_information.product_category = ProductCategory.IO_LINK.value
-        module.base = Mock()
+        module.base = MagicMock()
         module.base.write_reg_data = Mock()
         module.base.read_reg_data = Mock(return_value=b"\x00\x00")
+        module.base.isdu = IsduEngine(module.base)
 
         # Act
         channel = input_value
@@ -1953,23 +2130,19 @@ class TestApModule:
         result = module.read_isdu(channel, index, subindex)
 
         # Assert
-        module.base.write_reg_data.assert_has_calls(
-            [
-                call(b"\x01\x00", 34002),  # MODULE_NO (position add 1)
-                call((channel + 1).to_bytes(2, "little"), 34003),  # CHANNEL (add 1)
-                call(b"\x04\x00", 34004),  # INDEX
-                call(b"\x05\x00", 34005),  # SUBINDEX
-                call(b"\x00\x00", 34006),  # LENGTH zero when reading
-                call(b"\x64\x00", 34001),  # COMMAND (read 100)
-            ]
-        )
-        module.base.read_reg_data.assert_has_calls(
-            [
-                call(34000, 1),
-                call(34006),
-                call(34007, 0),
-            ]
-        )
+        assert module.base.write_reg_data.call_args_list == [
+            call(
+                b"\x01\x00"  # MODULE_NO (position add 1)
+                + (channel + 1).to_bytes(2, "little")  # CHANNEL (add 1)
+                + b"\x04\x00"  # INDEX
+                + b"\x05\x00"  # SUBINDEX
+                + b"\x00\x00",  # LENGTH zero when reading
+                34002,
+            ),
+            call(b"\x64\x00", 34001),  # COMMAND (read 100)
+        ]
+        # status, length and the first data registers are read with one request
+        module.base.read_reg_data.assert_called_once_with(34000, 15)
 
         assert (
             result == b""
@@ -1981,9 +2154,10 @@ class TestApModule:
         module = module_fixture
         module.position = 0
         module.apdd_information.product_category = ProductCategory.IO_LINK.value
-        module.base = Mock()
+        module.base = MagicMock()
         module.base.write_reg_data = Mock()
         module.base.read_reg_data = Mock(return_value=b"\x01\x00")
+        module.base.isdu = IsduEngine(module.base, timeout=0.01)
 
         # Act & Assert
         channel = 0
@@ -2000,9 +2174,10 @@ class TestApModule:
         module = module_fixture
         module.position = 0
         module.apdd_information.product_category = ProductCategory.IO_LINK.value
-        module.base = Mock()
+        module.base = MagicMock()
         module.base.write_reg_data = Mock()
         module.base.read_reg_data = Mock(return_value=b"\x00\x00")
+        module.base.isdu = IsduEngine(module.base)
 
         # Act
         data = b"\xCA\xFE"
@@ -2013,18 +2188,19 @@ class TestApModule:
         module.write_isdu(data, channel, index, subindex)
 
         # Assert
-        module.base.write_reg_data.assert_has_calls(
-            [
-                call(b"\x01\x00", 34002),  # MODULE_NO (position add 1)
-                call((channel + 1).to_bytes(2, "little"), 34003),  # CHANNEL (add 1)
-                call(b"\x04\x00", 34004),  # INDEX
-                call(b"\x05\x00", 34005),  # SUBINDEX
-                call(b"\x02\x00", 34006),  # LENGTH (bytes)
-                call(data, 34007),  # DATA
-                call(b"\x65\x00", 34001),  # COMMAND (read 101)
-            ]
-        )
-        module.base.read_reg_data.assert_has_calls([call(34000, 1)])
+        assert module.base.write_reg_data.call_args_list == [
+            call(
+                b"\x01\x00"  # MODULE_NO (position add 1)
+                + (channel + 1).to_bytes(2, "little")  # CHANNEL (add 1)
+                + b"\x04\x00"  # INDEX
+                + b"\x05\x00"  # SUBINDEX
+                + b"\x02\x00"  # LENGTH
+                + data,  # DATA
+                34002,
+            ),
+            call(b"\x65\x00", 34001),  # COMMAND (read 101)
+        ]
+        module.base.read_reg_data.assert_called_once_with(34000, 15)
 
     @pytest.mark.parametrize(
         "input_value",
@@ -2041,9 +2217,10 @@ class TestApModule:
         module = module_fixture
         module.position = 0
         module.apdd_information.product_category = ProductCategory.IO_LINK.value
-        module.base = Mock()
+        module.base = MagicMock()
         module.base.write_reg_data = Mock()
         module.base.read_reg_data = Mock(return_value=b"\x00\x00")
+        module.base.isdu = IsduEngine(module.base)
 
         # Act
         data = input_value
@@ -2055,18 +2232,19 @@ class TestApModule:
         length = len(data)
 
         # Assert
-        module.base.write_reg_data.assert_has_calls(
-            [
-                call(b"\x01\x00", 34002),  # MODULE_NO (position add 1)
-                call((channel + 1).to_bytes(2, "little"), 34003),  # CHANNEL (add 1)
-                call(b"\x04\x00", 34004),  # INDEX
-                call(b"\x05\x00", 34005),  # SUBINDEX
-                call(length.to_bytes(2, "little"), 34006),  # LENGTH
-                call(data, 34007),  # DATA
-                call(b"\x65\x00", 34001),  # COMMAND (read 101)
-            ]
-        )
-        module.base.read_reg_data.assert_has_calls([call(34000, 1)])
+        assert module.base.write_reg_data.call_args_list == [
+            call(
+                b"\x01\x00"  # MODULE_NO (position add 1)
+                + (channel + 1).to_bytes(2, "little")  # CHANNEL (add 1)
+                + b"\x04\x00"  # INDEX
+                + b"\x05\x00"  # SUBINDEX
+                + length.to_bytes(2, "little")  # LENGTH
+                + data,  # DATA
+                34002,
+            ),
+            call(b"\x65\x00", 34001),  # COMMAND (read 101)
+        ]
+        module.base.read_reg_data.assert_called_once_with(34000, 15)
 
     def test_write_isdu_no_response(self, module_fixture):
         """Test write_isdu"""
@@ -2074,9 +2252,10 @@ class TestApModule:
         module = module_fixture
         module.position = 0
         module.apdd_information.product_category = ProductCategory.IO_LINK.value
-        module.base = Mock()
+        module.base = MagicMock()
         module.base.write_reg_data = Mock()
         module.base.read_reg_data = Mock(return_value=b"\x01\x00")
+        module.base.isdu = IsduEngine(module.base, timeout=0.01)
 
         # Act & Assert
         data = b"\xCA\xFE"
@@ -2099,9 +2278,10 @@ class TestApModule:
         module = module_fixture
         module.position = 0
         module.apdd_information.product_category = ProductCategory.IO_LINK.value
-        module.base = Mock()
+        module.base = MagicMock()
         module.base.write_reg_data = Mock()
         module.base.read_reg_data = Mock(return_value=b"\x00\x00")
+        module.base.isdu = IsduEngine(module.base)
 
         # Act
         ret = module.read_isdu(0, 0, data_type=input_value)
@@ -2129,9 +2309,10 @@ class TestApModule:
         module = module_fixture
         module.position = 0
         module.apdd_information.product_category = ProductCategory.IO_LINK.value
-        module.base = Mock()
+        module.base = MagicMock()
         module.base.write_reg_data = Mock()
         module.base.read_reg_data = Mock(return_value=b"\x00\x00")
+        module.base.isdu = IsduEngine(module.base)
 
         # Act
         module.write_isdu(input_value, 0, 0)
@@ -2139,15 +2320,513 @@ class TestApModule:
         command = 51 if isinstance(input_value, (bool, int)) else 101
 
         # Assert
-        module.base.write_reg_data.assert_has_calls(
+        assert module.base.write_reg_data.call_args_list == [
+            call(
+                b"\x01\x00"  # MODULE_NO (position add 1)
+                + (1).to_bytes(2, "little")  # CHANNEL (add 1)
+                + b"\x00\x00"  # INDEX
+                + b"\x00\x00"  # SUBINDEX
+                + length.to_bytes(2, "little")  # LENGTH
+                + expected_output,  # DATA
+                34002,
+            ),
+            call(command.to_bytes(2, "little"), 34001),  # COMMAND
+        ]
+        module.base.read_reg_data.assert_called_once_with(34000, 15)
+
+    def test_read_isdu_identification_cached(self, module_fixture):
+        """Test read_isdu reads identification data once until DevCOM changes"""
+        # Arrange
+        module = module_fixture
+        module.position = 1
+        module.apdd_information.product_category = ProductCategory.IO_LINK.value
+        module.system_entry_registers.inputs = 0
+        module.base = MagicMock()
+        module.base.write_reg_data = Mock()
+        module.base.isdu = IsduEngine(module.base)
+        pqi = [b"\x20\x00\x00\x00"]
+
+        def read_reg_data(register, length=1):
+            if register == 34000:
+                return b"\x00\x00" + bytes(10) + b"\x05\x00" + b"Festo" + bytes(11)
+            return pqi[0][: length * 2]
+
+        module.base.read_reg_data = Mock(side_effect=read_reg_data)
+
+        # Act
+        module.read_pqi()
+        first = module.read_isdu(0, 0x10, data_type="str")
+        second = module.read_isdu(0, 0x10, data_type="str")
+        pqi[0] = b"\x00\x00\x00\x00"  # device disconnected
+        module.read_pqi()
+        third = module.read_isdu(0, 0x10, data_type="str")
+
+        # Assert
+        assert first == second == third == "Festo"
+        commands = [
+            c for c in module.base.write_reg_data.call_args_list if c.args[1] == 34001
+        ]
+        assert len(commands) == 2
+        assert module.base.isdu.cache.statistics() == {
+            "hits": 1,
+            "misses": 2,
+            "invalidations": 1,
+            "entries": 1,
+        }
+
+    def test_write_isdu_drops_cached_value(self, module_fixture):
+        """Test write_isdu drops the cached value of the written index"""
+        # Arrange
+        module = module_fixture
+        module.position = 0
+        module.apdd_information.product_category = ProductCategory.IO_LINK.value
+        module.base = MagicMock()
+        module.base.write_reg_data = Mock()
+        module.base.read_reg_data = Mock(return_value=b"\x00\x00")
+        module.base.isdu = IsduEngine(module.base)
+        module.base.isdu.cache.put((0, 0, 0x18, 0), 100, b"old")
+
+        # Act
+        module.write_isdu("new", 0, 0x18)
+
+        # Assert
+        assert len(module.base.isdu.cache) == 0
+
+    @pytest.fixture(scope="function")
+    def iodd_fixture(self):
+        """IODD of a device with vendor ID 333 and device ID 1234"""
+        yield IoddDevice(
+            {
+                "vendor_id": 333,
+                "device_id": 1234,
+                "name": "Festo SDAS",
+                "variables": {
+                    "Vendor Name": {"index": 0x10, "datatype": {"type": "StringT"}},
+                    "Setpoint": {
+                        "index": 60,
+                        "datatype": {
+                            "type": "RecordT",
+                            "bitLength": 32,
+                            "items": [
+                                {
+                                    "name": "Setpoint 1",
+                                    "subindex": 1,
+                                    "bitOffset": 16,
+                                    "datatype": {"type": "IntegerT", "bitLength": 16},
+                                },
+                                {
+                                    "name": "Setpoint 2",
+                                    "subindex": 2,
+                                    "bitOffset": 0,
+                                    "datatype": {"type": "IntegerT", "bitLength": 16},
+                                },
+                            ],
+                        },
+                    },
+                },
+                "process_data_in": {"type": "UIntegerT", "bitLength": 12},
+            }
+        )
+
+    def test_read_isdu_iodd_name(self, module_fixture, iodd_fixture):
+        """Test read_isdu with a variable name of the IODD"""
+        # Arrange
+        module = module_fixture
+        module.position = 2
+        module.apdd_information.product_category = ProductCategory.IO_LINK.value
+        module.base = Mock()
+        module.base.isdu.read.return_value = b"\xff\xfe\x00\x05"
+        module.fieldbus_parameters = [
+            {"Actual vendor ID": 333, "Actual device ID": 1234}
+        ] * 4
+        module.iodds = Mock(get=Mock(return_value=iodd_fixture))
+
+        # Act
+        ret = module.read_isdu(1, "Setpoint")
+
+        # Assert
+        module.iodds.get.assert_called_once_with(333, 1234)
+        module.base.isdu.read.assert_called_once_with(2, 1, 60, 0, 100)
+        assert ret.setpoint_1 == -2
+        assert ret.setpoint_2 == 5
+
+    def test_read_isdu_iodd_subindex(self, module_fixture, iodd_fixture):
+        """Test read_isdu with a variable name of the IODD and subindex"""
+        # Arrange
+        module = module_fixture
+        module.position = 2
+        module.apdd_information.product_category = ProductCategory.IO_LINK.value
+        module.base = Mock()
+        module.base.isdu.read.return_value = b"\x00\x05"
+        module.fieldbus_parameters = [
+            {"Actual vendor ID": 333, "Actual device ID": 1234}
+        ] * 4
+        module.iodds = Mock(get=Mock(return_value=iodd_fixture))
+
+        # Act
+        ret = module.read_isdu(0, "Setpoint", 2)
+
+        # Assert
+        module.base.isdu.read.assert_called_once_with(2, 0, 60, 2, 100)
+        assert ret == 5
+
+    def test_read_isdu_iodd_missing(self, module_fixture):
+        """Test read_isdu with a variable name and no IODD"""
+        # Arrange
+        module = module_fixture
+        module.apdd_information.product_category = ProductCategory.IO_LINK.value
+        module.base = Mock()
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            module.read_isdu(0, "Vendor Name")
+
+    def test_read_channel_iolink_iodd(self, module_fixture, iodd_fixture):
+        """Test read_channel decodes the process data with the IODD"""
+        # Arrange
+        module = module_fixture
+        module.apdd_information.product_category = ProductCategory.IO_LINK.value
+        module.channels.outputs = [
+            Channel(
+                array_size=None,
+                bits=8,
+                byte_swap_needed=None,
+                channel_id=0,
+                data_type="",
+                description="",
+                direction="out",
+                name="",
+                parameter_group_ids=None,
+                profile_list=[],
+            )
+        ] * 4
+        module.base = Mock()
+        module.fieldbus_parameters = [
+            {"Input data length": 2, "Actual vendor ID": 333, "Actual device ID": 1234}
+        ] * 4
+        module.iodds = Mock(get=Mock(return_value=iodd_fixture))
+        module.read_channels = Mock(return_value=[b"\x12\x34\x00\x00"] * 4)
+
+        # Act
+        ret = module.read_channel(0)
+        ret_full_size = module.read_channel(0, full_size=True)
+
+        # Assert
+        assert ret == 0x234
+        assert ret_full_size == b"\x12\x34\x00\x00"
+
+    def test_read_channel_iolink_iodd_cached(self, module_fixture, iodd_fixture):
+        """Test read_channel looks up the IODD once per device and reads the fieldbus
+        parameters of a port whose DevCOM bit changed again"""
+        # Arrange
+        module = module_fixture
+        module.apdd_information.product_category = ProductCategory.IO_LINK.value
+        module.channels.outputs = [
+            Channel(
+                array_size=None,
+                bits=8,
+                byte_swap_needed=None,
+                channel_id=0,
+                data_type="",
+                description="",
+                direction="out",
+                name="",
+                parameter_group_ids=None,
+                profile_list=[],
+            )
+        ] * 4
+        module.base = Mock()
+        module.fieldbus_parameters = [
+            {"Input data length": 2, "Actual vendor ID": 333, "Actual device ID": 1234}
+        ] * 4
+        module.position = 0
+        module.iodds = Mock(
+            get=Mock(
+                side_effect=lambda vendor, device: {1234: iodd_fixture}.get(device)
+            )
+        )
+        module.read_channels = Mock(return_value=[b"\x12\x34\x00\x00"] * 4)
+        ModuleDicts = namedtuple("ModuleDicts", ["parameters"])
+        module.module_dicts = ModuleDicts(
+            parameters={number: number for number in range(20074, 20110)}
+        )
+        # port status, revision, rate, cycle time, vendor, device, in and out length
+        module.base.read_parameters = Mock(return_value=[4, 0x11, 2, 30, 333, 99, 3, 0])
+
+        # Act
+        first = module.read_channel(0)
+        second = module.read_channel(0)
+        module._dev_com = [False] * 4
+        module._update_port_qualifiers([PortQualifier.DEV_COM] + [PortQualifier(0)] * 3)
+        changed = module.read_channel(0)
+        unchanged = module.read_channel(1)
+
+        # Assert
+        assert first == second == unchanged == 0x234
+        assert changed == b"\x12\x34\x00"
+        assert module.iodds.get.call_args_list == [
+            call(333, 1234),
+            call(333, 99),
+            call(333, 1234),
+        ]
+        module.base.read_parameters.assert_called_once_with(
+            0, [(number, 0) for number in [*range(20074, 20080), 20108, 20109]]
+        )
+        assert module.fieldbus_parameters[0]["Input data length"] == 3
+        assert not module._outdated_ports
+
+    def test_read_channel_iolink_dev_com_changed(self, module_fixture):
+        """Test read_channel still returns trimmed data after a DevCOM change"""
+        # Arrange
+        module = module_fixture
+        module.apdd_information.product_category = ProductCategory.IO_LINK.value
+        module.channels.inputs = [
+            Channel(
+                array_size=None,
+                bits=8,
+                byte_swap_needed=None,
+                channel_id=0,
+                data_type="",
+                description="",
+                direction="in",
+                name="",
+                parameter_group_ids=None,
+                profile_list=[],
+            )
+        ] * 4
+        module.base = Mock()
+        module.position = 0
+        module.fieldbus_parameters = [{"Input data length": 2}] * 4
+        module.read_channels = Mock(return_value=[b"\x12\x34\x56\x78"] * 4)
+        ModuleDicts = namedtuple("ModuleDicts", ["parameters"])
+        module.module_dicts = ModuleDicts(
+            parameters={number: number for number in range(20074, 20110)}
+        )
+        module.base.read_parameters = Mock(
+            return_value=[4, 0x11, 2, 30, 333, 1, 3, 0] * 2
+        )
+        module._dev_com = [False] * 4
+
+        # Act
+        module._update_port_qualifiers(
+            [PortQualifier(0)] * 2 + [PortQualifier.DEV_COM] * 2
+        )
+        ret = [module.read_channel(channel) for channel in range(4)]
+
+        # Assert
+        assert ret == [b"\x12\x34", b"\x12\x34", b"\x12\x34\x56", b"\x12\x34\x56"]
+        module.base.read_parameters.assert_called_once_with(
+            0,
             [
-                call(b"\x01\x00", 34002),  # MODULE_NO (position add 1)
-                call((1).to_bytes(2, "little"), 34003),  # CHANNEL (add 1)
-                call(b"\x00\x00", 34004),  # INDEX
-                call(b"\x00\x00", 34005),  # SUBINDEX
-                call(length.to_bytes(2, "little"), 34006),  # LENGTH
-                call(expected_output, 34007),  # DATA
-                call(command.to_bytes(2, "little"), 34001),  # COMMAND
+                (number, channel)
+                for channel in [2, 3]
+                for number in [*range(20074, 20080), 20108, 20109]
+            ],
+        )
+
+    @pytest.fixture(scope="function")
+    def iolink_fixture(self, module_fixture):
+        """IO-Link module with a device with vendor ID 333 and device ID 1234"""
+        module = module_fixture
+        module.position = 1
+        module.apdd_information.product_category = ProductCategory.IO_LINK.value
+        module.base = Mock()
+        module.fieldbus_parameters = [
+            {"Actual vendor ID": 333, "Actual device ID": 1234}
+        ] * 4
+        yield module
+
+    def test_backup_port(self, iolink_fixture):
+        """Test backup_port reads all indices with one batch"""
+        # Arrange
+        module = iolink_fixture
+        module.base.isdu_batch = Mock(
+            return_value=[
+                IsduResult(None, b"\x01\x02"),
+                IsduResult(None, error=CpxRequestError()),
+                IsduResult(None, b"TAG"),
+            ]
+        )
+
+        # Act
+        backup = module.backup_port(2, [60, 61, (0x18, 0)])
+
+        # Assert
+        assert backup == PortBackup(
+            333, 1234, {(60, 0): b"\x01\x02", (0x18, 0): b"TAG"}
+        )
+        module.base.isdu_batch.assert_called_once_with(
+            [
+                IsduJob(module, 2, 60, 0),
+                IsduJob(module, 2, 61, 0),
+                IsduJob(module, 2, 0x18, 0),
+            ]
+        )
+        assert not module.port_backups
+
+    def test_backup_port_iodd(self, iolink_fixture):
+        """Test backup_port reads the parameters of the IODD by default"""
+        # Arrange
+        module = iolink_fixture
+        module.iodd = Mock(return_value=Mock(parameter_indices=Mock(return_value=[60])))
+        module.base.isdu_batch = Mock(return_value=[IsduResult(None, b"\x01")])
+
+        # Act
+        backup = module.backup_port(0, auto_restore=True)
+
+        # Assert
+        module.iodd.assert_called_once_with(0)
+        assert backup.parameters == {(60, 0): b"\x01"}
+        assert module.port_backups == {0: backup}
+
+    def test_backup_port_without_indices(self, iolink_fixture):
+        """Test backup_port raises ValueError without indices and IODD"""
+        # Arrange
+        module = iolink_fixture
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            module.backup_port(0)
+
+    def test_restore_port_writes_differences(self, iolink_fixture):
+        """Test restore_port writes the changed parameters only"""
+        # Arrange
+        module = iolink_fixture
+        backup = PortBackup(333, 1234, {(60, 0): b"\x01", (61, 0): b"\x02"})
+        module.base.isdu_batch = Mock(
+            side_effect=[
+                [IsduResult(None, b"\x01"), IsduResult(None, b"\x05")],
+                [IsduResult(None)],
+            ]
+        )
+
+        # Act
+        ret = module.restore_port(3, backup)
+
+        # Assert
+        assert ret == [(61, 0)]
+        assert module.base.isdu_batch.call_args_list[1] == call(
+            [IsduJob(module, 3, 61, 0, data=b"\x02")]
+        )
+
+    def test_restore_port_other_device(self, iolink_fixture):
+        """Test restore_port raises ValueError for a device with other IDs"""
+        # Arrange
+        module = iolink_fixture
+        module.base.isdu_batch = Mock()
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            module.restore_port(0, PortBackup(333, 9999, {(60, 0): b"\x01"}))
+        module.base.isdu_batch.assert_not_called()
+
+    def test_restore_port_write_failed(self, iolink_fixture):
+        """Test restore_port raises CpxRequestError if a write failed"""
+        # Arrange
+        module = iolink_fixture
+        module.base.isdu_batch = Mock(
+            side_effect=[
+                [IsduResult(None, error=CpxRequestError())],
+                [IsduResult(None, error=CpxRequestError())],
             ]
         )
-        module.base.read_reg_data.assert_has_calls([call(34000, 1)])
+
+        # Act & Assert
+        with pytest.raises(CpxRequestError):
+            module.restore_port(0, PortBackup(333, 1234, {(60, 0): b"\x01"}))
+
+    def test_auto_restore_on_dev_com(self, iolink_fixture):
+        """Test a port with a backup on which a device appears is queued for the
+        restore without reading anything in the process data path"""
+        # Arrange
+        module = iolink_fixture
+        backup = PortBackup(333, 1234, {(60, 0): b"\x01"})
+        module.port_backups = {1: backup, 2: backup}
+        module.restore_port = Mock()
+        module.read_fieldbus_parameters = Mock()
+        module._dev_com = [True, False] * 2
+
+        # Act
+        module._update_port_qualifiers([PortQualifier.DEV_COM] * 4)
+
+        # Assert
+        module.base.submit.assert_called_once_with(module.restore_pending_ports)
+        module.read_fieldbus_parameters.assert_not_called()
+        module.restore_port.assert_not_called()
+        assert module._pending_restore == {1}
+
+    def test_reset_port_states(self, iolink_fixture):
+        """Test a port with a backup counts as appeared after reset_port_states"""
+        # Arrange
+        module = iolink_fixture
+        module.port_backups = {1: PortBackup(333, 1234, {(60, 0): b"\x01"})}
+        module._dev_com = [True] * 4
+        module._outdated_ports = {2}
+
+        # Act
+        module.reset_port_states()
+        module._update_port_qualifiers([PortQualifier.DEV_COM] * 4)
+
+        # Assert
+        assert module.fieldbus_parameters is None
+        assert not module._outdated_ports
+        assert module._pending_restore == {1}
+        module.base.submit.assert_called_once_with(module.restore_pending_ports)
+
+    def test_restore_pending_ports(self, iolink_fixture):
+        """Test restore_pending_ports restores the backups of the queued ports"""
+        # Arrange
+        module = iolink_fixture
+        backup = PortBackup(333, 1234, {(60, 0): b"\x01"})
+        module.port_backups = {1: backup, 3: backup}
+        fieldbus_parameters = module.fieldbus_parameters
+        module._pending_restore = {1, 3}
+        module._outdated_ports = {1, 3}
+        module.read_fieldbus_parameters = Mock(return_value=fieldbus_parameters)
+        module.restore_port = Mock()
+
+        # Act
+        ret = module.restore_pending_ports()
+
+        # Assert
+        assert ret == [1, 3]
+        assert module.read_fieldbus_parameters.call_args_list == [
+            call(refresh_outdated=True)
+        ] * 2
+        assert module.restore_port.call_args_list == [call(1, backup), call(3, backup)]
+        assert not module._pending_restore
+
+    def test_restore_pending_ports_other_device(self, iolink_fixture):
+        """Test the backup is not restored for a device with other IDs"""
+        # Arrange
+        module = iolink_fixture
+        module.port_backups = {0: PortBackup(333, 9999)}
+        module._pending_restore = {0}
+        module.restore_port = Mock()
+
+        # Act
+        ret = module.restore_pending_ports()
+
+        # Assert
+        assert ret == []
+        module.restore_port.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "error",
+        [CpxRequestError(), ValueError(), ConnectionAbortedError(), OSError()],
+    )
+    def test_restore_pending_ports_error(self, iolink_fixture, error):
+        """Test errors are logged and the other ports are restored"""
+        # Arrange
+        module = iolink_fixture
+        backup = PortBackup(333, 1234, {(60, 0): b"\x01"})
+        module.port_backups = {0: backup, 1: backup}
+        module._pending_restore = {0, 1}
+        module.restore_port = Mock(side_effect=[error, [(60, 0)]])
+
+        # Act
+        ret = module.restore_pending_ports()
+
+        # Assert
+        assert ret == [1]
+        assert module.restore_port.call_count == 2
@@ -0,0 +1,47 @@
+"""Contains tests for the PQI decoding"""
+
+import pytest
+
+from cpx_io.cpx_system.cpx_ap.ap_pqi import IoLinkPort, PortQualifier, decode_pqi
+
+
+class TestDecodePqi:
+    "Test decode_pqi"
+
+    def test_decode_pqi(self):
+        """Test decode_pqi returns the flags of every port"""
+        # Arrange
+        data = b"\xe0\x80\x20\x1f"
+
+        # Act
+        qualifiers = decode_pqi(data)
+
+        # Assert
+        assert qualifiers == [
+            PortQualifier.PQ | PortQualifier.DEV_ERR | PortQualifier.DEV_COM,
+            PortQualifier.PQ,
+            PortQualifier.DEV_COM,
+            PortQualifier(0),
+        ]
+        assert all(isinstance(pqi, PortQualifier) for pqi in qualifiers)
+
+
+class TestIoLinkPort:
+    "Test IoLinkPort"
+
+    @pytest.mark.parametrize(
+        "pqi, expected_output",
+        [
+            (PortQualifier(0), (False, False, False)),
+            (PortQualifier.PQ, (True, False, False)),
+            (PortQualifier.DEV_ERR, (False, True, False)),
+            (PortQualifier.DEV_COM, (False, False, True)),
+        ],
+    )
+    def test_properties(self, pqi, expected_output):
+        """Test valid, device_error and dev_com"""
+        # Arrange
+        port = IoLinkPort(0, b"\x00", pqi)
+
+        # Act & Assert
+        assert (port.valid, port.device_error, port.dev_com) == expected_output
@@ -4,9 +4,19 @@ from unittest.mock import Mock, call, patch
 import pytest
 
 from cpx_io.cpx_system.cpx_ap.cpx_ap import CpxAp
+from cpx_io.cpx_system.cpx_base import CpxInitError, CpxRequestError
+from cpx_io.cpx_system.cpx_dataclasses import (
+    ReadRequest,
+    SystemEntryRegisters,
+    WriteRequest,
+)
 from cpx_io.cpx_system.cpx_ap.ap_module import ApModule
+from cpx_io.cpx_system.cpx_ap.ap_diagnosis import ActiveDiagnosis
+from cpx_io.cpx_system.cpx_ap.ap_isdu import IsduCommand, IsduJob
+from cpx_io.cpx_system.cpx_ap.dataclasses.module_diagnosis import ModuleDiagnosis
 from cpx_io.cpx_system.cpx_ap.dataclasses.apdd_information import ApddInformation
 from cpx_io.cpx_system.cpx_ap.ap_parameter import Parameter
+from cpx_io.cpx_system.cpx_ap.ap_product_categories import ProductCategory
 
 
 class TestCpxAp:
@@ -328,6 +338,25 @@ class TestCpxAp:
         # Assert
         assert ret == "/dummy_user/festo/docu"
 
+    def test_create_iodd_path(self, ap_fixture, mocker):
+        # Arrange
+        mock_user_data_dir = mocker.patch(
+            "cpx_io.cpx_system.cpx_ap.cpx_ap.platformdirs.user_data_dir",
+            return_value="/dummy_user/festo",
+        )
+        mock_join = mocker.patch(
+            "cpx_io.cpx_system.cpx_ap.cpx_ap.os.path.join",
+            side_effect=lambda *args: "/".join(args),
+        )
+        mock_makedirs = mocker.patch("cpx_io.cpx_system.cpx_ap.cpx_ap.os.makedirs")
+
+        # Act
+        ret = ap_fixture.create_iodd_path()
+
+        # Assert
+        assert ret == "/dummy_user/festo/iodds"
+        mock_makedirs.assert_called_once_with(ret, exist_ok=True)
+
     def test_getter_modules(self, ap_fixture):
         # Arrange
         mocked_list = [
@@ -404,6 +433,75 @@ class TestCpxAp:
         with pytest.raises(OverflowError):
             ap_fixture.set_timeout(4294967296)
 
+    def test_revalidate_unchanged(self, ap_fixture):
+        "Test _revalidate with unchanged topology"
+        # Arrange
+        ap_fixture._timeout_ms = 100
+        ap_fixture._modules = [
+            Mock(information=CpxAp.ApInformation(module_code=8323)),
+            Mock(information=CpxAp.ApInformation(module_code=8199)),
+        ]
+        ap_fixture.execute_batch = Mock(
+            return_value=[b"\x02\x00", b"\x83\x20\x00\x00", b"\x07\x20\x00\x00", None]
+        )
+
+        # Act
+        ap_fixture._revalidate()
+
+        # Assert
+        ap_fixture.execute_batch.assert_called_once_with(
+            [
+                ReadRequest(12000, 1),
+                ReadRequest(15000, 2),
+                ReadRequest(15037, 2),
+                WriteRequest(b"\x64\x00\x00\x00", 14000),
+            ]
+        )
+
+    def test_revalidate_resets_io_link_modules(self, ap_fixture):
+        "Test _revalidate resets the port states of the IO-Link modules"
+        # Arrange
+        io_link = Mock(
+            information=CpxAp.ApInformation(module_code=8323),
+            apdd_information=Mock(product_category=ProductCategory.IO_LINK.value),
+        )
+        digital = Mock(
+            information=CpxAp.ApInformation(module_code=8199),
+            apdd_information=Mock(product_category=ProductCategory.DIGITAL.value),
+        )
+        ap_fixture._timeout_ms = None
+        ap_fixture._modules = [io_link, digital]
+        ap_fixture.execute_batch = Mock(
+            return_value=[b"\x02\x00", b"\x83\x20\x00\x00", b"\x07\x20\x00\x00"]
+        )
+
+        # Act
+        ap_fixture._revalidate()
+
+        # Assert
+        io_link.reset_port_states.assert_called_once_with()
+        digital.reset_port_states.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "input_value",
+        [
+            [b"\x03\x00", b"\x83\x20\x00\x00", None],
+            [b"\x01\x00", b"\x84\x20\x00\x00", None],
+        ],
+    )
+    def test_revalidate_changed(self, ap_fixture, input_value):
+        "Test _revalidate with changed topology"
+        # Arrange
+        ap_fixture._timeout_ms = 100
+        ap_fixture._modules = [
+            Mock(information=CpxAp.ApInformation(module_code=8323)),
+        ]
+        ap_fixture.execute_batch = Mock(return_value=input_value)
+
+        # Act & Assert
+        with pytest.raises(CpxInitError):
+            ap_fixture._revalidate()
+
     @pytest.mark.parametrize(
         "input_value", [10, 20, 30, 40, 50, 60, 61, 70, 80, 81, 82, 83, 84, 85]
     )
@@ -503,13 +601,35 @@ class TestCpxAp:
 
     def test_read_diagnostics_status(self, ap_fixture):
         # Arrange
-        ap_fixture.read_parameter = Mock(return_value=[0, 1, 2])
+        ap_fixture._modules = [Mock(), Mock()]
+        ap_fixture._read_parameter_raw = Mock(return_value=b"\x00\x41\x48\x00")
+        ap_fixture.read_module_count = Mock()
 
         # Act
         ret = ap_fixture.read_diagnostic_status()
 
         # Assert
         assert all(isinstance(r, CpxAp.Diagnostics) for r in ret)
+        assert len(ret) == 3
+        assert ret[1] == CpxAp.Diagnostics.from_int(0x41)
+        assert ret[2].module_present and ret[2].degree_of_severity_error
+        ap_fixture._read_parameter_raw.assert_called_once_with(0, 20196, 0)
+        ap_fixture.read_module_count.assert_not_called()
+
+    def test_read_diagnostics_status_parameter_cached(self, ap_fixture):
+        """Test the status parameter is built once"""
+        # Arrange
+        ap_fixture._modules = [Mock()]
+        ap_fixture._read_parameter_raw = Mock(return_value=b"\x00\x40")
+
+        # Act
+        ap_fixture.read_diagnostic_status()
+        parameter = ap_fixture._diagnostic_status_parameter
+        ap_fixture.read_diagnostic_status()
+
+        # Assert
+        assert ap_fixture._diagnostic_status_parameter is parameter
+        assert parameter.array_size == 2
 
     def test_read_global_diagnosis_state(self, ap_fixture):
         # Arrange
@@ -543,6 +663,86 @@ class TestCpxAp:
             "Encoder": False,
         }
 
+    def test_read_diagnosis_state(self, ap_fixture):
+        """Test read_diagnosis_state reads the global diagnosis block at once"""
+        # Arrange
+        ap_fixture.read_reg_data = Mock(
+            return_value=b"\x02\x00\x00\x00\x01\x00\x03\x00\x10\x00\x01\x06"
+        )
+
+        # Act
+        ret = ap_fixture.read_diagnosis_state()
+
+        # Assert
+        ap_fixture.read_reg_data.assert_called_once_with(11000, length=6)
+        assert ret.state["Current"] is True
+        assert ret.active_count == 1
+        assert ret.latest_module == 2
+        assert ret.latest_code == 0x06010010
+
+    def test_read_all_diagnoses(self, ap_fixture):
+        """Test read_all_diagnoses reads all diagnosis blocks in chunks"""
+        # Arrange
+        diagnosis = ModuleDiagnosis("Description", "0x06010010", "Guideline", "Name")
+        modules = [
+            Mock(
+                system_entry_registers=SystemEntryRegisters(diagnosis=11006 + 6 * i),
+                module_dicts=Mock(diagnosis={0x06010010: diagnosis}),
+            )
+            for i in range(25)
+        ]
+        for i, module in enumerate(modules):
+            module.is_function_supported.return_value = i != 3
+        ap_fixture._modules = modules
+        codes = {2: 0x06010010, 3: 0x1, 24: 0x1234}
+
+        def execute_batch(requests):
+            return [
+                b"".join(
+                    bytes(8) + codes.get((register - 11006) // 6, 0).to_bytes(4, "little")
+                    for register in range(
+                        request.register, request.register + request.length, 6
+                    )
+                )
+                for request in requests
+            ]
+
+        ap_fixture.execute_batch = Mock(side_effect=execute_batch)
+
+        # Act
+        ret = ap_fixture.read_all_diagnoses()
+
+        # Assert
+        ap_fixture.execute_batch.assert_called_once_with(
+            [ReadRequest(11006, 120), ReadRequest(11126, 30)]
+        )
+        assert ret == [
+            ActiveDiagnosis(modules[2], 0x06010010, diagnosis),
+            ActiveDiagnosis(modules[24], 0x1234, None),
+        ]
+
+    def test_read_all_diagnoses_no_modules(self, ap_fixture):
+        """Test read_all_diagnoses without modules with diagnosis"""
+        # Arrange
+        ap_fixture._modules = []
+        ap_fixture.execute_batch = Mock()
+
+        # Act
+        ret = ap_fixture.read_all_diagnoses()
+
+        # Assert
+        assert ret == []
+        ap_fixture.execute_batch.assert_not_called()
+
+    def test_diagnosis_monitor(self, ap_fixture):
+        """Test diagnosis_monitor returns a monitor of the system"""
+        # Act
+        monitor = ap_fixture.diagnosis_monitor(history_size=10)
+
+        # Assert
+        assert monitor.cpx is ap_fixture
+        assert monitor.history.maxlen == 10
+
     def test_read_active_diagnosis_count(self, ap_fixture):
         # Arrange
         ap_fixture.read_reg_data = Mock(return_value=b"\x01\x00\x00\x00")
@@ -673,3 +873,131 @@ class TestCpxAp:
         )
 
         assert ret == 2
+
+    def test_read_parameters(self, ap_fixture):
+        """Test read_parameters reads all parameters in order"""
+        # Arrange
+        parameter = Parameter(
+            parameter_id=1,
+            parameter_instances={},
+            is_writable=True,
+            array_size=0,
+            data_type="UINT8",
+            default_value=0,
+            description="description",
+            name="name",
+        )
+        ap_fixture._read_parameter_raw = Mock(side_effect=[b"\x02", b"\x03"])
+
+        # Act
+        ret = ap_fixture.read_parameters(12, [(parameter, 0), (parameter, 1)])
+
+        # Assert
+        assert ret == [2, 3]
+        assert ap_fixture._read_parameter_raw.call_args_list == [
+            call(12, 1, 0),
+            call(12, 1, 1),
+        ]
+
+    def test_read_parameter_raw_prefetched(self, ap_fixture):
+        """Test _read_parameter_raw gets short data with the status poll"""
+        # Arrange
+        ap_fixture.write_reg_data = Mock()
+        ap_fixture.read_reg_data = Mock(
+            side_effect=[
+                b"\x03\x00" + bytes(20),
+                b"\x10\x00\x03\x00" + bytes(10) + b"\x01\x02\x03\x00" + bytes(4),
+            ]
+        )
+
+        # Act
+        ret = ap_fixture._read_parameter_raw(0, 20074, 1)
+
+        # Assert
+        assert ret == b"\x01\x02\x03\x00"
+        ap_fixture.write_reg_data.assert_called_once_with(
+            b"\x01\x00\x6a\x4e\x01\x00\x01\x00", 10000
+        )
+        assert ap_fixture.read_reg_data.call_args_list == [call(10003, 11)] * 2
+
+    def test_read_parameter_raw_long(self, ap_fixture):
+        """Test _read_parameter_raw reads the data exceeding the status poll"""
+        # Arrange
+        ap_fixture.write_reg_data = Mock()
+        ap_fixture.read_reg_data = Mock(
+            side_effect=[
+                b"\x10\x00\x0c\x00" + bytes(10) + b"\x01" * 8,
+                b"\x02" * 4,
+            ]
+        )
+
+        # Act
+        ret = ap_fixture._read_parameter_raw(0, 1, 0)
+
+        # Assert
+        assert ret == b"\x01" * 8 + b"\x02" * 4
+        assert ap_fixture.read_reg_data.call_args_list == [
+            call(10003, 11),
+            call(10014, 2),
+        ]
+
+    def test_isdu_batch(self, ap_fixture):
+        """Test isdu_batch converts the jobs and results"""
+        # Arrange
+        module = Mock(spec=ApModule, position=3)
+        module.is_function_supported.return_value = True
+        ap_fixture._modules = [Mock(), Mock(), Mock(), module]
+        ap_fixture.isdu.batch = Mock(return_value=[b"Festo\x00", None, b"\x2a"])
+
+        # Act
+        ret = ap_fixture.isdu_batch(
+            [
+                (3, 0, 0x10, 0, "str"),
+                IsduJob(module, 1, 0x18, data="TAG"),
+                (module, 2, 0x3C, 1, "int"),
+            ]
+        )
+
+        # Assert
+        ap_fixture.isdu.batch.assert_called_once_with(
+            [
+                (3, 0, 0x10, 0, None, IsduCommand.READ),
+                (3, 1, 0x18, 0, b"TAG", IsduCommand.WRITE),
+                (3, 2, 0x3C, 1, None, IsduCommand.READ_SWAPPED),
+            ]
+        )
+        assert [r.value for r in ret] == ["Festo", None, 42]
+        assert all(r.ok for r in ret)
+        assert ret[1].job.data == "TAG"
+
+    def test_isdu_batch_errors_per_job(self, ap_fixture):
+        """Test isdu_batch returns errors per job instead of raising"""
+        # Arrange
+        module = Mock(spec=ApModule, position=0)
+        module.is_function_supported.return_value = True
+        unsupported = Mock(spec=ApModule, position=1)
+        unsupported.is_function_supported.return_value = False
+        ap_fixture._modules = [module, unsupported]
+        error = CpxRequestError("ISDU failed")
+        ap_fixture.isdu.batch = Mock(return_value=[error, b"\x01"])
+
+        # Act
+        ret = ap_fixture.isdu_batch(
+            [
+                (0, 0, 0x10, 0, "str"),
+                (1, 0, 0x10, 0, "raw"),
+                (5, 0, 0x10, 0, "raw"),
+                (0, 0, 0x10, 0, "unknown"),
+                (0, 0, 0x10, 0, "float", 1.5),
+                (0, 1, 0x10, 0, "bool"),
+            ]
+        )
+
+        # Assert
+        assert len(ap_fixture.isdu.batch.call_args.args[0]) == 2
+        assert ret[0].error is error
+        assert isinstance(ret[1].error, NotImplementedError)
+        assert isinstance(ret[2].error, IndexError)
+        assert isinstance(ret[3].error, TypeError)
+        assert isinstance(ret[4].error, TypeError)
+        assert ret[5].ok and ret[5].value is True
@@ -1,16 +1,24 @@
 """Contains tests for CpxE class"""
 
+import threading
 from unittest.mock import Mock, patch, call
 import pytest
-from cpx_io.cpx_system.cpx_e.cpx_e import CpxE
+from cpx_io.cpx_system.cpx_e.cpx_e import CpxE, CpxFunctionNumberTimeoutError
 
 from cpx_io.cpx_system.cpx_e.eep import CpxEEp
 from cpx_io.cpx_system.cpx_e.e16di import CpxE16Di
 from cpx_io.cpx_system.cpx_e.e8do import CpxE8Do
 from cpx_io.cpx_system.cpx_e.e4aiui import CpxE4AiUI
 from cpx_io.cpx_system.cpx_e.e4aoui import CpxE4AoUI
+from cpx_io.cpx_system.cpx_e.e4iol import CpxE4Iol
 
 from cpx_io.cpx_system.cpx_e.cpx_e import CpxInitError
+from cpx_io.cpx_system.cpx_dataclasses import (
+    HealthChange,
+    ProcessImage,
+    ReadRequest,
+    WriteRequest,
+)
 import cpx_io.cpx_system.cpx_e.cpx_e_registers as cpx_e_registers
 
 from cpx_io.utils.logging import Logging
@@ -379,3 +387,625 @@ class TestCpxE:
                 call(*cpx_e_registers.DATA_SYSTEM_TABLE_READ),
             ]
         )
+
+
+class TestCpxEFunctionNumberCache:
+    """Test the function number cache and configuration() of CpxE"""
+
+    @pytest.fixture(name="cpx_e")
+    def fixture_cpx_e(self):
+        """CpxE with 16DI and 4IOL and a mocked system table"""
+        cpx_e = CpxE([CpxEEp(), CpxE16Di(), CpxE4Iol()])
+        table = {}
+        cpx_e._read_function_number_uncached = Mock(
+            side_effect=lambda function_number: table.get(function_number, 0)
+        )
+        cpx_e._write_function_number_uncached = Mock(side_effect=table.__setitem__)
+        return cpx_e
+
+    def test_read_function_number_cached(self, cpx_e):
+        """Test that module parameters are only read once"""
+        # Act
+        values = [cpx_e.read_function_number(4828 + 64 + 1) for _ in range(3)]
+
+        # Assert
+        assert values == [0, 0, 0]
+        cpx_e._read_function_number_uncached.assert_called_once_with(4828 + 64 + 1)
+
+    def test_read_function_number_not_module_parameter(self, cpx_e):
+        """Test that function numbers outside the module parameters are not cached"""
+        # Act
+        cpx_e.read_function_number(43)
+        cpx_e.read_function_number(43)
+
+        # Assert
+        assert cpx_e._read_function_number_uncached.call_count == 2
+
+    def test_read_function_number_cache_disabled(self, cpx_e):
+        """Test read_function_number with disabled cache"""
+        # Arrange
+        cpx_e.function_number_cache = False
+
+        # Act
+        cpx_e.read_function_number(4828 + 64)
+        cpx_e.read_function_number(4828 + 64)
+
+        # Assert
+        assert cpx_e._read_function_number_uncached.call_count == 2
+
+    def test_write_function_number_write_through(self, cpx_e):
+        """Test that written values are read from the cache"""
+        # Act
+        cpx_e.write_function_number(4828 + 64, 0xAA)
+        value = cpx_e.read_function_number(4828 + 64)
+
+        # Assert
+        assert value == 0xAA
+        cpx_e._read_function_number_uncached.assert_not_called()
+
+    def test_write_function_number_failed(self, cpx_e):
+        """Test that a failed write removes the cache entry"""
+        # Arrange
+        cpx_e.read_function_number(4828 + 64)
+        cpx_e._write_function_number_uncached.side_effect = ConnectionError
+
+        # Act
+        with pytest.raises(ConnectionError):
+            cpx_e.write_function_number(4828 + 64, 0xAA)
+        cpx_e.read_function_number(4828 + 64)
+
+        # Assert
+        assert cpx_e._read_function_number_uncached.call_count == 2
+
+    def test_status_parameters_expire(self, cpx_e):
+        """Test that status parameters are read again after status_cache_time"""
+        # Arrange
+        line_state = 4828 + 64 * 2 + 24
+
+        # Act
+        cpx_e.read_function_number(line_state)
+        cpx_e.read_function_number(line_state)
+        cpx_e.status_cache_time = 0
+        cpx_e.read_function_number(line_state)
+
+        # Assert
+        assert cpx_e._read_function_number_uncached.call_count == 2
+
+    def test_invalidate_function_number_cache(self, cpx_e):
+        """Test invalidate_function_number_cache"""
+        # Arrange
+        cpx_e.read_function_number(4828 + 64)
+        cpx_e.read_function_number(4828 + 128)
+
+        # Act
+        cpx_e.invalidate_function_number_cache(1)
+        cpx_e.read_function_number(4828 + 64)
+        cpx_e.read_function_number(4828 + 128)
+        cpx_e.invalidate_function_number_cache()
+        cpx_e.read_function_number(4828 + 128)
+
+        # Assert
+        assert cpx_e._read_function_number_uncached.call_args_list == [
+            call(4828 + 64),
+            call(4828 + 128),
+            call(4828 + 64),
+            call(4828 + 128),
+        ]
+
+    def test_configuration(self, cpx_e):
+        """Test that configuration() writes every changed function number once"""
+        # Arrange
+        module = cpx_e.modules[1]
+
+        # Act
+        with module.configuration():
+            module.configure_diagnostics(True)
+            module.configure_power_reset(False)
+            module.configure_debounce_time(1)
+            module.configure_signal_extension_time(2)
+            cpx_e._write_function_number_uncached.assert_not_called()
+
+        # Assert
+        assert cpx_e._write_function_number_uncached.call_args_list == [
+            call(4828 + 64, 0x01),
+            call(4828 + 64 + 1, 0x90),
+        ]
+        assert cpx_e._read_function_number_uncached.call_count == 2
+
+    def test_configuration_unchanged(self, cpx_e):
+        """Test that configuration() skips function numbers with unchanged value"""
+        # Arrange
+        module = cpx_e.modules[1]
+
+        # Act
+        with module.configuration():
+            module.configure_diagnostics(False)
+
+        # Assert
+        cpx_e._write_function_number_uncached.assert_not_called()
+
+    def test_configuration_exception(self, cpx_e):
+        """Test that configuration() discards the changes on exception"""
+        # Arrange
+        module = cpx_e.modules[1]
+
+        # Act
+        with pytest.raises(ValueError):
+            with module.configuration():
+                module.configure_diagnostics(True)
+                raise ValueError
+
+        # Assert
+        cpx_e._write_function_number_uncached.assert_not_called()
+        assert cpx_e.read_function_number(4828 + 64) == 0
+
+    def test_configuration_nested(self, cpx_e):
+        """Test that the outermost configuration() writes the changes"""
+        # Arrange
+        module = cpx_e.modules[1]
+
+        # Act
+        with cpx_e.configuration():
+            with module.configuration():
+                module.configure_diagnostics(True)
+            cpx_e._write_function_number_uncached.assert_not_called()
+
+        # Assert
+        cpx_e._write_function_number_uncached.assert_called_once_with(4828 + 64, 0x01)
+
+    def test_configuration_module_without_base(self):
+        """Test configuration() of a module that was not added to a base"""
+        # Arrange
+        module = CpxE16Di()
+
+        # Act & Assert
+        with pytest.raises(CpxInitError):
+            with module.configuration():
+                pass
+
+
+class TestCpxEFunctionNumberHandshake:
+    """Test the function number handshake of CpxE"""
+
+    def test_handshake_statistics(self):
+        """Test that handshakes are counted"""
+        # Arrange
+        cpx_e = CpxE()
+        cpx_e.read_reg_data = Mock(side_effect=[b"\x00\x00", b"\x00\x80", b"\x2a\x00"])
+        cpx_e.write_reg_data = Mock()
+
+        # Act
+        value = cpx_e.read_function_number(1)
+        statistics = cpx_e.handshake_statistics()
+
+        # Assert
+        assert value == 42
+        assert statistics["read"]["polls"] == 2
+        assert statistics["read"]["timeouts"] == 0
+        assert statistics["read"]["latency"]["count"] == 1
+        assert statistics["write"]["latency"]["count"] == 0
+
+    def test_handshake_timeout(self):
+        """Test that a missing acknowledge raises after handshake_timeout"""
+        # Arrange
+        cpx_e = CpxE([CpxEEp(), CpxE16Di()])
+        cpx_e.read_reg_data = Mock(return_value=b"\x00\x00")
+        cpx_e.write_reg_data = Mock()
+        cpx_e.handshake_timeout = 0.05
+        cpx_e.handshake_fast_poll_time = 0
+
+        # Act
+        with pytest.raises(CpxFunctionNumberTimeoutError) as excinfo:
+            cpx_e.write_function_number(4828 + 64 + 1, 0)
+
+        # Assert
+        assert isinstance(excinfo.value, ConnectionError)
+        assert excinfo.value.function_number == 4828 + 64 + 1
+        assert excinfo.value.module is cpx_e.modules[1]
+        assert "cpxe16di" in str(excinfo.value)
+        statistics = cpx_e.handshake_statistics()
+        assert statistics["write"]["timeouts"] == 1
+        # backoff instead of back to back polling
+        assert statistics["write"]["polls"] < 20
+
+    def test_handshake_timeout_system_function_number(self):
+        """Test the timeout of a function number that belongs to no module"""
+        # Arrange
+        cpx_e = CpxE()
+        cpx_e.read_reg_data = Mock(return_value=b"\x00\x00")
+        cpx_e.write_reg_data = Mock()
+        cpx_e.handshake_timeout = 0
+
+        # Act & Assert
+        with pytest.raises(CpxFunctionNumberTimeoutError) as excinfo:
+            cpx_e.read_function_number(43)
+        assert excinfo.value.module is None
+        cpx_e.read_reg_data.assert_called_once()
+
+
+class TestCpxEProcessImage:
+    """Test read_process_image of CpxE"""
+
+    def test_read_process_image(self):
+        """Test that the inputs of all modules are read with one request"""
+        # Arrange
+        cpx_e = CpxE([CpxEEp(), CpxE16Di(), CpxE4AiUI()])
+        data = b"\x00" * 6 + b"\x01\x00\xaa\xaa" + b"\x05\x00" * 4 + b"\x00\x00"
+        cpx_e.execute_batch = Mock(return_value=[data])
+
+        # Act
+        image = cpx_e.read_process_image()
+        snapshots = [module.read_snapshot(image) for module in cpx_e.modules[1:]]
+
+        # Assert
+        cpx_e.execute_batch.assert_called_once_with([ReadRequest(45392, 10)])
+        assert image == ProcessImage(45392, data)
+        assert snapshots[0].channels == [True] + [False] * 15
+        assert snapshots[0].status == [False, True] * 8
+        assert snapshots[1].channels == [5, 5, 5, 5]
+
+    def test_read_process_image_large_system(self):
+        """Test that large systems are read with several requests"""
+        # Arrange
+        cpx_e = CpxE([CpxEEp()] + [CpxE4AiUI() for _ in range(30)])
+        cpx_e.execute_batch = Mock(return_value=[b"\x00" * 250, b"\x00" * 56])
+
+        # Act
+        image = cpx_e.read_process_image()
+
+        # Assert
+        cpx_e.execute_batch.assert_called_once_with(
+            [ReadRequest(45392, 125), ReadRequest(45517, 28)]
+        )
+        assert len(image.data) == 306
+
+    def test_process_image_read_invalid_register(self):
+        """Test ProcessImage.read outside of the image"""
+        # Arrange
+        image = ProcessImage(10, b"\x00\x00")
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            image.read(10, 2)
+        with pytest.raises(ValueError):
+            image.read(9)
+
+
+class TestCpxEOutputImage:
+    """Test the output image of CpxE"""
+
+    @pytest.fixture(name="cpx_e")
+    def fixture_cpx_e(self):
+        """CpxE with output modules at 40003 (8DO), 40004 (4AOUI) and 40008 (8DO)
+        and mocked execute_batch"""
+        cpx_e = CpxE([CpxEEp(), CpxE8Do(), CpxE4AoUI(), CpxE8Do()])
+        registers = {register: b"\x00\x00" for register in range(40001, 40009)}
+        registers[40008] = b"\x80\x00"
+
+        def execute_batch(requests):
+            results = []
+            for request in requests:
+                if isinstance(request, ReadRequest):
+                    results.append(
+                        b"".join(
+                            registers[request.register + i]
+                            for i in range(request.length)
+                        )
+                    )
+                else:
+                    for i in range(len(request.data) // 2):
+                        registers[request.register + i] = request.data[
+                            i * 2 : i * 2 + 2
+                        ]
+                    results.append(None)
+            return results
+
+        cpx_e.execute_batch = Mock(side_effect=execute_batch)
+        cpx_e.registers = registers
+        return cpx_e
+
+    def test_write_channel_without_read_back(self, cpx_e):
+        """Test that channel writes only read the outputs once"""
+        # Act
+        cpx_e.modules[1].set_channel(0)
+        cpx_e.modules[1].set_channel(1)
+        cpx_e.modules[3].toggle_channel(7)
+
+        # Assert
+        assert cpx_e.execute_batch.call_args_list == [
+            call([ReadRequest(40003, 6)]),
+            call([WriteRequest(b"\x01\x00", 40003)]),
+            call([WriteRequest(b"\x03\x00", 40003)]),
+            call([WriteRequest(b"\x00\x00", 40008)]),
+        ]
+
+    def test_output_batch(self, cpx_e):
+        """Test that output_batch writes the changed registers with one batch"""
+        # Arrange
+        cpx_e.sync_output_image()
+
+        # Act
+        with cpx_e.output_batch():
+            cpx_e.modules[1].set_channel(0)
+            cpx_e.modules[2].write_channel(1, 1000)
+            cpx_e.modules[2].write_channel(2, 2000)
+            cpx_e.modules[3].clear_channel(7)
+
+        # Assert
+        cpx_e.execute_batch.assert_called_with(
+            [
+                WriteRequest(b"\x01\x00", 40003),
+                WriteRequest(b"\xe8\x03\xd0\x07", 40005),
+                WriteRequest(b"\x00\x00", 40008),
+            ]
+        )
+        assert cpx_e.execute_batch.call_count == 2
+
+    def test_output_batch_all_modules(self, cpx_e):
+        """Test output_batch that writes all module outputs with one request"""
+        # Arrange
+        cpx_e.sync_output_image()
+
+        # Act
+        with cpx_e.output_batch(all_modules=True):
+            cpx_e.modules[1].set_channel(0)
+
+        # Assert
+        cpx_e.execute_batch.assert_called_with(
+            [WriteRequest(b"\x01\x00" + b"\x00\x00" * 4 + b"\x80\x00", 40003)]
+        )
+
+    def test_output_batch_exception(self, cpx_e):
+        """Test that output_batch discards the changes on exception"""
+        # Arrange
+        cpx_e.sync_output_image()
+
+        # Act
+        with pytest.raises(ValueError):
+            with cpx_e.output_batch():
+                cpx_e.modules[1].set_channel(0)
+                raise ValueError
+        value = cpx_e.read_output_image(40003)
+
+        # Assert
+        assert value == b"\x00\x00"
+        assert all(
+            isinstance(request, ReadRequest)
+            for args in cpx_e.execute_batch.call_args_list
+            for request in args.args[0]
+        )
+
+    def test_output_batch_other_thread(self, cpx_e):
+        """Test that writes of another thread during output_batch do not flush the
+        changes of the batch"""
+        # Arrange
+        cpx_e.sync_output_image()
+
+        # Act
+        with cpx_e.output_batch():
+            cpx_e.modules[1].set_channel(0)
+            thread = threading.Thread(target=cpx_e.modules[3].clear_channel, args=(7,))
+            thread.start()
+            thread.join()
+            during = dict(cpx_e.registers)
+            image = cpx_e.read_output_image(40003)
+
+        # Assert
+        assert during[40003] == b"\x00\x00"
+        assert during[40008] == b"\x00\x00"
+        assert image == b"\x01\x00"
+        assert cpx_e.registers[40003] == b"\x01\x00"
+        cpx_e.execute_batch.assert_called_with([WriteRequest(b"\x01\x00", 40003)])
+
+    def test_sync_output_image_keeps_changes(self, cpx_e):
+        """Test that sync_output_image keeps registers that were not flushed yet"""
+        # Arrange
+        cpx_e.sync_output_image()
+        cpx_e.registers[40004] = b"\x01\x00"
+
+        # Act
+        with cpx_e.output_batch():
+            cpx_e.modules[1].set_channel(0)
+            cpx_e.sync_output_image()
+            image = cpx_e.read_output_image(40003, 2)
+
+        # Assert
+        assert image == b"\x01\x00\x01\x00"
+        assert cpx_e.registers[40003] == b"\x01\x00"
+
+    @pytest.mark.parametrize("input_value", [40001, 40008 + 1])
+    def test_write_output_image_invalid_register(self, cpx_e, input_value):
+        """Test write_output_image with register that is no module output"""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            cpx_e.write_output_image(b"\x00\x00", input_value)
+
+
+class TestCpxETopology:
+    """Test the typecode tokenizer and the module discovery of CpxE"""
+
+    @pytest.fixture(name="topology_cache")
+    def fixture_topology_cache(self, tmp_path):
+        """Path of an empty topology cache"""
+        return str(tmp_path / "topology.json")
+
+    def mock_system(
+        self,
+        cpx_e,
+        configuration=b"\x0f\x00\x00\x00\x00\x00",
+        module_codes=(0xC1, 0xC2, 0xC3, 0xC4),
+    ):
+        """Mocks module configuration, device identification and module codes"""
+
+        def read_function_number(function_number):
+            if function_number == 43:
+                return 0x1234
+            return module_codes[function_number // 16 - 1]
+
+        cpx_e.read_reg_data = Mock(return_value=configuration)
+        cpx_e.read_function_number = Mock(side_effect=read_function_number)
+        return cpx_e
+
+    @pytest.mark.parametrize(
+        "input_value, expected_value",
+        [
+            ("60E-EP-", ["EP"]),
+            ("60E-EP-MLNINO", ["EP", "M", "L", "NI", "NO"]),
+            ("60E-EP-2T51T53", ["EP", "T51", "T51", "T53"]),
+            ("60E-EP-12M", ["EP"] + ["M"] * 12),
+        ],
+    )
+    def test_tokenize_typecode(self, input_value, expected_value):
+        """Test tokenize_typecode"""
+        # Act
+        module_ids = CpxE.tokenize_typecode(input_value)
+
+        # Assert
+        assert module_ids == expected_value
+
+    @pytest.mark.parametrize("input_value", ["60E-EP-MX", "60E-EP-3", "60E-EP-T5"])
+    def test_tokenize_typecode_unknown_module(self, input_value):
+        """Test tokenize_typecode with unknown module"""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            CpxE.tokenize_typecode(input_value)
+
+    def test_read_fingerprint(self):
+        """Test read_fingerprint"""
+        # Arrange
+        cpx_e = self.mock_system(CpxE())
+
+        # Act
+        fingerprint = cpx_e.read_fingerprint()
+
+        # Assert
+        assert fingerprint == "1234-00000000000f-c1.c2.c3.c4"
+        cpx_e.read_reg_data.assert_called_once_with(
+            *cpx_e_registers.MODULE_CONFIGURATION
+        )
+        assert cpx_e.read_function_number.call_args_list == [
+            call(43),
+            call(16),
+            call(32),
+            call(48),
+            call(64),
+        ]
+
+    def test_save_topology_and_discover(self, topology_cache):
+        """Test that a saved topology is used for modules='auto'"""
+        # Arrange
+        learned = self.mock_system(CpxE("60E-EP-MLT51"))
+        learned.topology_cache = topology_cache
+        learned.save_topology()
+        cpx_e = self.mock_system(CpxE(topology_cache=topology_cache))
+
+        # Act
+        cpx_e.modules = "auto"
+
+        # Assert
+        assert [type(m) for m in cpx_e.modules] == [
+            CpxEEp,
+            CpxE16Di,
+            CpxE8Do,
+            CpxE4Iol,
+        ]
+        assert cpx_e.modules[3].system_entry_registers.inputs == 45392 + 3 + 2 + 2
+
+    def test_discover_other_module_types(self, topology_cache):
+        """Test modules='auto' with a system that has other module types on the same
+        positions as a saved topology"""
+        # Arrange
+        learned = self.mock_system(CpxE("60E-EP-MLT51"))
+        learned.topology_cache = topology_cache
+        learned.save_topology()
+        cpx_e = self.mock_system(
+            CpxE(topology_cache=topology_cache), module_codes=(0xC1, 0xC2, 0xC5, 0xC4)
+        )
+
+        # Act & Assert
+        with pytest.raises(CpxInitError):
+            cpx_e.modules = "auto"
+
+    def test_discover_unknown_system(self, topology_cache):
+        """Test modules='auto' with a system that is not in the topology cache"""
+        # Arrange
+        cpx_e = self.mock_system(CpxE(topology_cache=topology_cache))
+
+        # Act & Assert
+        with pytest.raises(CpxInitError):
+            cpx_e.modules = "auto"
+
+    def test_discover_without_topology_cache(self):
+        """Test modules='auto' without topology cache"""
+        # Arrange
+        cpx_e = self.mock_system(CpxE())
+
+        # Act & Assert
+        with pytest.raises(CpxInitError):
+            cpx_e.modules = "auto"
+
+    def test_save_topology_mismatch(self, topology_cache):
+        """Test save_topology with a module list that does not match the system"""
+        # Arrange
+        cpx_e = self.mock_system(CpxE("60E-EP-ML", topology_cache=topology_cache))
+
+        # Act & Assert
+        with pytest.raises(CpxInitError):
+            cpx_e.save_topology()
+
+
+class TestCpxEHealth:
+    """Test read_health and read_health_changes of CpxE"""
+
+    def health_data(self, configuration=b"\x0f", faults=b"\x00", status=b"\x00\x00"):
+        """Register content from MODULE_CONFIGURATION to STATUS_REGISTER"""
+        data = bytearray(50)
+        data[0 : len(configuration)] = configuration
+        data[32 : 32 + len(faults)] = faults
+        data[48:50] = status
+        return bytes(data)
+
+    def test_read_health(self):
+        """Test read_health"""
+        # Arrange
+        cpx_e = CpxE()
+        cpx_e.read_reg_data = Mock(
+            return_value=self.health_data(b"\x3f\x01", b"\x04\x00\x80", b"\x00\x08")
+        )
+
+        # Act
+        health = cpx_e.read_health()
+
+        # Assert
+        cpx_e.read_reg_data.assert_called_once_with(45367, 25)
+        assert health.module_bitmap == 0x013F
+        assert health.module_count == 7
+        assert health.faults == [i in (2, 23) for i in range(24)]
+        assert health.write_protected is True
+        assert health.force_active is False
+
+    def test_read_health_changes(self):
+        """Test that read_health_changes only reports transitions"""
+        # Arrange
+        cpx_e = CpxE()
+        cpx_e.read_reg_data = Mock(
+            side_effect=[
+                self.health_data(),
+                self.health_data(),
+                self.health_data(faults=b"\x02", status=b"\x00\x80"),
+            ]
+        )
+
+        # Act
+        first = cpx_e.read_health_changes()
+        second = cpx_e.read_health_changes()
+        third = cpx_e.read_health_changes()
+
+        # Assert
+        assert len(first) == 3 + 24
+        assert HealthChange("module_bitmap", None, 0x0F) in first
+        assert not second
+        assert third == [
+            HealthChange("force_active", False, True),
+            HealthChange("fault", False, True, 1),
+        ]
@@ -5,7 +5,7 @@ import pytest
 
 from cpx_io.cpx_system.cpx_e.e16di import CpxE16Di
 from cpx_io.cpx_system.cpx_e.cpx_e_enums import DebounceTime, SignalExtension
-from cpx_io.cpx_system.cpx_dataclasses import SystemEntryRegisters
+from cpx_io.cpx_system.cpx_dataclasses import ProcessImage, SystemEntryRegisters
 
 
 class TestCpxE16Di:
@@ -49,6 +49,37 @@ class TestCpxE16Di:
         # Assert
         assert status == [False, True] * 8
 
+    def test_read_snapshot(self):
+        """Test read_snapshot"""
+        # Arrange
+        cpxe16di = CpxE16Di()
+        cpxe16di.system_entry_registers = SystemEntryRegisters(inputs=0)
+        cpxe16di.base = Mock(read_reg_data=Mock(return_value=b"\x01\x00\xaa\xaa"))
+
+        # Act
+        snapshot = cpxe16di.read_snapshot()
+
+        # Assert
+        assert snapshot.channels == [True] + [False] * 15
+        assert snapshot.status == [False, True] * 8
+        cpxe16di.base.read_reg_data.assert_called_once_with(0, 2)
+
+    def test_read_snapshot_process_image(self):
+        """Test read_snapshot with process image"""
+        # Arrange
+        cpxe16di = CpxE16Di()
+        cpxe16di.system_entry_registers = SystemEntryRegisters(inputs=10)
+        cpxe16di.base = Mock()
+        image = ProcessImage(8, b"\x00" * 4 + b"\x01\x00\xaa\xaa")
+
+        # Act
+        snapshot = cpxe16di.read_snapshot(image)
+
+        # Assert
+        assert snapshot.channels == [True] + [False] * 15
+        assert snapshot.status == [False, True] * 8
+        cpxe16di.base.read_reg_data.assert_not_called()
+
     def test_read_channel_0_to_15(self):
         """Test read channels"""
         # Arrange
@@ -55,6 +55,31 @@ class TestCpxE1Ci:
         # Assert
         assert status == [False, True] * 8
 
+    def test_read_snapshot(self):
+        """Test read_snapshot"""
+        # Arrange
+        cpxe1ci = CpxE1Ci()
+        cpxe1ci.system_entry_registers = SystemEntryRegisters(inputs=0)
+        cpxe1ci.base = Mock(
+            read_reg_data=Mock(
+                return_value=b"\x01\x00\x02\x00\x03\x00\x00\x00\x01\x00\x00\x00"
+                b"\x04\x00\xaa\xaa"
+            )
+        )
+
+        # Act
+        snapshot = cpxe1ci.read_snapshot()
+
+        # Assert
+        assert snapshot.value == 0x00020001
+        assert snapshot.latching_value == 3
+        assert snapshot.status_word.di0
+        assert not snapshot.status_word.di1
+        assert snapshot.process_data.set_counter
+        assert not snapshot.process_data.block_counter
+        assert snapshot.status == [False, True] * 8
+        cpxe1ci.base.read_reg_data.assert_called_once_with(0, 8)
+
     def test_read_value(self):
         """Test read channels"""
         # Arrange
@@ -683,3 +708,38 @@ class TestCpxE1Ci:
 
         # Assert
         assert module_repr == "cpxe1ci (idx: 1, type: CpxE1Ci)"
+
+    def test_read_counter_limits(self):
+        """Test read_counter_limits"""
+        # Arrange
+        cpxe1ci = CpxE1Ci()
+        cpxe1ci.position = 1
+        function_number = 4828 + 64
+        parameters = {
+            function_number + 16: 0xE8,
+            function_number + 17: 0x03,
+            function_number + 20: 0x0A,
+        }
+        cpxe1ci.base = Mock(
+            read_function_number=Mock(side_effect=lambda f: parameters.get(f, 0))
+        )
+
+        # Act
+        limits = cpxe1ci.read_counter_limits()
+
+        # Assert
+        assert limits == (10, 1000)
+
+    def test_sampler(self):
+        """Test sampler"""
+        # Arrange
+        cpxe1ci = CpxE1Ci()
+        cpxe1ci.system_entry_registers = SystemEntryRegisters(inputs=0)
+        cpxe1ci.base = Mock(read_reg_data=Mock(return_value=b"\x00\x00"))
+
+        # Act
+        sampler = cpxe1ci.sampler(limits=(0, 100), window=3)
+
+        # Assert
+        assert sampler.module is cpxe1ci
+        assert sampler.window == 3
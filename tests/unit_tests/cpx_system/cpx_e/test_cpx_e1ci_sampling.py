@@ -0,0 +1,151 @@
+"""Contains tests for CounterSampler class"""
+
+import time
+from unittest.mock import Mock, patch
+import pytest
+from cpx_io.cpx_system.cpx_e.e1ci import CpxE1Ci
+from cpx_io.cpx_system.cpx_e.e1ci_sampling import CounterSampler
+
+
+def snapshot(value):
+    """Snapshot of a counter module with the given value"""
+    return CpxE1Ci.Snapshot(
+        value=value,
+        latching_value=0,
+        status_word=None,
+        process_data=None,
+        status=[False] * 16,
+    )
+
+
+class TestCounterSampler:
+    """Test CounterSampler"""
+
+    def make_sampler(self, values, limits=(0, 999), **kwargs):
+        """Sampler of a mocked module that returns values, one per sample"""
+        module = Mock(
+            read_snapshot=Mock(side_effect=[snapshot(v) for v in values]),
+            read_process_data=Mock(return_value=CpxE1Ci.ProcessData.from_int(0)),
+        )
+        module.name = "cpxe1ci"
+        return CounterSampler(module, limits=limits, **kwargs)
+
+    def test_constructor_reads_limits(self):
+        """Test that the count limits are read from the module if not given"""
+        # Arrange
+        module = Mock(
+            read_counter_limits=Mock(return_value=(10, 100)),
+            read_process_data=Mock(return_value=CpxE1Ci.ProcessData.from_int(0)),
+        )
+
+        # Act
+        sampler = CounterSampler(module)
+
+        # Assert
+        assert (sampler.lower_limit, sampler.upper_limit) == (10, 100)
+
+    def test_constructor_speed_measurement(self):
+        """Test that a module in speed measurement mode is rejected"""
+        # Arrange
+        module = Mock(
+            read_process_data=Mock(return_value=CpxE1Ci.ProcessData.from_int(0b100000))
+        )
+
+        # Act & Assert
+        with pytest.raises(ValueError, match="speed measurement"):
+            CounterSampler(module, limits=(0, 999))
+
+    @pytest.mark.parametrize(
+        "input_value", [{"limits": (100, 100)}, {"limits": (0, 10), "window": 1}]
+    )
+    def test_constructor_invalid(self, input_value):
+        """Test constructor with invalid limits or window"""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            CounterSampler(Mock(), **input_value)
+
+    def test_sample_velocity(self):
+        """Test velocity and acceleration estimation"""
+        # Arrange
+        sampler = self.make_sampler([0, 10, 30, 60], window=3)
+
+        # Act
+        with patch("time.monotonic", side_effect=[0, 0, 1, 1, 2, 2, 3, 3]):
+            samples = [sampler.sample() for _ in range(4)]
+
+        # Assert
+        assert [s.timestamp for s in samples] == [0, 1, 2, 3]
+        assert [s.velocity for s in samples] == [None, 10, 15, 25]
+        assert [s.acceleration for s in samples] == [None, None, 5, 7.5]
+        assert sampler.samples() == samples
+
+    @pytest.mark.parametrize(
+        "input_value, expected_value",
+        [
+            ([990, 995, 3, 8], [990, 995, 1003, 1008]),
+            ([5, 1, 995, 990], [5, 1, -5, -10]),
+        ],
+    )
+    def test_sample_overrun(self, input_value, expected_value):
+        """Test that the position continues over the count limits"""
+        # Arrange
+        sampler = self.make_sampler(input_value)
+
+        # Act
+        positions = [sampler.sample().position for _ in input_value]
+
+        # Assert
+        assert positions == expected_value
+        assert sampler.overruns == 1
+
+    def test_buffer_size(self):
+        """Test that the buffer keeps the newest samples"""
+        # Arrange
+        sampler = self.make_sampler(range(5), buffer_size=3)
+
+        # Act
+        for _ in range(5):
+            sampler.sample()
+
+        # Assert
+        assert [s.value for s in sampler.samples()] == [2, 3, 4]
+
+    def test_stream(self):
+        """Test stream with count"""
+        # Arrange
+        sampler = self.make_sampler(range(3), period=0.001)
+
+        # Act
+        values = [s.value for s in sampler.stream(3)]
+
+        # Assert
+        assert values == [0, 1, 2]
+
+    def test_start_stop(self):
+        """Test sampling in a background thread"""
+        # Arrange
+        sampler = self.make_sampler(range(1000), period=0.001)
+
+        # Act
+        with sampler:
+            deadline = time.monotonic() + 2
+            while len(sampler.buffer) < 3 and time.monotonic() < deadline:
+                time.sleep(0.001)
+
+        # Assert
+        assert len(sampler.buffer) >= 3
+        assert sampler.error is None
+
+    def test_start_error(self):
+        """Test that errors of the background thread are kept"""
+        # Arrange
+        sampler = self.make_sampler([], period=0.001)
+        sampler.module.read_snapshot.side_effect = ConnectionError
+
+        # Act
+        sampler.start()
+        sampler._thread.join(timeout=2)  # pylint: disable=protected-access
+        sampler.stop()
+
+        # Assert
+        assert isinstance(sampler.error, ConnectionError)
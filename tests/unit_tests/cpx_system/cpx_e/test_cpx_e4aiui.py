@@ -1,11 +1,12 @@
 """Contains tests for cpx_e4aiui class"""
 
+import struct
 from unittest.mock import Mock, call
 import pytest
 
 from cpx_io.cpx_system.cpx_e.e4aiui import CpxE4AiUI
 from cpx_io.cpx_system.cpx_e.cpx_e_enums import ChannelRange
-from cpx_io.cpx_system.cpx_dataclasses import SystemEntryRegisters
+from cpx_io.cpx_system.cpx_dataclasses import ProcessImage, SystemEntryRegisters
 
 
 class TestCpxE4AiUI:
@@ -49,6 +50,43 @@ class TestCpxE4AiUI:
         # Assert
         assert status == [False, True] * 8
 
+    def test_read_snapshot(self):
+        """Test read_snapshot"""
+        # Arrange
+        cpxe4aiui = CpxE4AiUI()
+        cpxe4aiui.system_entry_registers = SystemEntryRegisters(inputs=0)
+        cpxe4aiui.base = Mock(
+            read_reg_data=Mock(
+                return_value=struct.pack("<hhhh", 1, -2, 3, -4) + b"\xaa\xaa"
+            )
+        )
+
+        # Act
+        snapshot = cpxe4aiui.read_snapshot()
+
+        # Assert
+        assert snapshot.channels == [1, -2, 3, -4]
+        assert snapshot.status == [False, True] * 8
+        cpxe4aiui.base.read_reg_data.assert_called_once_with(0, 5)
+
+    def test_read_snapshot_process_image(self):
+        """Test read_snapshot with process image"""
+        # Arrange
+        cpxe4aiui = CpxE4AiUI()
+        cpxe4aiui.system_entry_registers = SystemEntryRegisters(inputs=10)
+        cpxe4aiui.base = Mock()
+        image = ProcessImage(
+            8, b"\x00" * 4 + struct.pack("<hhhh", 1, -2, 3, -4) + b"\xaa\xaa"
+        )
+
+        # Act
+        snapshot = cpxe4aiui.read_snapshot(image)
+
+        # Assert
+        assert snapshot.channels == [1, -2, 3, -4]
+        assert snapshot.status == [False, True] * 8
+        cpxe4aiui.base.read_reg_data.assert_not_called()
+
     def test_read_channel_0_to_3(self):
         """Test read channels"""
         # Arrange
@@ -560,3 +598,66 @@ class TestCpxE4AiUI:
 
         # Assert
         assert module_repr == "cpxe4aiui (idx: 1, type: CpxE4AiUI)"
+
+    def test_read_channels_scaled(self):
+        """Test read_channels_scaled with data format sign + 15 bit"""
+        # Arrange
+        cpxe4aiui = CpxE4AiUI()
+        cpxe4aiui.position = 1
+        cpxe4aiui.system_entry_registers = SystemEntryRegisters(inputs=0)
+        parameters = {4828 + 64 + 6: 0x00, 4828 + 64 + 13: 0x21, 4828 + 64 + 14: 0x06}
+        cpxe4aiui.base = Mock(
+            read_function_number=Mock(side_effect=parameters.get),
+            read_reg_data=Mock(
+                return_value=struct.pack("<hhhh", 32767, -16384, 16384, 0)
+            ),
+        )
+
+        # Act
+        values = cpxe4aiui.read_channels_scaled()
+
+        # Assert
+        assert values[:3] == pytest.approx([10.0, -5.0, 12.0], abs=1e-3)
+        assert values[3] is None
+
+    def test_read_channel_scaled_linear_scaled(self):
+        """Test read_channel_scaled with data format linear scaled"""
+        # Arrange
+        cpxe4aiui = CpxE4AiUI()
+        cpxe4aiui.position = 1
+        cpxe4aiui.system_entry_registers = SystemEntryRegisters(inputs=0)
+        function_number = 4828 + 64
+        parameters = {
+            function_number + 6: 0x01,
+            function_number + 13: 0x05,
+            function_number + 14: 0x00,
+            # lower limit -1000, upper limit 1000 of channel 0
+            function_number + 17: 0x18,
+            function_number + 18: 0xFC,
+            function_number + 25: 0xE8,
+            function_number + 26: 0x03,
+        }
+        cpxe4aiui.base = Mock(
+            read_function_number=Mock(side_effect=lambda f: parameters.get(f, 0)),
+            read_reg_data=Mock(return_value=struct.pack("<hhhh", 500, 0, 0, 0)),
+        )
+
+        # Act
+        value = cpxe4aiui.read_channel_scaled(0)
+
+        # Assert
+        assert value == pytest.approx(15.0)
+
+    def test_configure_data_format_resets_scaling(self):
+        """Test that configure_data_format reads the scaling again"""
+        # Arrange
+        cpxe4aiui = CpxE4AiUI()
+        cpxe4aiui.position = 1
+        cpxe4aiui.base = Mock(read_function_number=Mock(return_value=0x00))
+        cpxe4aiui.read_scaling()
+
+        # Act
+        cpxe4aiui.configure_data_format(True)
+
+        # Assert
+        assert cpxe4aiui._scaling is None  # pylint: disable=protected-access
@@ -1,10 +1,11 @@
 """Contains tests for cpx_e4aoui class"""
 
+import struct
 from unittest.mock import Mock
 import pytest
 from cpx_io.cpx_system.cpx_e.e4aoui import CpxE4AoUI
 from cpx_io.cpx_system.cpx_e.cpx_e_enums import ChannelRange
-from cpx_io.cpx_system.cpx_dataclasses import SystemEntryRegisters
+from cpx_io.cpx_system.cpx_dataclasses import ProcessImage, SystemEntryRegisters
 
 
 class TestCpxE4AoUI:
@@ -48,6 +49,43 @@ class TestCpxE4AoUI:
         # Assert
         assert status == [False, True] * 8
 
+    def test_read_snapshot(self):
+        """Test read_snapshot"""
+        # Arrange
+        cpxe4aoui = CpxE4AoUI()
+        cpxe4aoui.system_entry_registers = SystemEntryRegisters(inputs=0)
+        cpxe4aoui.base = Mock(
+            read_reg_data=Mock(
+                return_value=struct.pack("<hhhh", 1, -2, 3, -4) + b"\xaa\xaa"
+            )
+        )
+
+        # Act
+        snapshot = cpxe4aoui.read_snapshot()
+
+        # Assert
+        assert snapshot.channels == [1, -2, 3, -4]
+        assert snapshot.status == [False, True] * 8
+        cpxe4aoui.base.read_reg_data.assert_called_once_with(0, 5)
+
+    def test_read_snapshot_process_image(self):
+        """Test read_snapshot with process image"""
+        # Arrange
+        cpxe4aoui = CpxE4AoUI()
+        cpxe4aoui.system_entry_registers = SystemEntryRegisters(inputs=10)
+        cpxe4aoui.base = Mock()
+        image = ProcessImage(
+            8, b"\x00" * 4 + struct.pack("<hhhh", 1, -2, 3, -4) + b"\xaa\xaa"
+        )
+
+        # Act
+        snapshot = cpxe4aoui.read_snapshot(image)
+
+        # Assert
+        assert snapshot.channels == [1, -2, 3, -4]
+        assert snapshot.status == [False, True] * 8
+        cpxe4aoui.base.read_reg_data.assert_not_called()
+
     def test_read_channel_0_to_3(self):
         """Test read channels"""
         # Arrange
@@ -96,26 +134,26 @@ class TestCpxE4AoUI:
         # Arrange
         cpxe4aoui = CpxE4AoUI()
         cpxe4aoui.system_entry_registers = SystemEntryRegisters(outputs=output_register)
-        cpxe4aoui.base = Mock(write_reg_data=Mock())
+        cpxe4aoui.base = Mock(write_output_image=Mock())
 
         # Act
         cpxe4aoui.write_channel(*input_value)
 
         # Assert
-        cpxe4aoui.base.write_reg_data.assert_called_with(*expected_value)
+        cpxe4aoui.base.write_output_image.assert_called_with(*expected_value)
 
     def test_write_channels(self):
         """test write channels"""
         # Arrange
         cpxe4aoui = CpxE4AoUI()
         cpxe4aoui.system_entry_registers = SystemEntryRegisters(outputs=0)
-        cpxe4aoui.base = Mock(write_reg_data=Mock())
+        cpxe4aoui.base = Mock(write_output_image=Mock())
 
         # Act
         cpxe4aoui.write_channels([0, 1, 2, 3])
 
         # Assert
-        cpxe4aoui.base.write_reg_data.assert_called_with(
+        cpxe4aoui.base.write_output_image.assert_called_with(
             b"\x00\x00\x01\x00\x02\x00\x03\x00",
             cpxe4aoui.system_entry_registers.outputs,
         )
@@ -161,13 +199,13 @@ class TestCpxE4AoUI:
         # Arrange
         cpxe4aoui = CpxE4AoUI()
         cpxe4aoui.system_entry_registers = SystemEntryRegisters(outputs=0)
-        cpxe4aoui.base = Mock(write_reg_data=Mock())
+        cpxe4aoui.base = Mock(write_output_image=Mock())
 
         # Act
         cpxe4aoui.write_channels([0, -1, -2, -3])
 
         # Assert
-        cpxe4aoui.base.write_reg_data.assert_called_with(
+        cpxe4aoui.base.write_output_image.assert_called_with(
             b"\x00\x00\xff\xff\xfe\xff\xfd\xff",
             cpxe4aoui.system_entry_registers.outputs,
         )
@@ -177,13 +215,13 @@ class TestCpxE4AoUI:
         # Arrange
         cpxe4aoui = CpxE4AoUI()
         cpxe4aoui.system_entry_registers = SystemEntryRegisters(outputs=0)
-        cpxe4aoui.base = Mock(write_reg_data=Mock())
+        cpxe4aoui.base = Mock(write_output_image=Mock())
 
         # Act
         cpxe4aoui[0] = 1000
 
         # Assert
-        cpxe4aoui.base.write_reg_data.assert_called_with(
+        cpxe4aoui.base.write_output_image.assert_called_with(
             b"\xE8\x03", cpxe4aoui.system_entry_registers.outputs
         )
 
@@ -518,3 +556,78 @@ class TestCpxE4AoUI:
 
         # Assert
         assert module_repr == "cpxe4aoui (idx: 1, type: CpxE4AoUI)"
+
+    def test_read_scaling(self):
+        """Test read_scaling"""
+        # Arrange
+        cpxe4aoui = CpxE4AoUI()
+        cpxe4aoui.position = 1
+        parameters = {4828 + 64 + 6: 0x00, 4828 + 64 + 11: 0x21, 4828 + 64 + 12: 0x76}
+        cpxe4aoui.base = Mock(read_function_number=Mock(side_effect=parameters.get))
+
+        # Act
+        scaling = cpxe4aoui.read_scaling()
+        cpxe4aoui.read_scaling()
+
+        # Assert
+        assert scaling.units == ["V", "V", "mA", "mA"]
+        assert cpxe4aoui.base.read_function_number.call_count == 3
+
+    def test_read_scaling_linear_scaled(self):
+        """Test read_scaling with data format linear scaled"""
+        # Arrange
+        cpxe4aoui = CpxE4AoUI()
+        cpxe4aoui.position = 1
+        cpxe4aoui.base = Mock(read_function_number=Mock(return_value=0x11))
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            cpxe4aoui.read_scaling()
+
+    def test_write_channels_scaled(self):
+        """Test write_channels_scaled"""
+        # Arrange
+        cpxe4aoui = CpxE4AoUI()
+        cpxe4aoui.position = 1
+        cpxe4aoui.system_entry_registers = SystemEntryRegisters(outputs=0)
+        parameters = {4828 + 64 + 6: 0x00, 4828 + 64 + 11: 0x21, 4828 + 64 + 12: 0x76}
+        cpxe4aoui.base = Mock(read_function_number=Mock(side_effect=parameters.get))
+
+        # Act
+        cpxe4aoui.write_channels_scaled([5.0, -10.0, 20.0, 0.0])
+
+        # Assert
+        cpxe4aoui.base.write_output_image.assert_called_once_with(
+            struct.pack("<hhhh", 16384, -32767, 32767, 0), 0
+        )
+
+    def test_write_channel_scaled(self):
+        """Test write_channel_scaled"""
+        # Arrange
+        cpxe4aoui = CpxE4AoUI()
+        cpxe4aoui.position = 1
+        cpxe4aoui.system_entry_registers = SystemEntryRegisters(outputs=0)
+        parameters = {4828 + 64 + 6: 0x00, 4828 + 64 + 11: 0x21, 4828 + 64 + 12: 0x76}
+        cpxe4aoui.base = Mock(read_function_number=Mock(side_effect=parameters.get))
+
+        # Act
+        cpxe4aoui.write_channel_scaled(2, 12.0)
+
+        # Assert
+        cpxe4aoui.base.write_output_image.assert_called_once_with(
+            (16384).to_bytes(2, byteorder="little", signed=True), 2
+        )
+
+    def test_configure_channel_range_resets_scaling(self):
+        """Test that configure_channel_range reads the scaling again"""
+        # Arrange
+        cpxe4aoui = CpxE4AoUI()
+        cpxe4aoui.position = 1
+        cpxe4aoui.base = Mock(read_function_number=Mock(return_value=0x00))
+        cpxe4aoui.read_scaling()
+
+        # Act
+        cpxe4aoui.configure_channel_range(0, ChannelRange.U_10V)
+
+        # Assert
+        assert cpxe4aoui._scaling is None  # pylint: disable=protected-access
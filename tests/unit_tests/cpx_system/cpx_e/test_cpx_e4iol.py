@@ -1,11 +1,15 @@
 """Contains tests for cpx_e4iol class"""
 
-from unittest.mock import Mock, call
+import struct
+from unittest.mock import Mock, call, patch
 import pytest
 
+from cpx_io.cpx_system.cpx_e.cpx_e import CpxE
+from cpx_io.cpx_system.cpx_e.eep import CpxEEp
 from cpx_io.cpx_system.cpx_e.e4iol import CpxE4Iol
 from cpx_io.cpx_system.cpx_e.cpx_e_enums import OperatingMode, AddressSpace
-from cpx_io.cpx_system.cpx_dataclasses import SystemEntryRegisters
+from cpx_io.cpx_system.cpx_dataclasses import ProcessImage, SystemEntryRegisters
+from cpx_io.utils.codecs import StructCodec
 
 
 class TestCpxE4Iol:
@@ -68,6 +72,43 @@ class TestCpxE4Iol:
         # Assert
         assert status == [False, True] * 8
 
+    def test_read_snapshot(self):
+        """Test read_snapshot"""
+        # Arrange
+        cpxe4iol = CpxE4Iol()
+        cpxe4iol.system_entry_registers = SystemEntryRegisters(inputs=0)
+        cpxe4iol.base = Mock(
+            read_reg_data=Mock(
+                return_value=b"\x01\x02\x03\x04\x05\x06\x07\x08\xaa\xaa"
+            )
+        )
+
+        # Act
+        snapshot = cpxe4iol.read_snapshot()
+
+        # Assert
+        assert snapshot.channels == [b"\x01\x02", b"\x03\x04", b"\x05\x06", b"\x07\x08"]
+        assert snapshot.status == [False, True] * 8
+        cpxe4iol.base.read_reg_data.assert_called_once_with(0, 5)
+
+    def test_read_snapshot_process_image(self):
+        """Test read_snapshot with process image"""
+        # Arrange
+        cpxe4iol = CpxE4Iol()
+        cpxe4iol.system_entry_registers = SystemEntryRegisters(inputs=10)
+        cpxe4iol.base = Mock()
+        image = ProcessImage(
+            8, b"\x00" * 4 + b"\x01\x02\x03\x04\x05\x06\x07\x08\xaa\xaa"
+        )
+
+        # Act
+        snapshot = cpxe4iol.read_snapshot(image)
+
+        # Assert
+        assert snapshot.channels == [b"\x01\x02", b"\x03\x04", b"\x05\x06", b"\x07\x08"]
+        assert snapshot.status == [False, True] * 8
+        cpxe4iol.base.read_reg_data.assert_not_called()
+
     def test_read_2byte_channel_0_to_3(self):
         """Test read channels"""
         # Arrange
@@ -553,23 +594,26 @@ class TestCpxE4Iol:
             cpxe4iol.read_line_state(input_value)
 
     @pytest.mark.parametrize(
-        "input_value, expected_value",
+        "input_value, expected_value, expected_calls",
         [
             (
                 (None),
                 [("0xb", "0xb")] * 4,
+                [25, 26, 28, 29, 31, 32, 34, 35],
             ),
             (
                 (0),
                 ("0xb", "0xb"),
+                [25, 26],
             ),
             (
                 ([1, 2]),
                 [("0xb", "0xb")] * 2,
+                [28, 29, 31, 32],
             ),
         ],
     )
-    def test_read_device_error(self, input_value, expected_value):
+    def test_read_device_error(self, input_value, expected_value, expected_calls):
         """Test read_device_error per channel"""
         # Arrange
         cpxe4iol = CpxE4Iol()
@@ -581,19 +625,9 @@ class TestCpxE4Iol:
 
         # Assert
         assert state == expected_value
-        cpxe4iol.base.read_function_number.assert_has_calls(
-            [
-                call(4892 + 25),
-                call(4892 + 26),
-                call(4892 + 28),
-                call(4892 + 29),
-                call(4892 + 31),
-                call(4892 + 32),
-                call(4892 + 34),
-                call(4892 + 35),
-            ],
-            any_order=False,
-        )
+        assert cpxe4iol.base.read_function_number.call_args_list == [
+            call(4892 + offset) for offset in expected_calls
+        ]
 
     @pytest.mark.parametrize(
         "input_value",
@@ -614,3 +648,265 @@ class TestCpxE4Iol:
         # Act & Assert
         with pytest.raises(ValueError):
             cpxe4iol.read_device_error(input_value)
+
+    def test_register_codec_too_large(self):
+        """Test register_codec with codec larger than the port data"""
+        # Arrange
+        cpxe4iol = CpxE4Iol(2)
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            cpxe4iol.register_codec(0, StructCodec(">HHH"))
+
+    @pytest.mark.parametrize("input_value", [-1, 4])
+    def test_register_codec_wrong_channel(self, input_value):
+        """Test register_codec with channel out of range"""
+        # Arrange
+        cpxe4iol = CpxE4Iol(2)
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            cpxe4iol.register_codec(input_value, StructCodec(">H"))
+
+    def test_read_ports(self):
+        """Test read_ports with and without codec"""
+        # Arrange
+        cpxe4iol = CpxE4Iol(4)
+        cpxe4iol.system_entry_registers = SystemEntryRegisters(inputs=0)
+        data = struct.pack(">HH", 0x8040, 7) + bytes(range(12))
+        cpxe4iol.base = Mock(read_reg_data=Mock(return_value=data))
+        cpxe4iol.register_codec(
+            0,
+            StructCodec(
+                ">HH", ["status", "error"], bits={"fault": (0, 15), "ready": (0, 6)}
+            ),
+        )
+
+        # Act
+        ports = cpxe4iol.read_ports()
+
+        # Assert
+        assert ports[0].status == 0x8040
+        assert ports[0].error == 7
+        assert ports[0].fault and ports[0].ready
+        assert ports[1:] == [bytes(range(0, 4)), bytes(range(4, 8)), bytes(range(8, 12))]
+        cpxe4iol.base.read_reg_data.assert_called_once_with(0, 8)
+
+    def test_read_ports_process_image(self):
+        """Test read_ports from the process image"""
+        # Arrange
+        cpxe4iol = CpxE4Iol(2)
+        cpxe4iol.system_entry_registers = SystemEntryRegisters(inputs=10)
+        cpxe4iol.base = Mock()
+        cpxe4iol.register_codec(3, StructCodec("<h", ["value"]))
+        image = ProcessImage(8, bytes(4) + b"\x01\x00\x02\x00\x03\x00\xfe\xff")
+
+        # Act
+        ports = cpxe4iol.read_ports(image)
+
+        # Assert
+        assert ports[:3] == [b"\x01\x00", b"\x02\x00", b"\x03\x00"]
+        assert ports[3].value == -2
+        cpxe4iol.base.read_reg_data.assert_not_called()
+
+    def test_wait_for(self):
+        """Test wait_for until the predicate is fulfilled"""
+        # Arrange
+        cpxe4iol = CpxE4Iol(2)
+        cpxe4iol.system_entry_registers = SystemEntryRegisters(inputs=0)
+        values = [0, 0, 0, 5]
+        cpxe4iol.base = Mock(
+            read_reg_data=Mock(
+                side_effect=[struct.pack("<hhhh", 0, v, 0, 0) for v in values]
+            )
+        )
+        cpxe4iol.register_codec(1, StructCodec("<h", ["value"]))
+
+        # Act
+        with patch("time.sleep") as sleep:
+            value = cpxe4iol.wait_for(1, lambda port: port.value == 5)
+
+        # Assert
+        assert value.value == 5
+        assert [c.args[0] for c in sleep.call_args_list] == [0.001, 0.002, 0.004]
+
+    def test_wait_for_timeout(self):
+        """Test wait_for with timeout"""
+        # Arrange
+        cpxe4iol = CpxE4Iol(2)
+        cpxe4iol.system_entry_registers = SystemEntryRegisters(inputs=0)
+        cpxe4iol.base = Mock(read_reg_data=Mock(return_value=bytes(8)))
+
+        # Act & Assert
+        with pytest.raises(TimeoutError):
+            cpxe4iol.wait_for(0, lambda port: port != bytes(2), timeout=0.01)
+
+
+class TestStructCodec:
+    """Test StructCodec"""
+
+    def test_decode(self):
+        """Test decode with offset and bit fields"""
+        # Arrange
+        codec = StructCodec(
+            ">HB", ["word", "byte"], bits={"flag": (0, 1), "mode": (0, 8, 4)}
+        )
+
+        # Act
+        record = codec.decode(memoryview(b"\xff\x0a\x02\x03"), 1)
+
+        # Assert
+        assert record == (0x0A02, 3, True, 0x0A)
+        assert record.mode == 0x0A
+        assert codec.size == 3
+
+    def test_default_fields(self):
+        """Test decode without field names"""
+        # Arrange
+        codec = StructCodec("<hh")
+
+        # Act
+        record = codec.decode(b"\x01\x00\xff\xff")
+
+        # Assert
+        assert record.value0 == 1
+        assert record.value1 == -1
+
+    def test_encode(self):
+        """Test encode of a decoded record"""
+        # Arrange
+        codec = StructCodec(">HH", ["a", "b"], bits={"flag": (1, 0)})
+        record = codec.decode(b"\x00\x01\x00\x03")
+
+        # Act
+        data = codec.encode(record._replace(a=2))
+
+        # Assert
+        assert data == b"\x00\x02\x00\x03"
+
+    @pytest.mark.parametrize(
+        "input_value",
+        [{"fields": ["a"]}, {"fields": ["a", "b"], "bits": {"flag": (2, 0)}}],
+    )
+    def test_invalid(self, input_value):
+        """Test constructor with wrong field names or bit fields"""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            StructCodec(">HH", **input_value)
+
+
+class TestCpxE4IolPorts:
+    """Test the port vector functions of cpx-e-4iol"""
+
+    @pytest.fixture(name="cpxe4iol")
+    def fixture_cpxe4iol(self):
+        """CpxE4Iol on position 1 with a mocked parameter table of the base"""
+        cpx_e = CpxE([CpxEEp(), CpxE4Iol()])
+        table = {}
+        cpx_e._read_function_number_uncached = Mock(
+            side_effect=lambda function_number: table.get(function_number, 0)
+        )
+        cpx_e._write_function_number_uncached = Mock(side_effect=table.__setitem__)
+        cpx_e.table = table
+        return cpx_e.modules[1]
+
+    def test_read_port_states(self, cpxe4iol):
+        """Test read_port_states"""
+        # Arrange
+        cpxe4iol.base.table.update({4892 + 24: 0x05, 4892 + 25: 0x12, 4892 + 26: 0x34})
+
+        # Act
+        states = cpxe4iol.read_port_states()
+
+        # Assert
+        assert states[0] == CpxE4Iol.PortState("OPERATE", ("0x2", "0x4"))
+        assert states[1] == CpxE4Iol.PortState("INACTIVE", ("0x0", "0x0"))
+        assert cpxe4iol.base._read_function_number_uncached.call_count == 12
+
+    def test_read_port_states_reuses_cached_values(self, cpxe4iol):
+        """Test that read_line_state after read_port_states uses the read values"""
+        # Arrange
+        cpxe4iol.read_port_states()
+
+        # Act
+        line_state = cpxe4iol.read_line_state()
+
+        # Assert
+        assert line_state == ["INACTIVE"] * 4
+        assert cpxe4iol.base._read_function_number_uncached.call_count == 12
+
+    def test_read_port_configuration(self, cpxe4iol):
+        """Test read_port_configuration"""
+        # Arrange
+        cpxe4iol.base.table.update(
+            {4892 + 12: 0x10, 4892 + 13: 0x20, 4892 + 14: 0x01, 4892 + 15: 0xF3}
+        )
+
+        # Act
+        configuration = cpxe4iol.read_port_configuration([0, 1])
+
+        # Assert
+        assert configuration == [
+            CpxE4Iol.PortConfiguration((0, 0), False, 0),
+            CpxE4Iol.PortConfiguration((0x10, 0x20), True, 3),
+        ]
+
+    def test_configure_ports(self, cpxe4iol):
+        """Test configure_ports writes the cycle times and only changed parameters"""
+        # Arrange
+        cpxe4iol.base.table.update({4892 + 10: 0x01, 4892 + 14: 0x01})
+
+        # Act
+        cpxe4iol.configure_ports(
+            operating_mode=OperatingMode.IO_LINK,
+            pl_supply=True,
+            cycle_time=[(0, 0), (5, 0), (0, 0), (0, 0)],
+        )
+
+        # Assert
+        assert cpxe4iol.base._read_function_number_uncached.call_count == 8
+        writes = cpxe4iol.base._write_function_number_uncached.call_args_list
+        assert writes == [
+            call(4892 + 8, 0),
+            call(4892 + 9, 0),
+            call(4892 + 11, 3),
+            call(4892 + 12, 5),
+            call(4892 + 13, 0),
+            call(4892 + 15, 3),
+            call(4892 + 16, 0),
+            call(4892 + 17, 0),
+            call(4892 + 18, 1),
+            call(4892 + 19, 3),
+            call(4892 + 20, 0),
+            call(4892 + 21, 0),
+            call(4892 + 22, 1),
+            call(4892 + 23, 3),
+        ]
+
+    def test_configure_ports_again(self, cpxe4iol):
+        """Test that configuring the same values again needs no handshake"""
+        # Arrange
+        cpxe4iol.configure_ports(OperatingMode.IO_LINK, True, (0, 0))
+        cpxe4iol.base._read_function_number_uncached.reset_mock()
+        cpxe4iol.base._write_function_number_uncached.reset_mock()
+
+        # Act
+        cpxe4iol.configure_ports(OperatingMode.IO_LINK, True, (0, 0))
+
+        # Assert
+        cpxe4iol.base._read_function_number_uncached.assert_not_called()
+        cpxe4iol.base._write_function_number_uncached.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "input_value",
+        [
+            {"operating_mode": 4},
+            {"pl_supply": [True, False], "channel": [0, 1, 2]},
+            {"pl_supply": True, "channel": [4]},
+        ],
+    )
+    def test_configure_ports_invalid(self, cpxe4iol, input_value):
+        """Test configure_ports with invalid values"""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            cpxe4iol.configure_ports(**input_value)
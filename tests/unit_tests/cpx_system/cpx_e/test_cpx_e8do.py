@@ -4,7 +4,7 @@ from unittest.mock import Mock
 import pytest
 
 from cpx_io.cpx_system.cpx_e.e8do import CpxE8Do
-from cpx_io.cpx_system.cpx_dataclasses import SystemEntryRegisters
+from cpx_io.cpx_system.cpx_dataclasses import ProcessImage, SystemEntryRegisters
 
 
 class TestCpxE8Do:
@@ -48,6 +48,37 @@ class TestCpxE8Do:
         # Assert
         assert status == [False, True] * 8
 
+    def test_read_snapshot(self):
+        """Test read_snapshot"""
+        # Arrange
+        cpxe8do = CpxE8Do()
+        cpxe8do.system_entry_registers = SystemEntryRegisters(inputs=0)
+        cpxe8do.base = Mock(read_reg_data=Mock(return_value=b"\x01\x00\xaa\xaa"))
+
+        # Act
+        snapshot = cpxe8do.read_snapshot()
+
+        # Assert
+        assert snapshot.channels == [True] + [False] * 7
+        assert snapshot.status == [False, True] * 8
+        cpxe8do.base.read_reg_data.assert_called_once_with(0, 2)
+
+    def test_read_snapshot_process_image(self):
+        """Test read_snapshot with process image"""
+        # Arrange
+        cpxe8do = CpxE8Do()
+        cpxe8do.system_entry_registers = SystemEntryRegisters(inputs=10)
+        cpxe8do.base = Mock()
+        image = ProcessImage(8, b"\x00" * 4 + b"\x01\x00\xaa\xaa")
+
+        # Act
+        snapshot = cpxe8do.read_snapshot(image)
+
+        # Assert
+        assert snapshot.channels == [True] + [False] * 7
+        assert snapshot.status == [False, True] * 8
+        cpxe8do.base.read_reg_data.assert_not_called()
+
     def test_read_channel_0_to_7(self):
         """Test read channels"""
         # Arrange
@@ -102,13 +133,13 @@ class TestCpxE8Do:
         # Arrange
         cpxe8do = CpxE8Do()
         cpxe8do.system_entry_registers = SystemEntryRegisters(outputs=0)
-        cpxe8do.base = Mock(write_reg_data=Mock())
+        cpxe8do.base = Mock(write_output_image=Mock())
 
         # Act
         cpxe8do.write_channels(input_value)
 
         # Assert
-        cpxe8do.base.write_reg_data.assert_called_with(*expected_value)
+        cpxe8do.base.write_output_image.assert_called_with(*expected_value)
 
     @pytest.mark.parametrize(
         "input_value",
@@ -124,7 +155,7 @@ class TestCpxE8Do:
         cpxe8do = CpxE8Do()
         cpxe8do.system_entry_registers = SystemEntryRegisters(outputs=0)
         cpxe8do.base = Mock(
-            read_reg_data=Mock(return_value=b"\xAE"), write_reg_data=Mock()
+            read_output_image=Mock(return_value=b"\xAE"), write_output_image=Mock()
         )
 
         # Act & Assert
@@ -146,14 +177,14 @@ class TestCpxE8Do:
         cpxe8do = CpxE8Do()
         cpxe8do.system_entry_registers = SystemEntryRegisters(outputs=output_register)
         cpxe8do.base = Mock(
-            read_reg_data=Mock(return_value=b"\xAE"), write_reg_data=Mock()
+            read_output_image=Mock(return_value=b"\xAE"), write_output_image=Mock()
         )
 
         # Act
         cpxe8do.write_channel(*input_value)
 
         # Assert
-        cpxe8do.base.write_reg_data.assert_called_with(*expected_value)
+        cpxe8do.base.write_output_image.assert_called_with(*expected_value)
 
     @pytest.mark.parametrize(
         "output_register, input_value, expected_value",
@@ -170,14 +201,14 @@ class TestCpxE8Do:
         cpxe8do = CpxE8Do()
         cpxe8do.system_entry_registers = SystemEntryRegisters(outputs=output_register)
         cpxe8do.base = Mock(
-            read_reg_data=Mock(return_value=b"\xAE"), write_reg_data=Mock()
+            read_output_image=Mock(return_value=b"\xAE"), write_output_image=Mock()
         )
 
         # Act
         cpxe8do[input_value[0]] = input_value[True]
 
         # Assert
-        cpxe8do.base.write_reg_data.assert_called_with(*expected_value)
+        cpxe8do.base.write_output_image.assert_called_with(*expected_value)
 
     def test_set_channel(self):
         """Test set channel"""
@@ -185,14 +216,14 @@ class TestCpxE8Do:
         cpxe8do = CpxE8Do()
         cpxe8do.system_entry_registers = SystemEntryRegisters(outputs=0)
         cpxe8do.base = Mock(
-            read_reg_data=Mock(return_value=b"\xAE"), write_reg_data=Mock()
+            read_output_image=Mock(return_value=b"\xAE"), write_output_image=Mock()
         )
 
         # Act
         cpxe8do.set_channel(0)
 
         # Assert
-        cpxe8do.base.write_reg_data.assert_called_with(b"\xAF", 0)
+        cpxe8do.base.write_output_image.assert_called_with(b"\xAF", 0)
 
     def test_clear_channel(self):
         """Test clear channel"""
@@ -200,14 +231,14 @@ class TestCpxE8Do:
         cpxe8do = CpxE8Do()
         cpxe8do.system_entry_registers = SystemEntryRegisters(outputs=0)
         cpxe8do.base = Mock(
-            read_reg_data=Mock(return_value=b"\xAE"), write_reg_data=Mock()
+            read_output_image=Mock(return_value=b"\xAE"), write_output_image=Mock()
         )
 
         # Act
         cpxe8do.clear_channel(1)
 
         # Assert
-        cpxe8do.base.write_reg_data.assert_called_with(b"\xAC", 0)
+        cpxe8do.base.write_output_image.assert_called_with(b"\xAC", 0)
 
     def test_toggle_channel(self):
         """Test toggle channel"""
@@ -215,14 +246,14 @@ class TestCpxE8Do:
         cpxe8do = CpxE8Do()
         cpxe8do.system_entry_registers = SystemEntryRegisters(outputs=0)
         cpxe8do.base = Mock(
-            read_reg_data=Mock(return_value=b"\xAE"), write_reg_data=Mock()
+            read_output_image=Mock(return_value=b"\xAE"), write_output_image=Mock()
         )
 
         # Act
         cpxe8do.toggle_channel(2)
 
         # Assert
-        cpxe8do.base.write_reg_data.assert_called_with(
+        cpxe8do.base.write_output_image.assert_called_with(
             b"\xAA", cpxe8do.system_entry_registers.outputs
         )
 
@@ -0,0 +1,157 @@
+"""Contains tests for cpx_e_scaling"""
+
+import pytest
+from cpx_io.cpx_system.cpx_e.cpx_e_enums import ChannelRange
+from cpx_io.cpx_system.cpx_e.cpx_e_scaling import (
+    ChannelScaling,
+    ScalingVector,
+    ranges_from_parameters,
+)
+
+
+class TestChannelScaling:
+    """Test ChannelScaling"""
+
+    @pytest.mark.parametrize(
+        "input_value, expected_value",
+        [
+            ((ChannelRange.U_10V, 0), 0.0),
+            ((ChannelRange.U_10V, 32767), 10.0),
+            ((ChannelRange.B_10V, -32767), -10.0),
+            ((ChannelRange.B_5V, 32767), 5.0),
+            ((ChannelRange.U_4_20MA, 0), 4.0),
+            ((ChannelRange.U_4_20MA, 32767), 20.0),
+            ((ChannelRange.U_1_5V, 16383.5), 3.0),
+        ],
+    )
+    def test_to_units(self, input_value, expected_value):
+        """Test to_units with data format sign + 15 bit"""
+        # Arrange
+        channel_range, raw = input_value
+        scaling = ChannelScaling.from_range(channel_range)
+
+        # Act
+        value = scaling.to_units(raw)
+
+        # Assert
+        assert value == pytest.approx(expected_value)
+
+    def test_to_units_linear_scaled(self):
+        """Test to_units with data format linear scaled"""
+        # Arrange
+        scaling = ChannelScaling.from_range(ChannelRange.U_20MA, (0, 2000))
+
+        # Act
+        value = scaling.to_units(1000)
+
+        # Assert
+        assert value == pytest.approx(10.0)
+        assert scaling.unit == "mA"
+
+    @pytest.mark.parametrize(
+        "input_value, expected_value",
+        [(5.0, 16384), (0.0, 0), (-1.0, 0), (12.0, 32767)],
+    )
+    def test_to_raw(self, input_value, expected_value):
+        """Test to_raw with values inside and outside of the signal range"""
+        # Arrange
+        scaling = ChannelScaling.from_range(ChannelRange.U_10V)
+
+        # Act
+        raw = scaling.to_raw(input_value)
+
+        # Assert
+        assert raw == expected_value
+
+    def test_from_range_none(self):
+        """Test from_range without signal range"""
+        # Act
+        scaling = ChannelScaling.from_range(ChannelRange.NONE)
+
+        # Assert
+        assert scaling is None
+
+    def test_from_range_invalid_limits(self):
+        """Test from_range with lower limit above upper limit"""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            ChannelScaling.from_range(ChannelRange.U_10V, (100, -100))
+
+    def test_ranges_from_parameters(self):
+        """Test ranges_from_parameters"""
+        # Act
+        ranges = ranges_from_parameters(0x21, 0x06)
+
+        # Assert
+        assert ranges == [
+            ChannelRange.U_10V,
+            ChannelRange.B_10V,
+            ChannelRange.U_4_20MA,
+            ChannelRange.NONE,
+        ]
+
+
+class TestScalingVector:
+    """Test ScalingVector"""
+
+    @pytest.fixture(name="scaling")
+    def fixture_scaling(self):
+        """Scaling of four channels, the last one without signal range"""
+        return ScalingVector(
+            [
+                ChannelScaling.from_range(r)
+                for r in ranges_from_parameters(0x21, 0x06)
+            ]
+        )
+
+    def test_to_units(self, scaling):
+        """Test to_units with list"""
+        # Act
+        values = scaling.to_units([32767, -32767, 0, 123])
+
+        # Assert
+        assert values[:3] == pytest.approx([10.0, -10.0, 4.0])
+        assert values[3] is None
+        assert scaling.units == ["V", "V", "mA", None]
+
+    def test_to_raw(self, scaling):
+        """Test to_raw with list"""
+        # Act
+        raw = scaling.to_raw([10.0, -20.0, 12.0, 1.0])
+
+        # Assert
+        assert raw == [32767, -32767, 16384, 0]
+
+    def test_wrong_length(self, scaling):
+        """Test conversion with wrong number of values"""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            scaling.to_units([1, 2, 3])
+
+    def test_channel_without_range(self, scaling):
+        """Test channel without signal range"""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            scaling.channel(3)
+
+    def test_numpy(self):
+        """Test conversion of numpy arrays"""
+        # Arrange
+        np = pytest.importorskip("numpy")
+        scaling = ScalingVector(
+            [ChannelScaling.from_range(ChannelRange.U_10V)] * 2
+            + [ChannelScaling.from_range(ChannelRange.B_20MA), None]
+        )
+        raw = np.array([[0, 32767, -32767, 5], [16384, 0, 32767, 5]])
+
+        # Act
+        values = scaling.to_units(raw)
+        quantized = scaling.to_raw(values)
+
+        # Assert
+        assert values.shape == (2, 4)
+        assert values[0, 1] == pytest.approx(10.0)
+        assert values[0, 2] == pytest.approx(-20.0)
+        assert np.isnan(values[0, 3])
+        assert quantized[:, :3].tolist() == raw[:, :3].tolist()
+        assert quantized[:, 3].tolist() == [0, 0]
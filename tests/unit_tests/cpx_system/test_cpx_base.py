@@ -1,11 +1,14 @@
 """Contains tests for CpxBase class"""
 
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, call, patch
 from dataclasses import dataclass
 import pytest
 
 from pymodbus.client import ModbusTcpClient
+from pymodbus.exceptions import ConnectionException
 from cpx_io.cpx_system.cpx_base import CpxBase, CpxInitError
+from cpx_io.cpx_system.cpx_dataclasses import ReadRequest, WriteRequest
+from cpx_io.cpx_system.cpx_transport import ModbusTcpTransport
 
 
 class TestCpxBase:
@@ -414,6 +417,142 @@ class TestCpxBase:
         # Assert
         cpx.client.write_registers.assert_called_with(0, expected_value)
 
+    def test_write_read_reg_data(self):
+        "Test write_read_reg_data function"
+
+        # Arrange
+        class response:
+            """mock response object"""
+
+            def __init__(self):
+                self.registers = [0xBBAA]
+
+            def isError(self):
+                "mock error function"
+                return False
+
+        cpx = CpxBase()
+        cpx.client = Mock(readwrite_registers=Mock(return_value=response()))
+
+        # Act
+        data = cpx.write_read_reg_data(b"\x01\x02\x03", 0, 10)
+
+        # Assert
+        assert data == b"\xAA\xBB"
+        cpx.client.readwrite_registers.assert_called_with(
+            read_address=10, read_count=1, write_address=0, values=[0x0201, 0x03]
+        )
+
+    def test_execute_batch_sequential(self):
+        "Test execute_batch without lean transport"
+        # Arrange
+        cpx = CpxBase()
+        cpx.read_reg_data = Mock(return_value=b"\x01\x00")
+        cpx.write_reg_data = Mock()
+
+        # Act
+        results = cpx.execute_batch(
+            [ReadRequest(10, 1), WriteRequest(b"\x01\x02", 20), ReadRequest(30)]
+        )
+
+        # Assert
+        assert results == [b"\x01\x00", None, b"\x01\x00"]
+        cpx.read_reg_data.assert_has_calls([call(10, 1), call(30, 1)])
+        cpx.write_reg_data.assert_called_once_with(b"\x01\x02", 20)
+
+    def test_execute_batch_invalid_request(self):
+        "Test execute_batch with unsupported request"
+        # Arrange
+        cpx = CpxBase()
+
+        # Act & Assert
+        with pytest.raises(TypeError):
+            cpx.execute_batch([(10, 1)])
+
+    @pytest.mark.parametrize("lean_transport", [False, True])
+    def test_read_reg_data_reconnect(self, fake_device, lean_transport):
+        "Test read_reg_data is repeated after the device dropped the connection"
+        # Arrange
+        fake_device.set_registers(0, b"\x01\x02")
+        cpx = CpxBase(reconnect_backoff=0)
+        cpx.client = ModbusTcpClient("127.0.0.1", port=fake_device.port)
+        if lean_transport:
+            cpx._transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+        cpx._revalidate = Mock()
+        assert cpx.read_reg_data(0) == b"\x01\x02"
+
+        # Act
+        fake_device.drop_connections()
+        data = cpx.read_reg_data(0)
+
+        # Assert
+        assert data == b"\x01\x02"
+        assert cpx._connection_generation == 1
+        cpx._revalidate.assert_called_once_with()
+        cpx.client.close()
+
+    def test_write_reg_data_reconnect_without_retry(self):
+        "Test write_reg_data is not repeated after a reconnect"
+        # Arrange
+        cpx = CpxBase(reconnect_backoff=0)
+        cpx.client = Mock(
+            write_registers=Mock(side_effect=ConnectionResetError),
+            connect=Mock(return_value=True),
+        )
+
+        # Act & Assert
+        with pytest.raises(ConnectionResetError):
+            cpx.write_reg_data(b"\x01\x00", 0)
+        cpx.client.connect.assert_called_once()
+        cpx.client.write_registers.assert_called_once()
+
+    def test_read_reg_data_error_response_no_reconnect(self):
+        "Test that an error response does not trigger a reconnect"
+        # Arrange
+        response = Mock(isError=Mock(return_value=True), message="error")
+        cpx = CpxBase(reconnect_backoff=0)
+        cpx.client = Mock(read_holding_registers=Mock(return_value=response))
+
+        # Act & Assert
+        with pytest.raises(ConnectionAbortedError):
+            cpx.read_reg_data(0)
+        cpx.client.connect.assert_not_called()
+
+    @patch("cpx_io.cpx_system.cpx_base.time.sleep")
+    def test_reconnect_failed(self, mock_sleep):
+        "Test reconnect with exponential backoff"
+        # Arrange
+        cpx = CpxBase(reconnect_attempts=4, reconnect_backoff=0.5)
+        cpx.client = Mock(
+            read_holding_registers=Mock(side_effect=ConnectionException("lost")),
+            connect=Mock(return_value=False),
+        )
+
+        # Act & Assert
+        with pytest.raises(ConnectionException):
+            cpx.read_reg_data(0)
+        assert cpx.client.connect.call_count == 4
+        mock_sleep.assert_has_calls([call(0.5), call(1.0), call(2.0), call(2.0)])
+
+    def test_reconnect_disabled(self):
+        "Test that reconnect_attempts=0 disables the reconnect"
+        # Arrange
+        cpx = CpxBase(reconnect_attempts=0)
+        cpx.client = Mock(read_holding_registers=Mock(side_effect=ConnectionResetError))
+
+        # Act & Assert
+        with pytest.raises(ConnectionResetError):
+            cpx.read_reg_data(0)
+        cpx.client.connect.assert_not_called()
+
+    def test_reconnect_no_client(self):
+        "Test reconnect without ip address"
+        # Arrange
+        cpx = CpxBase()
+
+        # Act & Assert
+        assert cpx.reconnect() is False
+
     def test_require_base_missing(self):
         "Test require_base function"
 
@@ -0,0 +1,111 @@
+"""Contains concurrency tests for CpxBase against a stand-in device"""
+
+import struct
+import threading
+from unittest.mock import patch
+import pytest
+
+from pymodbus.client import ModbusTcpClient
+from cpx_io.cpx_system.cpx_ap.cpx_ap import CpxAp
+from cpx_io.cpx_system.cpx_transport import ModbusTcpTransport
+
+PARAMETER_REGISTER = 10000
+
+
+def parameter_mailbox(server, register, values):
+    """Write hook that emulates the CPX-AP parameter mailbox. A read request returns
+    module, parameter id and instance of the request as data, so a request that was
+    mixed up with the one of another thread returns wrong data.
+    """
+    command_register = PARAMETER_REGISTER + 3
+    if not register <= command_register < register + len(values):
+        return
+    if server.registers[command_register] == 1:
+        request = server.get_registers(PARAMETER_REGISTER, 3)
+        server.set_registers(PARAMETER_REGISTER + 10, request)
+        server.set_registers(PARAMETER_REGISTER + 4, struct.pack("<H", len(request)))
+    server.registers[command_register] = 16
+
+
+def create_cpx_ap(fake_device, lean_transport):
+    """Returns a CpxAp that is connected to the fake device"""
+    with patch.object(CpxAp, "connected", return_value=False):
+        cpx = CpxAp()
+    cpx.client = ModbusTcpClient("127.0.0.1", port=fake_device.port)
+    if lean_transport:
+        cpx._transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+    return cpx
+
+
+class TestCpxConcurrency:
+    "Test concurrent use of one CpxBase"
+
+    @pytest.mark.parametrize("lean_transport", [False, True])
+    def test_parameter_mailbox_stress(self, fake_device, lean_transport):
+        "Test concurrent parameter reads and cyclic reads"
+        # Arrange
+        fake_device.write_hooks.append(parameter_mailbox)
+        fake_device.set_registers(5000, b"\xaa\x55")
+        cpx = create_cpx_ap(fake_device, lean_transport)
+        errors = []
+
+        def read_parameters(position):
+            for param_id in range(40):
+                data = cpx._read_parameter_raw(position, param_id, position % 4)
+                expected = struct.pack("<HHH", position + 1, param_id, position % 4)
+                if data != expected:
+                    errors.append((position, param_id, data))
+
+        def read_inputs():
+            for _ in range(200):
+                if cpx.read_reg_data(5000) != b"\xaa\x55":
+                    errors.append("cyclic")
+
+        threads = [
+            threading.Thread(target=read_parameters, args=(i,)) for i in range(6)
+        ]
+        threads.append(threading.Thread(target=read_inputs))
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        assert not errors
+        cpx.shutdown()
+
+    def test_acyclic_connection(self, fake_device):
+        "Test that mailbox transactions use the acyclic connection"
+        # Arrange
+        fake_device.write_hooks.append(parameter_mailbox)
+        cpx = create_cpx_ap(fake_device, lean_transport=True)
+        cpx._acyclic_client = ModbusTcpClient("127.0.0.1", port=fake_device.port)
+        cpx._acyclic_transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+
+        # Act
+        cpx.read_reg_data(5000)
+        data = cpx._read_parameter_raw(0, 20, 1)
+
+        # Assert
+        assert data == b"\x01\x00\x14\x00\x01\x00"
+        assert cpx._transport.connected
+        assert cpx._acyclic_transport.connected
+        assert len(fake_device.connections) == 2
+        cpx.shutdown()
+
+    def test_mailbox_reentrant(self):
+        "Test that a mailbox can be entered again by the same thread"
+        # Arrange
+        with patch.object(CpxAp, "connected", return_value=False):
+            cpx = CpxAp()
+
+        # Act
+        with cpx.mailbox("isdu"):
+            with cpx.mailbox("isdu"):
+                depth = cpx._local.mailbox_depth
+
+        # Assert
+        assert depth == 2
+        assert cpx._local.mailbox_depth == 0
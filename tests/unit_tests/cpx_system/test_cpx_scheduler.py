@@ -0,0 +1,339 @@
+"""Contains tests for RequestScheduler class"""
+
+import threading
+import time
+from unittest.mock import MagicMock, Mock, call
+import pytest
+
+from cpx_io.cpx_system.cpx_base import CpxBase
+from cpx_io.cpx_system.cpx_scheduler import Priority, RequestScheduler
+from cpx_io.utils.statistics import LatencyStatistics
+
+
+def wait_for(condition, timeout=2.0):
+    """Waits until condition() is True"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError
+        time.sleep(0.001)
+
+
+class TestRequestScheduler:
+    "Test RequestScheduler"
+
+    def test_priority_order(self):
+        "Test that waiting requests are granted by priority"
+        # Arrange
+        scheduler = RequestScheduler()
+        order = []
+
+        def request(priority):
+            with scheduler.request(priority):
+                order.append(priority)
+
+        scheduler.acquire(Priority.OUTPUT)
+        threads = []
+        for priority in [Priority.DOCS, Priority.PARAMETER, Priority.CYCLIC_INPUT]:
+            thread = threading.Thread(target=request, args=(priority,))
+            thread.start()
+            threads.append(thread)
+            wait_for(lambda p=priority: scheduler.queue_depth(p) == 1)
+
+        # Act
+        scheduler.release()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        assert order == [Priority.CYCLIC_INPUT, Priority.PARAMETER, Priority.DOCS]
+
+    def test_reentrant(self):
+        "Test that a thread can acquire the scheduler again"
+        # Arrange
+        scheduler = RequestScheduler()
+
+        # Act
+        with scheduler.request(Priority.PARAMETER):
+            with scheduler.request(Priority.OUTPUT):
+                depth = scheduler.queue_depth()
+
+        # Assert
+        assert depth == 0
+        assert scheduler.wait_statistics[Priority.PARAMETER].count == 1
+        assert scheduler.wait_statistics[Priority.OUTPUT].count == 0
+
+    def test_release_other_thread(self):
+        "Test release of a request that is held by another thread"
+        # Arrange
+        scheduler = RequestScheduler()
+        errors = []
+
+        def release():
+            try:
+                scheduler.release()
+            except RuntimeError as error:
+                errors.append(error)
+
+        # Act
+        with scheduler.request(Priority.OUTPUT):
+            thread = threading.Thread(target=release)
+            thread.start()
+            thread.join()
+
+        # Assert
+        assert len(errors) == 1
+
+    def test_budget(self):
+        "Test that a budget delays requests to the next cycle"
+        # Arrange
+        scheduler = RequestScheduler(cycle_time=0.05)
+        scheduler.set_budget(Priority.DOCS, 1)
+
+        # Act
+        start = time.monotonic()
+        with scheduler.request(Priority.DOCS):
+            pass
+        with scheduler.request(Priority.DOCS):
+            pass
+        elapsed = time.monotonic() - start
+
+        # Assert
+        assert elapsed >= 0.02
+
+    def test_budget_does_not_block_other_classes(self):
+        "Test that an exhausted budget only delays its own priority class"
+        # Arrange
+        scheduler = RequestScheduler(cycle_time=10.0)
+        scheduler.set_budget(Priority.DOCS, 1)
+        with scheduler.request(Priority.DOCS):
+            pass
+        thread = threading.Thread(target=scheduler.acquire, args=(Priority.DOCS,))
+        thread.start()
+        wait_for(lambda: scheduler.queue_depth(Priority.DOCS) == 1)
+
+        # Act
+        with scheduler.request(Priority.PARAMETER):
+            depth = scheduler.queue_depth(Priority.DOCS)
+
+        # Assert
+        assert depth == 1
+        scheduler.set_budget(Priority.DOCS)
+        thread.join()
+
+    @pytest.mark.parametrize("input_value", [0, -1])
+    def test_set_budget_invalid(self, input_value):
+        "Test set_budget with invalid budget"
+        # Arrange
+        scheduler = RequestScheduler()
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            scheduler.set_budget(Priority.DOCS, input_value)
+
+    def test_submit(self):
+        "Test submit"
+        # Arrange
+        scheduler = RequestScheduler()
+
+        # Act
+        future = scheduler.submit(lambda: 42)
+
+        # Assert
+        assert future.result(timeout=2) == 42
+        scheduler.shutdown()
+
+    def test_submit_exception(self):
+        "Test submit with failing job"
+        # Arrange
+        scheduler = RequestScheduler()
+
+        def job():
+            raise ValueError
+
+        # Act
+        future = scheduler.submit(job)
+
+        # Assert
+        with pytest.raises(ValueError):
+            future.result(timeout=2)
+        scheduler.shutdown()
+
+    def test_submit_priority_order(self):
+        "Test that queued jobs are executed by priority"
+        # Arrange
+        scheduler = RequestScheduler()
+        event = threading.Event()
+        order = []
+        first = scheduler.submit(event.wait)
+        wait_for(lambda: scheduler.queue_depth() == 0)
+
+        # Act
+        futures = [
+            scheduler.submit(lambda: order.append("docs"), Priority.DOCS),
+            scheduler.submit(lambda: order.append("diagnosis"), Priority.DIAGNOSIS),
+            scheduler.submit(lambda: order.append("output"), Priority.OUTPUT),
+        ]
+        depth = scheduler.queue_depth()
+        event.set()
+        for future in [first] + futures:
+            future.result(timeout=2)
+
+        # Assert
+        assert depth == 3
+        assert order == ["output", "diagnosis", "docs"]
+        scheduler.shutdown()
+
+    def test_shutdown_cancels_jobs(self):
+        "Test that shutdown cancels queued jobs"
+        # Arrange
+        scheduler = RequestScheduler()
+        event = threading.Event()
+        scheduler.submit(event.wait)
+        wait_for(lambda: scheduler.queue_depth() == 0)
+        future = scheduler.submit(lambda: None)
+
+        # Act
+        event.set()
+        scheduler.shutdown()
+
+        # Assert
+        assert future.cancelled() or future.done()
+        with pytest.raises(RuntimeError):
+            scheduler.submit(lambda: None)
+
+    def test_statistics(self):
+        "Test statistics"
+        # Arrange
+        scheduler = RequestScheduler()
+        with scheduler.request(Priority.DIAGNOSIS):
+            pass
+
+        # Act
+        statistics = scheduler.statistics()
+
+        # Assert
+        assert list(statistics) == [priority.name for priority in Priority]
+        assert statistics["DIAGNOSIS"]["queue_depth"] == 0
+        assert statistics["DIAGNOSIS"]["wait_time"]["count"] == 1
+        assert statistics["OUTPUT"]["wait_time"]["count"] == 0
+
+
+class TestLatencyStatistics:
+    "Test LatencyStatistics"
+
+    def test_record(self):
+        "Test record"
+        # Arrange
+        statistics = LatencyStatistics(bucket_bounds=(0.001, 0.01))
+
+        # Act
+        for duration in [0.0005, 0.001, 0.002, 0.5]:
+            statistics.record(duration)
+
+        # Assert
+        assert statistics.count == 4
+        assert statistics.minimum == 0.0005
+        assert statistics.maximum == 0.5
+        assert statistics.mean == pytest.approx(0.503500 / 4)
+        assert statistics.histogram() == {0.001: 2, 0.01: 1, float("inf"): 1}
+
+    def test_reset(self):
+        "Test reset"
+        # Arrange
+        statistics = LatencyStatistics()
+        statistics.record(0.1)
+
+        # Act
+        statistics.reset()
+
+        # Assert
+        assert statistics.count == 0
+        assert statistics.mean == 0.0
+        assert statistics.maximum is None
+        assert sum(statistics.buckets) == 0
+
+
+class TestCpxBasePriority:
+    "Test the priority of requests of CpxBase"
+
+    @pytest.fixture(name="cpx")
+    def fixture_cpx(self):
+        """CpxBase with mocked client and scheduler"""
+        cpx = CpxBase()
+        cpx.client = Mock(
+            read_holding_registers=Mock(
+                return_value=Mock(registers=[0], isError=Mock(return_value=False))
+            )
+        )
+        cpx.scheduler = Mock(request=MagicMock())
+        return cpx
+
+    def test_default_priorities(self, cpx):
+        "Test the default priority of reads, writes and mailbox transactions"
+        # Act
+        cpx.read_reg_data(0)
+        cpx.write_reg_data(b"\x00\x00", 0)
+        with cpx.mailbox("parameter"):
+            cpx.read_reg_data(0)
+
+        # Assert
+        assert cpx.scheduler.request.call_args_list == [
+            call(Priority.CYCLIC_INPUT),
+            call(Priority.OUTPUT),
+            call(Priority.PARAMETER),
+        ]
+
+    def test_priority_context(self, cpx):
+        "Test priority()"
+        # Act
+        with cpx.priority(Priority.DIAGNOSIS):
+            with cpx.mailbox("parameter"):
+                cpx.read_reg_data(0)
+        cpx.read_reg_data(0)
+
+        # Assert
+        assert cpx.scheduler.request.call_args_list == [
+            call(Priority.DIAGNOSIS),
+            call(Priority.CYCLIC_INPUT),
+        ]
+
+    def test_with_priority(self, cpx):
+        "Test with_priority decorator"
+
+        # Arrange
+        class CpxDiagnosis(CpxBase):
+            "CpxBase with diagnosis function"
+
+            @CpxBase.with_priority(Priority.DIAGNOSIS)
+            def read_diagnosis(self):
+                "reads diagnosis register"
+                return self.read_reg_data(0)
+
+        diagnosis = CpxDiagnosis()
+        diagnosis.client = cpx.client
+        diagnosis.scheduler = cpx.scheduler
+
+        # Act
+        diagnosis.read_diagnosis()
+
+        # Assert
+        cpx.scheduler.request.assert_called_once_with(Priority.DIAGNOSIS)
+
+    def test_submit(self):
+        "Test submit"
+        # Arrange
+        cpx = CpxBase()
+        cpx.client = Mock(
+            read_holding_registers=Mock(
+                return_value=Mock(registers=[1], isError=Mock(return_value=False))
+            )
+        )
+
+        # Act
+        future = cpx.submit(cpx.read_reg_data, 10, priority=Priority.DOCS)
+
+        # Assert
+        assert future.result(timeout=2) == b"\x01\x00"
+        assert cpx.scheduler.wait_statistics[Priority.DOCS].count == 1
+        cpx.shutdown()
@@ -0,0 +1,288 @@
+"""Contains tests for ModbusTcpTransport class"""
+
+from unittest.mock import Mock, patch
+import pytest
+
+from cpx_io.cpx_system.cpx_base import CpxBase
+from cpx_io.cpx_system.cpx_dataclasses import ReadRequest, WriteRequest
+from cpx_io.cpx_system.cpx_transport import ModbusTcpTransport, swap_register_bytes
+
+
+class TestModbusTcpTransport:
+    "Test ModbusTcpTransport"
+
+    def test_swap_register_bytes(self):
+        "Test swap_register_bytes"
+        # Arrange
+        data = bytearray(b"\x01\x02\x03\x04\x05\x06")
+
+        # Act
+        swap_register_bytes(data, 2, 6)
+
+        # Assert
+        assert data == b"\x01\x02\x04\x03\x06\x05"
+
+    def test_read_holding_registers(self, fake_device):
+        "Test read_holding_registers"
+        # Arrange
+        fake_device.set_registers(100, b"\xaa\xbb\xcc\xdd")
+        transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+
+        # Act
+        data = transport.read_holding_registers(100, 2)
+
+        # Assert
+        assert isinstance(data, memoryview)
+        assert bytes(data) == b"\xaa\xbb\xcc\xdd"
+        transport.close()
+
+    def test_write_registers(self, fake_device):
+        "Test write_registers"
+        # Arrange
+        transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+
+        # Act
+        transport.write_registers(b"\xaa\xbb\xcc\xdd", 200)
+
+        # Assert
+        assert fake_device.registers[200] == 0xBBAA
+        assert fake_device.registers[201] == 0xDDCC
+        transport.close()
+
+    def test_read_write_registers(self, fake_device):
+        "Test read_write_registers"
+        # Arrange
+        fake_device.set_registers(300, b"\x01\x00")
+        transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+
+        # Act
+        data = transport.read_write_registers(b"\x02\x00", 301, 300, 2)
+
+        # Assert
+        assert bytes(data) == b"\x01\x00\x02\x00"
+        assert fake_device.requests == [23]
+        transport.close()
+
+    def test_exception_response(self, fake_device):
+        "Test exception response of the device"
+        # Arrange
+        transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+        transport.connect()
+        transport._read_frame[7] = 0x04  # pylint: disable=protected-access
+
+        # Act & Assert
+        with pytest.raises(ConnectionAbortedError):
+            transport.read_holding_registers(0)
+        transport.close()
+
+    @pytest.mark.parametrize("input_value", [0, 126])
+    def test_read_holding_registers_invalid_length(self, input_value):
+        "Test read_holding_registers"
+        # Arrange
+        transport = ModbusTcpTransport("127.0.0.1")
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            transport.read_holding_registers(0, input_value)
+
+    def test_connection_closed_by_peer(self, fake_device):
+        "Test that a dropped connection is reported and can be reopened"
+        # Arrange
+        transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+        transport.read_holding_registers(0)
+        fake_device.drop_connections()
+
+        # Act & Assert
+        with pytest.raises(OSError):
+            transport.read_holding_registers(0)
+        assert not transport.connected
+        assert bytes(transport.read_holding_registers(0)) == b"\x00\x00"
+        transport.close()
+
+    def test_execute_pipelined(self, fake_device):
+        "Test execute_pipelined"
+        # Arrange
+        fake_device.set_registers(0, b"\x01\x02\x03\x04")
+        transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+        requests = [
+            ReadRequest(0, 2),
+            WriteRequest(b"\xaa\xbb", 10),
+            ReadRequest(1),
+            ReadRequest(10),
+        ]
+
+        # Act
+        results = transport.execute_pipelined(requests, 3)
+
+        # Assert
+        assert results == [b"\x01\x02\x03\x04", None, b"\x03\x04", b"\xaa\xbb"]
+        assert fake_device.requests == [3, 16, 3, 3]
+        transport.close()
+
+    def test_execute_pipelined_discards_stale_responses(self, fake_device):
+        "Test that responses of unknown transactions are ignored"
+        # Arrange
+        fake_device.set_registers(0, b"\x01\x02")
+        transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+        transport.connect()
+        # request without collecting its response
+        _, frame = transport._prepare_read(0, 1)  # pylint: disable=protected-access
+        transport._send(frame)  # pylint: disable=protected-access
+
+        # Act
+        results = transport.execute_pipelined([ReadRequest(0)], 2)
+
+        # Assert
+        assert results == [b"\x01\x02"]
+        transport.close()
+
+    def test_execute_pipelined_invalid_request(self, fake_device):
+        "Test execute_pipelined with unsupported request"
+        # Arrange
+        transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+
+        # Act & Assert
+        with pytest.raises(TypeError):
+            transport.execute_pipelined([0], 2)
+        transport.close()
+
+    def test_probe_pipeline_depth(self, fake_device):
+        "Test probe_pipeline_depth"
+        # Arrange
+        transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+
+        # Act
+        depth = transport.probe_pipeline_depth(0, 4)
+
+        # Assert
+        assert depth == 4
+        assert fake_device.requests == [3, 3, 3, 3]
+        transport.close()
+
+    def test_probe_pipeline_depth_not_supported(self, fake_device):
+        "Test probe_pipeline_depth with device that closes the connection"
+        # Arrange
+        process = fake_device.process
+
+        def process_first_only(function_code, pdu):
+            if fake_device.requests:
+                fake_device.drop_connections()
+            return process(function_code, pdu)
+
+        fake_device.process = process_first_only
+        transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+
+        # Act
+        depth = transport.probe_pipeline_depth(0, 4)
+
+        # Assert
+        assert depth == 1
+        assert transport.connected
+        transport.close()
+
+
+class TestCpxBaseLeanTransport:
+    "Test CpxBase with lean transport"
+
+    @patch("cpx_io.cpx_system.cpx_base.ModbusTcpTransport", spec=True)
+    @patch("cpx_io.cpx_system.cpx_base.ModbusTcpClient", spec=True)
+    def test_constructor_lean_transport(self, mock_modbus_client, mock_transport):
+        "Test constructor"
+        # Arrange
+
+        # Act
+        cpx = CpxBase("192.168.1.1", lean_transport=True)
+
+        # Assert
+        mock_transport.return_value.connect.assert_called_once()
+        mock_modbus_client.return_value.connect.assert_not_called()
+        assert cpx._transport is mock_transport.return_value
+        assert cpx.pipeline_window == 8
+
+    @patch("cpx_io.cpx_system.cpx_base.ModbusTcpTransport", spec=True)
+    @patch("cpx_io.cpx_system.cpx_base.ModbusTcpClient", spec=True)
+    def test_constructor_probes_pipeline_depth(
+        self, mock_modbus_client, mock_transport
+    ):
+        "Test constructor with probe register"
+
+        # Arrange
+        class CpxProbe(CpxBase):
+            "CpxBase with probe register"
+
+            _pipeline_probe_register = 12000
+
+        mock_transport.return_value.probe_pipeline_depth.return_value = 2
+
+        # Act
+        cpx = CpxProbe("192.168.1.1", lean_transport=True, pipeline_window=4)
+
+        # Assert
+        mock_transport.return_value.probe_pipeline_depth.assert_called_once_with(
+            12000, 4
+        )
+        mock_modbus_client.return_value.connect.assert_not_called()
+        assert cpx.pipeline_window == 2
+
+    def test_read_write_reg_data(self, fake_device):
+        "Test read_reg_data and write_reg_data"
+        # Arrange
+        cpx = CpxBase()
+        cpx._transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+
+        # Act
+        cpx.write_reg_data(b"\xaa\xbb\xcc", 10)
+        data = cpx.read_reg_data(10, 2)
+        view = cpx.read_reg_view(10)
+
+        # Assert
+        assert data == b"\xaa\xbb\xcc\x00"
+        assert isinstance(data, bytes)
+        assert bytes(view) == b"\xaa\xbb"
+        cpx.shutdown()
+
+    def test_write_read_reg_data(self, fake_device):
+        "Test write_read_reg_data"
+        # Arrange
+        cpx = CpxBase()
+        cpx._transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+
+        # Act
+        data = cpx.write_read_reg_data(b"\x01\x02", 20, 20)
+
+        # Assert
+        assert data == b"\x01\x02"
+        cpx.shutdown()
+
+    def test_execute_batch_pipelined(self, fake_device):
+        "Test execute_batch with lean transport"
+        # Arrange
+        fake_device.set_registers(0, b"\x01\x02")
+        cpx = CpxBase()
+        cpx._transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+        cpx.pipeline_window = 4
+
+        # Act
+        results = cpx.execute_batch([WriteRequest(b"\xaa", 5), ReadRequest(0)])
+
+        # Assert
+        assert results == [None, b"\x01\x02"]
+        assert fake_device.registers[5] == 0x00AA
+        cpx.shutdown()
+
+    def test_read_reg_data_reconnect(self, fake_device):
+        "Test that a read is repeated after the connection was dropped"
+        # Arrange
+        fake_device.set_registers(0, b"\x01\x02")
+        cpx = CpxBase(reconnect_backoff=0)
+        cpx.client = Mock()
+        cpx._transport = ModbusTcpTransport("127.0.0.1", fake_device.port)
+        cpx.read_reg_data(0)
+        fake_device.drop_connections()
+
+        # Act
+        data = cpx.read_reg_data(0)
+
+        # Assert
+        assert data == b"\x01\x02"
+        cpx.shutdown()